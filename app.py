@@ -3,58 +3,199 @@ aplicacao web para o sistema de recomendacao hierarquica de produtos
 interface grafica usando fastapi
 """
 
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+import time
+
+# inicio do import, para medir quanto a inicializacao gasta so importando modulos
+INICIO_IMPORT = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+import asyncio
+import hashlib
+import os
+import uuid
+from urllib.parse import parse_qsl, urlencode
 import uvicorn
 
-from src.business_logic import SistemaRecomendacao
+from src.avl_tree import altura_teorica_minima
+from src.business_logic import LacunaAlteracoes, SistemaRecomendacao
+from src.cache_respostas import CacheRespostas, EntradaCache
+from src.compressao import aceitas, comprimir
 from src.database import Database
+from src.escrita import CoordenadorEscrita
+from src.estaticos import EstaticosPrecomprimidos, carregar_manifesto
+from src import exportacao
+from src.indices_produtos import chave_da_ordenacao
+from src.lote import (LoteRecusado, aplicar_lote_categorias, aplicar_lote_produtos,
+                      gravar_lote_categorias, gravar_lote_produtos)
+from src.memoria_compartilhada import MAX_PRODUTOS_DECODIFICADOS, CatalogoCompartilhado
+from src.models import Produto
+from src.perfilamento import Perfilador
+from src.relacionados import MotorRelacionados
+from src.serializacao import dumps, juntar_lista, produtos_json
+from src.snapshot import carregar_snapshot, salvar_snapshot
 
-app = FastAPI(title="SRHP - Sistema de Recomendacao de Produtos")
+# instanciar o sistema de recomendacao e banco de dados
+# (a carga do catalogo na AVL acontece no lifespan, nao no import); a
+# estrutura das categorias e configuravel (avl, arvore_b ou lista_blocos)
+sistema = SistemaRecomendacao(os.environ.get("SRHP_ESTRUTURA", "avl"),
+                              os.environ.get("SRHP_CHAVES", "colacao"),
+                              os.environ.get("SRHP_SUGESTOES", "categorias"),
+                              os.environ.get("SRHP_INDICES_PRODUTOS", "1") != "0")
+db = Database(os.environ.get("SRHP_DB", "srhp.db"))
 
-# configurar arquivos estaticos e templates
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# catalogo compartilhado entre workers: com o nome do segmento definido, este
+# processo nao carrega a AVL; ele mapeia a versao publicada por
+# scripts/publicar_catalogo.py e troca de versao quando sai uma nova. as
+# categorias lidas ficam decodificadas em um lru limitado em produtos
+CATALOGO_COMPARTILHADO = os.environ.get("SRHP_CATALOGO_COMPARTILHADO", "")
+catalogo_compartilhado = CatalogoCompartilhado(
+    CATALOGO_COMPARTILHADO,
+    int(os.environ.get("SRHP_CATALOGO_DECODIFICADOS", str(MAX_PRODUTOS_DECODIFICADOS)))
+) if CATALOGO_COMPARTILHADO else None
 
-# instanciar o sistema de recomendacao e banco de dados
-sistema = SistemaRecomendacao()
-db = Database()
+# group commit: escritas que chegam dentro da janela (ou ate o tamanho maximo)
+# saem em uma unica transacao do sqlite
+escritas = CoordenadorEscrita(
+    db,
+    janela_ms=float(os.environ.get("SRHP_JANELA_ESCRITA_MS", "2")),
+    tamanho_maximo=int(os.environ.get("SRHP_LOTE_ESCRITA_MAX", "64")),
+    aplicar_em_memoria=catalogo_compartilhado is None,
+    sistema=sistema
+)
+
+# cache de respostas das rotas de leitura: orcamento em bytes (0 desliga) e
+# max-age enviado aos clientes (0 = revalidar sempre com If-None-Match)
+cache_respostas = CacheRespostas(int(os.environ.get("SRHP_CACHE_RESPOSTAS_BYTES", str(32 * 1024 * 1024))))
+CACHE_MAX_AGE = int(os.environ.get("SRHP_CACHE_MAX_AGE", "0"))
+
+# tags de invalidacao do cache: as escritas emitem a tag da tabela que mudaram
+TAG_CATEGORIAS = "categorias"
+TAG_PRODUTOS = "produtos"
+TAG_RELACIONADOS = "relacionados"
+
+# rotas cacheaveis (o caminho exato ou qualquer subcaminho) e as tags de que
+# cada resposta depende; produtos trazem o nome da categoria, entao tambem
+# dependem de categorias
+ROTAS_CACHEAVEIS = {
+    "/api/categorias": (TAG_CATEGORIAS,),
+    "/api/produtos": (TAG_PRODUTOS, TAG_CATEGORIAS),
+    "/api/hierarquia": (TAG_CATEGORIAS,),
+    "/api/buscar": (TAG_CATEGORIAS, TAG_PRODUTOS),
+    "/api/recomendar": (TAG_CATEGORIAS, TAG_PRODUTOS),
+    "/api/busca": (TAG_PRODUTOS, TAG_CATEGORIAS),
+    "/api/sugestoes": (TAG_CATEGORIAS, TAG_PRODUTOS),
+}
+
+# subcaminhos com dependencias proprias, conferidos antes dos prefixos
+SUFIXOS_CACHEAVEIS = {
+    "/relacionados": (TAG_RELACIONADOS, TAG_PRODUTOS, TAG_CATEGORIAS),
+}
+
+# numero maximo de itens aceitos por chamada dos endpoints de lote
+LOTE_API_MAX = int(os.environ.get("SRHP_LOTE_API_MAX", "5000"))
+
+# respostas (api e paginas) a partir deste tamanho saem comprimidas quando o
+# cliente aceita gzip/brotli; 0 desliga
+COMPRESSAO_MIN_BYTES = int(os.environ.get("SRHP_COMPRESSAO_MIN_BYTES", "1024"))
+
+# perfilamento sob demanda (cProfile + tracemalloc) de 1 requisicao a cada N
+# ou das que vierem com o cabecalho; desligado, o middleware e as rotas /debug
+# nem sao registrados
+perfilador = Perfilador(
+    amostragem=int(os.environ.get("SRHP_PERFIL_AMOSTRAGEM", "0")),
+    cabecalho=os.environ.get("SRHP_PERFIL_CABECALHO", "X-Perfil"),
+    capacidade=int(os.environ.get("SRHP_PERFIL_REGISTROS", "50"))
+) if os.environ.get("SRHP_PERFIL", "0") == "1" else None
+
+# caminho do snapshot binario do catalogo; vazio desliga o snapshot
+CAMINHO_SNAPSHOT = os.environ.get("SRHP_SNAPSHOT", "srhp.snapshot")
+
+# intervalo (segundos) entre leituras do log de alteracoes; 0 desliga o tailer
+INTERVALO_ALTERACOES = float(os.environ.get("SRHP_INTERVALO_ALTERACOES", "2.0"))
+
+# cada processo com a AVL grava no banco ate onde ja leu o log, e a poda nao
+# passa do menor seq entre eles; a marca de quem nao renova ha este tempo
+# (segundos) e descartada na poda (processo que morreu)
+VALIDADE_CONSUMIDOR = float(os.environ.get("SRHP_VALIDADE_CONSUMIDOR", "600"))
 
-def sincronizar_avl_com_banco():
+# carga em segundo plano: o servidor aceita conexoes (e /health/live) enquanto
+# o catalogo carrega; as rotas /api respondem 503 ate ficar pronto
+CARGA_EM_SEGUNDO_PLANO = os.environ.get("SRHP_CARGA_EM_SEGUNDO_PLANO", "1") != "0"
+
+# imprimir a hierarquia inteira no console custa O(n); so para depuracao
+IMPRIMIR_HIERARQUIA = os.environ.get("SRHP_IMPRIMIR_HIERARQUIA", "0") == "1"
+
+# produtos relacionados: eventos de sessao do arquivo jsonl (acompanhado pelo
+# offset, vazio desliga) e de POST /api/eventos; a tabela de vizinhos e
+# refeita em segundo plano a cada intervalo se chegaram eventos (0 desliga)
+ARQUIVO_EVENTOS = os.environ.get("SRHP_EVENTOS", "")
+INTERVALO_RELACIONADOS = float(os.environ.get("SRHP_INTERVALO_RELACIONADOS", "60"))
+relacionados = MotorRelacionados(
+    n=int(os.environ.get("SRHP_RELACIONADOS_N", "10")),
+    medida=os.environ.get("SRHP_RELACIONADOS_MEDIDA", "cosseno"),
+    max_sessoes=int(os.environ.get("SRHP_RELACIONADOS_SESSOES", "100000"))
+)
+
+# identifica esta instancia do processo nas etags (a versao do catalogo
+# recomeca do zero a cada reinicio) e como consumidor do log de alteracoes
+INSTANCIA = uuid.uuid4().hex[:8]
+CONSUMIDOR = f"{os.getpid()}-{INSTANCIA}"
+ultima_marca = {'seq': None, 'quando': 0.0}
+
+# estado da inicializacao e tempos (segundos) de cada fase
+estado = {'pronto': False, 'erro': None}
+tempos_inicializacao = {}
+
+def sincronizar_avl_com_banco(alvo=None):
     """
-    carrega todos os dados do banco e popula a arvore AVL
+    carrega todos os dados do banco e popula a arvore AVL de `alvo` (por
+    padrao o sistema da aplicacao)
     deve ser chamado na inicializacao do servidor
     complexidade: O(n log n) onde n e o numero de categorias
     """
+    if alvo is None:
+        alvo = sistema
     print("\n" + "="*60)
     print("SINCRONIZANDO AVL COM BANCO DE DADOS")
     print("="*60)
     
-    # carregar categorias do banco
+    inicio = time.perf_counter()
+    
+    # marca d'agua do log de alteracoes lida antes dos dados: o que mudar
+    # durante a carga e reaplicado depois pelo tailer (operacoes idempotentes)
+    seq_inicial = db.ultima_alteracao()
+    
+    # carregar categorias e produtos do banco
     categorias = db.listar_categorias()
     print(f"encontradas {len(categorias)} categorias no banco")
+    produtos = db.listar_produtos()
+    print(f"encontrados {len(produtos)} produtos no banco")
+    
+    fim_leitura = time.perf_counter()
+    tempos_inicializacao['leitura_banco'] = fim_leitura - inicio
     
     # inserir categorias na AVL em ordem (pais primeiro)
     # primeira passagem: categorias raiz (sem pai)
     for cat in categorias:
         if not cat['categoria_pai_id']:
-            sistema.cadastrar_categoria(cat['nome'], cat['descricao'])
+            alvo.cadastrar_categoria(cat['nome'], cat['descricao'])
     
     # segunda passagem: subcategorias
     for cat in categorias:
         if cat['categoria_pai_id']:
-            sistema.cadastrar_categoria(cat['nome'], cat['descricao'])
+            alvo.cadastrar_categoria(cat['nome'], cat['descricao'])
     
-    # carregar produtos e adicionar as categorias
-    produtos = db.listar_produtos()
-    print(f"encontrados {len(produtos)} produtos no banco")
+    fim_arvore = time.perf_counter()
+    tempos_inicializacao['construcao_arvore'] = fim_arvore - fim_leitura
     
+    # adicionar os produtos as categorias
     for prod in produtos:
-        sistema.cadastrar_produto(
+        alvo.cadastrar_produto(
             prod['categoria_nome'],
             prod['id'],
             prod['nome'],
@@ -63,15 +204,402 @@ def sincronizar_avl_com_banco():
             prod['avaliacao']
         )
     
+    tempos_inicializacao['associacao_produtos'] = time.perf_counter() - fim_arvore
+    
+    alvo.seq_alteracoes = seq_inicial
+    
     print("="*60)
     print("SINCRONIZACAO COMPLETA!")
     print("="*60 + "\n")
     
     # imprimir hierarquia para verificar
-    sistema.imprimir_hierarquia()
+    if IMPRIMIR_HIERARQUIA:
+        alvo.imprimir_hierarquia()
+
+def carregar_catalogo():
+    """
+    carrega a AVL pelo caminho mais barato disponivel
+    com snapshot valido: le o arquivo e reaplica so as alteracoes posteriores
+    a marca d'agua gravada nele; sem snapshot: sincronizacao completa com o
+    banco seguida da gravacao de um snapshot novo
+    """
+    if CAMINHO_SNAPSHOT and os.path.exists(CAMINHO_SNAPSHOT):
+        inicio = time.perf_counter()
+        try:
+            seq = carregar_snapshot(CAMINHO_SNAPSHOT, sistema, db)
+            tempos_inicializacao['leitura_snapshot'] = time.perf_counter() - inicio
+            aplicadas = sistema.sincronizar_alteracoes(db)
+            tempos_inicializacao['replay_alteracoes'] = (
+                time.perf_counter() - inicio - tempos_inicializacao['leitura_snapshot']
+            )
+            print(f"snapshot carregado (seq {seq}), {aplicadas} alteracoes reaplicadas")
+            marcar_consumo()
+            return
+        except (OSError, ValueError) as e:
+            # inclui LacunaAlteracoes: o log ja foi podado alem do snapshot
+            print(f"snapshot ignorado: {e}")
+            sistema.trocar_arvore(sistema.nova_arvore(), 0)
+    
+    sincronizar_avl_com_banco()
+    marcar_consumo()
+    salvar_snapshot_catalogo()
+
+def recarregar_catalogo():
+    """
+    recarrega o banco inteiro depois de uma lacuna no log de alteracoes
+    a carga vai para um sistema novo e a arvore e trocada de uma vez; as
+    consultas seguem na arvore anterior ate a troca
+    """
+    novo = SistemaRecomendacao(sistema.estrutura, sistema.chaves,
+                               sistema.modo_sugestoes, sistema.usar_indices)
+    sincronizar_avl_com_banco(novo)
+    sistema.trocar_arvore(novo.arvore_categorias, novo.seq_alteracoes)
+
+def marcar_consumo(forcar=False):
+    """
+    grava no banco o seq ate onde este processo ja aplicou o log
+    so escreve quando o seq muda ou a marca esta perto de vencer
+    """
+    seq = sistema.seq_alteracoes
+    agora = time.monotonic()
+    if forcar or seq != ultima_marca['seq'] or agora - ultima_marca['quando'] > VALIDADE_CONSUMIDOR / 4:
+        db.registrar_consumidor(CONSUMIDOR, seq)
+        ultima_marca.update(seq=seq, quando=agora)
+
+def sincronizar_com_o_log():
+    """
+    aplica as alteracoes novas do log e renova a marca d'agua deste processo;
+    com uma lacuna no log (podado por outro processo), recarrega o banco
+    
+    returns
+        bool true se o catalogo mudou
+    """
+    try:
+        mudou = sistema.sincronizar_alteracoes(db) > 0
+    except LacunaAlteracoes as e:
+        print(f"{e}: recarregando o catalogo do banco")
+        recarregar_catalogo()
+        mudou = True
+    marcar_consumo()
+    return mudou
+
+def salvar_snapshot_catalogo():
+    """
+    grava o snapshot do catalogo atual se estiver habilitado e poda o log de
+    alteracoes ate a marca d'agua dele (o replay comeca dali), sem passar da
+    marca dos outros processos que ainda leem o log
+    """
+    if not CAMINHO_SNAPSHOT:
+        return
+    # lido antes da gravacao: o snapshot tem pelo menos este seq
+    seq = sistema.seq_alteracoes
+    try:
+        salvar_snapshot(sistema, CAMINHO_SNAPSHOT, db)
+    except OSError as e:
+        print(f"erro ao gravar snapshot: {e}")
+        return
+    marcar_consumo(forcar=True)
+    podadas = db.podar_alteracoes(seq, VALIDADE_CONSUMIDOR)
+    if podadas:
+        print(f"log de alteracoes podado ({podadas} linhas, snapshot no seq {seq})")
+
+async def acompanhar_alteracoes():
+    """
+    tailer do log de alteracoes do banco
+    aplica na AVL as mudancas feitas por outros processos (ou direto no banco)
+    sem precisar recarregar tudo; as escritas deste processo ja avancam o
+    seq_alteracoes e nao voltam por aqui. as consultas ao sqlite rodam em
+    uma thread, fora do loop de eventos
+    """
+    while True:
+        await asyncio.sleep(INTERVALO_ALTERACOES)
+        try:
+            if await asyncio.to_thread(sincronizar_com_o_log):
+                # mudancas de outros processos: as respostas guardadas ficaram velhas
+                cache_respostas.invalidar(TAG_CATEGORIAS, TAG_PRODUTOS)
+        except Exception as e:
+            print(f"erro ao aplicar alteracoes do banco: {e}")
+
+def atualizar_relacionados():
+    """le os eventos novos do arquivo e refaz a tabela de vizinhos se algo mudou"""
+    if ARQUIVO_EVENTOS:
+        relacionados.ingerir_arquivo(ARQUIVO_EVENTOS)
+    return relacionados.recalcular()
+
+async def recalcular_relacionados():
+    """
+    tarefa em segundo plano dos produtos relacionados
+    o calculo roda em uma thread; as consultas seguem na tabela anterior ate
+    a nova ser publicada
+    """
+    while True:
+        try:
+            if await asyncio.to_thread(atualizar_relacionados):
+                cache_respostas.invalidar(TAG_RELACIONADOS)
+        except Exception as e:
+            print(f"erro ao recalcular os produtos relacionados: {e}")
+        await asyncio.sleep(INTERVALO_RELACIONADOS)
+
+async def aquecer_catalogo(tarefas):
+    """
+    carrega o catalogo fora do loop de eventos e marca o servico como pronto
+    depois inicia o tailer do log de alteracoes
+    """
+    inicio = time.perf_counter()
+    try:
+        await asyncio.to_thread(carregar_catalogo)
+    except Exception as e:
+        estado['erro'] = str(e)
+        print(f"erro ao carregar o catalogo: {e}")
+        return
+    tempos_inicializacao['carga_total'] = time.perf_counter() - inicio
+    estado['pronto'] = True
+    
+    resumo = ", ".join(f"{fase} {segundos * 1000:.1f}ms" for fase, segundos in tempos_inicializacao.items())
+    print(f"catalogo pronto: {resumo}")
+    
+    if INTERVALO_ALTERACOES > 0:
+        tarefas.append(asyncio.create_task(acompanhar_alteracoes()))
+
+async def acompanhar_catalogo_compartilhado():
+    """
+    modo worker: espera a primeira publicacao do carregador, marca o servico
+    como pronto e depois troca para cada versao nova que for publicada
+    """
+    inicio = time.perf_counter()
+    intervalo = INTERVALO_ALTERACOES or 0.5
+    while True:
+        try:
+            trocou = catalogo_compartilhado.atualizar(sistema)
+            if trocou:
+                cache_respostas.limpar()
+            if trocou and not estado['pronto']:
+                tempos_inicializacao['mapeamento_compartilhado'] = time.perf_counter() - inicio
+                estado['pronto'] = True
+                print(f"catalogo compartilhado '{CATALOGO_COMPARTILHADO}' mapeado (seq {sistema.seq_alteracoes})")
+        except Exception as e:
+            estado['erro'] = str(e)
+            print(f"erro ao mapear o catalogo compartilhado: {e}")
+        await asyncio.sleep(intervalo if estado['pronto'] else 0.1)
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    ciclo de vida do servidor
+    inicializacao: carga do catalogo (em segundo plano por padrao) e tailer,
+    ou o mapeamento do catalogo compartilhado no modo worker
+    encerramento: para as tarefas e grava o snapshot para o proximo reinicio
+    """
+    tarefas = []
+    if INTERVALO_RELACIONADOS > 0:
+        tarefas.append(asyncio.create_task(recalcular_relacionados()))
+    if catalogo_compartilhado is not None:
+        tarefas.append(asyncio.create_task(acompanhar_catalogo_compartilhado()))
+    elif CARGA_EM_SEGUNDO_PLANO:
+        tarefas.append(asyncio.create_task(aquecer_catalogo(tarefas)))
+    else:
+        await aquecer_catalogo(tarefas)
+    
+    yield
+    
+    for tarefa in tarefas:
+        tarefa.cancel()
+    if catalogo_compartilhado is not None:
+        # o snapshot e responsabilidade do carregador
+        catalogo_compartilhado.fechar()
+    elif estado['pronto']:
+        try:
+            sistema.sincronizar_alteracoes(db)
+            salvar_snapshot_catalogo()
+        except LacunaAlteracoes as e:
+            # o catalogo em memoria ficou para tras: nao vira snapshot
+            print(f"snapshot nao gravado: {e}")
+        db.remover_consumidor(CONSUMIDOR)
+
+app = FastAPI(title="SRHP - Sistema de Recomendacao de Produtos", lifespan=lifespan)
+
+# configurar arquivos estaticos e templates
+# (com o build de scripts/construir_estaticos.py, os templates usam os nomes
+# com hash do conteudo, servidos pre-comprimidos e com cache imutavel)
+app.mount("/static", EstaticosPrecomprimidos(directory="static"), name="static")
+templates = Jinja2Templates(directory="templates")
+manifesto_estaticos = carregar_manifesto("static")
+
+def estatico(caminho):
+    """url de um arquivo de static/, com fingerprint quando o build foi feito"""
+    caminho = caminho.lstrip("/")
+    return "/static/" + manifesto_estaticos.get(caminho, caminho)
+
+templates.env.globals["estatico"] = estatico
+
+tempos_inicializacao['import'] = time.perf_counter() - INICIO_IMPORT
+
+def tags_da_rota(caminho):
+    """tags das quais a resposta de `caminho` depende, ou None se a rota nao e cacheavel"""
+    for sufixo, tags in SUFIXOS_CACHEAVEIS.items():
+        if caminho.startswith("/api/") and caminho.endswith(sufixo):
+            return tags
+    for prefixo, tags in ROTAS_CACHEAVEIS.items():
+        if caminho == prefixo or caminho.startswith(prefixo + "/"):
+            return tags
+    return None
+
+def codificacao_da_resposta(request: Request, tamanho: int):
+    """codificacao preferida pelo cliente para um corpo de `tamanho` bytes, ou None"""
+    if COMPRESSAO_MIN_BYTES <= 0 or tamanho < COMPRESSAO_MIN_BYTES:
+        return None
+    codificacoes = aceitas(request.headers.get("accept-encoding"))
+    return codificacoes[0] if codificacoes else None
+
+async def comprimir_corpo(corpo: bytes, codificacao: str) -> bytes:
+    """comprime o corpo; corpos grandes (ex.: /api/tree inteira) fora do loop"""
+    if len(corpo) > 256 * 1024:
+        return await asyncio.to_thread(comprimir, corpo, codificacao)
+    return comprimir(corpo, codificacao)
+
+async def resposta_do_cache(request: Request, chave: str, entrada: EntradaCache, situacao: str):
+    """
+    monta a resposta a partir da entrada guardada
+    responde 304 sem corpo quando o If-None-Match ja tem a etag atual
+    a variante comprimida na codificacao do cliente e feita uma vez e fica na
+    entrada: os acertos seguintes nao comprimem de novo
+    """
+    cabecalhos = {
+        "ETag": entrada.etag,
+        "Cache-Control": f"max-age={CACHE_MAX_AGE}" if CACHE_MAX_AGE > 0 else "no-cache",
+        "X-Cache": situacao
+    }
+    if COMPRESSAO_MIN_BYTES > 0:
+        cabecalhos["Vary"] = "Accept-Encoding"
+    if etag_confere(request, entrada.etag):
+        return Response(status_code=304, headers=cabecalhos)
+    
+    corpo = entrada.corpo
+    codificacao = codificacao_da_resposta(request, len(corpo))
+    if codificacao is not None:
+        corpo = entrada.variantes.get(codificacao)
+        if corpo is None:
+            corpo = await comprimir_corpo(entrada.corpo, codificacao)
+            cache_respostas.guardar_variante(chave, entrada, codificacao, corpo)
+        # o corpo comprimido nao e byte a byte o da etag forte
+        cabecalhos["ETag"] = "W/" + entrada.etag
+        cabecalhos["Content-Encoding"] = codificacao
+    return Response(content=corpo, status_code=entrada.status,
+                    headers={**entrada.cabecalhos, **cabecalhos})
+
+@app.middleware("http")
+async def cache_de_respostas(request: Request, call_next):
+    """
+    cache das rotas de leitura por metodo + caminho + query
+    o cliente pode pular a consulta ao cache com Cache-Control: no-cache
+    (a resposta nova e guardada) ou no-store (nada e guardado)
+    as respostas do cache ja saem comprimidas (comprimir_respostas as deixa passar)
+    """
+    tags = tags_da_rota(request.url.path) if request.method == "GET" else None
+    diretivas = request.headers.get("cache-control", "").lower()
+    if tags is None or not cache_respostas.habilitado or "no-store" in diretivas:
+        return await call_next(request)
+    
+    consulta = urlencode(sorted(parse_qsl(request.url.query, keep_blank_values=True)))
+    chave = f"GET {request.url.path}?{consulta}"
+    
+    entrada = None if "no-cache" in diretivas else cache_respostas.obter(chave)
+    if entrada is not None:
+        return await resposta_do_cache(request, chave, entrada, "HIT")
+    
+    # marca antes de calcular: se uma escrita invalidar as tags no meio do
+    # caminho, a resposta vai para o cliente mas nao fica guardada
+    marca = cache_respostas.marca()
+    resposta = await call_next(request)
+    if resposta.status_code != 200 or "etag" in resposta.headers or "set-cookie" in resposta.headers:
+        return resposta
+    
+    corpo = b"".join([parte async for parte in resposta.body_iterator])
+    cabecalhos = {k: v for k, v in resposta.headers.items() if k != "content-length"}
+    entrada = EntradaCache(corpo, resposta.status_code, cabecalhos, tags)
+    cache_respostas.guardar(chave, entrada, marca)
+    return await resposta_do_cache(request, chave, entrada, "MISS")
+
+@app.middleware("http")
+async def exigir_catalogo_pronto(request: Request, call_next):
+    """as rotas da api dependem da AVL; enquanto ela carrega respondem 503"""
+    if not estado['pronto'] and request.url.path.startswith("/api/"):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "catalogo carregando"},
+            headers={"Retry-After": "1"}
+        )
+    return await call_next(request)
+
+@app.middleware("http")
+async def comprimir_respostas(request: Request, call_next):
+    """
+    comprime com gzip/brotli (o que o cliente preferir) as respostas a partir
+    de COMPRESSAO_MIN_BYTES; respostas em streaming (sem Content-Length), as do
+    cache (que guarda as variantes comprimidas) e os arquivos estaticos, que
+    ja vem pre-comprimidos, passam direto
+    """
+    resposta = await call_next(request)
+    tamanho = resposta.headers.get("content-length")
+    if (COMPRESSAO_MIN_BYTES <= 0 or request.url.path.startswith("/static/")
+            or resposta.status_code != 200 or tamanho is None
+            or "content-encoding" in resposta.headers):
+        return resposta
+    
+    resposta.headers["Vary"] = "Accept-Encoding"
+    codificacao = codificacao_da_resposta(request, int(tamanho))
+    if codificacao is None:
+        return resposta
+    
+    corpo = b"".join([parte async for parte in resposta.body_iterator])
+    comprimido = await comprimir_corpo(corpo, codificacao)
+    
+    cabecalhos = {k: v for k, v in resposta.headers.items() if k != "content-length"}
+    cabecalhos["Content-Encoding"] = codificacao
+    etag = cabecalhos.get("etag")
+    if etag and not etag.startswith("W/"):
+        # o corpo comprimido nao e byte a byte o da etag forte
+        cabecalhos["etag"] = "W/" + etag
+    return Response(content=comprimido, status_code=resposta.status_code, headers=cabecalhos)
+
+if perfilador is not None:
+    @app.middleware("http")
+    async def perfilar_requisicoes(request: Request, call_next):
+        """
+        roda sob cProfile e tracemalloc as requisicoes sorteadas (1 a cada N) ou
+        marcadas com o cabecalho; o perfil vai ate o inicio da resposta (o corpo
+        de respostas em streaming fica de fora) e o id sai em X-Perfil-Id
+        """
+        motivo = perfilador.motivo(request.url.path, request.headers)
+        if motivo is None:
+            return await call_next(request)
+        resposta, registro = await perfilador.perfilar(
+            lambda: call_next(request), request.method, request.url.path, motivo)
+        if registro is not None:
+            resposta.headers["X-Perfil-Id"] = str(registro['id'])
+        return resposta
+
+# endpoints de saude
+
+@app.get("/health/live")
+async def health_live():
+    """o processo esta de pe (nao depende do catalogo)"""
+    return JSONResponse(content={"status": "ok"})
 
-# sincronizar na inicializacao
-sincronizar_avl_com_banco()
+@app.get("/health/ready")
+async def health_ready():
+    """o catalogo esta carregado na AVL e a api pode receber trafego"""
+    if not estado['pronto']:
+        return JSONResponse(status_code=503, content={
+            "status": "erro" if estado['erro'] else "carregando",
+            "erro": estado['erro']
+        })
+    return JSONResponse(content={
+        "status": "pronto",
+        "tempos_inicializacao_ms": {
+            fase: round(segundos * 1000, 3) for fase, segundos in tempos_inicializacao.items()
+        }
+    })
 
 # modelos pydantic para validacao
 
@@ -99,29 +627,62 @@ class ProdutoUpdate(BaseModel):
     descricao: Optional[str] = ""
     avaliacao: Optional[float] = 0.0
 
+# itens dos endpoints de lote: criar exige os campos do cadastro, atualizar
+# e excluir exigem o id; na atualizacao os campos ausentes sao mantidos
+
+class CategoriaLoteItem(BaseModel):
+    operacao: Literal["criar", "atualizar", "excluir"] = "criar"
+    id: Optional[int] = None
+    nome: Optional[str] = None
+    descricao: Optional[str] = None
+    categoria_pai_id: Optional[int] = None
+
+class ProdutoLoteItem(BaseModel):
+    operacao: Literal["criar", "atualizar", "excluir"] = "criar"
+    id: Optional[int] = None
+    nome: Optional[str] = None
+    categoria_id: Optional[int] = None
+    preco: Optional[float] = None
+    descricao: Optional[str] = None
+    avaliacao: Optional[float] = None
+
+class Evento(BaseModel):
+    sessao: str = Field(..., min_length=1)
+    produto_id: int
+    tipo: Literal["visualizacao", "compra"] = "visualizacao"
+
+class EventosLote(BaseModel):
+    eventos: List[Evento] = Field(..., min_length=1, max_length=LOTE_API_MAX)
+
+class CategoriaLote(BaseModel):
+    itens: List[CategoriaLoteItem] = Field(..., min_length=1, max_length=LOTE_API_MAX)
+
+class ProdutoLote(BaseModel):
+    itens: List[ProdutoLoteItem] = Field(..., min_length=1, max_length=LOTE_API_MAX)
+
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """pagina inicial"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates.TemplateResponse(request, "index.html")
 
 
 @app.get("/arvore", response_class=HTMLResponse)
 async def arvore(request: Request):
     """pagina de visualizacao da arvore"""
-    return templates.TemplateResponse("arvore.html", {"request": request})
+    return templates.TemplateResponse(request, "arvore.html")
 
 
 @app.get("/buscar", response_class=HTMLResponse)
 async def buscar(request: Request):
     """pagina de busca"""
-    return templates.TemplateResponse("buscar.html", {"request": request})
+    return templates.TemplateResponse(request, "buscar.html")
 
 
 @app.get("/cadastrar", response_class=HTMLResponse)
 async def cadastrar(request: Request):
     """pagina de cadastro"""
-    return templates.TemplateResponse("cadastrar.html", {"request": request})
+    return templates.TemplateResponse(request, "cadastrar.html")
 
 
 # api endpoints para categorias
@@ -144,18 +705,25 @@ async def buscar_categoria(categoria_id: int):
 async def criar_categoria(categoria: CategoriaCreate):
     """cria uma nova categoria"""
     try:
-        # 1. inserir na AVL (O(log n) - estrutura principal)
-        sucesso_avl = sistema.cadastrar_categoria(categoria.nome, categoria.descricao)
-        
-        if not sucesso_avl:
+        # 1. conferir na AVL (O(log n) - estrutura principal)
+        if sistema.buscar_categoria(categoria.nome) is not None:
             raise HTTPException(status_code=400, detail="categoria ja existe na AVL")
         
-        # 2. persistir no banco (backup/persistencia)
-        categoria_id = db.inserir_categoria(
-            nome=categoria.nome,
-            descricao=categoria.descricao,
-            categoria_pai_id=categoria.categoria_pai_id
-        )
+        # 2. persistir no banco (lote com commit unico)
+        def gravar(conn):
+            return db.inserir_categoria(
+                nome=categoria.nome,
+                descricao=categoria.descricao,
+                categoria_pai_id=categoria.categoria_pai_id,
+                conn=conn
+            )
+        
+        # 3. inserir na AVL depois do commit
+        def aplicar(categoria_id):
+            sistema.cadastrar_categoria(categoria.nome, categoria.descricao)
+        
+        categoria_id = await escritas.executar(gravar, aplicar)
+        cache_respostas.invalidar(TAG_CATEGORIAS)
         
         return JSONResponse(content={
             "id": categoria_id, 
@@ -168,30 +736,68 @@ async def criar_categoria(categoria: CategoriaCreate):
 
 @app.put("/api/categorias/{categoria_id}")
 async def atualizar_categoria(categoria_id: int, categoria: CategoriaUpdate):
-    """atualiza uma categoria existente"""
-    sucesso = db.atualizar_categoria(
-        categoria_id=categoria_id,
-        nome=categoria.nome,
-        descricao=categoria.descricao,
-        categoria_pai_id=categoria.categoria_pai_id
-    )
-    if not sucesso:
-        raise HTTPException(status_code=404, detail="categoria nao encontrada")
+    """
+    atualiza uma categoria existente no banco e na AVL
+    renomear move a chave na AVL sem recarregar (O(log n))
+    """
+    try:
+        def gravar(conn):
+            # 1. nome atual, que e a chave da categoria na AVL
+            atual = db.buscar_categoria_por_id(categoria_id, conn=conn)
+            if not atual:
+                raise HTTPException(status_code=404, detail="categoria nao encontrada")
+            
+            # 2. conferir na AVL antes de gravar: o que ela recusaria nao vai ao banco
+            if escritas.aplicar_em_memoria:
+                em_memoria = sistema.buscar_categoria(atual['nome'])
+                if em_memoria is None:
+                    raise HTTPException(status_code=404, detail="categoria nao encontrada na AVL")
+                existente = sistema.buscar_categoria(categoria.nome)
+                if existente is not None and existente is not em_memoria:
+                    raise HTTPException(status_code=400, detail="categoria ja existe na AVL")
+            
+            # 3. persistir no banco
+            db.atualizar_categoria(
+                categoria_id=categoria_id,
+                nome=categoria.nome,
+                descricao=categoria.descricao,
+                categoria_pai_id=categoria.categoria_pai_id,
+                conn=conn
+            )
+            return atual
+        
+        # 4. aplicar na AVL (o pai so existe no banco; a AVL e indexada pelo nome)
+        def aplicar(atual):
+            if not sistema.atualizar_categoria(atual['nome'], categoria.nome, categoria.descricao):
+                raise HTTPException(status_code=409, detail="alteracao gravada no banco mas recusada pela AVL")
+        
+        await escritas.executar(gravar, aplicar)
+        cache_respostas.invalidar(TAG_CATEGORIAS)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return JSONResponse(content={"message": "categoria atualizada com sucesso"})
 
 @app.delete("/api/categorias/{categoria_id}")
 async def deletar_categoria(categoria_id: int):
     """deleta uma categoria"""
-    # 1. buscar nome da categoria no banco
-    categoria = db.buscar_categoria_por_id(categoria_id)
-    if not categoria:
-        raise HTTPException(status_code=404, detail="categoria nao encontrada")
+    def gravar(conn):
+        # 1. buscar nome da categoria no banco
+        categoria = db.buscar_categoria_por_id(categoria_id, conn=conn)
+        if not categoria:
+            raise HTTPException(status_code=404, detail="categoria nao encontrada")
+        
+        # 2. remover do banco (persistencia)
+        db.deletar_categoria(categoria_id, conn=conn)
+        return categoria
     
-    # 2. remover da AVL (O(log n))
-    sistema.remover_categoria(categoria['nome'])
+    # 3. remover da AVL (O(log n))
+    def aplicar(categoria):
+        sistema.remover_categoria(categoria['nome'])
     
-    # 3. remover do banco (persistencia)
-    sucesso = db.deletar_categoria(categoria_id)
+    await escritas.executar(gravar, aplicar)
+    cache_respostas.invalidar(TAG_CATEGORIAS)
     
     return JSONResponse(content={
         "message": "categoria deletada com sucesso da AVL e banco"
@@ -205,6 +811,75 @@ async def listar_produtos():
     produtos = db.listar_produtos()
     return JSONResponse(content=produtos)
 
+def ler_cursor(cursor):
+    """cursor "valor,id" da consulta de produtos -> chave do indice (float, int)"""
+    try:
+        valor, produto_id = cursor.split(",")
+        return (float(valor), int(produto_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"cursor invalido: {cursor!r}")
+
+@app.get("/api/produtos/consulta")
+async def consultar_produtos(preco_min: Optional[float] = Query(None, ge=0),
+                             preco_max: Optional[float] = Query(None, ge=0),
+                             avaliacao_min: Optional[float] = Query(None, ge=0, le=5),
+                             ordenar: Literal["preco_asc", "preco_desc", "avaliacao"] = "preco_asc",
+                             limite: int = Query(50, ge=1, le=1000),
+                             cursor: Optional[str] = None):
+    """
+    consulta o catalogo inteiro pelos indices globais de preco e avaliacao em
+    memoria, em paginas de {produto, categoria} como o /api/recomendar
+    a paginacao e por chave: `proximo` e a chave ((preco, id) ou
+    (-avaliacao, id)) do ultimo item, e a pagina seguinte comeca logo
+    depois dela (insercoes e remocoes entre as chamadas nao deslocam as
+    paginas); null na ultima
+    complexidade: O(log n + k) por pagina
+    """
+    apos = ler_cursor(cursor) if cursor else None
+    with sistema.trava.leitura():
+        # um a mais para saber se ha pagina seguinte
+        encontrados = sistema.consultar_produtos(preco_min, preco_max, avaliacao_min,
+                                                 ordenar, limite + 1, apos)
+        if encontrados is None:
+            raise HTTPException(status_code=503, detail="indices de produtos indisponiveis")
+        
+        proximo = None
+        if len(encontrados) > limite:
+            encontrados = encontrados[:limite]
+            valor, produto_id = chave_da_ordenacao(encontrados[-1][0], ordenar)
+            proximo = f"{valor!r},{produto_id}"
+        
+        nomes_json = {}
+        itens = []
+        for produto, categoria in encontrados:
+            if categoria.nome not in nomes_json:
+                nomes_json[categoria.nome] = dumps(categoria.nome)
+            itens.append(b'{"produto":' + produto.json_bytes() +
+                         b',"categoria":' + nomes_json[categoria.nome] + b'}')
+    
+    return Response(content=b'{"itens":' + juntar_lista(itens) + b',"proximo":' + dumps(proximo) + b'}',
+                    media_type="application/json")
+
+@app.get("/api/exportar/produtos")
+async def exportar_produtos(formato: Literal["ndjson", "csv"] = "ndjson",
+                            categoria_id: Optional[int] = None,
+                            lote: int = Query(1000, ge=1, le=10000)):
+    """
+    exporta o catalogo de produtos em streaming (ndjson ou csv), em ordem de id
+    le o banco em lotes por paginacao de chave e escreve cada lote assim que
+    ele e lido: memoria constante e primeiro byte sem esperar o catalogo todo
+    categoria_id restringe a categoria e suas subcategorias
+    """
+    if categoria_id is not None and not db.buscar_categoria_por_id(categoria_id):
+        raise HTTPException(status_code=404, detail="categoria nao encontrada")
+    
+    # gerador sincrono: o starlette o consome em uma thread, fora do loop de eventos
+    corpo = exportacao.GERADORES[formato](db.iterar_produtos(categoria_id, lote))
+    sufixo = f"-{categoria_id}" if categoria_id is not None else ""
+    return StreamingResponse(corpo, media_type=exportacao.FORMATOS[formato], headers={
+        "Content-Disposition": f'attachment; filename="produtos{sufixo}.{formato}"'
+    })
+
 @app.get("/api/produtos/categoria/{categoria_id}")
 async def listar_produtos_por_categoria(categoria_id: int):
     """
@@ -217,23 +892,51 @@ async def listar_produtos_por_categoria(categoria_id: int):
         raise HTTPException(status_code=404, detail="categoria nao encontrada")
     
     # buscar na AVL (O(log n))
-    categoria_avl = sistema.buscar_categoria(categoria_db['nome'])
-    if not categoria_avl:
-        raise HTTPException(status_code=404, detail="categoria nao encontrada na AVL")
-    
-    # converter produtos da AVL para formato JSON
-    produtos = [{
-        'id': p.id,
-        'nome': p.nome,
-        'preco': p.preco,
-        'descricao': p.descricao,
-        'avaliacao': p.avaliacao,
-        'categoria_id': categoria_id,
-        'categoria_nome': categoria_db['nome']
-    } for p in categoria_avl.produtos]
+    with sistema.trava.leitura():
+        categoria_avl = sistema.buscar_categoria(categoria_db['nome'])
+        if not categoria_avl:
+            raise HTTPException(status_code=404, detail="categoria nao encontrada na AVL")
+        
+        # converter produtos da AVL para formato JSON
+        produtos = [{
+            'id': p.id,
+            'nome': p.nome,
+            'preco': p.preco,
+            'descricao': p.descricao,
+            'avaliacao': p.avaliacao,
+            'categoria_id': categoria_id,
+            'categoria_nome': categoria_db['nome']
+        } for p in categoria_avl.produtos]
     
     return JSONResponse(content=produtos)
 
+@app.get("/api/produtos/{produto_id}/relacionados")
+async def produtos_relacionados(produto_id: int, limite: int = Query(10, ge=1, le=100)):
+    """
+    produtos vistos ou comprados nas mesmas sessoes, do mais parecido para o
+    menos, com a similaridade; a lista vem da tabela de vizinhos calculada em
+    segundo plano e os dados dos produtos do banco (uma consulta)
+    complexidade: O(log P + N) na tabela
+    """
+    vizinhos = relacionados.relacionados(produto_id, limite)
+    encontrados = db.buscar_produtos_por_ids([produto_id] + [id for id, _ in vizinhos])
+    if produto_id not in encontrados:
+        raise HTTPException(status_code=404, detail="produto nao encontrado")
+    
+    # vizinhos excluidos depois do calculo ficam de fora
+    itens = [dict(encontrados[id], similaridade=round(nota, 4))
+             for id, nota in vizinhos if id in encontrados]
+    return JSONResponse(content=itens)
+
+@app.post("/api/eventos")
+async def registrar_eventos(lote: EventosLote):
+    """
+    eventos de visualizacao e compra para os produtos relacionados
+    entram na proxima atualizacao da tabela de vizinhos
+    """
+    aceitos = relacionados.registrar(evento.model_dump() for evento in lote.eventos)
+    return JSONResponse(status_code=202, content={'aceitos': aceitos})
+
 @app.get("/api/produtos/{produto_id}")
 async def buscar_produto(produto_id: int):
     """busca um produto por id"""
@@ -246,33 +949,43 @@ async def buscar_produto(produto_id: int):
 async def criar_produto(produto: ProdutoCreate):
     """cria um novo produto"""
     try:
-        # 1. buscar nome da categoria
-        categoria = db.buscar_categoria_por_id(produto.categoria_id)
-        if not categoria:
-            raise HTTPException(status_code=404, detail="categoria nao encontrada")
-        
-        # 2. persistir no banco primeiro para obter o ID
-        produto_id = db.inserir_produto(
-            nome=produto.nome,
-            categoria_id=produto.categoria_id,
-            preco=produto.preco,
-            descricao=produto.descricao,
-            avaliacao=produto.avaliacao
-        )
+        def gravar(conn):
+            # 1. buscar nome da categoria
+            categoria = db.buscar_categoria_por_id(produto.categoria_id, conn=conn)
+            if not categoria:
+                raise HTTPException(status_code=404, detail="categoria nao encontrada")
+            
+            # 2. persistir no banco primeiro para obter o ID
+            produto_id = db.inserir_produto(
+                nome=produto.nome,
+                categoria_id=produto.categoria_id,
+                preco=produto.preco,
+                descricao=produto.descricao,
+                avaliacao=produto.avaliacao,
+                conn=conn
+            )
+            return categoria['nome'], produto_id
         
         # 3. adicionar na AVL (O(log n) para encontrar categoria + O(1) para adicionar)
-        sucesso_avl = sistema.cadastrar_produto(
-            categoria['nome'],
-            produto_id,
-            produto.nome,
-            produto.preco,
-            produto.descricao,
-            produto.avaliacao
-        )
+        sucesso_avl = False
+        def aplicar(resultado):
+            nonlocal sucesso_avl
+            nome_categoria, produto_id = resultado
+            sucesso_avl = sistema.cadastrar_produto(
+                nome_categoria,
+                produto_id,
+                produto.nome,
+                produto.preco,
+                produto.descricao,
+                produto.avaliacao
+            )
+        
+        _, produto_id = await escritas.executar(gravar, aplicar)
+        cache_respostas.invalidar(TAG_PRODUTOS)
         
-        if not sucesso_avl:
+        if not sucesso_avl and escritas.aplicar_em_memoria:
             # se falhar na AVL, remover do banco
-            db.deletar_produto(produto_id)
+            await escritas.executar(lambda conn: db.deletar_produto(produto_id, conn=conn))
             raise HTTPException(status_code=400, detail="erro ao adicionar produto na AVL")
         
         return JSONResponse(content={
@@ -286,99 +999,288 @@ async def criar_produto(produto: ProdutoCreate):
 
 @app.put("/api/produtos/{produto_id}")
 async def atualizar_produto(produto_id: int, produto: ProdutoUpdate):
-    """atualiza um produto existente"""
-    sucesso = db.atualizar_produto(
-        produto_id=produto_id,
-        nome=produto.nome,
-        categoria_id=produto.categoria_id,
-        preco=produto.preco,
-        descricao=produto.descricao,
-        avaliacao=produto.avaliacao
-    )
-    if not sucesso:
-        raise HTTPException(status_code=404, detail="produto nao encontrado")
+    """
+    atualiza um produto existente no banco e na AVL
+    edita o objeto no lugar e, se a categoria mudou, move entre categorias
+    """
+    try:
+        def gravar(conn):
+            # 1. categoria atual do produto e categoria de destino
+            atual = db.buscar_produto_por_id(produto_id, conn=conn)
+            if not atual:
+                raise HTTPException(status_code=404, detail="produto nao encontrado")
+            destino = db.buscar_categoria_por_id(produto.categoria_id, conn=conn)
+            if not destino:
+                raise HTTPException(status_code=404, detail="categoria nao encontrada")
+            
+            # 2. conferir na AVL antes de gravar: o que ela recusaria nao vai ao banco
+            if escritas.aplicar_em_memoria:
+                origem = sistema.buscar_categoria(atual['categoria_nome'])
+                if origem is None or origem.buscar_produto(produto_id) is None:
+                    raise HTTPException(status_code=404, detail="produto nao encontrado na AVL")
+                if sistema.buscar_categoria(destino['nome']) is None:
+                    raise HTTPException(status_code=404, detail="categoria nao encontrada na AVL")
+            
+            # 3. persistir no banco
+            db.atualizar_produto(
+                produto_id=produto_id,
+                nome=produto.nome,
+                categoria_id=produto.categoria_id,
+                preco=produto.preco,
+                descricao=produto.descricao,
+                avaliacao=produto.avaliacao,
+                conn=conn
+            )
+            return atual['categoria_nome'], destino['nome']
+        
+        # 4. aplicar na AVL (O(log n) para achar as categorias + O(1) para o produto)
+        def aplicar(categorias):
+            categoria_atual, categoria_nova = categorias
+            atualizado = sistema.atualizar_produto(
+                categoria_atual,
+                produto_id,
+                produto.nome,
+                produto.preco,
+                produto.descricao,
+                produto.avaliacao,
+                nova_categoria=categoria_nova
+            )
+            if not atualizado:
+                raise HTTPException(status_code=409, detail="alteracao gravada no banco mas recusada pela AVL")
+        
+        await escritas.executar(gravar, aplicar)
+        cache_respostas.invalidar(TAG_PRODUTOS)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return JSONResponse(content={"message": "produto atualizado com sucesso"})
 
 @app.delete("/api/produtos/{produto_id}")
 async def deletar_produto(produto_id: int):
     """deleta um produto"""
-    # 1. buscar produto no banco
-    produto = db.buscar_produto_por_id(produto_id)
-    if not produto:
-        raise HTTPException(status_code=404, detail="produto nao encontrado")
+    def gravar(conn):
+        # 1. buscar produto no banco
+        produto = db.buscar_produto_por_id(produto_id, conn=conn)
+        if not produto:
+            raise HTTPException(status_code=404, detail="produto nao encontrado")
+        
+        # 2. remover do banco (persistencia)
+        db.deletar_produto(produto_id, conn=conn)
+        return produto
     
-    # 2. buscar categoria na AVL (O(log n))
-    categoria = sistema.buscar_categoria(produto['categoria_nome'])
-    if categoria:
-        # remover produto da categoria na AVL
-        categoria.produtos = [p for p in categoria.produtos if p.id != produto_id]
+    # 3. remover produto da categoria na AVL (O(log n) para achar a categoria)
+    def aplicar(produto):
+        sistema.remover_produto(produto['categoria_nome'], produto_id)
     
-    # 3. remover do banco (persistencia)
-    sucesso = db.deletar_produto(produto_id)
+    await escritas.executar(gravar, aplicar)
+    cache_respostas.invalidar(TAG_PRODUTOS)
     
     return JSONResponse(content={
         "message": "produto deletado com sucesso da AVL e banco"
     })
 
+async def executar_lote_api(gravar_lote, aplicar_lote, itens, tag):
+    """
+    grava um lote da api como uma unica operacao do coordenador de escritas
+    (uma transacao, um savepoint por item) e aplica na AVL em uma passada
+    itens gravados no banco mas recusados pela AVL voltam com erro; o lote
+    entao nao conta como aplicado e o tailer reaplica o log
+    """
+    itens = [item.model_dump() for item in itens]
+    gravado = {}
+    
+    def gravar(conn):
+        gravado['resultados'], mudancas = gravar_lote(db, conn, itens)
+        return mudancas
+    
+    recusados = 0
+    try:
+        await escritas.executar(gravar, lambda mudancas: aplicar_lote(sistema, mudancas))
+    except LoteRecusado as e:
+        recusados = len(e.recusados)
+    resultados = gravado['resultados']
+    sucessos = sum(1 for resultado in resultados if resultado['status'] == 'ok')
+    if sucessos or recusados:
+        cache_respostas.invalidar(tag)
+    return JSONResponse(content={
+        'total': len(resultados),
+        'sucessos': sucessos,
+        'falhas': len(resultados) - sucessos,
+        'itens': resultados
+    })
+
+@app.post("/api/categorias/lote")
+async def lote_categorias(lote: CategoriaLote):
+    """
+    cria, atualiza e exclui categorias em lote
+    o status de cada item vem na resposta; um item com erro nao desfaz os demais
+    """
+    return await executar_lote_api(gravar_lote_categorias, aplicar_lote_categorias,
+                                   lote.itens, TAG_CATEGORIAS)
+
+@app.post("/api/produtos/lote")
+async def lote_produtos(lote: ProdutoLote):
+    """
+    cria, atualiza e exclui produtos em lote
+    os ids de categoria e produto do lote sao resolvidos em uma consulta so
+    """
+    return await executar_lote_api(gravar_lote_produtos, aplicar_lote_produtos,
+                                   lote.itens, TAG_PRODUTOS)
+
+@app.get("/api/metricas/escrita")
+async def metricas_escrita():
+    """configuracao do group commit e estatisticas de tamanho dos lotes"""
+    return JSONResponse(content=escritas.metricas())
+
+@app.get("/api/metricas/relacionados")
+async def metricas_relacionados():
+    """sessoes, eventos, ultimo recalculo e tamanho da tabela de vizinhos"""
+    return JSONResponse(content=relacionados.metricas())
+
+@app.get("/api/metricas/cache")
+async def metricas_cache():
+    """ocupacao e taxa de acerto do cache de respostas"""
+    return JSONResponse(content=cache_respostas.metricas())
+
+@app.get("/api/metricas/concorrencia")
+async def metricas_concorrencia():
+    """aquisicoes e tempos de espera/posse da trava de leitores e escritor do motor"""
+    return JSONResponse(content=sistema.trava.metricas())
+
+# dumps do perfilamento (so existem com SRHP_PERFIL=1)
+
+if perfilador is not None:
+    @app.get("/debug/profile")
+    async def debug_profile(formato: Literal["texto", "pstats", "json"] = "texto",
+                            id: Optional[List[int]] = Query(None),
+                            ordenar: Literal["cumulative", "tottime", "ncalls", "time"] = "cumulative",
+                            limite: int = Query(40, ge=1, le=1000)):
+        """
+        perfis de cpu guardados no buffer, somados (ou so os ids pedidos)
+        texto: relatorio do pstats; pstats: arquivo para pstats.Stats/snakeviz;
+        json: a lista de registros e as metricas do perfilador
+        """
+        if formato == "json":
+            return JSONResponse(content={'metricas': perfilador.metricas(), 'registros': perfilador.resumo()})
+        if formato == "pstats":
+            conteudo = perfilador.bytes_pstats(id)
+            if conteudo is None:
+                raise HTTPException(status_code=404, detail="nenhum registro de perfil")
+            return Response(content=conteudo, media_type="application/octet-stream",
+                            headers={"Content-Disposition": 'attachment; filename="srhp.pstats"'})
+        return PlainTextResponse(perfilador.texto_perfil(id, ordenar, limite))
+
+    @app.get("/debug/allocations")
+    async def debug_allocations(formato: Literal["texto", "json"] = "texto",
+                                id: Optional[List[int]] = Query(None),
+                                limite: int = Query(40, ge=1, le=1000)):
+        """linhas que mais alocaram nas requisicoes perfiladas (tracemalloc), e o pico de cada uma"""
+        if formato == "json":
+            return JSONResponse(content={'registros': perfilador.resumo(),
+                                         'alocacoes': perfilador.alocacoes(id, limite)})
+        return PlainTextResponse(perfilador.texto_alocacoes(id, limite))
+
 # api para arvore avl
 
+def etag_arvore(*parametros):
+    """
+    etag forte da arvore: muda quando o catalogo em memoria muda (versao),
+    quando o processo reinicia (INSTANCIA) ou quando os parametros mudam
+    no modo worker usa a versao publicada, igual em todos os workers
+    """
+    assinatura = hashlib.sha1(repr(parametros).encode("utf-8")).hexdigest()[:12]
+    if catalogo_compartilhado is not None:
+        return f'"{CATALOGO_COMPARTILHADO}-{catalogo_compartilhado.versao}-{assinatura}"'
+    return f'"{INSTANCIA}-{sistema.versao}-{assinatura}"'
+
+def etag_confere(request: Request, etag: str) -> bool:
+    """
+    verifica se o If-None-Match da requisicao ja contem a etag atual
+    a comparacao e fraca (ignora W/), como pede o If-None-Match: a etag de uma
+    resposta comprimida volta do cliente como W/"..."
+    """
+    cabecalho = request.headers.get("if-none-match")
+    if not cabecalho:
+        return False
+    etag = etag.removeprefix("W/")
+    return cabecalho.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in cabecalho.split(",")]
+
 @app.get("/api/tree")
-async def get_tree():
+async def get_tree(request: Request,
+                   depth: Optional[int] = Query(None, ge=1),
+                   include_produtos: bool = True,
+                   root: Optional[str] = None):
     """
     retorna a estrutura da arvore AVL em json
-    usa travessia in-ordem para converter a AVL em estrutura hierarquica
-    complexidade: O(n) onde n e o numero de categorias
+    usa travessia pre-ordem para converter a AVL em estrutura hierarquica
+    
+    parametros
+        depth: numero de niveis a partir da raiz pedida; nos cortados vem com
+            children vazio e filhos_pendentes true para expandir depois
+        include_produtos: false devolve so num_produtos em cada no
+        root: nome da categoria a usar como raiz (expansao sob demanda)
+    
+    responde 304 quando o If-None-Match confere com a etag da versao atual
+    complexidade: O(n) sem limite; O(2^depth) com depth e sem produtos
     """
+    etag = etag_arvore(depth, include_produtos, root)
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_confere(request, etag):
+        return Response(status_code=304, headers=cabecalhos)
     
-    def node_to_dict(node):
+    def node_to_json(node, nivel):
         """
-        converte um no da AVL em dicionario recursivamente
+        converte um no da AVL em json recursivamente, juntando os fragmentos
+        ja codificados de cada categoria e produto
         travessia pre-ordem (raiz, esquerda, direita)
         """
-        if node is None:
-            return None
-        
         categoria = node.data
         
-        # converter produtos para formato json
-        produtos = [{
-            'id': p.id,
-            'nome': p.nome,
-            'preco': p.preco,
-            'descricao': p.descricao,
-            'avaliacao': p.avaliacao
-        } for p in categoria.produtos]
-        
-        node_dict = {
-            'id': f"avl-{node.key}",  # identificador unico baseado na chave
-            'nome': categoria.nome,
-            'descricao': categoria.descricao,
-            'altura': node.height,
-            'produtos': produtos,
-            'num_produtos': len(produtos),
-            'children': []
-        }
+        partes = [
+            b'{"id":', dumps(f"avl-{node.key}"),  # identificador unico baseado na chave
+            b',', categoria.json_campos(),
+            b',"altura":', str(node.height).encode(),
+            b',"num_produtos":', str(len(categoria.produtos)).encode(),
+        ]
         
-        # adicionar filhos (esquerda e direita da AVL)
-        if node.leftChild:
-            left_dict = node_to_dict(node.leftChild)
-            if left_dict:
-                node_dict['children'].append(left_dict)
+        # produtos a partir dos fragmentos em cache
+        if include_produtos:
+            partes += [b',"produtos":', produtos_json(categoria.produtos)]
         
-        if node.rightChild:
-            right_dict = node_to_dict(node.rightChild)
-            if right_dict:
-                node_dict['children'].append(right_dict)
+        filhos = []
+        tem_filhos = node.leftChild is not None or node.rightChild is not None
+        if depth is not None and nivel + 1 >= depth:
+            # limite de profundidade: o cliente expande este no pedindo root=nome
+            partes += [b',"filhos_pendentes":', b'true' if tem_filhos else b'false']
+        else:
+            # adicionar filhos (esquerda e direita da AVL)
+            if node.leftChild:
+                filhos.append(node_to_json(node.leftChild, nivel + 1))
+            if node.rightChild:
+                filhos.append(node_to_json(node.rightChild, nivel + 1))
         
-        return node_dict
+        partes += [b',"children":', juntar_lista(filhos), b'}']
+        return b"".join(partes)
     
-    # converter a arvore AVL inteira
-    if sistema.arvore_categorias.root is None:
-        return JSONResponse(content=[])
-    
-    tree = node_to_dict(sistema.arvore_categorias.root)
+    # a travessia le nos e listas de produtos: leitura sob a trava do motor
+    with sistema.trava.leitura():
+        if root is not None:
+            chave = sistema.chave(root)
+            inicio = None if chave is None else sistema._buscar_node(sistema.arvore_categorias.root, chave)
+            if inicio is None:
+                raise HTTPException(status_code=404, detail="categoria nao encontrada na AVL")
+        else:
+            inicio = sistema.arvore_categorias.root
+        
+        # converter a arvore AVL (ou a subarvore pedida)
+        if inicio is None:
+            return JSONResponse(content=[], headers=cabecalhos)
+        
+        tree = node_to_json(inicio, 0)
     
-    return JSONResponse(content=[tree] if tree else [])
+    return Response(content=juntar_lista([tree]), media_type="application/json",
+                    headers=cabecalhos)
 
 
 # endpoints avancados usando funcionalidades da AVL
@@ -389,25 +1291,61 @@ async def buscar_categoria_avl(nome_categoria: str):
     busca uma categoria na AVL pelo nome
     complexidade: O(log n)
     """
-    categoria = sistema.buscar_categoria(nome_categoria)
-    
-    if not categoria:
-        raise HTTPException(status_code=404, detail="categoria nao encontrada na AVL")
-    
-    produtos = [{
-        'id': p.id,
-        'nome': p.nome,
-        'preco': p.preco,
-        'descricao': p.descricao,
-        'avaliacao': p.avaliacao
-    } for p in categoria.produtos]
+    with sistema.trava.leitura():
+        categoria = sistema.buscar_categoria(nome_categoria)
+        
+        if not categoria:
+            raise HTTPException(status_code=404, detail="categoria nao encontrada na AVL")
+        
+        # resposta montada com os fragmentos json em cache da categoria e dos produtos
+        produtos = categoria.produtos
+        corpo = b"".join([
+            b'{', categoria.json_campos(),
+            b',"produtos":', produtos_json(produtos),
+            b',"num_produtos":', str(len(produtos)).encode(),
+            b'}'
+        ])
+    return Response(content=corpo, media_type="application/json")
+
+@app.get("/api/sugestoes")
+async def sugerir_nomes(q: str = Query(..., min_length=1, max_length=100),
+                        k: int = Query(10, ge=1, le=50),
+                        tipo: Optional[Literal["categoria", "produto"]] = None,
+                        limiar: float = Query(0.3, gt=0, le=1)):
+    """
+    categorias e produtos com nome parecido com `q` (erros de digitacao,
+    maiusculas e acentos), do mais parecido para o menos
+    complexidade: proporcional as listas de trigramas mais raras de `q`, nao ao catalogo
+    (q tem no maximo 100 caracteres: os trigramas e a distancia de edicao por
+    candidato crescem com ele, sob a trava de leitura)
+    """
+    with sistema.trava.leitura():
+        if sistema.sugestoes is None:
+            raise HTTPException(status_code=503, detail="indice de sugestoes indisponivel")
+        itens = []
+        for entrada, similaridade, distancia in sistema.sugestoes.buscar(q, k, limiar, tipo):
+            if isinstance(entrada, Produto):
+                item = {'tipo': 'produto', 'id': entrada.id, 'nome': entrada.nome}
+            else:
+                item = {'tipo': 'categoria', 'nome': entrada.nome}
+            item['similaridade'] = round(similaridade, 3)
+            item['distancia'] = distancia
+            itens.append(item)
+    return JSONResponse(content=itens)
+
+@app.get("/api/busca")
+async def buscar_produtos_texto(q: str = Query(..., min_length=1),
+                                limite: int = Query(20, ge=1, le=100)):
+    """
+    busca textual de produtos por nome e descricao (indice fts5 no sqlite)
+    cada palavra casa por prefixo e o resultado vem ordenado por relevancia (bm25)
+    complexidade: proporcional aos documentos que casam, nao ao catalogo
+    """
+    if not db.fts_disponivel:
+        raise HTTPException(status_code=503, detail="busca textual indisponivel")
     
-    return JSONResponse(content={
-        'nome': categoria.nome,
-        'descricao': categoria.descricao,
-        'produtos': produtos,
-        'num_produtos': len(produtos)
-    })
+    produtos = db.buscar_produtos_texto(q, limite)
+    return JSONResponse(content=produtos)
 
 @app.get("/api/recomendar/{nome_categoria}")
 async def recomendar_produtos_avl(nome_categoria: str, 
@@ -418,26 +1356,26 @@ async def recomendar_produtos_avl(nome_categoria: str,
     inclui produtos de subcategorias usando travessia da AVL
     complexidade: O(log n) para encontrar + O(m) para percorrer subarvore
     """
-    # usar o sistema de recomendacao
-    recomendacoes = sistema.recomendar_produtos(nome_categoria, ordenar_por, limite)
-    
-    if not recomendacoes:
-        raise HTTPException(status_code=404, 
-                          detail="categoria nao encontrada ou sem produtos")
-    
-    # converter para formato JSON
-    resultado = [{
-        'produto': {
-            'id': item['produto'].id,
-            'nome': item['produto'].nome,
-            'preco': item['produto'].preco,
-            'descricao': item['produto'].descricao,
-            'avaliacao': item['produto'].avaliacao
-        },
-        'categoria': item['categoria']
-    } for item in recomendacoes]
+    # usar o sistema de recomendacao (a leitura cobre tambem a serializacao,
+    # para uma edicao concorrente nao aparecer pela metade na resposta)
+    with sistema.trava.leitura():
+        recomendacoes = sistema.recomendar_produtos(nome_categoria, ordenar_por, limite)
+        
+        if not recomendacoes:
+            raise HTTPException(status_code=404, 
+                              detail="categoria nao encontrada ou sem produtos")
+        
+        # converter para formato JSON juntando os fragmentos em cache dos produtos
+        nomes_json = {}
+        itens = []
+        for item in recomendacoes:
+            nome = item['categoria']
+            if nome not in nomes_json:
+                nomes_json[nome] = dumps(nome)
+            itens.append(b'{"produto":' + item['produto'].json_bytes() +
+                         b',"categoria":' + nomes_json[nome] + b'}')
     
-    return JSONResponse(content=resultado)
+    return Response(content=juntar_lista(itens), media_type="application/json")
 
 @app.get("/api/hierarquia")
 async def obter_hierarquia():
@@ -462,14 +1400,15 @@ async def obter_hierarquia():
             return -1
         return node.height
     
-    total = contar_nos(sistema.arvore_categorias.root)
-    altura = calcular_altura(sistema.arvore_categorias.root)
+    with sistema.trava.leitura():
+        total = contar_nos(sistema.arvore_categorias.root)
+        altura = calcular_altura(sistema.arvore_categorias.root)
     
     return JSONResponse(content={
         'total_categorias': total,
         'altura_arvore': altura,
         'balanceada': True,  # AVL sempre balanceada
-        'altura_teorica_minima': int(total.bit_length() - 1) if total > 0 else 0
+        'altura_teorica_minima': altura_teorica_minima(total)
     })
 
 
@@ -0,0 +1,5 @@
+"""
+Benchmarks de desempenho do SRHP
+
+    python -m benchmarks.escalabilidade --help
+"""
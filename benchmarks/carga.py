@@ -0,0 +1,281 @@
+"""
+Gerador de carga da API HTTP com percentis de latência por endpoint
+
+Por padrão sobe o `app` no próprio processo, sobre um catálogo sintético
+gerado com semente fixa em um banco temporário, e dispara as requisições
+pelo transporte ASGI do httpx (sem socket). Com --url mede um servidor já
+rodando (ex.: uvicorn em localhost), com o catálogo que ele tiver.
+
+N clientes concorrentes sorteiam o próximo endpoint pelo mix de pesos,
+durante o aquecimento (descartado) e depois durante a janela medida. O
+relatório traz vazão e p50/p95/p99/p999 por endpoint; o JSON de cada
+execução fica em benchmarks/resultados/carga/ e --comparar mostra a
+diferença contra uma execução anterior.
+
+No modo em processo cliente e servidor dividem o mesmo event loop: a
+latência inclui o custo do cliente, e a vazão é a de um worker só.
+
+Uso:
+    python -m benchmarks.carga
+    python -m benchmarks.carga --concorrencia 64 --duracao 30 --mix recomendar=8,tree=1
+    python -m benchmarks.carga --url http://127.0.0.1:8000 --rotulo uvicorn-4w
+    python -m benchmarks.carga --comparar benchmarks/resultados/carga/<anterior>.json
+    python -m benchmarks.carga --estrutura arvore_b --rotulo arvore_b
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import httpx
+
+from benchmarks.catalogo_sintetico import gerar_catalogo, termos_de_busca
+from benchmarks.escalabilidade import PASTA_RESULTADOS, ambiente
+from benchmarks.estruturas import silenciar
+from src.mapas_ordenados import ESTRUTURAS as ESTRUTURAS_CATEGORIAS
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PASTA_CARGA = os.path.join(PASTA_RESULTADOS, "carga")
+
+# endpoint -> caminho a partir do catálogo (nomes de categoria e termos de busca)
+ENDPOINTS = {
+    'recomendar': lambda sorteio, catalogo: f"/api/recomendar/{quote(sorteio.choice(catalogo['categorias']))}?limite=20",
+    'buscar': lambda sorteio, catalogo: f"/api/buscar/{quote(sorteio.choice(catalogo['categorias']))}",
+    'tree': lambda sorteio, catalogo: "/api/tree",
+    'tree_raso': lambda sorteio, catalogo: "/api/tree?depth=3&include_produtos=false",
+    'busca': lambda sorteio, catalogo: f"/api/busca?q={quote(sorteio.choice(catalogo['termos']))}",
+    'hierarquia': lambda sorteio, catalogo: "/api/hierarquia",
+}
+MIX_PADRAO = "recomendar=5,buscar=3,busca=1,tree=1"
+PERCENTIS = (50, 95, 99, 99.9)
+
+
+def ler_mix(texto):
+    """'recomendar=5,tree=1' -> {'recomendar': 5.0, 'tree': 1.0}"""
+    mix = {}
+    for parte in texto.split(","):
+        nome, _, peso = parte.partition("=")
+        nome = nome.strip()
+        if nome not in ENDPOINTS:
+            raise ValueError(f"endpoint desconhecido no mix: {nome} (opções: {', '.join(ENDPOINTS)})")
+        mix[nome] = float(peso or 1)
+    if not any(peso > 0 for peso in mix.values()):
+        raise ValueError("o mix precisa de pelo menos um peso positivo")
+    return mix
+
+
+def percentil(ordenados, p):
+    """Percentil pelo método do posto mais próximo; `ordenados` em ordem crescente"""
+    if not ordenados:
+        return None
+    posto = max(1, -(-len(ordenados) * p // 100))  # ceil(n * p / 100)
+    return ordenados[int(posto) - 1]
+
+
+def resumir(latencias, erros, duracao):
+    """Vazão e percentis (ms) de uma lista de latências em segundos"""
+    ordenadas = sorted(latencias)
+    resumo = {
+        'requisicoes': len(ordenadas),
+        'erros': erros,
+        'vazao_rps': len(ordenadas) / duracao if duracao > 0 else 0.0,
+        'media_ms': 1000 * sum(ordenadas) / len(ordenadas) if ordenadas else None,
+        'max_ms': 1000 * ordenadas[-1] if ordenadas else None
+    }
+    for p in PERCENTIS:
+        valor = percentil(ordenadas, p)
+        resumo[f"p{p:g}_ms".replace(".", "")] = 1000 * valor if valor is not None else None
+    return resumo
+
+
+async def executar_carga(cliente, catalogo, mix, concorrencia=32, duracao=10.0, aquecimento=2.0,
+                         semente=42, cabecalhos=None):
+    """
+    Dispara a carga com `concorrencia` clientes e agrega as latências
+
+    Cada cliente tem o próprio gerador com semente derivada de `semente`,
+    então a sequência de requisições é reproduzível. Respostas >= 400 contam
+    como erro e ficam fora dos percentis.
+
+    returns
+        {'duracao_s', 'total': resumo, 'endpoints': {nome: resumo}}
+    """
+    nomes, pesos = list(mix), list(mix.values())
+    latencias = {nome: [] for nome in nomes}
+    erros = {nome: 0 for nome in nomes}
+    inicio_medicao = time.perf_counter() + aquecimento
+    fim = inicio_medicao + duracao
+
+    async def cliente_virtual(indice):
+        sorteio = random.Random(semente * 1_000_003 + indice)
+        while True:
+            nome = sorteio.choices(nomes, pesos)[0]
+            caminho = ENDPOINTS[nome](sorteio, catalogo)
+            inicio = time.perf_counter()
+            if inicio >= fim:
+                return
+            resposta = await cliente.get(caminho, headers=cabecalhos)
+            await resposta.aread()
+            termino = time.perf_counter()
+            if inicio < inicio_medicao:
+                continue
+            if resposta.status_code >= 400:
+                erros[nome] += 1
+            else:
+                latencias[nome].append(termino - inicio)
+
+    await asyncio.gather(*(cliente_virtual(i) for i in range(concorrencia)))
+    medido = time.perf_counter() - inicio_medicao
+
+    return {
+        'duracao_s': medido,
+        'total': resumir([l for lista in latencias.values() for l in lista], sum(erros.values()), medido),
+        'endpoints': {nome: resumir(latencias[nome], erros[nome], medido) for nome in nomes}
+    }
+
+
+async def catalogo_do_servidor(cliente):
+    """Nomes de categoria do servidor medido e os termos do vocabulário sintético"""
+    resposta = await cliente.get("/api/categorias")
+    resposta.raise_for_status()
+    categorias = [categoria['nome'] for categoria in resposta.json()]
+    if not categorias:
+        raise RuntimeError("o servidor não tem categorias cadastradas")
+    return {'categorias': categorias, 'termos': termos_de_busca()}
+
+
+async def carga_em_processo(args, mix, cabecalhos):
+    """Gera o catálogo em um banco temporário e mede o `app` pelo transporte ASGI"""
+    pasta = tempfile.mkdtemp(prefix="srhp-carga-")
+    try:
+        caminho_db = os.path.join(pasta, "srhp.db")
+        os.environ.update({
+            'SRHP_DB': caminho_db,
+            'SRHP_SNAPSHOT': "",
+            'SRHP_INTERVALO_ALTERACOES': "0",
+            'SRHP_CARGA_EM_SEGUNDO_PLANO': "0",
+            'SRHP_ESTRUTURA': args.estrutura,
+        })
+        os.environ.pop("SRHP_CATALOGO_COMPARTILHADO", None)
+        os.chdir(RAIZ)  # static/ e templates/ são relativos à raiz
+
+        with silenciar():
+            from src.database import Database
+            gerar_catalogo(Database(caminho_db), args.categorias, args.produtos, args.semente)
+            import app as aplicacao
+
+            async with aplicacao.app.router.lifespan_context(aplicacao.app):
+                transporte = httpx.ASGITransport(app=aplicacao.app)
+                async with httpx.AsyncClient(transport=transporte, base_url="http://srhp") as cliente:
+                    catalogo = await catalogo_do_servidor(cliente)
+                    return await executar_carga(cliente, catalogo, mix, args.concorrencia, args.duracao,
+                                                args.aquecimento, args.semente, cabecalhos)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+async def carga_remota(args, mix, cabecalhos):
+    """Mede um servidor já rodando em --url"""
+    limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=60.0) as cliente:
+        catalogo = await catalogo_do_servidor(cliente)
+        return await executar_carga(cliente, catalogo, mix, args.concorrencia, args.duracao,
+                                    args.aquecimento, args.semente, cabecalhos)
+
+
+def _formatar(valor, largura=10, casas=2):
+    return f"{'—':>{largura}}" if valor is None else f"{valor:>{largura},.{casas}f}"
+
+
+def imprimir_relatorio(resultado):
+    colunas = ["requisicoes", "erros", "vazao_rps", "p50_ms", "p95_ms", "p99_ms", "p999_ms", "max_ms"]
+    print(f"\n{'endpoint':<12}" + "".join(f"{coluna:>11}" for coluna in colunas))
+    linhas = list(resultado['endpoints'].items()) + [("total", resultado['total'])]
+    for nome, resumo in linhas:
+        print(f"{nome:<12}" + "".join(
+            f"{resumo[coluna]:>11,}" if coluna in ("requisicoes", "erros")
+            else " " + _formatar(resumo[coluna]) for coluna in colunas))
+
+
+def imprimir_comparacao(atual, anterior):
+    """Variação de vazão e latência contra uma execução gravada antes"""
+    print(f"\ncomparação com {anterior['arquivo']} ({anterior['parametros'].get('rotulo') or 'sem rótulo'})")
+    print(f"{'endpoint':<12}{'vazao_rps':>24}{'p50_ms':>24}{'p99_ms':>24}")
+    nomes = list(atual['endpoints']) + ["total"]
+    for nome in nomes:
+        novo = atual['total'] if nome == "total" else atual['endpoints'][nome]
+        velho = anterior['total'] if nome == "total" else anterior['endpoints'].get(nome)
+        if velho is None:
+            continue
+        celulas = []
+        for campo in ("vazao_rps", "p50_ms", "p99_ms"):
+            if novo[campo] is None or not velho[campo]:
+                celulas.append(f"{'—':>24}")
+                continue
+            variacao = 100 * (novo[campo] - velho[campo]) / velho[campo]
+            celulas.append(f"{velho[campo]:,.1f} -> {novo[campo]:,.1f} ({variacao:+.0f}%)".rjust(24))
+        print(f"{nome:<12}" + "".join(celulas))
+
+
+def gravar(resultado, args, pasta=PASTA_CARGA):
+    """Grava a execução em JSON e retorna o caminho"""
+    os.makedirs(pasta, exist_ok=True)
+    carimbo = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    nome = f"{carimbo}-{args.rotulo}.json" if args.rotulo else f"{carimbo}.json"
+    caminho = os.path.join(pasta, nome)
+    parametros = {chave: valor for chave, valor in vars(args).items() if chave != "comparar"}
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({'ambiente': ambiente(), 'parametros': parametros, **resultado},
+                  arquivo, indent=2, ensure_ascii=False)
+    return caminho
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", help="servidor já rodando; sem ela o app sobe no processo")
+    parser.add_argument("--concorrencia", type=int, default=32, help="clientes simultâneos")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos medidos")
+    parser.add_argument("--aquecimento", type=float, default=2.0, help="segundos descartados no início")
+    parser.add_argument("--mix", default=MIX_PADRAO, help=f"pesos por endpoint ({', '.join(ENDPOINTS)})")
+    parser.add_argument("--categorias", type=int, default=500, help="tamanho do catálogo sintético")
+    parser.add_argument("--produtos", type=int, default=20_000, help="tamanho do catálogo sintético")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--estrutura", choices=list(ESTRUTURAS_CATEGORIAS), default="avl",
+                        help="mapa ordenado das categorias no app em processo (SRHP_ESTRUTURA)")
+    parser.add_argument("--sem-cache", action="store_true",
+                        help="envia Cache-Control: no-store para medir os handlers sem o cache de respostas")
+    parser.add_argument("--rotulo", default="", help="sufixo do arquivo de resultado")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = ler_mix(args.mix)
+    except ValueError as erro:
+        parser.error(str(erro))
+    cabecalhos = {"Cache-Control": "no-store"} if args.sem_cache else None
+
+    alvo = args.url or f"app em processo ({args.categorias} categorias, {args.produtos} produtos)"
+    print(f"Carga em {alvo}: {args.concorrencia} clientes, {args.duracao:g}s medidos, mix {args.mix}")
+    executor = carga_remota if args.url else carga_em_processo
+    resultado = asyncio.run(executor(args, mix, cabecalhos))
+
+    imprimir_relatorio(resultado)
+    caminho = gravar(resultado, args)
+    print(f"\nResultados em {caminho}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)
+        anterior['arquivo'] = os.path.basename(args.comparar)
+        imprimir_comparacao(resultado, anterior)
+
+
+if __name__ == "__main__":
+    main()
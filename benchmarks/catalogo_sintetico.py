@@ -0,0 +1,86 @@
+"""
+Catálogo sintético e reprodutível para os benchmarks
+
+A mesma semente gera sempre as mesmas categorias (uma floresta com ~5% de
+raízes; cada categoria nova pendura em uma anterior sorteada) e os mesmos
+produtos (nome com palavras de um vocabulário fixo, preço log-normal e
+avaliação de 0 a 5), distribuídos entre as categorias.
+"""
+
+import random
+
+SUBSTANTIVOS = [
+    "Cabo", "Fone", "Teclado", "Mouse", "Monitor", "Cadeira", "Mesa", "Luminária", "Mochila",
+    "Garrafa", "Tênis", "Camiseta", "Jaqueta", "Livro", "Caderno", "Caneta", "Panela", "Faca",
+    "Bola", "Raquete", "Bicicleta", "Relógio", "Câmera", "Carregador", "Caixa", "Tapete"
+]
+ADJETIVOS = [
+    "Azul", "Preto", "Compacto", "Portátil", "Sem Fio", "Premium", "Básico", "Infantil",
+    "Profissional", "Clássico", "Leve", "Resistente", "Digital", "Ergonômico", "Térmico"
+]
+AREAS = [
+    "Eletrônicos", "Informática", "Casa", "Cozinha", "Esportes", "Moda", "Livros", "Brinquedos",
+    "Jardim", "Automotivo", "Saúde", "Beleza", "Papelaria", "Games", "Música", "Pet"
+]
+
+
+def termos_de_busca():
+    """Palavras que aparecem nos nomes dos produtos gerados"""
+    return SUBSTANTIVOS + ADJETIVOS
+
+
+def gerar_registros(categorias, produtos, semente=42, tamanho_descricao=0):
+    """
+    Registros do catálogo sintético, sem banco
+
+    As categorias vêm em uma lista de dicts (`pai` é o índice da categoria
+    pai ou None) e os produtos em um gerador (`categoria` é o índice da
+    categoria), para catálogos grandes não ficarem inteiros na memória.
+    `tamanho_descricao` completa a descrição dos produtos até esse número
+    de caracteres (0 mantém a descrição curta).
+
+    returns
+        (lista de categorias, gerador de produtos)
+    """
+    sorteio = random.Random(semente)
+    raizes = max(1, categorias // 20)
+    lista = []
+    for i in range(categorias):
+        lista.append({
+            'nome': f"{AREAS[i % len(AREAS)]} {i:05d}",
+            'descricao': f"Categoria sintética {i}",
+            'pai': sorteio.randrange(i) if i >= raizes else None
+        })
+
+    def gerar_produtos():
+        for i in range(produtos):
+            descricao = f"Produto sintético {i}"
+            yield {
+                'id': i + 1,
+                'nome': f"{sorteio.choice(SUBSTANTIVOS)} {sorteio.choice(ADJETIVOS)} {i}",
+                'preco': round(min(sorteio.lognormvariate(4.0, 1.0), 50_000.0), 2),
+                'avaliacao': round(sorteio.uniform(0.0, 5.0), 1),
+                'categoria': sorteio.randrange(categorias),
+                'descricao': descricao.ljust(tamanho_descricao, ".")
+            }
+
+    return lista, gerar_produtos()
+
+
+def gerar_catalogo(db, categorias=500, produtos=20_000, semente=42):
+    """
+    Grava o catálogo sintético em `db` (um `Database` vazio) em uma única transação
+
+    returns
+        lista com os nomes das categorias criadas
+    """
+    lista, registros = gerar_registros(categorias, produtos, semente)
+    ids = []
+    with db.get_connection() as conn:
+        for categoria in lista:
+            pai = ids[categoria['pai']] if categoria['pai'] is not None else None
+            ids.append(db.inserir_categoria(categoria['nome'], categoria['descricao'], pai, conn=conn))
+        for produto in registros:
+            db.inserir_produto(produto['nome'], ids[produto['categoria']], produto['preco'],
+                               produto['descricao'], produto['avaliacao'], conn=conn)
+    return [categoria['nome'] for categoria in lista]
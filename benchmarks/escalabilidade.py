@@ -0,0 +1,165 @@
+"""
+Benchmark de escalabilidade da AVL contra dict, lista ordenada (bisect), árvore B e lista em blocos
+
+Mede o custo por operação de inserir, buscar, recomendar e remover para cada
+tamanho n e cada ordem de inserção, e a altura final da AVL comparada com a
+altura teórica mínima (ceil(log2(n + 1))) e a máxima de uma AVL (~1.44 log2 n).
+Grava os resultados em JSON e os gráficos em PNG.
+
+Uso:
+    python -m benchmarks.escalabilidade
+    python -m benchmarks.escalabilidade --tamanhos 1000 10000 --ordens aleatoria crescente
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import time
+from datetime import datetime, timezone
+
+from benchmarks.estruturas import ESTRUTURAS, EstruturaAVL, intervalos_subarvore
+from benchmarks.ordens import ORDENS, aleatoria
+from src.avl_tree import altura_maxima_avl, altura_teorica_minima
+
+PASTA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+
+OPERACOES = ("inserir", "buscar", "recomendar", "remover")
+AMOSTRA_BUSCA = 100_000
+AMOSTRA_RECOMENDACAO = 10_000
+LIMITE_BISECT = 100_000  # inserção O(n) na lista: acima disso leva minutos
+
+
+def cronometrar(funcao, *args):
+    """Tempo de parede em ns de uma chamada, sem o coletor de lixo no meio"""
+    gc.collect()
+    gc.disable()
+    try:
+        inicio = time.perf_counter_ns()
+        funcao(*args)
+        return time.perf_counter_ns() - inicio
+    finally:
+        gc.enable()
+
+
+def medir(classe, chaves, busca, recomendacao, remocao, intervalos=None):
+    """
+    Uma rodada completa numa estrutura nova
+
+    `intervalos` são as subárvores da AVL para as chaves de `recomendacao`;
+    quando a estrutura é a própria AVL e eles ainda não existem, são
+    calculados depois da inserção, fora da medição
+
+    returns
+        (tempos em ns por operação, altura após a inserção, intervalos)
+    """
+    estrutura = classe()
+    tempos = {'inserir': cronometrar(estrutura.inserir, chaves) / len(chaves)}
+    altura = estrutura.altura()
+    if intervalos is None and isinstance(estrutura, EstruturaAVL):
+        intervalos = intervalos_subarvore(estrutura.arvore, recomendacao)
+    tempos['buscar'] = cronometrar(estrutura.buscar, busca) / len(busca)
+    if estrutura.recomendar is not None:
+        tempos['recomendar'] = cronometrar(estrutura.recomendar, recomendacao, intervalos) / len(recomendacao)
+    tempos['remover'] = cronometrar(estrutura.remover, remocao) / len(remocao)
+    return tempos, altura, intervalos
+
+
+def executar(tamanhos, ordens, estruturas, repeticoes=3, limite_bisect=LIMITE_BISECT, semente=42):
+    """
+    Roda a matriz tamanho x ordem x estrutura
+
+    Cada combinação é repetida e fica o menor tempo de cada operação; com
+    n >= 10^6 roda uma vez só (repeticoes é limitado a 10^6 // n).
+
+    returns
+        lista de dicts, um por combinação medida
+    """
+    resultados = []
+    for n in tamanhos:
+        sorteio = random.Random(semente + n)
+        busca = sorteio.choices(range(n), k=min(n, AMOSTRA_BUSCA))
+        recomendacao = sorteio.choices(range(n), k=min(n, AMOSTRA_RECOMENDACAO))
+        remocao = aleatoria(n, semente + 1)
+        rodadas = max(1, min(repeticoes, 10 ** 6 // n))
+
+        for ordem in ordens:
+            chaves = ORDENS[ordem](n)
+            # a subárvore de cada chave depende da forma da AVL nesta ordem;
+            # a AVL roda primeiro e os intervalos saem da primeira rodada dela
+            intervalos = None
+            if "avl" not in estruturas:
+                referencia = EstruturaAVL()
+                referencia.inserir(chaves)
+                intervalos = intervalos_subarvore(referencia.arvore, recomendacao)
+                del referencia
+
+            for nome in sorted(estruturas, key=lambda nome: nome != "avl"):
+                if nome == "bisect" and n > limite_bisect:
+                    print(f"  n={n:>9,} {ordem:<12} {nome:<12} ignorado (acima de --limite-bisect)")
+                    continue
+                melhores, altura = {}, None
+                for _ in range(rodadas):
+                    tempos, altura, intervalos = medir(ESTRUTURAS[nome], chaves, busca, recomendacao,
+                                                       remocao, intervalos)
+                    for operacao, tempo in tempos.items():
+                        melhores[operacao] = min(tempo, melhores.get(operacao, tempo))
+
+                resultado = {
+                    'estrutura': nome, 'ordem': ordem, 'n': n, 'rodadas': rodadas,
+                    **{f"{operacao}_ns": melhores.get(operacao) for operacao in OPERACOES},
+                    'itens_por_recomendacao': (sum(maior - menor + 1 for menor, maior in intervalos) / len(intervalos)
+                                               if 'recomendar' in melhores else None),
+                    'altura': altura,
+                    'altura_teorica_minima': altura_teorica_minima(n),
+                    'altura_maxima_avl': altura_maxima_avl(n)
+                }
+                resultados.append(resultado)
+                print(f"  n={n:>9,} {ordem:<12} {nome:<12} " + " ".join(
+                    f"{operacao} {melhores[operacao]:>8.0f} ns" for operacao in OPERACOES if operacao in melhores)
+                    + (f"  altura {altura}" if altura is not None else ""))
+    return resultados
+
+
+def ambiente():
+    return {
+        'python': platform.python_version(),
+        'implementacao': platform.python_implementation(),
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'data': datetime.now(timezone.utc).isoformat(timespec="seconds")
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument("--ordens", nargs="+", choices=list(ORDENS), default=list(ORDENS))
+    parser.add_argument("--estruturas", nargs="+", choices=list(ESTRUTURAS), default=list(ESTRUTURAS))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--limite-bisect", type=int, default=LIMITE_BISECT)
+    parser.add_argument("--saida", default=PASTA_RESULTADOS, help="pasta do JSON e dos gráficos")
+    parser.add_argument("--sem-graficos", action="store_true")
+    args = parser.parse_args(argv)
+
+    print("Benchmark de escalabilidade")
+    resultados = executar(args.tamanhos, args.ordens, args.estruturas,
+                          args.repeticoes, args.limite_bisect)
+
+    os.makedirs(args.saida, exist_ok=True)
+    caminho = os.path.join(args.saida, "escalabilidade.json")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({'ambiente': ambiente(), 'parametros': vars(args), 'resultados': resultados},
+                  arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultados em {caminho}")
+
+    if not args.sem_graficos:
+        from benchmarks.graficos import gerar_graficos
+        for grafico in gerar_graficos(resultados, args.saida):
+            print(f"Gráfico em {grafico}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Estruturas comparadas nos benchmarks, com a mesma interface
+
+Cada adaptador expõe inserir/buscar/recomendar/remover recebendo a lista de
+chaves inteira, para que o laço de cada operação rode dentro da medição e o
+custo por operação seja tempo_total / len(chaves).
+
+- AVL: `src.avl_tree.AVLTree`, a estrutura do sistema;
+- dict: tabela hash, O(1) médio, sem ordem (não responde `recomendar`);
+- bisect: lista ordenada com `bisect.insort`, busca O(log n) e inserção/remoção
+  O(n) por causa do deslocamento da lista;
+- arvore_b e lista_blocos: os mapas alternativos de `src.mapas_ordenados`,
+  com nós largos (selecionáveis no app por SRHP_ESTRUTURA).
+
+`recomendar` na AVL devolve os dados da subárvore de uma chave. Uma subárvore
+de BST é um intervalo contíguo de chaves, então a lista ordenada responde a
+mesma pergunta com duas buscas binárias e um fatiamento do intervalo, e os
+mapas alternativos percorrem o mesmo intervalo com `itens(menor, maior)`.
+"""
+
+import bisect
+import contextlib
+import os
+
+from src.avl_tree import AVLTree
+from src.mapas_ordenados import ArvoreB, ListaBlocos
+
+# todos os nós apontam para o mesmo dado: `recommend` só precisa de um dict
+# com a lista 'produtos', e assim a memória fica só com os nós
+DADO = {'produtos': [None]}
+
+
+@contextlib.contextmanager
+def silenciar():
+    """As rotações da AVL imprimem no console; descarta a saída durante a medição"""
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        yield
+
+
+def intervalos_subarvore(arvore, chaves):
+    """(menor, maior) chave da subárvore de cada chave, calculados fora da medição"""
+    intervalos = []
+    for chave in chaves:
+        node = arvore._find_node(arvore.root, chave)
+        menor = maior = node
+        while menor.leftChild is not None:
+            menor = menor.leftChild
+        while maior.rightChild is not None:
+            maior = maior.rightChild
+        intervalos.append((menor.key, maior.key))
+    return intervalos
+
+
+class EstruturaAVL:
+    nome = "avl"
+
+    def __init__(self):
+        self.arvore = AVLTree()
+
+    def inserir(self, chaves):
+        insert = self.arvore.insert
+        with silenciar():
+            for chave in chaves:
+                insert(chave, DADO)
+
+    def buscar(self, chaves):
+        find = self.arvore.find
+        for chave in chaves:
+            find(chave)
+
+    def recomendar(self, chaves, intervalos):
+        recommend = self.arvore.recommend
+        for chave in chaves:
+            recommend(chave)
+
+    def remover(self, chaves):
+        delete = self.arvore.delete
+        with silenciar():
+            for chave in chaves:
+                delete(chave)
+
+    def altura(self):
+        return self.arvore.root.height if self.arvore.root else 0
+
+
+class EstruturaDict:
+    nome = "dict"
+
+    def __init__(self):
+        self.tabela = {}
+
+    def inserir(self, chaves):
+        tabela = self.tabela
+        for chave in chaves:
+            tabela[chave] = DADO
+
+    def buscar(self, chaves):
+        get = self.tabela.get
+        for chave in chaves:
+            get(chave)
+
+    recomendar = None  # sem ordem entre as chaves
+
+    def remover(self, chaves):
+        tabela = self.tabela
+        for chave in chaves:
+            del tabela[chave]
+
+    def altura(self):
+        return None
+
+
+class EstruturaBisect:
+    nome = "bisect"
+
+    def __init__(self):
+        self.chaves = []
+        self.dados = []
+
+    def inserir(self, chaves):
+        lista, dados = self.chaves, self.dados
+        bisect_left = bisect.bisect_left
+        for chave in chaves:
+            i = bisect_left(lista, chave)
+            lista.insert(i, chave)
+            dados.insert(i, DADO)
+
+    def buscar(self, chaves):
+        lista, dados = self.chaves, self.dados
+        bisect_left = bisect.bisect_left
+        for chave in chaves:
+            i = bisect_left(lista, chave)
+            if i < len(lista) and lista[i] == chave:
+                dados[i]
+
+    def recomendar(self, chaves, intervalos):
+        lista, dados = self.chaves, self.dados
+        bisect_left, bisect_right = bisect.bisect_left, bisect.bisect_right
+        for menor, maior in intervalos:
+            resultados = []
+            for dado in dados[bisect_left(lista, menor):bisect_right(lista, maior)]:
+                resultados.extend(dado['produtos'])
+
+    def remover(self, chaves):
+        lista, dados = self.chaves, self.dados
+        bisect_left = bisect.bisect_left
+        for chave in chaves:
+            i = bisect_left(lista, chave)
+            del lista[i]
+            del dados[i]
+
+    def altura(self):
+        return None
+
+
+class _EstruturaMapa:
+    """adaptador dos mapas de src.mapas_ordenados"""
+
+    def __init__(self):
+        self.mapa = self.classe()
+
+    def inserir(self, chaves):
+        insert = self.mapa.insert
+        for chave in chaves:
+            insert(chave, DADO)
+
+    def buscar(self, chaves):
+        find = self.mapa.find
+        for chave in chaves:
+            find(chave)
+
+    def recomendar(self, chaves, intervalos):
+        itens = self.mapa.itens
+        for menor, maior in intervalos:
+            resultados = []
+            for _, dado in itens(menor, maior):
+                resultados.extend(dado['produtos'])
+
+    def remover(self, chaves):
+        delete = self.mapa.delete
+        for chave in chaves:
+            delete(chave)
+
+    def altura(self):
+        return None
+
+
+class EstruturaArvoreB(_EstruturaMapa):
+    nome = "arvore_b"
+    classe = ArvoreB
+
+
+class EstruturaListaBlocos(_EstruturaMapa):
+    nome = "lista_blocos"
+    classe = ListaBlocos
+
+
+ESTRUTURAS = {
+    'avl': EstruturaAVL,
+    'dict': EstruturaDict,
+    'bisect': EstruturaBisect,
+    'arvore_b': EstruturaArvoreB,
+    'lista_blocos': EstruturaListaBlocos
+}
@@ -0,0 +1,102 @@
+"""
+Gráficos dos resultados do benchmark de escalabilidade
+
+Pode ser rodado sozinho sobre um JSON já gravado:
+    python -m benchmarks.graficos benchmarks/resultados/escalabilidade.json
+"""
+
+import json
+import math
+import os
+import sys
+
+import matplotlib
+
+matplotlib.use("Agg")  # sem display: só grava os arquivos
+import matplotlib.pyplot as plt
+
+from benchmarks.escalabilidade import OPERACOES
+
+CORES = {'avl': "tab:blue", 'dict': "tab:green", 'bisect': "tab:orange", 'arvore_b': "tab:red",
+         'lista_blocos': "tab:purple"}
+ESTILOS = {'aleatoria': "-", 'crescente': "--", 'decrescente': ":", 'adversarial': "-."}
+MARCADORES = {'aleatoria': "o", 'crescente': "^", 'decrescente': "v", 'adversarial': "s"}
+
+
+def _series(resultados, campo):
+    """{(estrutura, ordem): ([n], [valor])} ignorando as medições ausentes"""
+    series = {}
+    for resultado in sorted(resultados, key=lambda r: r['n']):
+        if resultado.get(campo) is None:
+            continue
+        xs, ys = series.setdefault((resultado['estrutura'], resultado['ordem']), ([], []))
+        xs.append(resultado['n'])
+        ys.append(resultado[campo])
+    return series
+
+
+def grafico_tempos(resultados, caminho):
+    """Um painel por operação: ns por operação x n, em escala log-log"""
+    figura, eixos = plt.subplots(2, 2, figsize=(13, 9))
+    for eixo, operacao in zip(eixos.flat, OPERACOES):
+        for (estrutura, ordem), (xs, ys) in _series(resultados, f"{operacao}_ns").items():
+            eixo.plot(xs, ys, color=CORES.get(estrutura), linestyle=ESTILOS.get(ordem, "-"),
+                      marker=MARCADORES.get(ordem, "o"), markersize=4, label=f"{estrutura} / {ordem}")
+        eixo.set_title(operacao)
+        eixo.set_xscale("log")
+        eixo.set_yscale("log")
+        eixo.set_xlabel("n")
+        eixo.set_ylabel("ns por operação")
+        eixo.grid(True, which="both", alpha=0.3)
+    eixos.flat[0].legend(fontsize=7, ncol=2)
+    figura.suptitle("Custo por operação: AVL x dict x bisect x árvore B x lista em blocos")
+    figura.tight_layout()
+    figura.savefig(caminho, dpi=120)
+    plt.close(figura)
+
+
+def grafico_altura(resultados, caminho):
+    """Altura medida da AVL por ordem de inserção contra os limites teóricos"""
+    avl = [r for r in resultados if r['estrutura'] == "avl" and r.get('altura') is not None]
+    figura, eixo = plt.subplots(figsize=(9, 6))
+    for (_, ordem), (xs, ys) in _series(avl, "altura").items():
+        eixo.plot(xs, ys, linestyle="none", marker=MARCADORES.get(ordem, "o"), markersize=8,
+                  fillstyle="none", label=f"medida / {ordem}")
+
+    tamanhos = sorted({r['n'] for r in avl})
+    if tamanhos:
+        minimas = {r['n']: r['altura_teorica_minima'] for r in avl}
+        maximas = {r['n']: r['altura_maxima_avl'] for r in avl}
+        eixo.plot(tamanhos, [minimas[n] for n in tamanhos], color="black",
+                  label="altura_teorica_minima = ceil(log2(n + 1))")
+        eixo.plot(tamanhos, [maximas[n] for n in tamanhos], color="gray", linestyle="--",
+                  label="altura máxima de uma AVL (árvore de Fibonacci)")
+        eixo.plot(tamanhos, [1.4405 * math.log2(n + 2) - 0.3277 for n in tamanhos], color="gray",
+                  linestyle=":", label="1.44 log2(n + 2) - 0.328")
+    eixo.set_xscale("log")
+    eixo.set_xlabel("n")
+    eixo.set_ylabel("altura (níveis)")
+    eixo.set_title("Altura da AVL após as inserções")
+    eixo.grid(True, which="both", alpha=0.3)
+    eixo.legend(fontsize=8)
+    figura.tight_layout()
+    figura.savefig(caminho, dpi=120)
+    plt.close(figura)
+
+
+def gerar_graficos(resultados, pasta):
+    """Grava os dois gráficos em `pasta` e retorna os caminhos"""
+    caminhos = [os.path.join(pasta, "escalabilidade_tempos.png"),
+                os.path.join(pasta, "escalabilidade_altura.png")]
+    grafico_tempos(resultados, caminhos[0])
+    grafico_altura(resultados, caminhos[1])
+    return caminhos
+
+
+if __name__ == "__main__":
+    arquivo = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "resultados", "escalabilidade.json")
+    with open(arquivo, encoding="utf-8") as entrada:
+        dados = json.load(entrada)
+    for grafico in gerar_graficos(dados['resultados'], os.path.dirname(os.path.abspath(arquivo))):
+        print(f"Gráfico em {grafico}")
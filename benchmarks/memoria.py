@@ -0,0 +1,383 @@
+"""
+Contabilidade de memória do catálogo em memória (AVL + categorias + produtos)
+
+Monta catálogos sintéticos de tamanhos crescentes pelo `SistemaRecomendacao`
+(cada tamanho em um processo novo, para o RSS não herdar a memória do
+anterior) e relata:
+
+- bytes por dono (nó da AVL, categoria, produto) e por tipo de objeto
+  (instância, str, list, dict, int, float, bytes do cache JSON);
+- bytes médios por AVLNode, por categoria e por produto (profundo);
+- bytes por nível da árvore (nó + categoria + produtos de cada nível);
+- RSS antes, depois de montar e depois de aquecer o cache JSON.
+
+O custo das instâncias é calibrado com tracemalloc na versão do Python em
+uso (objetos com valores inline, __dict__ materializado ou __slots__ custam
+diferente); str/list/dict/int/float usam sys.getsizeof, sem contar duas
+vezes o mesmo objeto. Com os pontos medidos, ajusta por mínimos quadrados
+bytes ~ fixo + a * categorias + b * produtos e usa o modelo em --prever.
+
+Uso:
+    python -m benchmarks.memoria
+    python -m benchmarks.memoria --produtos 100000 1000000 --produtos-por-categoria 20 200
+    python -m benchmarks.memoria --tamanho-descricao 300 --prever 2000,1500000
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import tracemalloc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.catalogo_sintetico import gerar_registros
+from benchmarks.escalabilidade import PASTA_RESULTADOS, ambiente
+from benchmarks.estruturas import silenciar
+
+DONOS = ("avl_node", "categoria", "produto")
+TIPOS = ("instancia", "str", "list", "dict", "int", "float", "bytes")
+
+
+def rss_bytes():
+    """RSS atual do processo (Linux: /proc/self/statm; senão o pico do getrusage)"""
+    try:
+        with open("/proc/self/statm") as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico if sys.platform == "darwin" else pico * 1024
+
+
+def campos_da_classe(amostra):
+    """Atributos de instância, lidos de uma instância descartável"""
+    if hasattr(type(amostra), "__slots__"):
+        return tuple(type(amostra).__slots__)
+    return tuple(vars(amostra))
+
+
+def custo_instancia(classe, campos, amostras=20_000):
+    """
+    Bytes de uma instância com os `campos` preenchidos, medidos com tracemalloc
+
+    Os campos recebem o mesmo objeto (None), então só o objeto e a sua
+    área de atributos entram na conta. Ler `__dict__` das instâncias do
+    catálogo materializaria o dict e mudaria a medida, por isso a calibração
+    usa instâncias próprias.
+    """
+    objetos = [None] * amostras
+    ja_rastreando = tracemalloc.is_tracing()
+    if not ja_rastreando:
+        tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    for i in range(amostras):
+        objeto = object.__new__(classe)
+        for campo in campos:
+            object.__setattr__(objeto, campo, None)
+        objetos[i] = objeto
+    depois = tracemalloc.get_traced_memory()[0]
+    if not ja_rastreando:
+        tracemalloc.stop()
+    return round((depois - antes) / amostras)
+
+
+class Contabilidade:
+    """soma bytes por (dono, tipo) sem contar o mesmo objeto duas vezes"""
+
+    def __init__(self, custos):
+        self.custos = custos  # classe -> (campos, bytes por instância)
+        self.bytes = {dono: dict.fromkeys(TIPOS, 0) for dono in DONOS}
+        self.objetos = {dono: dict.fromkeys(TIPOS, 0) for dono in DONOS}
+        self.caracteres = dict.fromkeys(DONOS, 0)
+        self._vistos = set()
+
+    def _somar(self, dono, tipo, tamanho):
+        self.bytes[dono][tipo] += tamanho
+        self.objetos[dono][tipo] += 1
+        return tamanho
+
+    def valor(self, dono, valor):
+        """conta um valor simples (str, int, float, bytes); retorna os bytes novos"""
+        if valor is None or id(valor) in self._vistos:
+            return 0
+        tipo = {str: "str", int: "int", float: "float", bytes: "bytes"}.get(type(valor))
+        if tipo is None:
+            return 0
+        self._vistos.add(id(valor))
+        if tipo == "str":
+            self.caracteres[dono] += len(valor)
+        return self._somar(dono, tipo, sys.getsizeof(valor))
+
+    def instancia(self, dono, objeto):
+        """conta a instância (custo calibrado) e os seus atributos simples"""
+        if id(objeto) in self._vistos:
+            return 0
+        self._vistos.add(id(objeto))
+        campos, custo = self.custos[type(objeto)]
+        total = self._somar(dono, "instancia", custo)
+        for campo in campos:
+            total += self.valor(dono, getattr(objeto, campo, None))
+        return total
+
+    def container(self, dono, tipo, objeto):
+        """conta a list/dict em si (os itens são contados por quem os possui)"""
+        if id(objeto) in self._vistos:
+            return 0
+        self._vistos.add(id(objeto))
+        return self._somar(dono, tipo, sys.getsizeof(objeto))
+
+
+def contabilizar(sistema, custos):
+    """
+    Percorre a AVL em largura e contabiliza nós, categorias e produtos
+
+    returns
+        (Contabilidade, lista de {'nivel', 'nos', 'produtos', 'bytes'})
+    """
+    conta = Contabilidade(custos)
+    niveis = []
+    fila = deque([(sistema.arvore_categorias.root, 0)] if sistema.arvore_categorias.root else [])
+    while fila:
+        node, nivel = fila.popleft()
+        if nivel == len(niveis):
+            niveis.append({'nivel': nivel + 1, 'nos': 0, 'produtos': 0, 'bytes': 0})
+        categoria = node.data
+        # a categoria antes do nó: no modo exata a chave do nó é a mesma str
+        # do nome e conta para a categoria; a chave de colação conta para o nó
+        total = conta.instancia("categoria", categoria)
+        total += conta.instancia("avl_node", node)
+        total += conta.container("categoria", "list", categoria.produtos)
+        total += conta.container("categoria", "dict", categoria._indice_produtos)
+        for produto in categoria.produtos:
+            total += conta.instancia("produto", produto)
+        niveis[nivel]['nos'] += 1
+        niveis[nivel]['produtos'] += len(categoria.produtos)
+        niveis[nivel]['bytes'] += total
+        for filho in (node.leftChild, node.rightChild):
+            if filho is not None:
+                fila.append((filho, nivel + 1))
+    return conta, niveis
+
+
+def calibrar():
+    """custo por instância das três classes do catálogo nesta versão do Python"""
+    from src.avl_tree import AVLNode
+    from src.models import Categoria, Produto
+
+    custos = {}
+    for amostra in (AVLNode("x", None), Categoria("x"), Produto(0, "x", 0.0)):
+        campos = campos_da_classe(amostra)
+        custos[type(amostra)] = (campos, custo_instancia(type(amostra), campos))
+    return custos
+
+
+def medir_tamanho(categorias, produtos, semente=42, tamanho_descricao=0):
+    """
+    Monta um catálogo pelo SistemaRecomendacao e mede (rode em processo novo)
+
+    returns
+        dict com RSS, contabilidade por dono/tipo, médias por objeto e níveis
+    """
+    from src.business_logic import SistemaRecomendacao
+
+    lista, registros = gerar_registros(categorias, produtos, semente, tamanho_descricao)
+    gc.collect()
+    rss_inicial = rss_bytes()
+
+    with silenciar():
+        sistema = SistemaRecomendacao()
+        for categoria in lista:
+            sistema.cadastrar_categoria(categoria['nome'], categoria['descricao'])
+        for produto in registros:
+            sistema.cadastrar_produto(lista[produto['categoria']]['nome'], produto['id'], produto['nome'],
+                                      produto['preco'], produto['descricao'], produto['avaliacao'])
+    del lista, registros
+    gc.collect()
+    rss_montado = rss_bytes()
+
+    # o cache JSON de cada objeto é preenchido na primeira resposta que o usa
+    with sistema.trava.leitura():
+        pilha = [sistema.arvore_categorias.root] if sistema.arvore_categorias.root else []
+        while pilha:
+            node = pilha.pop()
+            node.data.json_campos()
+            for produto in node.data.produtos:
+                produto.json_bytes()
+            pilha.extend(filho for filho in (node.leftChild, node.rightChild) if filho is not None)
+    gc.collect()
+    rss_aquecido = rss_bytes()
+
+    # a calibração vem depois do RSS: os objetos que ela libera seriam
+    # reaproveitados pelo catálogo e reduziriam o delta medido
+    custos = calibrar()
+    conta, niveis = contabilizar(sistema, custos)
+    quantidades = {'avl_node': categorias, 'categoria': categorias, 'produto': produtos}
+    por_objeto = {dono: (sum(conta.bytes[dono].values()) / quantidades[dono] if quantidades[dono] else 0.0)
+                  for dono in DONOS}
+    return {
+        'categorias': categorias,
+        'produtos': produtos,
+        'tamanho_descricao': tamanho_descricao,
+        'custo_instancia': {classe.__name__: custo for classe, (_, custo) in custos.items()},
+        'rss': {'inicial': rss_inicial, 'montado': rss_montado, 'aquecido': rss_aquecido,
+                'delta_montado': rss_montado - rss_inicial, 'delta_aquecido': rss_aquecido - rss_inicial},
+        'bytes': conta.bytes,
+        'objetos': conta.objetos,
+        'caracteres': conta.caracteres,
+        'total_contabilizado': sum(sum(tipos.values()) for tipos in conta.bytes.values()),
+        'bytes_por_objeto': por_objeto,
+        'niveis': niveis
+    }
+
+
+def ajustar_modelo(medicoes, campo):
+    """
+    Mínimos quadrados de campo(medição) ~ fixo + a * categorias + b * produtos
+
+    returns
+        {'fixo', 'por_categoria', 'por_produto', 'erro_relativo_max'} ou None
+        se os pontos não bastam (são precisas ao menos 3 combinações que não
+        tenham categorias proporcionais a produtos)
+    """
+    if len(medicoes) < 3:
+        return None
+    linhas = [(1.0, float(m['categorias']), float(m['produtos'])) for m in medicoes]
+    y = [float(campo(m)) for m in medicoes]
+    # colunas normalizadas pelo maior valor: produtos chegam a 10^7 e os
+    # quadrados nas equações normais perderiam precisão sem a escala
+    escalas = [max(abs(linha[j]) for linha in linhas) or 1.0 for j in range(3)]
+    x = [[linha[j] / escalas[j] for j in range(3)] for linha in linhas]
+    coeficientes = resolver_normais(x, y)
+    if coeficientes is None:
+        return None
+    coeficientes = [c / e for c, e in zip(coeficientes, escalas)]
+    erros = [abs(sum(c * v for c, v in zip(coeficientes, linha)) - alvo) / max(abs(alvo), 1.0)
+             for linha, alvo in zip(linhas, y)]
+    return {
+        'fixo': coeficientes[0],
+        'por_categoria': coeficientes[1],
+        'por_produto': coeficientes[2],
+        'erro_relativo_max': max(erros)
+    }
+
+
+def resolver_normais(x, y, tolerancia=1e-9):
+    """
+    Resolve as equações normais (XᵀX) c = Xᵀy por eliminação de Gauss com
+    pivotamento parcial, em Python puro (X tem poucas colunas)
+
+    returns
+        lista de coeficientes ou None se XᵀX é singular (colunas dependentes)
+    """
+    n = len(x[0])
+    a = [[sum(linha[i] * linha[j] for linha in x) for j in range(n)]
+         + [sum(linha[i] * alvo for linha, alvo in zip(x, y))] for i in range(n)]
+    limite = tolerancia * max(a[i][i] for i in range(n))
+    for coluna in range(n):
+        pivo = max(range(coluna, n), key=lambda i: abs(a[i][coluna]))
+        if abs(a[pivo][coluna]) <= limite:
+            return None
+        a[coluna], a[pivo] = a[pivo], a[coluna]
+        for i in range(coluna + 1, n):
+            fator = a[i][coluna] / a[coluna][coluna]
+            for j in range(coluna, n + 1):
+                a[i][j] -= fator * a[coluna][j]
+    coeficientes = [0.0] * n
+    for i in reversed(range(n)):
+        resto = a[i][n] - sum(a[i][j] * coeficientes[j] for j in range(i + 1, n))
+        coeficientes[i] = resto / a[i][i]
+    return coeficientes
+
+
+def prever(modelo, categorias, produtos):
+    return modelo['fixo'] + modelo['por_categoria'] * categorias + modelo['por_produto'] * produtos
+
+
+def _mib(valor):
+    return f"{valor / (1024 * 1024):>9.1f}"
+
+
+def imprimir_relatorio(medicoes, modelos):
+    print(f"\n{'categorias':>10} {'produtos':>10} {'contab. MiB':>11} {'RSS Δ MiB':>10} {'RSS Δ+json':>10}"
+          f" {'B/nó':>7} {'B/categoria':>11} {'B/produto':>10} {'níveis':>6}")
+    for m in medicoes:
+        print(f"{m['categorias']:>10,} {m['produtos']:>10,}  {_mib(m['total_contabilizado'])}"
+              f"  {_mib(m['rss']['delta_montado'])} {_mib(m['rss']['delta_aquecido'])}"
+              f" {m['bytes_por_objeto']['avl_node']:>7.0f} {m['bytes_por_objeto']['categoria']:>11.0f}"
+              f" {m['bytes_por_objeto']['produto']:>10.0f} {len(m['niveis']):>6}")
+
+    maior = max(medicoes, key=lambda m: m['produtos'])
+    print(f"\nbytes por dono e tipo ({maior['categorias']:,} categorias, {maior['produtos']:,} produtos)")
+    print(f"{'dono':<10}" + "".join(f"{tipo:>11}" for tipo in TIPOS) + f"{'total':>12}")
+    for dono in DONOS:
+        linha = maior['bytes'][dono]
+        print(f"{dono:<10}" + "".join(f"{linha[tipo]:>11,}" for tipo in TIPOS) + f"{sum(linha.values()):>12,}")
+    print("custo calibrado por instância: " + ", ".join(
+        f"{classe} {custo} B" for classe, custo in maior['custo_instancia'].items()))
+
+    print(f"\n{'nível':>5} {'nós':>8} {'produtos':>10} {'MiB':>9}")
+    for nivel in maior['niveis']:
+        print(f"{nivel['nivel']:>5} {nivel['nos']:>8,} {nivel['produtos']:>10,} {_mib(nivel['bytes'])}")
+
+    for nome, modelo in modelos.items():
+        if modelo is None:
+            print(f"\nmodelo {nome}: pontos insuficientes (varie --produtos-por-categoria)")
+            continue
+        print(f"\nmodelo {nome}: {modelo['fixo'] / 1024:,.0f} KiB + {modelo['por_categoria']:,.0f} B/categoria"
+              f" + {modelo['por_produto']:,.0f} B/produto (erro máx. {100 * modelo['erro_relativo_max']:.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--produtos", type=int, nargs="+", default=[10_000, 30_000, 100_000, 300_000])
+    parser.add_argument("--produtos-por-categoria", type=int, nargs="+", default=[20, 100],
+                        help="cada valor gera uma série; duas ou mais separam o custo de categoria e de produto")
+    parser.add_argument("--tamanho-descricao", type=int, default=0,
+                        help="caracteres da descrição dos produtos (0: descrição curta sintética)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--prever", metavar="CATEGORIAS,PRODUTOS",
+                        help="estima a memória de um catálogo com o modelo ajustado")
+    parser.add_argument("--saida", default=PASTA_RESULTADOS)
+    args = parser.parse_args(argv)
+
+    combinacoes = sorted({(max(1, produtos // razao), produtos)
+                          for produtos in args.produtos for razao in args.produtos_por_categoria},
+                         key=lambda par: (par[1], par[0]))
+    print(f"Contabilidade de memória: {len(combinacoes)} catálogos, um processo por catálogo")
+
+    medicoes = []
+    for categorias, produtos in combinacoes:
+        # processo novo por tamanho: o RSS não herda a memória dos anteriores
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            medicao = executor.submit(medir_tamanho, categorias, produtos, args.semente,
+                                      args.tamanho_descricao).result()
+        print(f"  {categorias:>8,} categorias {produtos:>10,} produtos: "
+              f"RSS +{medicao['rss']['delta_aquecido'] / (1024 * 1024):.1f} MiB")
+        medicoes.append(medicao)
+
+    modelos = {
+        'rss': ajustar_modelo(medicoes, lambda m: m['rss']['delta_aquecido']),
+        'contabilizado': ajustar_modelo(medicoes, lambda m: m['total_contabilizado'])
+    }
+    imprimir_relatorio(medicoes, modelos)
+
+    if args.prever:
+        categorias, produtos = (int(valor) for valor in args.prever.split(","))
+        for nome, modelo in modelos.items():
+            if modelo is not None:
+                print(f"previsão {nome} para {categorias:,} categorias e {produtos:,} produtos: "
+                      f"{prever(modelo, categorias, produtos) / (1024 * 1024):,.0f} MiB")
+
+    os.makedirs(args.saida, exist_ok=True)
+    caminho = os.path.join(args.saida, "memoria.json")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({'ambiente': ambiente(), 'parametros': vars(args), 'medicoes': medicoes, 'modelos': modelos},
+                  arquivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
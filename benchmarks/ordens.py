@@ -0,0 +1,68 @@
+"""
+Ordens de inserção das chaves usadas nos benchmarks
+
+Todas devolvem uma permutação de range(n):
+- aleatoria: embaralhada com semente fixa;
+- crescente / decrescente: o pior caso de uma BST sem balanceamento, que
+  na AVL força uma rotação a cada poucas inserções;
+- adversarial: a ordem em nível (BFS) de uma árvore de Fibonacci com n nós.
+  Inserida nessa ordem, a AVL nunca rotaciona e termina com a maior altura
+  possível para n nós (`altura_maxima_avl`).
+"""
+
+import random
+from collections import deque
+
+from src.avl_tree import altura_maxima_avl
+
+
+def aleatoria(n, semente=42):
+    chaves = list(range(n))
+    random.Random(semente).shuffle(chaves)
+    return chaves
+
+
+def crescente(n):
+    return list(range(n))
+
+
+def decrescente(n):
+    return list(range(n - 1, -1, -1))
+
+
+def _menor_avl(altura):
+    """N(h): número mínimo de nós de uma AVL com a altura dada"""
+    anterior, atual = 0, 1
+    for _ in range(altura - 1):
+        anterior, atual = atual, atual + anterior + 1
+    return atual if altura > 0 else 0
+
+
+def adversarial(n):
+    """
+    Monta, em largura, uma AVL de n nós com a maior altura possível: cada nó
+    fica com a subárvore esquerda uma unidade mais alta que a direita sempre
+    que o número de nós permite; a chave de cada nó é a sua posição em ordem
+    """
+    chaves = []
+    fila = deque([(0, n, altura_maxima_avl(n))])  # (menor chave, nós, altura)
+    while fila:
+        inicio, nos, altura = fila.popleft()
+        if nos == 0:
+            continue
+        cheia = (1 << (altura - 1)) - 1  # nós de uma subárvore cheia de altura h-1
+        direita = max(_menor_avl(altura - 2), nos - 1 - cheia)
+        altura_direita = altura - 2 if direita <= (1 << max(altura - 2, 0)) - 1 else altura - 1
+        esquerda = nos - 1 - direita
+        chaves.append(inicio + esquerda)
+        fila.append((inicio, esquerda, altura - 1))
+        fila.append((inicio + esquerda + 1, direita, altura_direita))
+    return chaves
+
+
+ORDENS = {
+    'aleatoria': aleatoria,
+    'crescente': crescente,
+    'decrescente': decrescente,
+    'adversarial': adversarial
+}
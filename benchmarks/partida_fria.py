@@ -0,0 +1,433 @@
+"""
+Partida a frio: tempo de carregar o catálogo do SQLite para a AVL
+
+Gera bancos SQLite sintéticos (mesmo esquema do `Database`, categorias em
+floresta com ~5% de raízes e, por padrão, 100 produtos por categoria) com
+10^4 a 10^6 produtos; 10^7 só quando pedido em --produtos, porque gerar e
+carregar esse banco leva minutos e vários GiB de memória. Para cada banco,
+cronometra cada fase da partida, em um processo novo por medição:
+
+- leitura_banco: consultas e fetchall das linhas;
+- linhas_para_dict: conversão das linhas em dicts;
+- insercao_categorias: categorias na AVL;
+- associacao_produtos: produtos anexados às categorias;
+- indices: índices de sugestões e de produtos refeitos da árvore montada
+  (nas estratégias que montam a árvore por fora);
+- impressao_hierarquia: `imprimir_hierarquia` (saída descartada);
+- leitura_snapshot: só na estratégia snapshot (inclui os índices).
+
+Todas as estratégias terminam com o sistema na configuração padrão do app
+(índice de sugestões e índices de produtos ligados); --sugestoes troca o
+modo do índice de sugestões para medir o custo de cada um.
+
+Estratégias comparadas:
+
+- atual: o mesmo caminho de `sincronizar_avl_com_banco` (sqlite3.Row, dicts,
+  `cadastrar_categoria` / `cadastrar_produto` um a um, com os prints);
+- tuplas: linhas como tuplas e inserção direta na AVL e nas categorias,
+  sem `find` por produto nem print, sob uma única trava de escrita;
+- em_lote: categorias já ordenadas pelo banco viram uma AVL balanceada em
+  O(n), sem rotações; produtos anexados pelo id da categoria, sem JOIN;
+- snapshot: `carregar_snapshot` de um snapshot gravado antes (não cronometrado).
+
+Os bancos ficam em benchmarks/resultados/partida_fria/ e são reaproveitados
+entre execuções (--regerar para refazer). As páginas do arquivo ficam no
+cache do sistema operacional depois da geração, como em um reinício na
+mesma máquina. Catálogos grandes precisam de memória: a estratégia atual
+guarda linhas e dicts ao mesmo tempo (veja benchmarks/memoria.py).
+
+Uso:
+    python -m benchmarks.partida_fria --produtos 10000 100000
+    python -m benchmarks.partida_fria --produtos 1000000 --estrategias atual em_lote snapshot
+    python -m benchmarks.partida_fria --produtos 10000000 --estrategias em_lote snapshot
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import resource
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.catalogo_sintetico import gerar_registros
+from benchmarks.escalabilidade import PASTA_RESULTADOS, ambiente
+from benchmarks.estruturas import silenciar
+from benchmarks.memoria import rss_bytes
+from src.sugestoes import MODOS_SUGESTOES
+
+FASES = ("leitura_banco", "linhas_para_dict", "insercao_categorias", "associacao_produtos",
+         "indices", "impressao_hierarquia", "leitura_snapshot")
+ROTULOS = {
+    "leitura_banco": "leitura", "linhas_para_dict": "dicts", "insercao_categorias": "categorias",
+    "associacao_produtos": "produtos", "indices": "índices", "impressao_hierarquia": "hierarquia",
+    "leitura_snapshot": "snapshot",
+}
+
+# modo do índice de sugestões do app (padrão de SRHP_SUGESTOES)
+SUGESTOES_PADRAO = "categorias"
+
+# as mesmas consultas de Database.listar_categorias e Database.listar_produtos
+CONSULTA_CATEGORIAS = """
+    SELECT c.id, c.nome, c.descricao, c.categoria_pai_id,
+           p.nome as categoria_pai_nome
+    FROM categorias c
+    LEFT JOIN categorias p ON c.categoria_pai_id = p.id
+    ORDER BY c.nome
+"""
+CONSULTA_PRODUTOS = """
+    SELECT p.id, p.nome, p.preco, p.descricao, p.avaliacao,
+           p.categoria_id, c.nome as categoria_nome
+    FROM produtos p
+    JOIN categorias c ON p.categoria_id = c.id
+    ORDER BY p.nome
+"""
+# em_lote: o nome da categoria não precisa vir em cada produto
+CONSULTA_PRODUTOS_SEM_JOIN = """
+    SELECT id, nome, preco, descricao, avaliacao, categoria_id
+    FROM produtos
+    ORDER BY nome
+"""
+
+
+def gerar_banco(caminho, produtos, categorias, semente=42):
+    """
+    Grava um catálogo sintético em um banco novo em `caminho`
+
+    Usa o esquema do `Database` (índices, log de alterações e busca textual
+    inclusos) e executemany em uma transação. O log de alterações sai vazio,
+    como depois de uma poda.
+    """
+    from src.colacao import chave_colacao
+    from src.database import Database
+
+    for sufixo in ("", "-journal", "-wal", "-shm"):
+        if os.path.exists(caminho + sufixo):
+            os.remove(caminho + sufixo)
+    db = Database(caminho)
+    lista, registros = gerar_registros(categorias, produtos, semente)
+    with db.get_connection() as conn:
+        conn.execute("PRAGMA synchronous = OFF")
+        # banco novo: os ids seguem a ordem de inserção a partir de 1
+        conn.executemany(
+            "INSERT INTO categorias (nome, descricao, categoria_pai_id, chave_nome) VALUES (?, ?, ?, ?)",
+            ((c['nome'], c['descricao'], c['pai'] + 1 if c['pai'] is not None else None,
+              chave_colacao(c['nome'])) for c in lista))
+        conn.executemany(
+            "INSERT INTO produtos (nome, categoria_id, preco, descricao, avaliacao) VALUES (?, ?, ?, ?, ?)",
+            ((p['nome'], p['categoria'] + 1, p['preco'], p['descricao'], p['avaliacao']) for p in registros))
+        conn.execute("DELETE FROM alteracoes")
+
+
+class Relogio:
+    """acumula o tempo de cada fase desde a marca anterior"""
+
+    def __init__(self):
+        self.fases = {}
+        self._marca = time.perf_counter()
+
+    def reiniciar(self):
+        """descarta o tempo desde a última marca"""
+        self._marca = time.perf_counter()
+
+    def marcar(self, fase):
+        agora = time.perf_counter()
+        self.fases[fase] = self.fases.get(fase, 0.0) + agora - self._marca
+        self._marca = agora
+
+
+def _ler(caminho, consultas, row_factory=None):
+    conn = sqlite3.connect(caminho)
+    conn.row_factory = row_factory
+    try:
+        return [conn.execute(consulta).fetchall() for consulta in consultas]
+    finally:
+        conn.close()
+
+
+def _novo_sistema(sugestoes):
+    from src.business_logic import SistemaRecomendacao
+
+    # a configuração do app (SRHP_SUGESTOES e SRHP_INDICES_PRODUTOS padrão),
+    # exceto pelo modo de sugestões pedido
+    with silenciar():
+        return SistemaRecomendacao(sugestoes=sugestoes)
+
+
+def _refazer_indices(sistema, relogio):
+    """índices da árvore montada por fora, como no carregamento de um snapshot"""
+    sistema.trocar_arvore(sistema.arvore_categorias, sistema.seq_alteracoes)
+    relogio.marcar("indices")
+
+
+def estrategia_atual(caminho, relogio, sugestoes=SUGESTOES_PADRAO):
+    """o caminho de sincronizar_avl_com_banco, fase a fase"""
+    sistema = _novo_sistema(sugestoes)
+    relogio.reiniciar()
+    linhas_categorias, linhas_produtos = _ler(caminho, (CONSULTA_CATEGORIAS, CONSULTA_PRODUTOS), sqlite3.Row)
+    relogio.marcar("leitura_banco")
+
+    categorias = [dict(row) for row in linhas_categorias]
+    produtos = [dict(row) for row in linhas_produtos]
+    relogio.marcar("linhas_para_dict")
+
+    with silenciar():
+        for cat in categorias:
+            if not cat['categoria_pai_id']:
+                sistema.cadastrar_categoria(cat['nome'], cat['descricao'])
+        for cat in categorias:
+            if cat['categoria_pai_id']:
+                sistema.cadastrar_categoria(cat['nome'], cat['descricao'])
+        relogio.marcar("insercao_categorias")
+
+        for prod in produtos:
+            sistema.cadastrar_produto(prod['categoria_nome'], prod['id'], prod['nome'], prod['preco'],
+                                      prod['descricao'], prod['avaliacao'])
+        relogio.marcar("associacao_produtos")
+    return sistema
+
+
+def estrategia_tuplas(caminho, relogio, sugestoes=SUGESTOES_PADRAO):
+    """tuplas do sqlite3 e inserção direta, sem busca na AVL por produto"""
+    from src.models import Categoria, Produto
+
+    sistema = _novo_sistema(sugestoes)
+    relogio.reiniciar()
+    categorias, produtos = _ler(caminho, (CONSULTA_CATEGORIAS, CONSULTA_PRODUTOS))
+    relogio.marcar("leitura_banco")
+
+    with sistema.trava.escrita():
+        por_nome = {}
+        arvore = sistema.arvore_categorias
+        with silenciar():
+            for _, nome, descricao, _, _ in categorias:
+                categoria = por_nome[nome] = Categoria(nome, descricao)
+                arvore.insert(sistema.chave(nome), categoria)
+        relogio.marcar("insercao_categorias")
+
+        for id, nome, preco, descricao, avaliacao, _, categoria_nome in produtos:
+            por_nome[categoria_nome].adicionar_produto(Produto(id, nome, preco, descricao, avaliacao))
+        sistema.versao += 1
+        relogio.marcar("associacao_produtos")
+    _refazer_indices(sistema, relogio)
+    return sistema
+
+
+def construir_balanceada(chaves, dados):
+    """AVL de altura mínima a partir de chaves ordenadas, em O(n) e sem rotações"""
+    from src.avl_tree import AVLNode
+
+    def construir(inicio, fim):
+        if inicio >= fim:
+            return None
+        meio = (inicio + fim) // 2
+        node = AVLNode(chaves[meio], dados[meio])
+        node.leftChild = construir(inicio, meio)
+        node.rightChild = construir(meio + 1, fim)
+        node.height = 1 + max(node.leftChild.height if node.leftChild else 0,
+                              node.rightChild.height if node.rightChild else 0)
+        return node
+
+    return construir(0, len(chaves))
+
+
+def estrategia_em_lote(caminho, relogio, sugestoes=SUGESTOES_PADRAO):
+    """AVL montada de uma vez das categorias ordenadas; produtos pelo id da categoria"""
+    from src.models import Categoria, Produto
+
+    sistema = _novo_sistema(sugestoes)
+    relogio.reiniciar()
+    categorias, produtos = _ler(caminho, (CONSULTA_CATEGORIAS, CONSULTA_PRODUTOS_SEM_JOIN))
+    relogio.marcar("leitura_banco")
+
+    with sistema.trava.escrita():
+        # a AVL é ordenada pela chave de colação; com nomes que não mudam de
+        # ordem ao normalizar, o ORDER BY do banco já a entrega e o sort só
+        # confere, em O(n)
+        por_id = {}
+        pares = []
+        for id, nome, descricao, _, _ in categorias:
+            categoria = por_id[id] = Categoria(nome, descricao)
+            pares.append((sistema.chave(nome), categoria))
+        pares.sort(key=lambda par: par[0])
+        sistema.arvore_categorias.root = construir_balanceada([chave for chave, _ in pares],
+                                                              [categoria for _, categoria in pares])
+        relogio.marcar("insercao_categorias")
+
+        for id, nome, preco, descricao, avaliacao, categoria_id in produtos:
+            por_id[categoria_id].adicionar_produto(Produto(id, nome, preco, descricao, avaliacao))
+        sistema.versao += 1
+        relogio.marcar("associacao_produtos")
+    _refazer_indices(sistema, relogio)
+    return sistema
+
+
+def estrategia_snapshot(caminho, relogio, sugestoes=SUGESTOES_PADRAO):
+    """carregar_snapshot do arquivo gravado por preparar_snapshot"""
+    from src.snapshot import carregar_snapshot
+
+    sistema = _novo_sistema(sugestoes)
+    relogio.reiniciar()
+    carregar_snapshot(caminho_snapshot(caminho), sistema)
+    relogio.marcar("leitura_snapshot")
+    return sistema
+
+
+ESTRATEGIAS = {
+    'atual': estrategia_atual,
+    'tuplas': estrategia_tuplas,
+    'em_lote': estrategia_em_lote,
+    'snapshot': estrategia_snapshot,
+}
+
+
+def caminho_snapshot(caminho_banco):
+    return caminho_banco + ".snapshot"
+
+
+def preparar_snapshot(caminho_banco):
+    """grava o snapshot do banco (fora da medição)"""
+    from src.snapshot import salvar_snapshot
+
+    sistema = estrategia_em_lote(caminho_banco, Relogio())
+    salvar_snapshot(sistema, caminho_snapshot(caminho_banco))
+
+
+def assinatura(sistema):
+    """hash do catálogo em ordem (nome, descrição e ids dos produtos de cada categoria)"""
+    resumo = hashlib.sha256()
+    pilha = []
+    node = sistema.arvore_categorias.root
+    while pilha or node is not None:
+        while node is not None:
+            pilha.append(node)
+            node = node.leftChild
+        node = pilha.pop()
+        categoria = node.data
+        resumo.update(repr((categoria.nome, categoria.descricao,
+                            [produto.id for produto in categoria.produtos])).encode("utf-8"))
+        node = node.rightChild
+    return resumo.hexdigest()[:16]
+
+
+def medir_partida(estrategia, caminho_banco, sugestoes=SUGESTOES_PADRAO):
+    """
+    Carrega o catálogo com a estratégia e imprime a hierarquia (rode em processo novo)
+
+    returns
+        dict com o tempo de cada fase, total, RSS e a assinatura do catálogo
+    """
+    rss_inicial = rss_bytes()
+    relogio = Relogio()
+    sistema = ESTRATEGIAS[estrategia](caminho_banco, relogio, sugestoes)
+    relogio.reiniciar()
+    with silenciar():
+        sistema.imprimir_hierarquia()
+    relogio.marcar("impressao_hierarquia")
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    raiz = sistema.arvore_categorias.root
+    return {
+        'estrategia': estrategia,
+        'fases_s': relogio.fases,
+        'total_s': sum(relogio.fases.values()),
+        'rss_mib': (rss_bytes() - rss_inicial) / (1024 * 1024),
+        'pico_rss_mib': (pico if sys.platform == "darwin" else pico * 1024) / (1024 * 1024),
+        'altura': raiz.height if raiz else 0,
+        'assinatura': assinatura(sistema)
+    }
+
+
+def _em_processo_novo(funcao, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(funcao, *args).result()
+
+
+def executar(tamanhos, estrategias, produtos_por_categoria=100, repeticoes=1, semente=42,
+             pasta_bancos=None, regerar=False, sugestoes=SUGESTOES_PADRAO):
+    """
+    Gera (ou reaproveita) os bancos e mede cada estratégia em cada tamanho
+
+    returns
+        lista de {'produtos', 'categorias', 'geracao_s', 'estrategias': {nome: medição}}
+        (a medição é a repetição de menor tempo total)
+    """
+    pasta_bancos = pasta_bancos or os.path.join(PASTA_RESULTADOS, "partida_fria")
+    os.makedirs(pasta_bancos, exist_ok=True)
+    resultados = []
+    for produtos in tamanhos:
+        categorias = max(1, produtos // produtos_por_categoria)
+        caminho = os.path.join(pasta_bancos, f"catalogo-{produtos}-{categorias}-{semente}.db")
+        geracao = None
+        if regerar or not os.path.exists(caminho):
+            print(f"gerando {os.path.basename(caminho)} ({categorias:,} categorias, {produtos:,} produtos)...")
+            inicio = time.perf_counter()
+            gerar_banco(caminho, produtos, categorias, semente)
+            geracao = time.perf_counter() - inicio
+            if os.path.exists(caminho_snapshot(caminho)):
+                os.remove(caminho_snapshot(caminho))
+        if "snapshot" in estrategias and not os.path.exists(caminho_snapshot(caminho)):
+            _em_processo_novo(preparar_snapshot, caminho)
+
+        medicoes = {}
+        for estrategia in estrategias:
+            rodadas = [_em_processo_novo(medir_partida, estrategia, caminho, sugestoes) for _ in range(repeticoes)]
+            medicoes[estrategia] = min(rodadas, key=lambda medicao: medicao['total_s'])
+            print(f"  {produtos:>10,} produtos {estrategia:<9} {medicoes[estrategia]['total_s']:>8.2f} s")
+        resultados.append({
+            'produtos': produtos,
+            'categorias': categorias,
+            'banco_mib': os.path.getsize(caminho) / (1024 * 1024),
+            'geracao_s': geracao,
+            'estrategias': medicoes
+        })
+    return resultados
+
+
+def imprimir_tabela(resultados):
+    colunas = [fase for fase in FASES
+               if any(fase in m['fases_s'] for r in resultados for m in r['estrategias'].values())]
+    print(f"\n{'produtos':>10} {'estratégia':<9}" + "".join(f"{ROTULOS[fase]:>11}" for fase in colunas)
+          + f"{'total s':>9}{'pico MiB':>10}{'altura':>7}")
+    for resultado in resultados:
+        for nome, medicao in resultado['estrategias'].items():
+            tempos = "".join(f"{medicao['fases_s'][fase]:>11.3f}" if fase in medicao['fases_s'] else f"{'—':>11}"
+                             for fase in colunas)
+            print(f"{resultado['produtos']:>10,} {nome:<9}{tempos}{medicao['total_s']:>9.2f}"
+                  f"{medicao['pico_rss_mib']:>10,.0f}{medicao['altura']:>7}")
+        if len({medicao['assinatura'] for medicao in resultado['estrategias'].values()}) > 1:
+            print(f"{'':>10} AVISO: as estratégias montaram catálogos diferentes")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    # 10^7 fica de fora do padrão: só com --produtos 10000000 explícito
+    parser.add_argument("--produtos", type=int, nargs="+", default=[10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument("--produtos-por-categoria", type=int, default=100)
+    parser.add_argument("--estrategias", nargs="+", choices=list(ESTRATEGIAS), default=list(ESTRATEGIAS))
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--sugestoes", choices=MODOS_SUGESTOES, default=SUGESTOES_PADRAO,
+                        help="modo do índice de sugestões (padrão: o do app)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--pasta-bancos", default=os.path.join(PASTA_RESULTADOS, "partida_fria"))
+    parser.add_argument("--regerar", action="store_true", help="refaz os bancos mesmo se já existirem")
+    parser.add_argument("--saida", default=PASTA_RESULTADOS)
+    args = parser.parse_args(argv)
+
+    resultados = executar(args.produtos, args.estrategias, args.produtos_por_categoria, args.repeticoes,
+                          args.semente, args.pasta_bancos, args.regerar, args.sugestoes)
+    imprimir_tabela(resultados)
+
+    os.makedirs(args.saida, exist_ok=True)
+    caminho = os.path.join(args.saida, "partida_fria.json")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({'ambiente': ambiente(), 'parametros': vars(args), 'resultados': resultados},
+                  arquivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Script de build dos arquivos estáticos
+
+Copia cada CSS/JS de static/ para static/dist/ com o hash do conteúdo no
+nome (style.css -> style.<hash>.css), grava as versões pré-comprimidas
+.gz (e .br, se o pacote brotli estiver instalado) e o manifest.json usado
+pelos templates para montar as URLs.
+
+Uso:
+    python scripts/construir_estaticos.py
+"""
+
+import json
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.compressao import CODIFICACOES, EXTENSOES, comprimir
+from src.estaticos import EXTENSOES_FINGERPRINT, MANIFESTO, PASTA_DIST, nome_com_hash
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def construir_estaticos(diretorio=os.path.join(RAIZ, "static")):
+    """Gera static/dist e retorna o manifesto"""
+    destino = os.path.join(diretorio, PASTA_DIST)
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+
+    manifesto = {}
+    for pasta, subpastas, arquivos in os.walk(diretorio):
+        if os.path.abspath(pasta) == os.path.abspath(diretorio):
+            subpastas[:] = [s for s in subpastas if s != PASTA_DIST]
+        for nome in sorted(arquivos):
+            if not nome.endswith(EXTENSOES_FINGERPRINT):
+                continue
+            origem = os.path.join(pasta, nome)
+            relativo = os.path.relpath(origem, diretorio).replace(os.sep, "/")
+            with open(origem, "rb") as arquivo:
+                conteudo = arquivo.read()
+
+            final = nome_com_hash(relativo, conteudo)
+            caminho_final = os.path.join(destino, final)
+            os.makedirs(os.path.dirname(caminho_final), exist_ok=True)
+            with open(caminho_final, "wb") as arquivo:
+                arquivo.write(conteudo)
+
+            tamanhos = [f"{len(conteudo)} B"]
+            for codificacao in CODIFICACOES:
+                comprimido = comprimir(conteudo, codificacao, estatico=True)
+                with open(caminho_final + EXTENSOES[codificacao], "wb") as arquivo:
+                    arquivo.write(comprimido)
+                tamanhos.append(f"{codificacao} {len(comprimido)} B")
+
+            manifesto[relativo] = f"{PASTA_DIST}/{final}"
+            print(f"  {relativo} -> {manifesto[relativo]} ({', '.join(tamanhos)})")
+
+    os.makedirs(destino, exist_ok=True)
+    with open(os.path.join(destino, MANIFESTO), "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, indent=2, sort_keys=True)
+    return manifesto
+
+
+if __name__ == "__main__":
+    print("Construindo arquivos estáticos...")
+    manifesto = construir_estaticos()
+    print(f"{len(manifesto)} arquivos em static/{PASTA_DIST}")
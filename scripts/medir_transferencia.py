@@ -0,0 +1,70 @@
+"""
+Script para medir os bytes transferidos pelas páginas principais
+
+Para cada página (HTML + CSS/JS referenciados) e para as rotas pesadas da
+API, compara o tamanho sem compressão com o tamanho negociado (gzip e, se o
+pacote brotli estiver instalado, br). Rode depois de
+scripts/construir_estaticos.py para medir os arquivos pré-comprimidos.
+
+Uso:
+    python scripts/medir_transferencia.py
+"""
+
+import os
+import re
+import sys
+import time
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)
+
+from fastapi.testclient import TestClient
+
+import app as aplicacao
+from src.compressao import CODIFICACOES
+
+PAGINAS = ["/", "/arvore", "/buscar", "/cadastrar"]
+ROTAS_API = ["/api/tree", "/api/produtos", "/api/categorias"]
+
+RECURSOS = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+
+def bytes_transferidos(cliente, caminho, codificacao):
+    """tamanho do corpo como sai na rede (Content-Length da resposta)"""
+    resposta = cliente.get(caminho, headers={"Accept-Encoding": codificacao})
+    resposta.raise_for_status()
+    return int(resposta.headers.get("content-length", len(resposta.content)))
+
+
+def medir(cliente):
+    """retorna [(nome, {codificacao: bytes})] para as páginas e a api"""
+    codificacoes = ["identity"] + list(CODIFICACOES)
+    linhas = []
+    for pagina in PAGINAS:
+        html = cliente.get(pagina).text
+        caminhos = [pagina] + RECURSOS.findall(html)
+        totais = {cod: sum(bytes_transferidos(cliente, c, cod) for c in caminhos) for cod in codificacoes}
+        linhas.append((f"{pagina} ({len(caminhos)} arquivos)", totais))
+    for rota in ROTAS_API:
+        linhas.append((rota, {cod: bytes_transferidos(cliente, rota, cod) for cod in codificacoes}))
+    return codificacoes, linhas
+
+
+if __name__ == "__main__":
+    with TestClient(aplicacao.app) as cliente:
+        while not aplicacao.estado['pronto']:
+            if aplicacao.estado['erro']:
+                sys.exit(f"erro ao carregar o catalogo: {aplicacao.estado['erro']}")
+            time.sleep(0.05)
+        codificacoes, linhas = medir(cliente)
+
+    print("\n" + "=" * 72)
+    print("BYTES TRANSFERIDOS")
+    print("=" * 72)
+    print(f"{'recurso':<30}" + "".join(f"{cod:>14}" for cod in codificacoes))
+    for nome, totais in linhas:
+        base = totais["identity"]
+        colunas = [f"{totais[cod]:>14,}" if cod == "identity"
+                   else f"{totais[cod]:>8,} {100 * totais[cod] / base:>4.0f}%" for cod in codificacoes]
+        print(f"{nome:<30}" + "".join(colunas))
@@ -0,0 +1,101 @@
+"""
+Carregador do catálogo compartilhado entre os workers do uvicorn
+
+Carrega a AVL uma única vez (snapshot + log de alterações, ou o banco inteiro),
+publica o catálogo em memória compartilhada e continua acompanhando o log de
+alterações, publicando uma versão nova sempre que algo muda.
+
+Uso:
+    python scripts/publicar_catalogo.py [nome]
+    SRHP_CATALOGO_COMPARTILHADO=nome uvicorn app:app --workers 4
+"""
+
+import os
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.business_logic import LacunaAlteracoes, SistemaRecomendacao
+from src.database import Database
+from src.memoria_compartilhada import PublicadorCatalogo
+from src.snapshot import carregar_snapshot, salvar_snapshot
+
+
+def carregar(sistema, db, caminho_snapshot):
+    """Carrega o catálogo pelo snapshot quando existir, senão pelo banco"""
+    if caminho_snapshot and os.path.exists(caminho_snapshot):
+        try:
+            carregar_snapshot(caminho_snapshot, sistema, db)
+            sistema.sincronizar_alteracoes(db)
+            return
+        except (OSError, ValueError) as e:
+            # inclui LacunaAlteracoes: o log já foi podado além do snapshot
+            print(f"  Snapshot ignorado: {e}")
+            sistema.trocar_arvore(sistema.nova_arvore(), 0)
+
+    # marca d'água lida antes das tabelas: o que mudar durante a carga é
+    # reaplicado na primeira volta do laço (operações idempotentes)
+    sistema.seq_alteracoes = db.ultima_alteracao()
+    for cat in db.listar_categorias():
+        sistema.cadastrar_categoria(cat['nome'], cat['descricao'])
+    for prod in db.listar_produtos():
+        sistema.cadastrar_produto(prod['categoria_nome'], prod['id'], prod['nome'],
+                                  prod['preco'], prod['descricao'], prod['avaliacao'])
+    if caminho_snapshot:
+        salvar_snapshot(sistema, caminho_snapshot, db)
+
+
+def novo_sistema():
+    """Sistema do carregador: só publica, então fica sem os índices de sugestões e de produtos"""
+    return SistemaRecomendacao(os.environ.get("SRHP_ESTRUTURA", "avl"),
+                               os.environ.get("SRHP_CHAVES", "colacao"),
+                               sugestoes="desligado", indices=False)
+
+
+def publicar_catalogo(nome, intervalo):
+    """Publica o catálogo e republica a cada lote de alterações do banco"""
+    # o mesmo banco dos workers (app.py)
+    db = Database(os.environ.get("SRHP_DB", "srhp.db"))
+    sistema = novo_sistema()
+    carregar(sistema, db, os.environ.get("SRHP_SNAPSHOT", "srhp.snapshot"))
+    # marca d'água do carregador no log: os processos que podam não passam dela
+    consumidor = f"publicador-{os.getpid()}"
+    renovar = float(os.environ.get("SRHP_VALIDADE_CONSUMIDOR", "600")) / 4
+    db.registrar_consumidor(consumidor, sistema.seq_alteracoes)
+    marcado = time.monotonic()
+
+    publicador = PublicadorCatalogo(nome)
+    versao = publicador.publicar(sistema)
+    print(f"Catálogo publicado em '{nome}' (versão {versao}, seq {sistema.seq_alteracoes})")
+
+    try:
+        while True:
+            time.sleep(intervalo)
+            try:
+                mudou = sistema.sincronizar_alteracoes(db)
+            except LacunaAlteracoes as e:
+                print(f"  {e}: recarregando o catálogo do banco")
+                sistema = novo_sistema()
+                carregar(sistema, db, None)
+                mudou = True
+            if mudou:
+                versao = publicador.publicar(sistema)
+                print(f"  Nova versão {versao} (seq {sistema.seq_alteracoes})")
+            if mudou or time.monotonic() - marcado > renovar:
+                db.registrar_consumidor(consumidor, sistema.seq_alteracoes)
+                marcado = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publicador.encerrar()
+        db.remover_consumidor(consumidor)
+
+
+if __name__ == "__main__":
+    nome = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("SRHP_CATALOGO_COMPARTILHADO", "srhp-catalogo")
+    intervalo = float(os.environ.get("SRHP_INTERVALO_ALTERACOES", "2.0")) or 0.5
+    # SIGTERM (docker stop, supervisor) tambem passa pelo finally e remove os segmentos
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    publicar_catalogo(nome, intervalo)
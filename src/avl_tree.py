@@ -303,6 +303,42 @@ class AVLTree:
             return self._find_node(node.leftChild, key)
         return self._find_node(node.rightChild, key)
 
+    def itens(self, inicio=None, fim=None):
+        """
+        Percorre em ordem os pares (key, data) com inicio <= key <= fim.
+        `None` deixa o lado correspondente aberto. Só desce nas sub-árvores
+        que podem ter chaves no intervalo: O(h + m) para m itens.
+        """
+        pilha = []
+        node = self.root
+        while pilha or node is not None:
+            while node is not None:
+                pilha.append(node)
+                # à esquerda só há chaves menores: inútil se node.key < inicio
+                node = node.leftChild if inicio is None or inicio <= node.key else None
+            node = pilha.pop()
+            if fim is not None and node.key > fim:
+                return
+            if inicio is None or inicio <= node.key:
+                yield node.key, node.data
+            node = node.rightChild
+
+    def intervalo_subarvore(self, key):
+        """
+        Retorna (menor, maior) chave da sub-árvore de `key`, ou `None` se a
+        chave não existir. Uma sub-árvore de BST é um intervalo contíguo de
+        chaves, então `itens(menor, maior)` percorre a mesma sub-árvore.
+        """
+        node = self._find_node(self.root, key)
+        if node is None:
+            return None
+        menor = maior = node
+        while menor.leftChild is not None:
+            menor = menor.leftChild
+        while maior.rightChild is not None:
+            maior = maior.rightChild
+        return menor.key, maior.key
+
     def recommend(self, key):
         """
         Retorna uma lista de produtos recomendados para a categoria `key`.
@@ -334,4 +370,24 @@ class AVLTree:
 
         dfs(root_node)
         return resultados
-    
\ No newline at end of file
+    
+
+def altura_teorica_minima(n):
+    """
+    Altura mínima de uma árvore binária com `n` nós, contada em níveis
+    (mesma unidade de `AVLNode.height`): ceil(log2(n + 1)).
+    """
+    return n.bit_length()
+
+
+def altura_maxima_avl(n):
+    """
+    Altura máxima que uma árvore AVL com `n` nós pode ter (árvore de Fibonacci).
+    A menor AVL de altura h tem N(h) = N(h-1) + N(h-2) + 1 nós, com N(0) = 0 e
+    N(1) = 1; a altura máxima é o maior h com N(h) <= n (~1.44 log2 n).
+    """
+    altura, anterior, atual = 0, 0, 1
+    while atual <= n:
+        altura += 1
+        anterior, atual = atual, atual + anterior + 1
+    return altura
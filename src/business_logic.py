@@ -3,50 +3,231 @@ modulo de logica de negocio para o sistema de recomendacao hierarquica de produt
 conecta as operacoes de negocio categorias e produtos com a estrutura avl
 """
 
-from src.avl_tree import AVLTree
+from src.colacao import MODOS_CHAVE, chave_colacao
+from src.concorrencia import TravaLeituraEscrita, escrita, leitura
+from src.indices_produtos import IndicesProdutos
+from src.mapas_ordenados import criar_mapa
 from src.models import Categoria, Produto
+from src.sugestoes import MODOS_SUGESTOES, IndiceSugestoes
+
+
+class LacunaAlteracoes(ValueError):
+    """
+    o log de alteracoes foi podado alem do seq ja aplicado: o que falta nao
+    pode ser reaplicado e o catalogo precisa ser recarregado do banco
+    """
 
 
 class SistemaRecomendacao:
     """
     gerencia o sistema de recomendacao de produtos usando avl tree
     
-    a arvore avl armazena as categorias chave igual nome da categoria
-    cada no da arvore contem um objeto categoria com sua lista de produtos
+    a arvore avl armazena as categorias chave derivada do nome da categoria
+    (a chave de colacao por padrao, veja `chave`); cada no da arvore contem um
+    objeto categoria com seu nome de exibicao e sua lista de produtos
+    
+    os metodos publicos passam pela trava de leitores e escritor: consultas
+    rodam em paralelo, mutacoes (que giram a AVL e trocam listas de produtos)
+    sao exclusivas; quem percorre a arvore por fora deve usar `trava.leitura()`
     """
     
-    def __init__(self):
-        """inicializa o sistema com uma arvore avl vazia"""
-        self.arvore_categorias = AVLTree()
+    def __init__(self, estrutura="avl", chaves="colacao", sugestoes="categorias", indices=True):
+        """
+        inicializa o sistema com uma arvore de categorias vazia
+
+        args
+            estrutura (str) mapa ordenado das categorias: avl (padrao),
+                arvore_b ou lista_blocos (src.mapas_ordenados)
+            chaves (str) chave das categorias na arvore: colacao (padrao),
+                exata ou id (src.colacao)
+            sugestoes (str) nomes no indice de sugestoes aproximadas:
+                categorias (padrao), completo (categorias e produtos; com
+                100 mil produtos, ~2.4x o tempo de carga e ~2.6x a memoria) ou
+                desligado (src.sugestoes)
+            indices (bool) mantem os indices globais de produtos por preco e
+                por avaliacao (src.indices_produtos)
+        """
+        if chaves not in MODOS_CHAVE:
+            raise ValueError(f"modo de chave desconhecido {chaves!r} (opcoes: {', '.join(MODOS_CHAVE)})")
+        if sugestoes not in MODOS_SUGESTOES:
+            raise ValueError(f"modo de sugestoes desconhecido {sugestoes!r} (opcoes: {', '.join(MODOS_SUGESTOES)})")
+        self.estrutura = estrutura
+        self.chaves = chaves
+        self.modo_sugestoes = sugestoes
+        # indice de trigramas dos nomes, mantido junto com a arvore; None se
+        # desligado ou indisponivel (arvore trocada sem verificacao)
+        self.sugestoes = self._novo_indice_sugestoes()
+        # indices (preco, id) e (avaliacao, id) de todos os produtos; None se
+        # desligados ou indisponiveis, como as sugestoes
+        self.usar_indices = indices
+        self.indices = IndicesProdutos() if indices else None
+        self.arvore_categorias = criar_mapa(estrutura)
+        # modo id: chave de colacao -> id inteiro usado como chave na arvore
+        self._ids = {}
+        self._proximo_id = 1
+        # ultimo seq do log de alteracoes do banco ja refletido na AVL
+        self.seq_alteracoes = 0
+        # alteracoes do log que a AVL recusou (ex.: nome equivalente ao de outra categoria)
+        self.alteracoes_recusadas = 0
+        # contador incrementado a cada mudanca no catalogo em memoria
+        # (usado para validar caches e etags da arvore)
+        self.versao = 0
+        self.trava = TravaLeituraEscrita()
         print("sistema de recomendacao inicializado com sucesso")
     
+    def nova_arvore(self):
+        """mapa vazio da estrutura configurada (para trocar a arvore inteira)"""
+        return criar_mapa(self.estrutura)
+    
+    def _novo_indice_sugestoes(self):
+        if self.modo_sugestoes == "desligado":
+            return None
+        return IndiceSugestoes(produtos=self.modo_sugestoes == "completo")
+    
+    def chave(self, nome_categoria):
+        """
+        chave da categoria `nome_categoria` na arvore
+        
+        exata: o proprio nome; colacao: a chave normalizada (maiusculas e
+        acentos nao importam); id: o inteiro atribuido no cadastro, ou None se
+        nenhuma categoria tem esse nome
+        """
+        if self.chaves == "exata":
+            return nome_categoria
+        colacao = chave_colacao(nome_categoria)
+        if self.chaves == "id":
+            return self._ids.get(colacao)
+        return colacao
+    
+    def _buscar(self, nome_categoria):
+        """categoria pelo nome (pela chave do modo configurado) ou None"""
+        chave = self.chave(nome_categoria)
+        return None if chave is None else self.arvore_categorias.find(chave)
+    
+    def _inserir(self, categoria):
+        """insere `categoria` na arvore, atribuindo um id novo no modo id"""
+        if self.chaves == "id":
+            chave = self._proximo_id
+            self._proximo_id += 1
+            self._ids[chave_colacao(categoria.nome)] = chave
+        else:
+            chave = self.chave(categoria.nome)
+        self.arvore_categorias.insert(chave, categoria)
+    
+    def _remover(self, categoria):
+        """tira `categoria` da arvore (e do mapa de ids no modo id)"""
+        self.arvore_categorias.delete(self.chave(categoria.nome))
+        if self.chaves == "id":
+            del self._ids[chave_colacao(categoria.nome)]
+    
+    def _indexar(self, categoria, produto):
+        """poe o produto de `categoria` nos indices globais (sugestoes, preco e avaliacao)"""
+        if self.sugestoes is not None:
+            self.sugestoes.adicionar_produto(produto)
+        if self.indices is not None:
+            self.indices.adicionar(categoria, produto)
+    
+    def _desindexar(self, produto):
+        """tira o produto dos indices globais, antes de mudar ou descartar"""
+        if self.sugestoes is not None:
+            self.sugestoes.remover_produto(produto)
+        if self.indices is not None:
+            self.indices.remover(produto)
+    
+    def _adicionar_produto(self, categoria, produto):
+        categoria.adicionar_produto(produto)
+        self._indexar(categoria, produto)
+    
+    def _remover_produto(self, categoria, produto_id):
+        produto = categoria.buscar_produto(produto_id)
+        if produto is not None:
+            categoria.remover_produto(produto_id)
+            self._desindexar(produto)
+    
+    def trocar_arvore(self, arvore, seq, verificar=True):
+        """
+        troca a arvore inteira (snapshot, catalogo compartilhado) sob a trava
+        de escrita
+        
+        com verificar, percorre as categorias conferindo que as chaves seguem
+        o modo deste sistema (e, no modo id, reconstroi o mapa de ids) e
+        refaz os indices de sugestoes e de produtos; sem verificar so a raiz
+        e conferida, o que evita decodificar todas as categorias de um
+        catalogo compartilhado, e os indices ficam indisponiveis
+        
+        raises
+            ValueError se as chaves da arvore nao seguem o modo configurado
+        """
+        ids = {}
+        sugestoes = indices = None
+        if verificar:
+            sugestoes = self._novo_indice_sugestoes()
+            categorias = []
+            for chave, categoria in arvore.itens():
+                self._conferir_chave(chave, categoria, ids)
+                categorias.append(categoria)
+                if sugestoes is not None:
+                    sugestoes.adicionar_categoria(categoria)
+            if self.usar_indices:
+                indices = IndicesProdutos.construir(categorias)
+        elif self.chaves == "id":
+            raise ValueError("o modo de chave id precisa verificar a arvore inteira")
+        elif arvore.root is not None:
+            self._conferir_chave(arvore.root.key, arvore.root.data, ids)
+        
+        with self.trava.escrita():
+            self.arvore_categorias = arvore
+            self._ids = ids
+            self._proximo_id = max(ids.values(), default=0) + 1
+            self.sugestoes = sugestoes
+            self.indices = indices
+            self.seq_alteracoes = seq
+            self.versao += 1
+    
+    def _conferir_chave(self, chave, categoria, ids):
+        if self.chaves == "id":
+            colacao = chave_colacao(categoria.nome)
+            if type(chave) is int and colacao not in ids:
+                ids[colacao] = chave
+                return
+        elif chave == self.chave(categoria.nome):
+            return
+        raise ValueError(f"chave {chave!r} da categoria {categoria.nome!r} nao segue o modo {self.chaves}")
+    
+    @escrita
     def cadastrar_categoria(self, nome_categoria, descricao=""):
         """
         cadastra uma nova categoria no sistema
         
         args
-            nome_categoria (str) nome unico da categoria usado como chave na AVL
+            nome_categoria (str) nome unico da categoria (a chave na AVL sai dele)
             descricao (str) descricao opcional da categoria
         
         returns
             bool true se cadastrou com sucesso false se a categoria ja existe
+            (no modo colacao, tambem se so difere de uma existente em maiusculas
+            ou acentos)
         
         complexidade Olog n devido a insercao na AVL
         """
         # verifica se a categoria ja existe
-        if self.arvore_categorias.find(nome_categoria) is not None:
+        if self._buscar(nome_categoria) is not None:
             print(f"categoria {nome_categoria} ja existe")
             return False
         
         # cria o objeto categoria
         nova_categoria = Categoria(nome_categoria, descricao)
         
-        # insere na arvore AVL chave igual nome data igual objeto Categoria
-        self.arvore_categorias.insert(nome_categoria, nova_categoria)
+        # insere na arvore AVL chave derivada do nome data igual objeto Categoria
+        self._inserir(nova_categoria)
+        if self.sugestoes is not None:
+            self.sugestoes.adicionar(nova_categoria, nome_categoria)
+        self.versao += 1
         
         print(f"categoria {nome_categoria} cadastrada com sucesso")
         return True
     
+    @escrita
     def cadastrar_produto(self, nome_categoria, produto_id, nome_produto, 
                          preco, descricao="", avaliacao=0.0):
         """
@@ -66,7 +247,7 @@ class SistemaRecomendacao:
         complexidade Olog n para buscar a categoria mais O1 para adicionar na lista
         """
         # busca a categoria na arvore Olog n
-        categoria = self.arvore_categorias.find(nome_categoria)
+        categoria = self._buscar(nome_categoria)
         
         if categoria is None:
             print(f"categoria {nome_categoria} nao encontrada")
@@ -77,11 +258,13 @@ class SistemaRecomendacao:
         novo_produto = Produto(produto_id, nome_produto, preco, descricao, avaliacao)
         
         # adiciona o produto a categoria O1
-        categoria.adicionar_produto(novo_produto)
+        self._adicionar_produto(categoria, novo_produto)
+        self.versao += 1
         
         print(f"produto {nome_produto} adicionado a categoria {nome_categoria}")
         return True
     
+    @escrita
     def remover_categoria(self, nome_categoria):
         """
         remove uma categoria do sistema
@@ -94,7 +277,7 @@ class SistemaRecomendacao:
         
         complexidade Olog n
         """
-        categoria = self.arvore_categorias.find(nome_categoria)
+        categoria = self._buscar(nome_categoria)
         
         if categoria is None:
             print(f"categoria {nome_categoria} nao encontrada")
@@ -104,24 +287,183 @@ class SistemaRecomendacao:
         if len(categoria.produtos) > 0:
             print(f"atencao a categoria tem {len(categoria.produtos)} produtos")
         
-        self.arvore_categorias.delete(nome_categoria)
+        self._remover(categoria)
+        if self.sugestoes is not None:
+            self.sugestoes.remover_categoria(categoria)
+        if self.indices is not None:
+            self.indices.remover_categoria(categoria)
+        self.versao += 1
         print(f"categoria {nome_categoria} removida com sucesso")
         return True
     
+    @escrita
+    def remover_produto(self, nome_categoria, produto_id):
+        """
+        remove um produto da categoria indicada
+        
+        args
+            nome_categoria (str) nome da categoria do produto
+            produto_id (int) id do produto
+        
+        returns
+            bool true se a categoria existe false caso contrario
+        
+        complexidade Olog n para buscar a categoria mais O1 para tirar o produto
+        """
+        categoria = self._buscar(nome_categoria)
+        
+        if categoria is None:
+            return False
+        
+        self._remover_produto(categoria, produto_id)
+        self.versao += 1
+        return True
+    
+    @escrita
+    def atualizar_categoria(self, nome_atual, novo_nome, descricao=""):
+        """
+        atualiza nome e descricao de uma categoria
+        
+        a renomeacao move a chave na AVL mas preserva o objeto categoria
+        (e portanto a lista de produtos), sem recarregar nada; se a chave nao
+        muda (so maiusculas ou acentos no modo colacao, ou qualquer nome no
+        modo id) so o nome de exibicao e trocado
+        
+        args
+            nome_atual (str) nome atual da categoria
+            novo_nome (str) novo nome (pode ser igual ao atual)
+            descricao (str) nova descricao
+        
+        returns
+            bool true se atualizou false se nao encontrou ou o novo nome ja existe
+        
+        complexidade Olog n uma remocao e uma insercao na AVL
+        """
+        categoria = self._buscar(nome_atual)
+        
+        if categoria is None:
+            print(f"categoria {nome_atual} nao encontrada")
+            return False
+        
+        if novo_nome != categoria.nome:
+            existente = self._buscar(novo_nome)
+            if existente is not None and existente is not categoria:
+                print(f"categoria {novo_nome} ja existe")
+                return False
+            if self.sugestoes is not None:
+                self.sugestoes.remover(categoria, categoria.nome)
+                self.sugestoes.adicionar(categoria, novo_nome)
+            if self.chaves == "id":
+                # o id fica; so o mapa de nomes muda
+                self._ids[chave_colacao(novo_nome)] = self._ids.pop(chave_colacao(categoria.nome))
+                categoria.nome = novo_nome
+            elif existente is categoria:
+                categoria.nome = novo_nome
+            else:
+                self._remover(categoria)
+                categoria.nome = novo_nome
+                self._inserir(categoria)
+        
+        categoria.descricao = descricao
+        self.versao += 1
+        return True
+    
+    @escrita
+    def atualizar_produto(self, nome_categoria, produto_id, nome_produto, preco,
+                          descricao="", avaliacao=0.0, nova_categoria=None):
+        """
+        atualiza os dados de um produto no lugar
+        
+        se nova_categoria for informada e diferente da atual o mesmo objeto
+        produto e movido para ela
+        
+        args
+            nome_categoria (str) categoria atual do produto
+            produto_id (int) id do produto
+            nome_produto (str) preco (float) descricao (str) avaliacao (float) novos dados
+            nova_categoria (str) categoria de destino opcional
+        
+        returns
+            bool true se atualizou false se a categoria ou o produto nao existem
+        
+        complexidade Olog n para achar as categorias mais O1 para achar, editar
+        e mover o produto
+        """
+        categoria = self._buscar(nome_categoria)
+        if categoria is None:
+            print(f"categoria {nome_categoria} nao encontrada")
+            return False
+        
+        produto = categoria.buscar_produto(produto_id)
+        if produto is None:
+            print(f"produto {produto_id} nao encontrado na categoria {nome_categoria}")
+            return False
+        
+        destino = None
+        if nova_categoria is not None and nova_categoria != nome_categoria:
+            destino = self._buscar(nova_categoria)
+            if destino is None:
+                print(f"categoria {nova_categoria} nao encontrada")
+                return False
+            if destino is categoria:
+                destino = None
+        
+        self._desindexar(produto)
+        produto.nome = nome_produto
+        produto.preco = preco
+        produto.descricao = descricao
+        produto.avaliacao = avaliacao
+        
+        if destino is not None:
+            categoria.remover_produto(produto_id)
+            destino.adicionar_produto(produto)
+        self._indexar(destino if destino is not None else categoria, produto)
+        
+        self.versao += 1
+        return True
+    
+    @leitura
+    def consultar_produtos(self, preco_min=None, preco_max=None, avaliacao_min=None,
+                           ordenar="preco_asc", limite=50, apos=None):
+        """
+        produtos do catalogo inteiro por faixa de preco e avaliacao minima,
+        pelos indices globais, sem percorrer as categorias
+        
+        args
+            preco_min preco_max (float) faixa de preco, inclusiva (None sem limite)
+            avaliacao_min (float) avaliacao minima
+            ordenar (str) preco_asc preco_desc avaliacao
+            limite (int) numero maximo de produtos
+            apos (tuple) chave do indice do ultimo produto da pagina anterior
+                (src.indices_produtos.chave_da_ordenacao); None comeca do inicio
+        
+        returns
+            list de (produto, categoria) ou None se os indices estao desligados
+            ou indisponiveis
+        
+        complexidade Olog n mais Ok para os k produtos varridos
+        """
+        if self.indices is None:
+            return None
+        return self.indices.consultar(preco_min, preco_max, avaliacao_min, ordenar, limite, apos)
+    
+    @leitura
     def buscar_categoria(self, nome_categoria):
         """
         busca uma categoria pelo nome
         
         args
-            nome_categoria (str) nome da categoria
+            nome_categoria (str) nome da categoria (no modo colacao, sem
+                diferenca entre maiusculas e minusculas ou com e sem acento)
         
         returns
             categoria objeto categoria se encontrado none caso contrario
         
         complexidade Olog n
         """
-        return self.arvore_categorias.find(nome_categoria)
+        return self._buscar(nome_categoria)
     
+    @leitura
     def listar_produtos_categoria(self, nome_categoria):
         """
         lista todos os produtos de uma categoria especifica
@@ -132,7 +474,7 @@ class SistemaRecomendacao:
         returns
             list lista de produtos da categoria
         """
-        categoria = self.arvore_categorias.find(nome_categoria)
+        categoria = self._buscar(nome_categoria)
         
         if categoria is None:
             print(f"categoria {nome_categoria} nao encontrada")
@@ -155,6 +497,7 @@ class SistemaRecomendacao:
         
         return categoria.produtos
     
+    @leitura
     def imprimir_hierarquia(self):
         """
         imprime a arvore de categorias de forma hierarquica usando travessia preordem
@@ -237,47 +580,47 @@ class SistemaRecomendacao:
         else:
             return self._buscar_node(node.rightChild, chave)
     
-    def _coletar_produtos_recursivo(self, node, lista_produtos, lista_categorias):
+    def _coletar_produtos(self, nome_categoria, lista_produtos, lista_categorias):
         """
-        recursao principal coleta produtos de um no e todos os seus descendentes
+        coleta os produtos da categoria e de todas as categorias da sua subarvore
         
-        usa travessia inordem esquerda raiz direita para coletar produtos
-        de forma organizada
+        uma subarvore e um intervalo contiguo de chaves, entao a coleta percorre
+        em ordem o intervalo devolvido pela arvore (na AVL, a subarvore do no;
+        nas outras estruturas, a da arvore balanceada implicita)
         
         args
-            node no atual da AVL
+            nome_categoria nome da categoria raiz da subarvore
             lista_produtos lista acumuladora de produtos passada por referencia
             lista_categorias lista de nomes de categorias visitadas
         
-        recursividade esta funcao explora TODA a subarvore a partir do no dado
-        complexidade Om onde m e o numero de nos na subarvore
-        """
-        if node is None:
-            return
-        
-        # recursao processa subarvore esquerda primeiro
-        self._coletar_produtos_recursivo(node.leftChild, lista_produtos, lista_categorias)
-        
-        # processa o no atual coleta produtos desta categoria
-        categoria = node.data
-        lista_categorias.append(categoria.nome)
+        returns
+            bool false se a categoria nao existe
         
-        # adiciona todos os produtos desta categoria a lista de recomendacoes
-        for produto in categoria.produtos:
-            lista_produtos.append({
-                'produto': produto,
-                'categoria': categoria.nome
-            })
+        complexidade Olog n mais Om onde m e o numero de categorias no intervalo
+        """
+        chave = self.chave(nome_categoria)
+        intervalo = None if chave is None else self.arvore_categorias.intervalo_subarvore(chave)
+        if intervalo is None:
+            return False
         
-        # recursao processa subarvore direita
-        self._coletar_produtos_recursivo(node.rightChild, lista_produtos, lista_categorias)
+        for _, categoria in self.arvore_categorias.itens(*intervalo):
+            lista_categorias.append(categoria.nome)
+            
+            # adiciona todos os produtos desta categoria a lista de recomendacoes
+            for produto in categoria.produtos:
+                lista_produtos.append({
+                    'produto': produto,
+                    'categoria': categoria.nome
+                })
+        return True
     
+    @leitura
     def recomendar_produtos(self, nome_categoria, ordenar_por="avaliacao", limite=None):
         """
         recomenda produtos de uma categoria e todas as suas subcategorias
         
         esta e a funcionalidade CORE do sistema de recomendacao
-        usa travessia recursiva para coletar produtos de toda a subarvore
+        percorre o intervalo de chaves da subarvore para coletar os produtos
         
         args
             nome_categoria (str) nome da categoria raiz
@@ -289,22 +632,17 @@ class SistemaRecomendacao:
         
         complexidade Olog n para buscar mais Om para percorrer m nos da subarvore
         """
-        # busca a categoria na arvore Olog n
-        node = self._buscar_node(self.arvore_categorias.root, nome_categoria)
+        # coleta os produtos de toda a subarvore Olog n para achar o intervalo
+        produtos_recomendados = []
+        categorias_visitadas = []
         
-        if node is None:
+        if not self._coletar_produtos(nome_categoria, produtos_recomendados, categorias_visitadas):
             print(f"categoria {nome_categoria} nao encontrada")
             return []
         
         print(f"\nRECOMENDACOES baseadas em {nome_categoria}")
         print(f"incluindo produtos de subcategorias\n")
         
-        # coleta produtos recursivamente de toda a subarvore
-        produtos_recomendados = []
-        categorias_visitadas = []
-        
-        self._coletar_produtos_recursivo(node, produtos_recomendados, categorias_visitadas)
-        
         # mostra estatisticas
         print(f"Estatisticas da busca")
         print(f"categorias visitadas {len(categorias_visitadas)}")
@@ -372,3 +710,137 @@ class SistemaRecomendacao:
                 print(f"   {produto.descricao}")
             
             print()
+    
+    def sincronizar_alteracoes(self, db, lote=1000):
+        """
+        aplica na AVL apenas as alteracoes do banco posteriores a seq_alteracoes
+        
+        le o log de alteracoes (preenchido por triggers) em lotes ate alcancar
+        o fim, permitindo que reinicios e outros processos alcancem o banco
+        sem recarregar tudo
+        
+        os seqs do log sao contiguos; se a primeira alteracao listada nao for
+        a seguinte a seq_alteracoes (ou nenhuma vier e o banco ja passou dele),
+        o log foi podado alem deste processo e nada e aplicado
+        
+        args
+            db (Database) banco com a tabela alteracoes
+            lote (int) quantidade maxima de alteracoes lidas por consulta
+        
+        returns
+            int numero de alteracoes aplicadas
+        
+        raises
+            LacunaAlteracoes se faltam alteracoes no log
+        
+        complexidade Ok log n para k alteracoes novas
+        """
+        # lido antes da listagem: tudo ate aqui ja estava gravado, entao se
+        # nao aparecer na listagem foi podado
+        ultima = db.ultima_alteracao()
+        total = 0
+        while True:
+            desde = self.seq_alteracoes
+            alteracoes = db.listar_alteracoes(desde, lote)
+            if alteracoes and alteracoes[0]['seq'] > desde + 1 or not alteracoes and ultima > desde:
+                raise LacunaAlteracoes(f"log de alteracoes podado alem do seq {desde}")
+            if not alteracoes:
+                return total
+            total += self.aplicar_alteracoes(alteracoes)
+    
+    @escrita
+    def avancar_alteracoes(self, seq_antes, seq_depois):
+        """
+        marca como aplicadas as alteracoes (seq_antes, seq_depois] do log, que
+        o proprio processo gravou e ja aplicou em memoria
+        
+        so avanca se nao houver alteracoes de outros processos pendentes antes
+        delas (seq_alteracoes ainda em seq_antes); se houver, o tailer reaplica
+        tudo em ordem (as operacoes sao idempotentes)
+        
+        returns
+            bool true se avancou
+        """
+        if self.seq_alteracoes != seq_antes:
+            return False
+        self.seq_alteracoes = seq_depois
+        return True
+    
+    @escrita
+    def aplicar_alteracoes(self, alteracoes):
+        """
+        aplica uma sequencia ordenada de alteracoes do log na AVL
+        
+        as operacoes sao idempotentes, entao reaplicar uma alteracao que o
+        proprio processo ja fez em memoria nao duplica categorias nem produtos
+        
+        args
+            alteracoes (list) dicts com seq tabela operacao dados_antigos dados_novos
+        
+        returns
+            int numero de alteracoes aplicadas
+        """
+        aplicadas = 0
+        for alteracao in alteracoes:
+            if alteracao['seq'] <= self.seq_alteracoes:
+                continue
+            if alteracao['tabela'] == 'categorias':
+                self._aplicar_alteracao_categoria(alteracao)
+            elif alteracao['tabela'] == 'produtos':
+                self._aplicar_alteracao_produto(alteracao)
+            self.seq_alteracoes = alteracao['seq']
+            self.versao += 1
+            aplicadas += 1
+        return aplicadas
+    
+    def _aplicar_alteracao_categoria(self, alteracao):
+        """aplica uma alteracao da tabela categorias na AVL"""
+        antigo = alteracao['dados_antigos']
+        novo = alteracao['dados_novos']
+        
+        if alteracao['operacao'] == 'DELETE':
+            if self._buscar(antigo['nome']) is not None:
+                self.remover_categoria(antigo['nome'])
+            return
+        
+        descricao = novo['descricao'] or ""
+        categoria = None
+        if antigo is not None:
+            categoria = self._buscar(antigo['nome'])
+        if categoria is None:
+            categoria = self._buscar(novo['nome'])
+        
+        if categoria is None:
+            aplicada = self.cadastrar_categoria(novo['nome'], descricao)
+        else:
+            # renomeacao troca a chave mas preserva o objeto categoria e seus produtos
+            aplicada = self.atualizar_categoria(categoria.nome, novo['nome'], descricao)
+        
+        if not aplicada:
+            # o banco ja tem a alteracao: a AVL fica divergente ate a proxima carga
+            self.alteracoes_recusadas += 1
+            print(f"atencao alteracao {alteracao['seq']} ({alteracao['operacao']} da categoria "
+                  f"{alteracao['registro_id']} '{novo['nome']}') recusada pela AVL")
+    
+    def _aplicar_alteracao_produto(self, alteracao):
+        """aplica uma alteracao da tabela produtos na AVL"""
+        antigo = alteracao['dados_antigos']
+        novo = alteracao['dados_novos']
+        
+        if antigo is not None and antigo['categoria_nome']:
+            categoria_antiga = self._buscar(antigo['categoria_nome'])
+            if categoria_antiga is not None:
+                self._remover_produto(categoria_antiga, antigo['id'])
+        
+        if novo is None or not novo['categoria_nome']:
+            return
+        
+        categoria = self._buscar(novo['categoria_nome'])
+        if categoria is None:
+            return
+        # remove antes de adicionar para nao duplicar um produto ja presente
+        self._remover_produto(categoria, novo['id'])
+        self._adicionar_produto(categoria, Produto(
+            novo['id'], novo['nome'], novo['preco'],
+            novo['descricao'] or "", novo['avaliacao']
+        ))
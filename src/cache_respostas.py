@@ -0,0 +1,178 @@
+"""
+modulo de cache de respostas http em memoria
+guarda o corpo das respostas de leitura da api por metodo + caminho + query,
+com remocao lru limitada por bytes e invalidacao por tags emitidas pelas
+escritas (ex.: "categorias", "produtos")
+cada entrada guarda tambem as variantes comprimidas do corpo (uma por
+Content-Encoding), feitas no primeiro pedido de cada codificacao
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class EntradaCache:
+    """resposta guardada: corpo, status, cabecalhos, etag, tags e variantes comprimidas"""
+
+    __slots__ = ('corpo', 'status', 'cabecalhos', 'etag', 'tags', 'variantes', 'tamanho')
+
+    def __init__(self, corpo, status, cabecalhos, tags):
+        self.corpo = corpo
+        self.status = status
+        self.cabecalhos = cabecalhos
+        self.tags = tuple(tags)
+        self.variantes = {}  # codificacao -> corpo comprimido
+        self.etag = '"' + hashlib.sha1(corpo).hexdigest()[:20] + '"'
+        # custo aproximado da entrada: corpo + cabecalhos
+        self.tamanho = len(corpo) + sum(len(k) + len(v) for k, v in cabecalhos.items())
+
+
+class CacheRespostas:
+    """
+    cache lru de respostas com orcamento em bytes
+
+    cada entrada leva as tags dos dados de que depende; `invalidar(tag)`
+    descarta todas as entradas com aquela tag. para nao guardar uma resposta
+    calculada antes de uma escrita e entregue depois da invalidacao, quem
+    calcula pega uma `marca()` antes e `guardar` recusa a entrada se alguma
+    das tags dela foi invalidada depois da marca
+    """
+
+    def __init__(self, limite_bytes=32 * 1024 * 1024):
+        """
+        args
+            limite_bytes (int) soma maxima do tamanho das entradas; 0 desliga o cache
+        """
+        self.limite_bytes = limite_bytes
+        self._entradas = OrderedDict()  # chave -> EntradaCache, da menos para a mais recente
+        self._por_tag = {}  # tag -> conjunto de chaves
+        self._invalidada_em = {}  # tag -> geracao da ultima invalidacao
+        self._geracao = 0
+        self._limpo_em = -1
+        self._trava = threading.Lock()
+        self.bytes_usados = 0
+
+        # metricas
+        self.acertos = 0
+        self.faltas = 0
+        self.remocoes_lru = 0
+        self.invalidacoes = 0
+
+    @property
+    def habilitado(self):
+        return self.limite_bytes > 0
+
+    def marca(self):
+        """geracao atual, a ser passada para `guardar`"""
+        return self._geracao
+
+    def obter(self, chave):
+        """retorna a entrada (e a marca como usada) ou None"""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada
+
+    def guardar(self, chave, entrada, marca):
+        """
+        guarda a entrada se ela couber e nenhuma tag dela mudou desde `marca`
+
+        returns
+            bool true se guardou
+        """
+        if entrada.tamanho > self.limite_bytes:
+            return False
+        with self._trava:
+            if self._limpo_em > marca or any(
+                    self._invalidada_em.get(tag, -1) > marca for tag in entrada.tags):
+                return False
+            self._remover(chave)
+            self._entradas[chave] = entrada
+            self.bytes_usados += entrada.tamanho
+            for tag in entrada.tags:
+                self._por_tag.setdefault(tag, set()).add(chave)
+            # remocao lru ate voltar ao orcamento
+            while self.bytes_usados > self.limite_bytes:
+                self._remover(next(iter(self._entradas)))
+                self.remocoes_lru += 1
+            return True
+
+    def guardar_variante(self, chave, entrada, codificacao, corpo):
+        """
+        guarda o corpo comprimido com `codificacao` na entrada, se ela ainda
+        estiver no cache; o tamanho da variante entra no orcamento
+
+        returns
+            bool true se guardou
+        """
+        with self._trava:
+            if self._entradas.get(chave) is not entrada:
+                return False
+            anterior = entrada.variantes.get(codificacao)
+            delta = len(corpo) - (len(anterior) if anterior is not None else 0)
+            entrada.variantes[codificacao] = corpo
+            entrada.tamanho += delta
+            self.bytes_usados += delta
+            while self.bytes_usados > self.limite_bytes:
+                self._remover(next(iter(self._entradas)))
+                self.remocoes_lru += 1
+            return True
+
+    def invalidar(self, *tags):
+        """
+        descarta as entradas marcadas com qualquer uma das tags
+
+        returns
+            int numero de entradas removidas
+        """
+        with self._trava:
+            self._geracao += 1
+            removidas = 0
+            for tag in tags:
+                self._invalidada_em[tag] = self._geracao
+                for chave in list(self._por_tag.pop(tag, ())):
+                    removidas += self._remover(chave)
+            self.invalidacoes += 1
+            return removidas
+
+    def limpar(self):
+        """descarta tudo (ex.: troca do catalogo inteiro)"""
+        with self._trava:
+            self._geracao += 1
+            self._limpo_em = self._geracao
+            self._entradas.clear()
+            self._por_tag.clear()
+            self.bytes_usados = 0
+            self.invalidacoes += 1
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return 0
+        self.bytes_usados -= entrada.tamanho
+        for tag in entrada.tags:
+            chaves = self._por_tag.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tag[tag]
+        return 1
+
+    def metricas(self):
+        """retorna ocupacao e contadores de acerto/falta/remocao"""
+        consultas = self.acertos + self.faltas
+        return {
+            'limite_bytes': self.limite_bytes,
+            'bytes_usados': self.bytes_usados,
+            'entradas': len(self._entradas),
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            'remocoes_lru': self.remocoes_lru,
+            'invalidacoes': self.invalidacoes,
+        }
@@ -0,0 +1,31 @@
+"""
+modulo de chaves de colacao das categorias
+o nome de exibicao continua na categoria; a arvore e indexada por uma chave
+normalizada (casefold, NFKD e sem acentos) calculada uma vez por nome e
+internada, entao buscas ignoram maiusculas e acentos e as comparacoes da AVL
+caem em strings curtas e compartilhadas
+"""
+
+import sys
+import unicodedata
+from functools import lru_cache
+
+
+# exata: chave igual ao nome (comportamento antigo)
+# colacao: chave normalizada (padrao)
+# id: chave inteira atribuida pelo sistema a cada chave de colacao
+MODOS_CHAVE = ("exata", "colacao", "id")
+
+
+@lru_cache(maxsize=65536)
+def chave_colacao(nome):
+    """
+    chave normalizada de `nome`: casefold, decomposicao NFKD, sem as marcas
+    combinantes (acentos) e com os espacos colapsados
+
+    o resultado e internado, entao nomes equivalentes compartilham o mesmo
+    objeto; o cache evita renormalizar os nomes mais buscados
+    """
+    decomposto = unicodedata.normalize("NFKD", nome.casefold())
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return sys.intern(" ".join(sem_acentos.split()))
@@ -0,0 +1,55 @@
+"""
+modulo de compressao das respostas e dos arquivos estaticos
+negocia gzip/brotli pelo Accept-Encoding; brotli e usado quando o pacote
+opcional `brotli` estiver instalado, senao so gzip e oferecido
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional
+    brotli = None
+
+# codificacoes suportadas, da preferida para a menos preferida
+CODIFICACOES = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# extensao dos arquivos pre-comprimidos gerados no build
+EXTENSOES = {"br": ".br", "gzip": ".gz"}
+
+
+def aceitas(accept_encoding):
+    """
+    codificacoes suportadas que o cliente aceita, na ordem de preferencia
+    (q do cliente e, no empate, a ordem de CODIFICACOES); q=0 recusa
+    """
+    pesos = {}
+    for parte in (accept_encoding or "").split(","):
+        nome, _, parametros = parte.strip().partition(";")
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        pesos[nome] = q
+    curinga = pesos.get("*", 0.0)
+    candidatas = [(pesos.get(nome, curinga), -i, nome) for i, nome in enumerate(CODIFICACOES)]
+    return [nome for q, _, nome in sorted(candidatas, reverse=True) if q > 0]
+
+
+def comprimir(corpo, codificacao, estatico=False):
+    """
+    comprime `corpo` (bytes)
+    respostas dinamicas usam niveis rapidos; arquivos estaticos, comprimidos
+    uma vez no build, usam o nivel maximo
+    """
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=11 if estatico else 4)
+    if codificacao == "gzip":
+        return gzip.compress(corpo, compresslevel=9 if estatico else 6, mtime=0)
+    raise ValueError(f"codificacao nao suportada: {codificacao}")
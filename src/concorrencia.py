@@ -0,0 +1,172 @@
+"""
+modulo de controle de concorrencia do motor de recomendacao
+trava de leitores e escritor com preferencia para escritores: leituras
+rodam em paralelo entre si, escritas sao serializadas e, quando ha um
+escritor esperando, leitores novos aguardam para o escritor nao passar fome
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TravaLeituraEscrita:
+    """
+    trava de leitores e escritor com metricas de espera e de posse
+
+    a escrita e reentrante na mesma thread (uma escrita pode chamar outra,
+    como aplicar_alteracoes chamando atualizar_categoria) e quem ja tem a
+    escrita pode ler; a leitura tambem e reentrante na mesma thread, o que
+    evita o deadlock de uma leitura aninhada esperar atras de um escritor
+    que por sua vez espera a leitura externa terminar
+    """
+
+    def __init__(self):
+        self._condicao = threading.Condition(threading.Lock())
+        self._leitores = 0
+        self._escritor = None  # thread que tem a escrita
+        self._profundidade_escrita = 0
+        self._escritores_esperando = 0
+        self._local = threading.local()
+
+        # metricas: por modo, aquisicoes, tempo total esperando e segurando
+        self._metricas = {
+            modo: {'aquisicoes': 0, 'espera_total': 0.0, 'espera_maxima': 0.0,
+                   'posse_total': 0.0, 'posse_maxima': 0.0}
+            for modo in ('leitura', 'escrita')
+        }
+        self.maximo_leitores_simultaneos = 0
+
+    def _leituras_da_thread(self):
+        return getattr(self._local, 'leituras', 0)
+
+    def adquirir_leitura(self):
+        """
+        bloqueia ate poder ler
+        retorna o tempo de espera em segundos (None em reentrada)
+        """
+        atual = threading.get_ident()
+        if self._escritor == atual or self._leituras_da_thread():
+            # reentrada: quem ja tem a escrita ou a leitura nao espera
+            self._local.leituras = self._leituras_da_thread() + 1
+            return None
+        inicio = time.perf_counter()
+        with self._condicao:
+            while self._escritor is not None or self._escritores_esperando:
+                self._condicao.wait()
+            self._leitores += 1
+            self.maximo_leitores_simultaneos = max(self.maximo_leitores_simultaneos, self._leitores)
+        self._local.leituras = 1
+        return time.perf_counter() - inicio
+
+    def liberar_leitura(self):
+        self._local.leituras -= 1
+        if self._local.leituras or self._escritor == threading.get_ident():
+            return
+        with self._condicao:
+            self._leitores -= 1
+            if self._leitores == 0:
+                self._condicao.notify_all()
+
+    def adquirir_escrita(self):
+        """
+        bloqueia ate ter acesso exclusivo
+        retorna o tempo de espera em segundos (None em reentrada)
+        """
+        atual = threading.get_ident()
+        if self._escritor == atual:
+            self._profundidade_escrita += 1
+            return None
+        if self._leituras_da_thread():
+            # promover leitura para escrita travaria com outro leitor fazendo o mesmo
+            raise RuntimeError("escrita pedida por uma thread que esta lendo")
+        inicio = time.perf_counter()
+        with self._condicao:
+            self._escritores_esperando += 1
+            try:
+                while self._escritor is not None or self._leitores:
+                    self._condicao.wait()
+            finally:
+                self._escritores_esperando -= 1
+            self._escritor = atual
+            self._profundidade_escrita = 1
+        return time.perf_counter() - inicio
+
+    def liberar_escrita(self):
+        self._profundidade_escrita -= 1
+        if self._profundidade_escrita:
+            return
+        with self._condicao:
+            self._escritor = None
+            self._condicao.notify_all()
+
+    @contextmanager
+    def leitura(self):
+        """`with trava.leitura():` secao compartilhada com outros leitores"""
+        espera = self.adquirir_leitura()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.liberar_leitura()
+            if espera is not None:
+                self._registrar('leitura', espera, time.perf_counter() - inicio)
+
+    @contextmanager
+    def escrita(self):
+        """`with trava.escrita():` secao exclusiva"""
+        espera = self.adquirir_escrita()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.liberar_escrita()
+            if espera is not None:
+                self._registrar('escrita', espera, time.perf_counter() - inicio)
+
+    def _registrar(self, modo, espera, posse):
+        # contadores atualizados sob a condicao para nao perder incrementos
+        with self._condicao:
+            metricas = self._metricas[modo]
+            metricas['aquisicoes'] += 1
+            metricas['espera_total'] += espera
+            metricas['espera_maxima'] = max(metricas['espera_maxima'], espera)
+            metricas['posse_total'] += posse
+            metricas['posse_maxima'] = max(metricas['posse_maxima'], posse)
+
+    def metricas(self):
+        """retorna aquisicoes e tempos de espera/posse (ms) por modo"""
+        with self._condicao:
+            resultado = {}
+            for modo, metricas in self._metricas.items():
+                aquisicoes = metricas['aquisicoes']
+                resultado[modo] = {
+                    'aquisicoes': aquisicoes,
+                    'espera_media_ms': 1000 * metricas['espera_total'] / aquisicoes if aquisicoes else 0.0,
+                    'espera_maxima_ms': 1000 * metricas['espera_maxima'],
+                    'posse_media_ms': 1000 * metricas['posse_total'] / aquisicoes if aquisicoes else 0.0,
+                    'posse_maxima_ms': 1000 * metricas['posse_maxima'],
+                }
+            resultado['leitores_ativos'] = self._leitores
+            resultado['escritores_esperando'] = self._escritores_esperando
+            resultado['maximo_leitores_simultaneos'] = self.maximo_leitores_simultaneos
+            return resultado
+
+
+def leitura(metodo):
+    """decorador: executa o metodo com a trava de leitura de `self.trava`"""
+    @functools.wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        with self.trava.leitura():
+            return metodo(self, *args, **kwargs)
+    return envolvido
+
+
+def escrita(metodo):
+    """decorador: executa o metodo com a trava de escrita de `self.trava`"""
+    @functools.wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        with self.trava.escrita():
+            return metodo(self, *args, **kwargs)
+    return envolvido
@@ -2,14 +2,21 @@
 modulo de banco de dados sqlite para o sistema de recomendacao
 """
 
+import json
 import sqlite3
-from typing import List, Optional, Dict, Any
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from contextlib import contextmanager
 
+from src.colacao import chave_colacao
+
 
 class Database:
     """classe para gerenciar o banco de dados sqlite"""
     
+    # ids por consulta IN (...), abaixo do limite de parametros do sqlite
+    MAX_PARAMETROS = 900
+    
     def __init__(self, db_path: str = "srhp.db"):
         """inicializa a conexao com o banco de dados"""
         self.db_path = db_path
@@ -29,6 +36,57 @@ class Database:
         finally:
             conn.close()
     
+    @contextmanager
+    def _usar_conexao(self, conn: Optional[sqlite3.Connection] = None):
+        """
+        usa a conexao recebida (dentro de uma transacao maior, sem commit aqui)
+        ou abre uma conexao propria com commit ao final
+        """
+        if conn is not None:
+            yield conn
+        else:
+            with self.get_connection() as nova:
+                yield nova
+    
+    def executar_lote(self, operacoes: List[Callable[[sqlite3.Connection], Any]]
+                      ) -> Tuple[List[Tuple[bool, Any]], Tuple[int, int]]:
+        """
+        executa varias operacoes em uma unica transacao (um unico commit/fsync)
+        
+        cada operacao recebe a conexao e roda dentro de um savepoint proprio, entao
+        a falha de uma desfaz so o que ela fez e nao derruba as demais do lote
+        
+        a transacao pega a trava de escrita no BEGIN, entao as alteracoes do
+        log entre os dois seqs devolvidos sao todas deste lote
+        
+        returns
+            (list (True, resultado) ou (False, excecao) para cada operacao, na
+            ordem; (seq do log antes do lote, seq depois))
+        """
+        with self.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            seq_antes = self._seq_alteracoes(conn)
+            resultados = [self.em_savepoint(conn, operacao, "operacao") for operacao in operacoes]
+            return resultados, (seq_antes, self._seq_alteracoes(conn))
+    
+    @staticmethod
+    def em_savepoint(conn: sqlite3.Connection, operacao: Callable[[sqlite3.Connection], Any],
+                     nome: str = "item") -> Tuple[bool, Any]:
+        """
+        roda `operacao(conn)` em um savepoint; se ela falhar, so o que ela fez e desfeito
+        
+        returns
+            (True, resultado) ou (False, excecao)
+        """
+        conn.execute(f"SAVEPOINT {nome}")
+        try:
+            resultado = (True, operacao(conn))
+        except Exception as e:
+            conn.execute(f"ROLLBACK TO {nome}")
+            resultado = (False, e)
+        conn.execute(f"RELEASE {nome}")
+        return resultado
+    
     def init_db(self):
         """cria as tabelas do banco de dados"""
         with self.get_connection() as conn:
@@ -42,9 +100,11 @@ class Database:
                     descricao TEXT,
                     categoria_pai_id INTEGER,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    chave_nome TEXT,
                     FOREIGN KEY (categoria_pai_id) REFERENCES categorias(id)
                 )
             """)
+            self.chave_nome_unica = self._criar_chave_nome(cursor)
             
             # tabela de produtos
             cursor.execute("""
@@ -70,16 +130,180 @@ class Database:
                 CREATE INDEX IF NOT EXISTS idx_categorias_pai 
                 ON categorias(categoria_pai_id)
             """)
+            
+            # log de alteracoes (change data capture) preenchido por triggers
+            # cada linha guarda a imagem antiga/nova do registro em json para que
+            # a AVL possa ser atualizada incrementalmente a partir de um seq
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS alteracoes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tabela TEXT NOT NULL,
+                    operacao TEXT NOT NULL,
+                    registro_id INTEGER NOT NULL,
+                    dados_antigos TEXT,
+                    dados_novos TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            self._criar_triggers_alteracoes(cursor)
+            
+            # marca d'agua de cada consumidor do log (processo com a AVL em
+            # memoria): a poda nao passa do menor seq entre eles
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS consumidores_alteracoes (
+                    consumidor TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # identidade do banco, gerada junto com o esquema: snapshots e
+            # catalogos derivados dele sao recusados por outro banco (recriado)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO meta (chave, valor) VALUES ('id_banco', ?)",
+                           (uuid.uuid4().hex,))
+            cursor.execute("SELECT valor FROM meta WHERE chave = 'id_banco'")
+            self.id_banco = cursor.fetchone()[0]
+            
+            self.fts_disponivel = self._criar_indice_texto(cursor)
+            
+            # indice de cobertura para o ranking de recomendacoes no sql
+            # (o rowid vai junto no indice, entao id/avaliacao/preco saem sem tocar a tabela)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_produtos_categoria_avaliacao 
+                ON produtos(categoria_id, avaliacao DESC, preco)
+            """)
+    
+    def _criar_chave_nome(self, cursor) -> bool:
+        """
+        garante a coluna chave_nome (chave de colacao do nome, a mesma da AVL)
+        com indice unico: dois nomes que so diferem em maiusculas ou acentos
+        sao a mesma categoria para a AVL e o banco tambem os recusa, inclusive
+        nas escritas em lote
+        
+        bancos antigos ganham a coluna e o preenchimento; se ja tiverem nomes
+        equivalentes, o indice nao e criado e retorna False
+        """
+        cursor.execute("PRAGMA table_info(categorias)")
+        if "chave_nome" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE categorias ADD COLUMN chave_nome TEXT")
+        
+        # linhas sem chave: banco antigo ou inseridas direto por sql (o
+        # preenchimento passa pelo log como atualizacoes sem efeito na AVL)
+        cursor.execute("SELECT id, nome FROM categorias WHERE chave_nome IS NULL")
+        pendentes = [(chave_colacao(nome), categoria_id) for categoria_id, nome in cursor.fetchall()]
+        if pendentes:
+            cursor.executemany("UPDATE categorias SET chave_nome = ? WHERE id = ?", pendentes)
+        
+        try:
+            cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_categorias_chave_nome
+                ON categorias(chave_nome)
+            """)
+        except sqlite3.IntegrityError:
+            cursor.execute("""
+                SELECT group_concat(nome, ', ') FROM categorias
+                GROUP BY chave_nome HAVING count(*) > 1
+            """)
+            duplicados = "; ".join(row[0] for row in cursor.fetchall())
+            print(f"atencao categorias com nomes equivalentes ({duplicados}): "
+                  f"indice unico de chave_nome nao criado")
+            return False
+        return True
+    
+    def _criar_triggers_alteracoes(self, cursor):
+        """cria os triggers que alimentam a tabela alteracoes"""
+        json_categoria = """json_object(
+            'id', {r}.id, 'nome', {r}.nome, 'descricao', {r}.descricao,
+            'categoria_pai_id', {r}.categoria_pai_id)"""
+        # o nome da categoria vai junto porque a AVL e indexada pelo nome
+        json_produto = """json_object(
+            'id', {r}.id, 'nome', {r}.nome, 'preco', {r}.preco,
+            'descricao', {r}.descricao, 'avaliacao', {r}.avaliacao,
+            'categoria_id', {r}.categoria_id,
+            'categoria_nome', (SELECT nome FROM categorias WHERE id = {r}.categoria_id))"""
+        
+        for tabela, json_registro in (("categorias", json_categoria), ("produtos", json_produto)):
+            antigos = json_registro.format(r="OLD")
+            novos = json_registro.format(r="NEW")
+            for operacao, registro_id, dados_antigos, dados_novos in (
+                ("INSERT", "NEW.id", "NULL", novos),
+                ("UPDATE", "NEW.id", antigos, novos),
+                ("DELETE", "OLD.id", antigos, "NULL"),
+            ):
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{tabela}_{operacao.lower()}
+                    AFTER {operacao} ON {tabela}
+                    BEGIN
+                        INSERT INTO alteracoes (tabela, operacao, registro_id, dados_antigos, dados_novos)
+                        VALUES ('{tabela}', '{operacao}', {registro_id}, {dados_antigos}, {dados_novos});
+                    END
+                """)
+    
+    def _criar_indice_texto(self, cursor) -> bool:
+        """
+        cria o indice fts5 sobre produtos(nome, descricao) e os triggers que o
+        mantem em dia; retorna False se o sqlite nao tiver fts5 compilado
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'produtos_fts'")
+        ja_existia = cursor.fetchone() is not None
+        try:
+            # tabela de conteudo externo: o texto fica so em produtos
+            # remove_diacritics permite achar "eletronico" em "eletrônico"
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS produtos_fts USING fts5(
+                    nome, descricao,
+                    content='produtos', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError:
+            return False
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_produtos_fts_insert AFTER INSERT ON produtos
+            BEGIN
+                INSERT INTO produtos_fts (rowid, nome, descricao)
+                VALUES (NEW.id, NEW.nome, COALESCE(NEW.descricao, ''));
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_produtos_fts_delete AFTER DELETE ON produtos
+            BEGIN
+                INSERT INTO produtos_fts (produtos_fts, rowid, nome, descricao)
+                VALUES ('delete', OLD.id, OLD.nome, COALESCE(OLD.descricao, ''));
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_produtos_fts_update AFTER UPDATE OF nome, descricao ON produtos
+            BEGIN
+                INSERT INTO produtos_fts (produtos_fts, rowid, nome, descricao)
+                VALUES ('delete', OLD.id, OLD.nome, COALESCE(OLD.descricao, ''));
+                INSERT INTO produtos_fts (rowid, nome, descricao)
+                VALUES (NEW.id, NEW.nome, COALESCE(NEW.descricao, ''));
+            END
+        """)
+        
+        # banco criado antes do indice: indexa os produtos que ja existem
+        if not ja_existia:
+            cursor.execute("INSERT INTO produtos_fts (produtos_fts) VALUES ('rebuild')")
+        return True
     
     # metodos para categorias
     
-    def inserir_categoria(self, nome: str, descricao: str = "", categoria_pai_id: Optional[int] = None) -> int:
+    def inserir_categoria(self, nome: str, descricao: str = "", categoria_pai_id: Optional[int] = None,
+                          conn: Optional[sqlite3.Connection] = None) -> int:
         """insere uma nova categoria"""
-        with self.get_connection() as conn:
+        with self._usar_conexao(conn) as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "INSERT INTO categorias (nome, descricao, categoria_pai_id) VALUES (?, ?, ?)",
-                (nome, descricao, categoria_pai_id)
+                "INSERT INTO categorias (nome, descricao, categoria_pai_id, chave_nome) VALUES (?, ?, ?, ?)",
+                (nome, descricao, categoria_pai_id, chave_colacao(nome))
             )
             return cursor.lastrowid
     
@@ -97,9 +321,10 @@ class Database:
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
-    def buscar_categoria_por_id(self, categoria_id: int) -> Optional[Dict[str, Any]]:
+    def buscar_categoria_por_id(self, categoria_id: int,
+                               conn: Optional[sqlite3.Connection] = None) -> Optional[Dict[str, Any]]:
         """busca uma categoria por id"""
-        with self.get_connection() as conn:
+        with self._usar_conexao(conn) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT c.id, c.nome, c.descricao, c.categoria_pai_id,
@@ -111,6 +336,23 @@ class Database:
             row = cursor.fetchone()
             return dict(row) if row else None
     
+    def buscar_categorias_por_ids(self, ids: List[int],
+                                  conn: Optional[sqlite3.Connection] = None) -> Dict[int, Dict[str, Any]]:
+        """busca varias categorias de uma vez (uma consulta por bloco de ids)"""
+        encontradas = {}
+        ids = list(set(ids))
+        with self._usar_conexao(conn) as conn:
+            cursor = conn.cursor()
+            for inicio in range(0, len(ids), self.MAX_PARAMETROS):
+                bloco = ids[inicio:inicio + self.MAX_PARAMETROS]
+                cursor.execute(f"""
+                    SELECT c.id, c.nome, c.descricao, c.categoria_pai_id
+                    FROM categorias c
+                    WHERE c.id IN ({",".join("?" * len(bloco))})
+                """, bloco)
+                encontradas.update((row["id"], dict(row)) for row in cursor.fetchall())
+        return encontradas
+    
     def buscar_categoria_por_nome(self, nome: str) -> Optional[Dict[str, Any]]:
         """busca uma categoria por nome"""
         with self.get_connection() as conn:
@@ -126,20 +368,21 @@ class Database:
             return dict(row) if row else None
     
     def atualizar_categoria(self, categoria_id: int, nome: str, descricao: str = "", 
-                           categoria_pai_id: Optional[int] = None) -> bool:
+                           categoria_pai_id: Optional[int] = None,
+                           conn: Optional[sqlite3.Connection] = None) -> bool:
         """atualiza uma categoria existente"""
-        with self.get_connection() as conn:
+        with self._usar_conexao(conn) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE categorias 
-                SET nome = ?, descricao = ?, categoria_pai_id = ?
+                SET nome = ?, descricao = ?, categoria_pai_id = ?, chave_nome = ?
                 WHERE id = ?
-            """, (nome, descricao, categoria_pai_id, categoria_id))
+            """, (nome, descricao, categoria_pai_id, chave_colacao(nome), categoria_id))
             return cursor.rowcount > 0
     
-    def deletar_categoria(self, categoria_id: int) -> bool:
+    def deletar_categoria(self, categoria_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
         """deleta uma categoria"""
-        with self.get_connection() as conn:
+        with self._usar_conexao(conn) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM categorias WHERE id = ?", (categoria_id,))
             return cursor.rowcount > 0
@@ -147,9 +390,10 @@ class Database:
     # metodos para produtos
     
     def inserir_produto(self, nome: str, categoria_id: int, preco: float, 
-                       descricao: str = "", avaliacao: float = 0.0) -> int:
+                       descricao: str = "", avaliacao: float = 0.0,
+                       conn: Optional[sqlite3.Connection] = None) -> int:
         """insere um novo produto"""
-        with self.get_connection() as conn:
+        with self._usar_conexao(conn) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO produtos (nome, categoria_id, preco, descricao, avaliacao)
@@ -186,9 +430,10 @@ class Database:
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
-    def buscar_produto_por_id(self, produto_id: int) -> Optional[Dict[str, Any]]:
+    def buscar_produto_por_id(self, produto_id: int,
+                              conn: Optional[sqlite3.Connection] = None) -> Optional[Dict[str, Any]]:
         """busca um produto por id"""
-        with self.get_connection() as conn:
+        with self._usar_conexao(conn) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT p.id, p.nome, p.preco, p.descricao, p.avaliacao,
@@ -200,10 +445,30 @@ class Database:
             row = cursor.fetchone()
             return dict(row) if row else None
     
+    def buscar_produtos_por_ids(self, ids: List[int],
+                                conn: Optional[sqlite3.Connection] = None) -> Dict[int, Dict[str, Any]]:
+        """busca varios produtos de uma vez, com o nome da categoria"""
+        encontrados = {}
+        ids = list(set(ids))
+        with self._usar_conexao(conn) as conn:
+            cursor = conn.cursor()
+            for inicio in range(0, len(ids), self.MAX_PARAMETROS):
+                bloco = ids[inicio:inicio + self.MAX_PARAMETROS]
+                cursor.execute(f"""
+                    SELECT p.id, p.nome, p.preco, p.descricao, p.avaliacao,
+                           p.categoria_id, c.nome as categoria_nome
+                    FROM produtos p
+                    JOIN categorias c ON p.categoria_id = c.id
+                    WHERE p.id IN ({",".join("?" * len(bloco))})
+                """, bloco)
+                encontrados.update((row["id"], dict(row)) for row in cursor.fetchall())
+        return encontrados
+    
     def atualizar_produto(self, produto_id: int, nome: str, categoria_id: int, 
-                         preco: float, descricao: str = "", avaliacao: float = 0.0) -> bool:
+                         preco: float, descricao: str = "", avaliacao: float = 0.0,
+                         conn: Optional[sqlite3.Connection] = None) -> bool:
         """atualiza um produto existente"""
-        with self.get_connection() as conn:
+        with self._usar_conexao(conn) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE produtos 
@@ -212,13 +477,224 @@ class Database:
             """, (nome, categoria_id, preco, descricao, avaliacao, produto_id))
             return cursor.rowcount > 0
     
-    def deletar_produto(self, produto_id: int) -> bool:
+    def deletar_produto(self, produto_id: int, conn: Optional[sqlite3.Connection] = None) -> bool:
         """deleta um produto"""
-        with self.get_connection() as conn:
+        with self._usar_conexao(conn) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM produtos WHERE id = ?", (produto_id,))
             return cursor.rowcount > 0
     
+    def buscar_produtos_texto(self, termo: str, limite: int = 20) -> List[Dict[str, Any]]:
+        """
+        busca produtos por nome e descricao no indice fts5
+        
+        cada palavra do termo vira um prefixo ("note" acha "notebook") e todas
+        precisam aparecer; o resultado vem ordenado por bm25 com peso maior
+        para o nome do que para a descricao
+        """
+        if not self.fts_disponivel:
+            raise RuntimeError("sqlite sem suporte a fts5")
+        
+        # aspas neutralizam a sintaxe do fts5 (operadores, colunas, parenteses)
+        palavras = [p.replace('"', '""') for p in termo.split()]
+        if not palavras:
+            return []
+        consulta = " ".join(f'"{p}"*' for p in palavras)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT p.id, p.nome, p.preco, p.descricao, p.avaliacao,
+                       p.categoria_id, c.nome as categoria_nome,
+                       bm25(produtos_fts, 10.0, 1.0) as relevancia
+                FROM produtos_fts
+                JOIN produtos p ON p.id = produtos_fts.rowid
+                JOIN categorias c ON p.categoria_id = c.id
+                WHERE produtos_fts MATCH ?
+                ORDER BY relevancia
+                LIMIT ?
+            """, (consulta, limite))
+            rows = cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    # metodos para o log de alteracoes
+    
+    @staticmethod
+    def _seq_alteracoes(conn: sqlite3.Connection) -> int:
+        # o contador do autoincrement, e nao MAX(seq): continua valendo depois
+        # que o log e podado
+        cursor = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'alteracoes'")
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    
+    def ultima_alteracao(self) -> int:
+        """retorna o maior seq ja gravado no log de alteracoes (0 se nunca houve alteracao)"""
+        with self.get_connection() as conn:
+            return self._seq_alteracoes(conn)
+    
+    def listar_alteracoes(self, desde_seq: int = 0, limite: int = 1000) -> List[Dict[str, Any]]:
+        """lista as alteracoes com seq maior que desde_seq em ordem de aplicacao"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT seq, tabela, operacao, registro_id, dados_antigos, dados_novos
+                FROM alteracoes
+                WHERE seq > ?
+                ORDER BY seq
+                LIMIT ?
+            """, (desde_seq, limite))
+            rows = cursor.fetchall()
+            alteracoes = []
+            for row in rows:
+                alteracao = dict(row)
+                for campo in ("dados_antigos", "dados_novos"):
+                    if alteracao[campo] is not None:
+                        alteracao[campo] = json.loads(alteracao[campo])
+                alteracoes.append(alteracao)
+            return alteracoes
+    
+    def registrar_consumidor(self, consumidor: str, seq: int):
+        """grava (ou renova) a marca d'agua de um consumidor do log: o seq ate onde ele ja aplicou"""
+        with self.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO consumidores_alteracoes (consumidor, seq, atualizado_em)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(consumidor) DO UPDATE
+                SET seq = excluded.seq, atualizado_em = excluded.atualizado_em
+            """, (consumidor, seq))
+    
+    def remover_consumidor(self, consumidor: str):
+        """remove a marca d'agua de um consumidor que deixou de ler o log"""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM consumidores_alteracoes WHERE consumidor = ?", (consumidor,))
+    
+    def podar_alteracoes(self, ate_seq: int, validade: Optional[float] = None) -> int:
+        """
+        remove do log as alteracoes ate ate_seq ja aplicadas por todos os consumidores
+        
+        a poda para no menor seq de consumidores_alteracoes; com validade
+        (segundos), antes descarta os consumidores que nao renovam a marca ha
+        mais tempo que isso (processos que morreram sem remover a sua)
+        
+        returns
+            int numero de alteracoes removidas
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            if validade is not None:
+                cursor.execute("DELETE FROM consumidores_alteracoes WHERE atualizado_em < datetime('now', ?)",
+                               (f"-{validade} seconds",))
+            cursor.execute("SELECT MIN(seq) FROM consumidores_alteracoes")
+            minimo = cursor.fetchone()[0]
+            if minimo is not None:
+                ate_seq = min(ate_seq, minimo)
+            cursor.execute("DELETE FROM alteracoes WHERE seq <= ?", (ate_seq,))
+            return cursor.rowcount
+    
+    # criterios de ordenacao aceitos pela recomendacao no sql
+    # (mesmos nomes usados por SistemaRecomendacao._ordenar_produtos)
+    ORDENACOES_SQL = {
+        "avaliacao": "p.avaliacao DESC, p.id",
+        "preco_asc": "p.preco ASC, p.id",
+        "preco_desc": "p.preco DESC, p.id",
+        "nome": "p.nome, p.id",
+    }
+    
+    def recomendar_produtos_descendentes(self, categoria_id: int, ordenar_por: str = "avaliacao",
+                                         limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        recomenda produtos de uma categoria e de todas as suas subcategorias direto no sql
+        
+        usa uma cte recursiva sobre categorias.categoria_pai_id para descobrir os
+        descendentes e ranqueia os produtos pelo indice de cobertura
+        idx_produtos_categoria_avaliacao, aplicando ORDER BY e LIMIT no proprio banco
+        serve como caminho frio (sem a AVL em memoria) e para conferir as recomendacoes
+        """
+        if ordenar_por not in self.ORDENACOES_SQL:
+            raise ValueError(f"criterio de ordenacao invalido: {ordenar_por}")
+        ordem = self.ORDENACOES_SQL[ordenar_por]
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # UNION (e nao UNION ALL) descarta ids repetidos e evita laco infinito
+            # caso algum categoria_pai_id forme um ciclo
+            cursor.execute(f"""
+                WITH RECURSIVE descendentes(id) AS (
+                    SELECT id FROM categorias WHERE id = ?
+                    UNION
+                    SELECT c.id FROM categorias c
+                    JOIN descendentes d ON c.categoria_pai_id = d.id
+                ),
+                ranqueados AS (
+                    SELECT p.id FROM descendentes d
+                    JOIN produtos p ON p.categoria_id = d.id
+                    ORDER BY {ordem}
+                    LIMIT ?
+                )
+                SELECT p.id, p.nome, p.preco, p.descricao, p.avaliacao,
+                       p.categoria_id, c.nome as categoria_nome
+                FROM ranqueados r
+                JOIN produtos p ON p.id = r.id
+                JOIN categorias c ON p.categoria_id = c.id
+                ORDER BY {ordem}
+            """, (categoria_id, limite if limite else -1))
+            rows = cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    def iterar_produtos(self, categoria_id: Optional[int] = None,
+                        tamanho_lote: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        percorre os produtos em ordem de id, em lotes de ate `tamanho_lote`
+        
+        usa paginacao por chave (id > ultimo id do lote anterior) e uma conexao
+        curta por lote: a memoria fica limitada a um lote, nenhuma transacao de
+        leitura fica aberta entre lotes e cada lote custa O(log n + lote) no indice
+        da chave primaria, seja qual for a posicao no catalogo
+        com categoria_id, so produtos da categoria e de suas subcategorias
+        """
+        if categoria_id is None:
+            consulta = """
+                SELECT p.id, p.nome, p.preco, p.descricao, p.avaliacao,
+                       p.categoria_id, c.nome as categoria_nome
+                FROM produtos p
+                JOIN categorias c ON p.categoria_id = c.id
+                WHERE p.id > ?
+                ORDER BY p.id
+                LIMIT ?
+            """
+            parametros = ()
+        else:
+            consulta = """
+                WITH RECURSIVE descendentes(id) AS (
+                    SELECT id FROM categorias WHERE id = ?
+                    UNION
+                    SELECT c.id FROM categorias c
+                    JOIN descendentes d ON c.categoria_pai_id = d.id
+                )
+                SELECT p.id, p.nome, p.preco, p.descricao, p.avaliacao,
+                       p.categoria_id, c.nome as categoria_nome
+                FROM produtos p
+                JOIN categorias c ON p.categoria_id = c.id
+                WHERE p.categoria_id IN descendentes AND p.id > ?
+                ORDER BY p.id
+                LIMIT ?
+            """
+            parametros = (categoria_id,)
+        
+        ultimo_id = 0
+        while True:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(consulta, parametros + (ultimo_id, tamanho_lote))
+                lote = [dict(row) for row in cursor.fetchall()]
+            if not lote:
+                return
+            yield lote
+            if len(lote) < tamanho_lote:
+                return
+            ultimo_id = lote[-1]['id']
+    
     def limpar_tabelas(self):
         """limpa todas as tabelas (cuidado!)"""
         with self.get_connection() as conn:
@@ -0,0 +1,148 @@
+"""
+modulo de coordenacao de escritas (group commit)
+agrupa as mutacoes que chegam em uma janela curta em uma unica transacao do
+sqlite e aplica as mudancas na AVL na mesma ordem, depois do commit
+"""
+
+import asyncio
+import time
+
+
+class CoordenadorEscrita:
+    """
+    fila de escritas na frente do Database
+
+    cada chamada de `executar` entra na fila e espera o lote dela ser
+    gravado; o lote fecha quando a janela expira ou quando atinge o tamanho
+    maximo. um unico consumidor grava os lotes em sequencia, entao a ordem de
+    chegada e a ordem do banco e da AVL
+    """
+
+    def __init__(self, db, janela_ms=2.0, tamanho_maximo=64, aplicar_em_memoria=True, sistema=None):
+        """
+        args
+            db (Database) banco onde os lotes sao gravados
+            janela_ms (float) tempo maximo que o primeiro pedido espera por companhia
+            tamanho_maximo (int) numero maximo de operacoes por transacao
+            aplicar_em_memoria (bool) false quando a AVL deste processo e somente
+                leitura (catalogo compartilhado); as mudancas chegam pelo
+                carregador, que acompanha o log de alteracoes
+            sistema (SistemaRecomendacao) motor onde os lotes sao aplicados; o
+                seq_alteracoes dele avanca sobre o que o lote gravou no log, para
+                o tailer nao reaplicar as escritas do proprio processo
+        """
+        self.db = db
+        self.janela_ms = janela_ms
+        self.tamanho_maximo = tamanho_maximo
+        self.aplicar_em_memoria = aplicar_em_memoria
+        self.sistema = sistema
+        self._fila = None
+        self._consumidor = None
+
+        # metricas
+        self.total_lotes = 0
+        self.total_operacoes = 0
+        self.total_falhas = 0
+        self.maior_lote = 0
+        self.tempo_gravacao = 0.0
+
+    async def executar(self, gravar, aplicar=None):
+        """
+        agenda uma escrita e espera o commit do lote em que ela entrou
+
+        args
+            gravar (callable) recebe a conexao do lote e faz o trabalho no banco
+            aplicar (callable) recebe o retorno de `gravar` e atualiza a AVL;
+                so e chamado se a gravacao deu certo
+
+        returns
+            o retorno de `gravar`
+
+        raises
+            a excecao levantada por `gravar` (apenas a operacao dela e desfeita)
+        """
+        self._garantir_consumidor()
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((gravar, aplicar, futuro))
+        return await futuro
+
+    def _garantir_consumidor(self):
+        """cria a fila e a tarefa consumidora no loop atual na primeira escrita"""
+        if self._consumidor is None or self._consumidor.done():
+            self._fila = asyncio.Queue()
+            self._consumidor = asyncio.get_running_loop().create_task(self._consumir())
+
+    async def _consumir(self):
+        """laco do consumidor: junta um lote, grava, aplica e responde"""
+        while True:
+            lote = [await self._fila.get()]
+            limite = time.monotonic() + self.janela_ms / 1000
+            while len(lote) < self.tamanho_maximo:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self._fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            await self._gravar_lote(lote)
+
+    async def _gravar_lote(self, lote):
+        inicio = time.perf_counter()
+        try:
+            # o sqlite bloqueia, entao a transacao roda fora do loop de eventos
+            resultados, (seq_antes, seq_depois) = await asyncio.to_thread(
+                self.db.executar_lote, [gravar for gravar, _, _ in lote]
+            )
+        except Exception as e:
+            # falha no commit: ninguem do lote foi gravado
+            for _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            self.total_falhas += len(lote)
+            return
+        finally:
+            self.tempo_gravacao += time.perf_counter() - inicio
+
+        self.total_lotes += 1
+        self.total_operacoes += len(lote)
+        self.maior_lote = max(self.maior_lote, len(lote))
+
+        # aplica na AVL na ordem do lote, ja com o commit feito
+        aplicado = self.aplicar_em_memoria
+        for (_, aplicar, futuro), (sucesso, resultado) in zip(lote, resultados):
+            if sucesso and aplicar is not None and self.aplicar_em_memoria:
+                try:
+                    aplicar(resultado)
+                except Exception as e:
+                    sucesso, resultado = False, e
+                    aplicado = False
+            elif sucesso:
+                # gravado no banco sem passar pela memoria: fica para o tailer
+                aplicado = False
+            if not sucesso:
+                self.total_falhas += 1
+            if futuro.done():
+                continue
+            if sucesso:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(resultado)
+
+        # o lote inteiro ja esta na memoria: o log ate seq_depois nao precisa
+        # voltar pelo tailer
+        if aplicado and self.sistema is not None and seq_depois > seq_antes:
+            self.sistema.avancar_alteracoes(seq_antes, seq_depois)
+
+    def metricas(self):
+        """retorna configuracao e estatisticas de tamanho dos lotes"""
+        return {
+            'janela_ms': self.janela_ms,
+            'tamanho_maximo': self.tamanho_maximo,
+            'lotes': self.total_lotes,
+            'operacoes': self.total_operacoes,
+            'falhas': self.total_falhas,
+            'maior_lote': self.maior_lote,
+            'media_por_lote': self.total_operacoes / self.total_lotes if self.total_lotes else 0.0,
+            'tempo_medio_lote_ms': 1000 * self.tempo_gravacao / self.total_lotes if self.total_lotes else 0.0,
+        }
@@ -0,0 +1,79 @@
+"""
+modulo dos arquivos estaticos com fingerprint e pre-compressao
+o build (scripts/construir_estaticos.py) copia cada css/js para
+static/dist com o hash do conteudo no nome e grava as versoes .gz/.br ao
+lado; em producao os templates apontam para esses nomes, servidos com
+cache imutavel
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from src.compressao import EXTENSOES, aceitas
+
+PASTA_DIST = "dist"
+MANIFESTO = "manifest.json"
+EXTENSOES_FINGERPRINT = (".css", ".js")
+
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+
+
+def nome_com_hash(caminho_relativo, conteudo):
+    """css/style.css -> css/style.<hash>.css"""
+    base, extensao = os.path.splitext(caminho_relativo)
+    return f"{base}.{hashlib.sha256(conteudo).hexdigest()[:12]}{extensao}"
+
+
+def carregar_manifesto(diretorio):
+    """mapa caminho original -> caminho com hash; vazio se o build nao rodou"""
+    try:
+        with open(os.path.join(diretorio, PASTA_DIST, MANIFESTO), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+class EstaticosPrecomprimidos(StaticFiles):
+    """
+    StaticFiles que entrega a versao .br/.gz gravada no build quando o
+    cliente aceita e marca os arquivos com fingerprint como imutaveis
+    os demais arquivos saem com no-cache (revalidacao por ETag/Last-Modified)
+    """
+
+    def __init__(self, *, directory, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.pasta_dist = os.path.realpath(os.path.join(directory, PASTA_DIST))
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        cabecalhos_requisicao = Headers(scope=scope)
+        full_path = os.fspath(full_path)
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+        imutavel = os.path.realpath(full_path).startswith(self.pasta_dist + os.sep)
+        cabecalhos = {
+            "Cache-Control": CACHE_IMUTAVEL if imutavel else CACHE_REVALIDAR,
+            "Vary": "Accept-Encoding"
+        }
+
+        caminho, estado = full_path, stat_result
+        for codificacao in aceitas(cabecalhos_requisicao.get("accept-encoding")):
+            candidato = full_path + EXTENSOES[codificacao]
+            try:
+                estado = os.stat(candidato)
+            except OSError:
+                continue
+            caminho = candidato
+            cabecalhos["Content-Encoding"] = codificacao
+            break
+
+        response = FileResponse(caminho, status_code=status_code, headers=cabecalhos,
+                                media_type=media_type, stat_result=estado)
+        if self.is_not_modified(response.headers, cabecalhos_requisicao):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,44 @@
+"""
+modulo de exportacao do catalogo em fluxo (ndjson e csv)
+transforma os lotes lidos do banco em pedacos de bytes, um por lote, para
+uma resposta em streaming: a memoria fica limitada a um lote e o primeiro
+byte sai assim que o primeiro lote e lido
+"""
+
+import csv
+import io
+
+from src.serializacao import dumps
+
+COLUNAS = ('id', 'nome', 'preco', 'descricao', 'avaliacao', 'categoria_id', 'categoria_nome')
+
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def gerar_ndjson(lotes):
+    """um objeto json por linha, na ordem das colunas"""
+    for lote in lotes:
+        yield b"".join(dumps({coluna: produto[coluna] for coluna in COLUNAS}) + b"\n"
+                       for produto in lote)
+
+
+def gerar_csv(lotes):
+    """csv com cabecalho; o BOM ajuda planilhas a reconhecer o utf-8"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(COLUNAS)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    for lote in lotes:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows([produto[coluna] for coluna in COLUNAS] for produto in lote)
+        yield buffer.getvalue().encode("utf-8")
+
+
+GERADORES = {
+    'ndjson': gerar_ndjson,
+    'csv': gerar_csv,
+}
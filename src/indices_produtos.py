@@ -0,0 +1,128 @@
+"""
+modulo de indices secundarios globais dos produtos
+duas listas ordenadas sobre todo o catalogo, por (preco, id) e por
+(-avaliacao, id), apontando para a categoria de cada produto; faixas de preco
+e os mais baratos/mais bem avaliados saem em O(log n + k) sem visitar os nos
+de categoria da arvore
+"""
+
+import math
+from operator import itemgetter
+
+from src.mapas_ordenados import ListaBlocos
+
+
+# ordenacoes aceitas por `consultar` (os mesmos nomes do recomendar_produtos)
+ORDENACOES = ("preco_asc", "preco_desc", "avaliacao")
+
+
+def chave_preco(produto):
+    return (produto.preco, produto.id)
+
+
+def chave_avaliacao(produto):
+    # avaliacao negada: a ordem crescente da lista ja e da melhor para a pior
+    return (-(produto.avaliacao or 0.0), produto.id)
+
+
+def chave_da_ordenacao(produto, ordenar):
+    """chave do produto no indice percorrido por `ordenar` (o cursor de paginacao)"""
+    return chave_avaliacao(produto) if ordenar == "avaliacao" else chave_preco(produto)
+
+
+class IndicesProdutos:
+    """
+    (preco, id) -> categoria e (-avaliacao, id) -> categoria
+
+    o dado e a categoria (que o produto nao conhece); o produto sai dela pelo
+    id em O(1), entao alem das duas chaves nada e alocado por produto.
+    as chaves sao lidas do produto: quem muda preco ou avaliacao tira o
+    produto antes e o poe de volta depois
+    """
+
+    def __init__(self, carga=256):
+        self.por_preco = ListaBlocos(carga)
+        self.por_avaliacao = ListaBlocos(carga)
+
+    def __len__(self):
+        return len(self.por_preco)
+
+    def adicionar(self, categoria, produto):
+        self.por_preco.insert(chave_preco(produto), categoria)
+        self.por_avaliacao.insert(chave_avaliacao(produto), categoria)
+
+    def remover(self, produto):
+        self.por_preco.delete(chave_preco(produto))
+        self.por_avaliacao.delete(chave_avaliacao(produto))
+
+    def adicionar_categoria(self, categoria):
+        for produto in categoria.produtos:
+            self.adicionar(categoria, produto)
+
+    def remover_categoria(self, categoria):
+        for produto in categoria.produtos:
+            self.remover(produto)
+
+    @classmethod
+    def construir(cls, categorias, carga=256):
+        """
+        indices de todos os produtos de `categorias` montados de uma vez
+        (ordenacao mais carga em blocos, em vez de n insercoes)
+        """
+        indices = cls(carga)
+        for lista, chave in ((indices.por_preco, chave_preco), (indices.por_avaliacao, chave_avaliacao)):
+            pares = [(chave(produto), categoria) for categoria in categorias for produto in categoria.produtos]
+            pares.sort(key=itemgetter(0))
+            lista.carregar_ordenados(list(map(itemgetter(0), pares)), list(map(itemgetter(1), pares)))
+        return indices
+
+    def consultar(self, preco_min=None, preco_max=None, avaliacao_min=None,
+                  ordenar="preco_asc", limite=50, apos=None):
+        """
+        produtos do catalogo inteiro filtrados e ordenados
+
+        a faixa do indice da ordenacao (preco ou avaliacao) e localizada por
+        busca binaria; o filtro da outra dimensao e conferido na varredura.
+        `apos` e a chave do indice da ordenacao ((preco, id) ou
+        (-avaliacao, id), veja chave_da_ordenacao) do ultimo produto da pagina
+        anterior: a varredura recomeca logo depois dela
+
+        returns
+            list de (produto, categoria), no maximo `limite`
+
+        complexidade O(log n + k) com k produtos varridos ate o limite
+        """
+        if ordenar not in ORDENACOES:
+            raise ValueError(f"ordenacao desconhecida {ordenar!r} (opcoes: {', '.join(ORDENACOES)})")
+        if ordenar == "avaliacao":
+            fim = None if avaliacao_min is None else (-avaliacao_min, math.inf)
+            pares = self.por_avaliacao.itens(apos, fim)
+            avaliacao_min = None
+        else:
+            inicio = None if preco_min is None else (preco_min, -math.inf)
+            fim = None if preco_max is None else (preco_max, math.inf)
+            if ordenar == "preco_asc":
+                if apos is not None and (inicio is None or apos > inicio):
+                    inicio = apos
+                pares = self.por_preco.itens(inicio, fim)
+            else:
+                if apos is not None and (fim is None or apos < fim):
+                    fim = apos
+                pares = self.por_preco.itens_reversos(inicio, fim)
+            preco_min = preco_max = None
+
+        resultado = []
+        for chave, categoria in pares:
+            if chave == apos:
+                continue
+            produto = categoria.buscar_produto(chave[1])
+            if preco_min is not None and produto.preco < preco_min:
+                continue
+            if preco_max is not None and produto.preco > preco_max:
+                continue
+            if avaliacao_min is not None and (produto.avaliacao or 0.0) < avaliacao_min:
+                continue
+            resultado.append((produto, categoria))
+            if len(resultado) == limite:
+                break
+        return resultado
@@ -0,0 +1,228 @@
+"""
+modulo de escrita em lote de produtos e categorias
+um lote inteiro e validado, tem os ids de categoria/produto resolvidos em
+uma consulta, e gravado em uma unica transacao (um savepoint por item) e
+aplicado na AVL em uma unica passada sob a trava de escrita
+"""
+
+OPERACOES = ("criar", "atualizar", "excluir")
+
+# erro dos itens gravados no banco que a AVL recusou
+ERRO_RECUSADO = "alteracao gravada no banco mas recusada pela AVL"
+
+
+class LoteRecusado(Exception):
+    """
+    a AVL recusou itens de um lote ja gravado no banco; os resultados deles
+    ja estao marcados com erro. levantada depois de aplicar os demais, para
+    o lote nao contar como aplicado em memoria e o tailer reaplicar o log
+    """
+
+    def __init__(self, recusados):
+        super().__init__(f"{len(recusados)} item(ns) do lote recusado(s) pela AVL")
+        self.recusados = recusados
+
+
+def _resultado(indice, operacao, status, id=None, erro=None):
+    return {'indice': indice, 'operacao': operacao, 'status': status, 'id': id, 'erro': erro}
+
+
+def _exigir(item, *campos):
+    """levanta ValueError se algum campo obrigatorio veio vazio"""
+    faltando = [campo for campo in campos if item.get(campo) is None]
+    if faltando:
+        raise ValueError(f"campos obrigatorios ausentes: {', '.join(faltando)}")
+
+
+def _executar_itens(db, conn, itens, executar_item):
+    """
+    roda `executar_item(item, conn)` para cada item em um savepoint proprio
+
+    returns
+        (resultados, mudancas) status por item e mudancas para a AVL, na ordem;
+        cada mudanca leva junto o resultado do seu item
+    """
+    resultados = []
+    mudancas = []
+    for indice, item in enumerate(itens):
+        operacao = item.get('operacao', 'criar')
+        if operacao not in OPERACOES:
+            resultados.append(_resultado(indice, operacao, 'erro', item.get('id'),
+                                         f"operacao invalida: {operacao}"))
+            continue
+        sucesso, retorno = db.em_savepoint(conn, lambda conn: executar_item(item, operacao, conn))
+        if sucesso:
+            id, mudanca = retorno
+            resultado = _resultado(indice, operacao, 'ok', id)
+            resultados.append(resultado)
+            mudancas.append(mudanca + (resultado,))
+        else:
+            resultados.append(_resultado(indice, operacao, 'erro', item.get('id'), str(retorno)))
+    return resultados, mudancas
+
+
+def gravar_lote_produtos(db, conn, itens):
+    """
+    grava um lote de produtos na transacao de `conn`
+
+    cada item e um dict com `operacao` (criar, atualizar ou excluir; padrao
+    criar), `id` (atualizar/excluir) e os campos do produto. na atualizacao
+    os campos ausentes mantem o valor atual
+
+    returns
+        (resultados, mudancas) status por item e mudancas para a AVL
+    """
+    categorias = db.buscar_categorias_por_ids(
+        [item['categoria_id'] for item in itens if item.get('categoria_id') is not None], conn=conn)
+    produtos = db.buscar_produtos_por_ids(
+        [item['id'] for item in itens if item.get('id') is not None], conn=conn)
+
+    def categoria(categoria_id):
+        if categoria_id not in categorias:
+            raise ValueError(f"categoria {categoria_id} nao encontrada")
+        return categorias[categoria_id]
+
+    def produto(produto_id):
+        if produto_id not in produtos:
+            raise ValueError(f"produto {produto_id} nao encontrado")
+        return produtos[produto_id]
+
+    def executar(item, operacao, conn):
+        if operacao == 'criar':
+            _exigir(item, 'nome', 'categoria_id', 'preco')
+            novo = {
+                'nome': item['nome'], 'categoria_id': item['categoria_id'], 'preco': item['preco'],
+                'descricao': item.get('descricao') or "", 'avaliacao': item.get('avaliacao') or 0.0,
+                'categoria_nome': categoria(item['categoria_id'])['nome']
+            }
+            novo['id'] = db.inserir_produto(novo['nome'], novo['categoria_id'], novo['preco'],
+                                            novo['descricao'], novo['avaliacao'], conn=conn)
+            produtos[novo['id']] = novo
+            return novo['id'], ('criar', None, novo)
+
+        _exigir(item, 'id')
+        atual = produto(item['id'])
+        if operacao == 'excluir':
+            db.deletar_produto(item['id'], conn=conn)
+            del produtos[item['id']]
+            return item['id'], ('excluir', atual['categoria_nome'], atual)
+
+        novo = dict(atual)
+        for campo in ('nome', 'categoria_id', 'preco', 'descricao', 'avaliacao'):
+            if item.get(campo) is not None:
+                novo[campo] = item[campo]
+        novo['categoria_nome'] = categoria(novo['categoria_id'])['nome']
+        db.atualizar_produto(novo['id'], novo['nome'], novo['categoria_id'], novo['preco'],
+                             novo['descricao'], novo['avaliacao'], conn=conn)
+        produtos[novo['id']] = novo
+        return novo['id'], ('atualizar', atual['categoria_nome'], novo)
+
+    return _executar_itens(db, conn, itens, executar)
+
+
+def _recusar(recusados):
+    """marca os itens recusados pela AVL com erro e levanta LoteRecusado"""
+    for resultado in recusados:
+        resultado['status'] = 'erro'
+        resultado['erro'] = ERRO_RECUSADO
+    if recusados:
+        raise LoteRecusado(recusados)
+
+
+def aplicar_lote_produtos(sistema, mudancas):
+    """
+    aplica na AVL as mudancas de um lote de produtos ja gravado, em uma passada
+
+    raises
+        LoteRecusado se a AVL recusou algum item (os demais sao aplicados)
+    """
+    recusados = []
+    with sistema.trava.escrita():
+        for operacao, categoria_antiga, dados, resultado in mudancas:
+            if operacao == 'criar':
+                aceito = sistema.cadastrar_produto(dados['categoria_nome'], dados['id'], dados['nome'],
+                                                   dados['preco'], dados['descricao'], dados['avaliacao'])
+            elif operacao == 'atualizar':
+                aceito = sistema.atualizar_produto(categoria_antiga, dados['id'], dados['nome'], dados['preco'],
+                                                   dados['descricao'], dados['avaliacao'],
+                                                   nova_categoria=dados['categoria_nome'])
+            else:
+                aceito = sistema.remover_produto(categoria_antiga, dados['id'])
+            if not aceito:
+                recusados.append(resultado)
+    _recusar(recusados)
+
+
+def gravar_lote_categorias(db, conn, itens):
+    """
+    grava um lote de categorias na transacao de `conn`
+
+    cada item e um dict com `operacao`, `id` (atualizar/excluir), `nome`,
+    `descricao` e `categoria_pai_id`; o pai pode ser criado antes no mesmo lote
+
+    returns
+        (resultados, mudancas) status por item e mudancas para a AVL
+    """
+    ids = [item[campo] for item in itens for campo in ('id', 'categoria_pai_id')
+           if item.get(campo) is not None]
+    categorias = db.buscar_categorias_por_ids(ids, conn=conn)
+
+    def categoria(categoria_id):
+        if categoria_id not in categorias:
+            raise ValueError(f"categoria {categoria_id} nao encontrada")
+        return categorias[categoria_id]
+
+    def executar(item, operacao, conn):
+        if operacao == 'criar':
+            _exigir(item, 'nome')
+            if item.get('categoria_pai_id') is not None:
+                categoria(item['categoria_pai_id'])
+            nova = {'nome': item['nome'], 'descricao': item.get('descricao') or "",
+                    'categoria_pai_id': item.get('categoria_pai_id')}
+            nova['id'] = db.inserir_categoria(nova['nome'], nova['descricao'],
+                                              nova['categoria_pai_id'], conn=conn)
+            categorias[nova['id']] = nova
+            return nova['id'], ('criar', None, nova)
+
+        _exigir(item, 'id')
+        atual = categoria(item['id'])
+        if operacao == 'excluir':
+            db.deletar_categoria(item['id'], conn=conn)
+            del categorias[item['id']]
+            return item['id'], ('excluir', atual['nome'], atual)
+
+        nova = dict(atual)
+        for campo in ('nome', 'descricao', 'categoria_pai_id'):
+            if item.get(campo) is not None:
+                nova[campo] = item[campo]
+        if nova['categoria_pai_id'] is not None:
+            if nova['categoria_pai_id'] == nova['id']:
+                raise ValueError("categoria nao pode ser pai de si mesma")
+            categoria(nova['categoria_pai_id'])
+        db.atualizar_categoria(nova['id'], nova['nome'], nova['descricao'],
+                               nova['categoria_pai_id'], conn=conn)
+        categorias[nova['id']] = nova
+        return nova['id'], ('atualizar', atual['nome'], nova)
+
+    return _executar_itens(db, conn, itens, executar)
+
+
+def aplicar_lote_categorias(sistema, mudancas):
+    """
+    aplica na AVL as mudancas de um lote de categorias ja gravado, em uma passada
+
+    raises
+        LoteRecusado se a AVL recusou algum item (os demais sao aplicados)
+    """
+    recusados = []
+    with sistema.trava.escrita():
+        for operacao, nome_antigo, dados, resultado in mudancas:
+            if operacao == 'criar':
+                aceito = sistema.cadastrar_categoria(dados['nome'], dados['descricao'])
+            elif operacao == 'atualizar':
+                aceito = sistema.atualizar_categoria(nome_antigo, dados['nome'], dados['descricao'])
+            else:
+                aceito = sistema.remover_categoria(nome_antigo)
+            if not aceito:
+                recusados.append(resultado)
+    _recusar(recusados)
@@ -0,0 +1,524 @@
+"""
+modulo de mapas ordenados intercambiaveis para as categorias
+define o protocolo que o SistemaRecomendacao usa da AVL e duas alternativas
+com nos largos, que percorrem menos ponteiros por busca:
+
+    - ArvoreB: arvore B com ate 2*grau-1 chaves por no e o tamanho de cada
+      subarvore guardado no no (posicao e selecao em O(grau log n))
+    - ListaBlocos: lista ordenada quebrada em blocos de ate 2*carga chaves;
+      busca com dois bisect, insercao/remocao deslocam so um bloco
+
+as duas nao tem a forma de uma AVL; para quem percorre nos (hierarquia,
+/api/tree, snapshot, recomendacao por subarvore) elas expoem em `root` a
+arvore balanceada implicita sobre as chaves ordenadas: o no de cada
+intervalo de posicoes [inicio, fim) e a chave do meio, como uma AVL montada
+de uma vez a partir da lista ordenada
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Iterator, Optional, Protocol, Tuple
+
+from src.avl_tree import AVLTree
+
+
+class MapaOrdenado(Protocol):
+    """
+    o que o SistemaRecomendacao usa da arvore de categorias
+
+    as chaves sao unicas: o sistema confere com `find` antes de `insert`
+    """
+
+    root: Any  # no com key, data, leftChild, rightChild e height (em niveis)
+
+    def insert(self, key, data) -> None: ...
+
+    def delete(self, key) -> None: ...
+
+    def find(self, key) -> Any: ...
+
+    def itens(self, inicio=None, fim=None) -> Iterator[Tuple[Any, Any]]: ...
+
+    def intervalo_subarvore(self, key) -> Optional[Tuple[Any, Any]]: ...
+
+    def recommend(self, key) -> list: ...
+
+
+class NoImplicito:
+    """
+    no somente leitura da arvore balanceada implicita sobre as posicoes
+    [inicio, fim) de um mapa; os filhos sao criados na primeira leitura e
+    reaproveitados, entao o mesmo no devolve sempre os mesmos filhos
+    """
+
+    __slots__ = ('_mapa', '_inicio', '_fim', 'key', 'data', 'height', '_esquerdo', '_direito')
+
+    def __init__(self, mapa, inicio, fim):
+        self._mapa = mapa
+        self._inicio = inicio
+        self._fim = fim
+        self.key, self.data = mapa._selecionar((inicio + fim) // 2)
+        self.height = (fim - inicio).bit_length()
+        self._esquerdo = self._direito = None
+
+    @property
+    def leftChild(self):
+        meio = (self._inicio + self._fim) // 2
+        if self._esquerdo is None and self._inicio < meio:
+            self._esquerdo = NoImplicito(self._mapa, self._inicio, meio)
+        return self._esquerdo
+
+    @property
+    def rightChild(self):
+        meio = (self._inicio + self._fim) // 2
+        if self._direito is None and meio + 1 < self._fim:
+            self._direito = NoImplicito(self._mapa, meio + 1, self._fim)
+        return self._direito
+
+
+class _MapaPorPosicao:
+    """
+    base das estruturas que sabem a posicao de uma chave e a chave de uma
+    posicao; implementa a arvore implicita, a subarvore e a recomendacao
+    """
+
+    def __init__(self):
+        self._raiz_implicita = None
+
+    def _alterado(self):
+        self._raiz_implicita = None
+
+    @property
+    def root(self):
+        """raiz da arvore implicita (a mesma ate a proxima alteracao)"""
+        if self._raiz_implicita is None and len(self) > 0:
+            self._raiz_implicita = NoImplicito(self, 0, len(self))
+        return self._raiz_implicita
+
+    def intervalo_subarvore(self, key):
+        """(menor, maior) chave da subarvore de `key` na arvore implicita, ou None"""
+        posicao = self._posicao(key)
+        if posicao is None:
+            return None
+        inicio, fim = 0, len(self)
+        while True:
+            meio = (inicio + fim) // 2
+            if posicao == meio:
+                return self._selecionar(inicio)[0], self._selecionar(fim - 1)[0]
+            if posicao < meio:
+                fim = meio
+            else:
+                inicio = meio + 1
+
+    def recommend(self, key):
+        """produtos da subarvore de `key` (dados no formato dict com 'produtos', como na AVL)"""
+        intervalo = self.intervalo_subarvore(key)
+        if intervalo is None:
+            return []
+        resultados = []
+        for _, data in self.itens(*intervalo):
+            if isinstance(data, dict) and data.get('produtos'):
+                resultados.extend(data['produtos'])
+        return resultados
+
+
+class _NoB:
+    __slots__ = ('chaves', 'dados', 'filhos', 'tamanho')
+
+    def __init__(self, chaves=None, dados=None, filhos=None):
+        self.chaves = chaves or []
+        self.dados = dados or []
+        self.filhos = filhos or []  # vazio na folha
+        self.tamanho = len(self.chaves) + sum(filho.tamanho for filho in self.filhos)
+
+
+class ArvoreB(_MapaPorPosicao):
+    """
+    arvore B (CLRS) com grau minimo `grau`: todo no fora a raiz tem de
+    grau-1 a 2*grau-1 chaves; divisoes e fusoes sao feitas na descida
+    """
+
+    def __init__(self, grau=32):
+        super().__init__()
+        if grau < 2:
+            raise ValueError("grau minimo da arvore B e 2")
+        self.grau = grau
+        self._raiz = _NoB()
+
+    def __len__(self):
+        return self._raiz.tamanho
+
+    def altura(self):
+        """niveis de nos da arvore B (nao da implicita)"""
+        niveis, no = 1, self._raiz
+        while no.filhos:
+            niveis, no = niveis + 1, no.filhos[0]
+        return niveis if self._raiz.chaves else 0
+
+    def find(self, key):
+        no = self._raiz
+        while True:
+            i = bisect_left(no.chaves, key)
+            if i < len(no.chaves) and no.chaves[i] == key:
+                return no.dados[i]
+            if not no.filhos:
+                return None
+            no = no.filhos[i]
+
+    def _substituir(self, key, data):
+        """troca o dado de uma chave existente; False se a chave nao existe"""
+        no = self._raiz
+        while True:
+            i = bisect_left(no.chaves, key)
+            if i < len(no.chaves) and no.chaves[i] == key:
+                no.dados[i] = data
+                return True
+            if not no.filhos:
+                return False
+            no = no.filhos[i]
+
+    def insert(self, key, data):
+        if self._substituir(key, data):
+            return
+        self._alterado()
+        cheio = 2 * self.grau - 1
+        if len(self._raiz.chaves) == cheio:
+            self._raiz = _NoB(filhos=[self._raiz])
+            self._dividir_filho(self._raiz, 0)
+        no = self._raiz
+        while True:
+            no.tamanho += 1
+            i = bisect_left(no.chaves, key)
+            if not no.filhos:
+                no.chaves.insert(i, key)
+                no.dados.insert(i, data)
+                return
+            if len(no.filhos[i].chaves) == cheio:
+                self._dividir_filho(no, i)
+                if key > no.chaves[i]:
+                    i += 1
+            no = no.filhos[i]
+
+    def _dividir_filho(self, pai, i):
+        """divide o filho cheio `i` de `pai`; a chave do meio sobe para `pai`"""
+        t = self.grau
+        filho = pai.filhos[i]
+        novo = _NoB(filho.chaves[t:], filho.dados[t:], filho.filhos[t:])
+        pai.chaves.insert(i, filho.chaves[t - 1])
+        pai.dados.insert(i, filho.dados[t - 1])
+        pai.filhos.insert(i + 1, novo)
+        del filho.chaves[t - 1:], filho.dados[t - 1:], filho.filhos[t:]
+        filho.tamanho -= novo.tamanho + 1
+
+    def delete(self, key):
+        if self._posicao(key) is None:
+            return
+        self._alterado()
+        self._remover(self._raiz, key)
+        if not self._raiz.chaves and self._raiz.filhos:
+            self._raiz = self._raiz.filhos[0]
+
+    def _remover(self, no, key):
+        """remove `key`, que esta na subarvore de `no` (que tem ao menos grau chaves ou e a raiz)"""
+        t = self.grau
+        while True:
+            i = bisect_left(no.chaves, key)
+            no.tamanho -= 1
+            if i < len(no.chaves) and no.chaves[i] == key:
+                if not no.filhos:
+                    del no.chaves[i], no.dados[i]
+                    return
+                esquerdo, direito = no.filhos[i], no.filhos[i + 1]
+                if len(esquerdo.chaves) >= t:
+                    # troca pelo antecessor e o remove da subarvore esquerda
+                    no.chaves[i], no.dados[i] = self._extremo(esquerdo, -1)
+                    no, key = esquerdo, no.chaves[i]
+                elif len(direito.chaves) >= t:
+                    no.chaves[i], no.dados[i] = self._extremo(direito, 0)
+                    no, key = direito, no.chaves[i]
+                else:
+                    self._fundir(no, i)
+                    no = esquerdo
+                continue
+            if len(no.filhos[i].chaves) < t:
+                i = self._reforcar(no, i)
+            no = no.filhos[i]
+
+    @staticmethod
+    def _extremo(no, lado):
+        """(chave, dado) menor (lado 0) ou maior (lado -1) da subarvore"""
+        while no.filhos:
+            no = no.filhos[lado]
+        return no.chaves[lado], no.dados[lado]
+
+    def _fundir(self, pai, i):
+        """junta o filho i+1 e a chave i de `pai` no filho i"""
+        esquerdo = pai.filhos[i]
+        direito = pai.filhos.pop(i + 1)
+        esquerdo.chaves.append(pai.chaves.pop(i))
+        esquerdo.dados.append(pai.dados.pop(i))
+        esquerdo.chaves += direito.chaves
+        esquerdo.dados += direito.dados
+        esquerdo.filhos += direito.filhos
+        esquerdo.tamanho += 1 + direito.tamanho
+
+    def _reforcar(self, pai, i):
+        """
+        garante grau chaves no filho `i` antes de descer nele, pegando uma
+        chave de um irmao ou fundindo com ele
+
+        returns
+            int indice do filho que agora contem o intervalo do antigo filho i
+        """
+        t = self.grau
+        filho = pai.filhos[i]
+        if i > 0 and len(pai.filhos[i - 1].chaves) >= t:
+            irmao = pai.filhos[i - 1]
+            filho.chaves.insert(0, pai.chaves[i - 1])
+            filho.dados.insert(0, pai.dados[i - 1])
+            pai.chaves[i - 1] = irmao.chaves.pop()
+            pai.dados[i - 1] = irmao.dados.pop()
+            movido = 0
+            if irmao.filhos:
+                neto = irmao.filhos.pop()
+                filho.filhos.insert(0, neto)
+                movido = neto.tamanho
+            filho.tamanho += 1 + movido
+            irmao.tamanho -= 1 + movido
+            return i
+        if i < len(pai.filhos) - 1 and len(pai.filhos[i + 1].chaves) >= t:
+            irmao = pai.filhos[i + 1]
+            filho.chaves.append(pai.chaves[i])
+            filho.dados.append(pai.dados[i])
+            pai.chaves[i] = irmao.chaves.pop(0)
+            pai.dados[i] = irmao.dados.pop(0)
+            movido = 0
+            if irmao.filhos:
+                neto = irmao.filhos.pop(0)
+                filho.filhos.append(neto)
+                movido = neto.tamanho
+            filho.tamanho += 1 + movido
+            irmao.tamanho -= 1 + movido
+            return i
+        if i < len(pai.filhos) - 1:
+            self._fundir(pai, i)
+            return i
+        self._fundir(pai, i - 1)
+        return i - 1
+
+    def _posicao(self, key):
+        """quantas chaves sao menores que `key`; None se `key` nao existe"""
+        posicao, no = 0, self._raiz
+        while True:
+            i = bisect_left(no.chaves, key)
+            if no.filhos:
+                posicao += sum(filho.tamanho for filho in no.filhos[:i])
+            posicao += i
+            if i < len(no.chaves) and no.chaves[i] == key:
+                return posicao + (no.filhos[i].tamanho if no.filhos else 0)
+            if not no.filhos:
+                return None
+            no = no.filhos[i]
+
+    def _selecionar(self, posicao):
+        """(chave, dado) na posicao (0 = menor chave)"""
+        no = self._raiz
+        while no.filhos:
+            for i, filho in enumerate(no.filhos):
+                if posicao < filho.tamanho:
+                    no = filho
+                    break
+                posicao -= filho.tamanho
+                if posicao == 0:
+                    return no.chaves[i], no.dados[i]
+                posicao -= 1
+        return no.chaves[posicao], no.dados[posicao]
+
+    def itens(self, inicio=None, fim=None):
+        """pares (chave, dado) em ordem com inicio <= chave <= fim (None: sem limite)"""
+        return self._itens(self._raiz, inicio, fim)
+
+    def _itens(self, no, inicio, fim):
+        menor = 0 if inicio is None else bisect_left(no.chaves, inicio)
+        maior = len(no.chaves) if fim is None else bisect_right(no.chaves, fim)
+        for i in range(menor, maior):
+            if no.filhos:
+                yield from self._itens(no.filhos[i], inicio, fim)
+            yield no.chaves[i], no.dados[i]
+        if no.filhos:
+            yield from self._itens(no.filhos[maior], inicio, fim)
+
+
+class ListaBlocos(_MapaPorPosicao):
+    """
+    lista ordenada em blocos (como o SortedList do sortedcontainers): cada
+    bloco tem ate 2*carga chaves e `_maximos` guarda a ultima chave de cada
+    um, entao a busca e um bisect nos maximos e outro dentro do bloco
+    """
+
+    def __init__(self, carga=256):
+        super().__init__()
+        if carga < 1:
+            raise ValueError("carga da lista em blocos deve ser positiva")
+        self.carga = carga
+        self._chaves = []
+        self._dados = []
+        self._maximos = []
+        self._tamanho = 0
+        self._inicios = None  # posicao da primeira chave de cada bloco, refeita sob demanda
+
+    def __len__(self):
+        return self._tamanho
+
+    def _alterado(self):
+        super()._alterado()
+        self._inicios = None
+
+    def _localizar(self, key):
+        """(bloco, indice) da primeira chave >= key; bloco None se nao houver"""
+        b = bisect_left(self._maximos, key)
+        if b == len(self._maximos):
+            return None, 0
+        return b, bisect_left(self._chaves[b], key)
+
+    def find(self, key):
+        b, i = self._localizar(key)
+        if b is not None and self._chaves[b][i] == key:
+            return self._dados[b][i]
+        return None
+
+    def insert(self, key, data):
+        b, i = self._localizar(key)
+        if b is not None and self._chaves[b][i] == key:
+            self._dados[b][i] = data
+            return
+        self._alterado()
+        self._tamanho += 1
+        if not self._chaves:
+            self._chaves.append([key])
+            self._dados.append([data])
+            self._maximos.append(key)
+            return
+        if b is None:
+            b = len(self._chaves) - 1
+            i = len(self._chaves[b])
+        chaves, dados = self._chaves[b], self._dados[b]
+        chaves.insert(i, key)
+        dados.insert(i, data)
+        self._maximos[b] = chaves[-1]
+        self._dividir_se_cheio(b)
+
+    def delete(self, key):
+        b, i = self._localizar(key)
+        if b is None or self._chaves[b][i] != key:
+            return
+        self._alterado()
+        self._tamanho -= 1
+        chaves, dados = self._chaves[b], self._dados[b]
+        del chaves[i], dados[i]
+        if not chaves:
+            del self._chaves[b], self._dados[b], self._maximos[b]
+            return
+        self._maximos[b] = chaves[-1]
+        # bloco pequeno demais: junta com o vizinho (e divide se passar do limite)
+        if len(chaves) < self.carga // 2 and len(self._chaves) > 1:
+            b = b if b + 1 < len(self._chaves) else b - 1
+            self._chaves[b] += self._chaves.pop(b + 1)
+            self._dados[b] += self._dados.pop(b + 1)
+            del self._maximos[b + 1]
+            self._maximos[b] = self._chaves[b][-1]
+            self._dividir_se_cheio(b)
+
+    def _dividir_se_cheio(self, b):
+        chaves, dados = self._chaves[b], self._dados[b]
+        if len(chaves) > 2 * self.carga:
+            metade = len(chaves) // 2
+            self._chaves.insert(b + 1, chaves[metade:])
+            self._dados.insert(b + 1, dados[metade:])
+            del chaves[metade:], dados[metade:]
+            self._maximos.insert(b, chaves[-1])
+
+    def _posicoes_iniciais(self):
+        if self._inicios is None:
+            inicios, total = [], 0
+            for bloco in self._chaves:
+                inicios.append(total)
+                total += len(bloco)
+            self._inicios = inicios
+        return self._inicios
+
+    def _posicao(self, key):
+        b, i = self._localizar(key)
+        if b is None or self._chaves[b][i] != key:
+            return None
+        return self._posicoes_iniciais()[b] + i
+
+    def _selecionar(self, posicao):
+        b = bisect_right(self._posicoes_iniciais(), posicao) - 1
+        i = posicao - self._inicios[b]
+        return self._chaves[b][i], self._dados[b][i]
+
+    def itens(self, inicio=None, fim=None):
+        """pares (chave, dado) em ordem com inicio <= chave <= fim (None: sem limite)"""
+        if inicio is None:
+            b, i = 0, 0
+        else:
+            b, i = self._localizar(inicio)
+            if b is None:
+                return
+        while b < len(self._chaves):
+            chaves, dados = self._chaves[b], self._dados[b]
+            ultimo = len(chaves) if fim is None else bisect_right(chaves, fim)
+            for j in range(i, ultimo):
+                yield chaves[j], dados[j]
+            if ultimo < len(chaves):
+                return
+            b, i = b + 1, 0
+
+    def itens_reversos(self, inicio=None, fim=None):
+        """como `itens`, da maior chave para a menor"""
+        if fim is None:
+            b = len(self._chaves) - 1
+        else:
+            b = bisect_right(self._maximos, fim)
+            b = min(b, len(self._chaves) - 1)
+        while b >= 0:
+            chaves, dados = self._chaves[b], self._dados[b]
+            ultimo = len(chaves) if fim is None else bisect_right(chaves, fim)
+            primeiro = 0 if inicio is None else bisect_left(chaves, inicio)
+            for j in range(ultimo - 1, primeiro - 1, -1):
+                yield chaves[j], dados[j]
+            if primeiro > 0:
+                return
+            b -= 1
+
+    def carregar_ordenados(self, chaves, dados):
+        """
+        troca o conteudo por `chaves` (ja ordenadas e unicas) e `dados`, em
+        blocos de `carga` chaves, sem as insercoes uma a uma
+        """
+        self._alterado()
+        passo = self.carga
+        self._chaves = [chaves[i:i + passo] for i in range(0, len(chaves), passo)]
+        self._dados = [dados[i:i + passo] for i in range(0, len(dados), passo)]
+        self._maximos = [bloco[-1] for bloco in self._chaves]
+        self._tamanho = len(chaves)
+
+
+# estruturas que podem guardar as categorias (SRHP_ESTRUTURA)
+ESTRUTURAS = {
+    'avl': AVLTree,
+    'arvore_b': ArvoreB,
+    'lista_blocos': ListaBlocos,
+}
+
+
+def criar_mapa(estrutura="avl"):
+    """
+    instancia a estrutura pelo nome
+
+    raises
+        ValueError se o nome nao estiver em ESTRUTURAS
+    """
+    if estrutura not in ESTRUTURAS:
+        raise ValueError(f"estrutura desconhecida: {estrutura} (opcoes: {', '.join(ESTRUTURAS)})")
+    return ESTRUTURAS[estrutura]()
@@ -0,0 +1,381 @@
+"""
+modulo de catalogo em memoria compartilhada entre processos
+um processo carregador publica o catalogo em um segmento de
+multiprocessing.shared_memory com layout plano e somente leitura; os workers
+mapeiam o segmento e navegam a AVL direto no buffer, sem copiar o catalogo
+"""
+
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+from src.avl_tree import AVLTree
+from src.models import Categoria, Produto
+from src.snapshot import _Leitor, _escrever_chave, _escrever_str, _NO, _PRODUTO
+
+
+MAGIC = b"SRHC"
+VERSAO_FORMATO = 1
+
+# cabecalho do segmento: magic, versao do formato, seq do log de alteracoes,
+# numero de nos, crc32 da tabela de nos + dados
+_CABECALHO = struct.Struct("<4sHQII")
+# tabela de nos (ordem pre-ordem): filho esquerdo, filho direito (-1 = nenhum),
+# offset do bloco de dados do no
+_REGISTRO_NO = struct.Struct("<iiQ")
+
+# diretorio: versao publicada (seqlock: impar = publicacao em andamento),
+# tamanho e nome do segmento atual
+_DIRETORIO = struct.Struct("<QQ48s")
+
+# limite padrao do cache de categorias decodificadas de cada worker, em
+# produtos (cada um custa ~600 bytes decodificado, com o json em cache)
+MAX_PRODUTOS_DECODIFICADOS = 20000
+
+
+def serializar_catalogo(sistema):
+    """
+    gera o layout plano do catalogo de `sistema`
+
+    os nos ficam numerados em pre-ordem, entao a subarvore de qualquer no e
+    um intervalo contiguo da tabela; cada registro aponta para um bloco com a
+    chave, a categoria e os produtos no mesmo formato do snapshot em arquivo
+    """
+    with sistema.trava.leitura():
+        ordem = []
+        if sistema.arvore_categorias.root is not None:
+            pilha = [sistema.arvore_categorias.root]
+            while pilha:
+                node = pilha.pop()
+                ordem.append(node)
+                if node.rightChild:
+                    pilha.append(node.rightChild)
+                if node.leftChild:
+                    pilha.append(node.leftChild)
+        indices = {id(node): i for i, node in enumerate(ordem)}
+
+        inicio_dados = _CABECALHO.size + _REGISTRO_NO.size * len(ordem)
+        registros = []
+        blocos = []
+        offset = inicio_dados
+        for node in ordem:
+            categoria = node.data
+            partes = [_NO.pack(0, node.height, len(categoria.produtos))]
+            _escrever_chave(partes, node.key)
+            _escrever_str(partes, categoria.nome)
+            _escrever_str(partes, categoria.descricao)
+            for produto in categoria.produtos:
+                partes.append(_PRODUTO.pack(produto.id, produto.preco, produto.avaliacao))
+                _escrever_str(partes, produto.nome)
+                _escrever_str(partes, produto.descricao)
+            bloco = b"".join(partes)
+
+            esquerda = indices[id(node.leftChild)] if node.leftChild else -1
+            direita = indices[id(node.rightChild)] if node.rightChild else -1
+            registros.append(_REGISTRO_NO.pack(esquerda, direita, offset))
+            blocos.append(bloco)
+            offset += len(bloco)
+        seq = sistema.seq_alteracoes
+
+    corpo = b"".join(registros) + b"".join(blocos)
+    cabecalho = _CABECALHO.pack(MAGIC, VERSAO_FORMATO, seq,
+                                len(ordem), zlib.crc32(corpo))
+    return cabecalho + corpo
+
+
+class CategoriasDecodificadas:
+    """
+    lru das categorias decodificadas de uma versao do segmento
+
+    o limite e em produtos (cada categoria conta 1 + len(produtos)), o que
+    pesa na memoria do worker; uma categoria maior que o limite inteiro e
+    devolvida sem entrar no cache. com o catalogo maior que o limite, uma
+    leitura da arvore inteira volta a decodificar as que sairam
+    """
+
+    def __init__(self, max_produtos=MAX_PRODUTOS_DECODIFICADOS):
+        self.max_produtos = max_produtos
+        self.produtos = 0
+        self._categorias = OrderedDict()  # indice do no -> Categoria, da menos para a mais recente
+        self._trava = threading.Lock()
+
+    def __len__(self):
+        return len(self._categorias)
+
+    def obter(self, indice, decodificar):
+        """devolve a categoria do no `indice`, chamando decodificar() se nao estiver no cache"""
+        with self._trava:
+            categoria = self._categorias.get(indice)
+            if categoria is not None:
+                self._categorias.move_to_end(indice)
+                return categoria
+        # fora da trava: duas leituras concorrentes podem decodificar o mesmo no; fica a ultima
+        categoria = decodificar()
+        peso = 1 + len(categoria.produtos)
+        if peso > self.max_produtos:
+            return categoria
+        with self._trava:
+            anterior = self._categorias.pop(indice, None)
+            if anterior is not None:
+                self.produtos -= 1 + len(anterior.produtos)
+            self._categorias[indice] = categoria
+            self.produtos += peso
+            while self.produtos > self.max_produtos:
+                _, removida = self._categorias.popitem(last=False)
+                self.produtos -= 1 + len(removida.produtos)
+        return categoria
+
+    def limpar(self):
+        with self._trava:
+            self._categorias.clear()
+            self.produtos = 0
+
+
+class NoCompartilhado:
+    """
+    no da AVL lido sob demanda do buffer compartilhado
+
+    expoe a mesma interface de leitura do AVLNode (key, data, height,
+    leftChild, rightChild), entao AVLTree.find e as travessias do
+    SistemaRecomendacao funcionam sem mudanca; os atributos nao tem setter,
+    o que torna a arvore somente leitura
+
+    a categoria de cada no e decodificada na primeira leitura e guardada no
+    lru da versao do segmento (CategoriasDecodificadas), compartilhado por
+    todos os nos dela: as leituras seguintes (e os fragmentos json em cache
+    da categoria e dos produtos) reaproveitam o mesmo objeto enquanto ele
+    estiver no cache
+    """
+
+    __slots__ = ("_buffer", "_indice", "_categorias")
+
+    def __init__(self, buffer, indice, categorias=None):
+        self._buffer = buffer
+        self._indice = indice
+        # categorias ja decodificadas, um cache por versao publicada
+        self._categorias = CategoriasDecodificadas() if categorias is None else categorias
+
+    def _registro(self):
+        return _REGISTRO_NO.unpack_from(self._buffer, _CABECALHO.size + _REGISTRO_NO.size * self._indice)
+
+    def _leitor(self):
+        leitor = _Leitor(self._buffer, self._registro()[2])
+        return leitor, leitor.ler(_NO)
+
+    @property
+    def key(self):
+        leitor, _ = self._leitor()
+        return leitor.ler_chave()
+
+    @property
+    def height(self):
+        _, (_, altura, _) = self._leitor()
+        return altura
+
+    @property
+    def data(self):
+        return self._categorias.obter(self._indice, self._decodificar)
+
+    def _decodificar(self):
+        leitor, (_, _, num_produtos) = self._leitor()
+        leitor.ler_chave()
+        categoria = Categoria(leitor.ler_str(), leitor.ler_str())
+        for _ in range(num_produtos):
+            produto_id, preco, avaliacao = leitor.ler(_PRODUTO)
+            nome = leitor.ler_str()
+            categoria.adicionar_produto(Produto(produto_id, nome, preco, leitor.ler_str(), avaliacao))
+        return categoria
+
+    @property
+    def leftChild(self):
+        esquerda = self._registro()[0]
+        return NoCompartilhado(self._buffer, esquerda, self._categorias) if esquerda >= 0 else None
+
+    @property
+    def rightChild(self):
+        direita = self._registro()[1]
+        return NoCompartilhado(self._buffer, direita, self._categorias) if direita >= 0 else None
+
+
+def _abrir_segmento(nome):
+    """anexa um segmento existente sem registra-lo no resource_tracker"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=nome, track=False)
+    segmento = shared_memory.SharedMemory(name=nome)
+    # antes do 3.13 o resource_tracker apagaria o segmento quando este
+    # processo (que so le) terminasse
+    from multiprocessing import resource_tracker
+    resource_tracker.unregister(segmento._name, "shared_memory")
+    return segmento
+
+
+class PublicadorCatalogo:
+    """
+    lado do processo carregador: publica versoes do catalogo
+
+    cada publicacao cria um segmento novo `<nome>-<versao>` e atualiza o
+    diretorio `<nome>` com um seqlock; os segmentos antigos sao removidos
+    depois de `manter` versoes (quem ja mapeou continua lendo normalmente)
+    """
+
+    def __init__(self, nome, manter=2):
+        self.nome = nome
+        self.manter = manter
+        self.versao = 0
+        self._segmentos = []
+        try:
+            self._diretorio = shared_memory.SharedMemory(name=nome, create=True, size=_DIRETORIO.size)
+        except FileExistsError:
+            # diretorio de uma execucao anterior: reaproveita e continua a contagem
+            self._diretorio = shared_memory.SharedMemory(name=nome)
+            self.versao = _DIRETORIO.unpack_from(self._diretorio.buf, 0)[0] & ~1
+
+    def publicar(self, sistema):
+        """
+        serializa `sistema` em um segmento novo e troca o diretorio para ele
+
+        returns
+            int versao publicada
+        """
+        dados = serializar_catalogo(sistema)
+        nova_versao = self.versao + 2
+        nome_segmento = f"{self.nome}-{nova_versao}"
+        segmento = shared_memory.SharedMemory(name=nome_segmento, create=True, size=len(dados))
+        segmento.buf[:len(dados)] = dados
+
+        buffer = self._diretorio.buf
+        struct.pack_into("<Q", buffer, 0, nova_versao - 1)  # impar: escrita em andamento
+        _DIRETORIO.pack_into(buffer, 0, nova_versao - 1, len(dados), nome_segmento.encode())
+        struct.pack_into("<Q", buffer, 0, nova_versao)
+        self.versao = nova_versao
+
+        self._segmentos.append(segmento)
+        while len(self._segmentos) > self.manter:
+            antigo = self._segmentos.pop(0)
+            antigo.close()
+            antigo.unlink()
+        return nova_versao
+
+    def encerrar(self):
+        """remove todos os segmentos e o diretorio"""
+        for segmento in self._segmentos:
+            segmento.close()
+            segmento.unlink()
+        self._segmentos = []
+        self._diretorio.close()
+        self._diretorio.unlink()
+
+
+class CatalogoCompartilhado:
+    """
+    lado do worker: acompanha o diretorio e troca a arvore do sistema para a
+    versao publicada mais recente
+
+    max_produtos limita as categorias decodificadas guardadas (veja
+    CategoriasDecodificadas)
+    """
+
+    def __init__(self, nome, max_produtos=MAX_PRODUTOS_DECODIFICADOS):
+        self.nome = nome
+        self.max_produtos = max_produtos
+        self.versao = 0
+        self._diretorio = None
+        self._segmento = None
+        self._antigos = []
+        # categorias decodificadas da versao atual (veja NoCompartilhado)
+        self._categorias = None
+
+    def _ler_diretorio(self):
+        """le o diretorio respeitando o seqlock; None se houver publicacao em andamento"""
+        if self._diretorio is None:
+            self._diretorio = _abrir_segmento(self.nome)
+        versao, tamanho, nome_segmento = _DIRETORIO.unpack_from(self._diretorio.buf, 0)
+        confirmacao = struct.unpack_from("<Q", self._diretorio.buf, 0)[0]
+        if versao & 1 or versao != confirmacao:
+            return None
+        return versao, tamanho, nome_segmento.rstrip(b"\0").decode()
+
+    def atualizar(self, sistema):
+        """
+        se houver versao nova publicada, mapeia o segmento e troca a arvore de
+        `sistema` por uma AVLTree somente leitura apoiada nele
+
+        returns
+            bool true se trocou de versao
+        """
+        try:
+            lido = self._ler_diretorio()
+        except FileNotFoundError:
+            return False
+        if lido is None or lido[0] == self.versao:
+            return False
+        versao, tamanho, nome_segmento = lido
+
+        try:
+            segmento = _abrir_segmento(nome_segmento)
+        except FileNotFoundError:
+            # ja foi substituido por outra versao; tenta de novo na proxima
+            return False
+        buffer = segmento.buf[:tamanho]
+        magic, formato, seq, total, crc = _CABECALHO.unpack_from(buffer, 0)
+        if magic != MAGIC or formato != VERSAO_FORMATO or zlib.crc32(buffer[_CABECALHO.size:]) != crc:
+            buffer.release()
+            segmento.close()
+            raise ValueError(f"segmento {nome_segmento} invalido")
+
+        categorias = CategoriasDecodificadas(self.max_produtos)
+        arvore = AVLTree()
+        arvore.root = NoCompartilhado(buffer, 0, categorias) if total > 0 else None
+
+        # troca atomica: leituras em andamento seguem com a arvore anterior;
+        # so a chave da raiz e conferida (o modo id precisaria decodificar o
+        # catalogo inteiro e e recusado)
+        try:
+            sistema.trocar_arvore(arvore, seq, verificar=False)
+        except ValueError:
+            arvore.root = None
+            buffer.release()
+            segmento.close()
+            raise
+
+        if self._segmento is not None:
+            self._antigos.append(self._segmento)
+        self._segmento = (segmento, buffer)
+        self.versao = versao
+        self._descartar_categorias(categorias)
+        self._liberar_antigos()
+        return True
+
+    def fechar(self):
+        """desfaz os mapeamentos deste worker (os segmentos continuam publicados)"""
+        self._descartar_categorias(None)
+        if self._segmento is not None:
+            self._antigos.append(self._segmento)
+            self._segmento = None
+        self._liberar_antigos()
+        if self._diretorio is not None:
+            self._diretorio.close()
+            self._diretorio = None
+
+    def _descartar_categorias(self, novas):
+        """
+        solta as categorias decodificadas da versao anterior; uma leitura
+        ainda em andamento nela volta a decodificar do buffer
+        """
+        if self._categorias is not None:
+            self._categorias.limpar()
+        self._categorias = novas
+
+    def _liberar_antigos(self):
+        """fecha os mapeamentos antigos que nao tem mais nos em uso"""
+        pendentes = []
+        for segmento, buffer in self._antigos:
+            try:
+                buffer.release()
+                segmento.close()
+            except BufferError:
+                pendentes.append((segmento, buffer))
+        self._antigos = pendentes
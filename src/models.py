@@ -2,21 +2,63 @@
 modelos de dominio para o sistema de recomendaçao de produtos
 """
 
+from src.serializacao import dumps, fragmento
+
+
 class Categoria:
     """representa uma categoria de produtos no marketplace"""
     
+    # campos que entram no fragmento json em cache
+    _CAMPOS_JSON = ('nome', 'descricao')
+    
     def __init__(self, nome, descricao=""):
+        self._json = None
         self.nome = nome
         self.descricao = descricao
         self.produtos = []  # lista de produtos desta categoria
+        self._indice_produtos = {}  # id -> posicao em produtos, para acesso e remocao O(1)
+    
+    def __setattr__(self, campo, valor):
+        # alterar um campo serializado invalida o fragmento json em cache
+        object.__setattr__(self, campo, valor)
+        if campo in self._CAMPOS_JSON:
+            object.__setattr__(self, '_json', None)
+    
+    def json_campos(self):
+        """
+        fragmento json `"nome":...,"descricao":...` (sem chaves) em cache,
+        para ser embutido nas respostas que descrevem a categoria
+        """
+        if self._json is None:
+            self._json = dumps({'nome': self.nome, 'descricao': self.descricao})[1:-1]
+        return self._json
     
     def adicionar_produto(self, produto):
-        """adiciona um produto a categoria"""
+        """adiciona um produto a categoria (um produto com o mesmo ID e substituido)"""
+        posicao = self._indice_produtos.get(produto.id)
+        if posicao is not None:
+            self.produtos[posicao] = produto
+            return
+        self._indice_produtos[produto.id] = len(self.produtos)
         self.produtos.append(produto)
     
     def remover_produto(self, produto_id):
-        """remove um produto da categoria pelo ID"""
-        self.produtos = [p for p in self.produtos if p.id != produto_id]
+        """
+        remove um produto da categoria pelo ID em O(1): o ultimo produto da
+        lista ocupa a posicao do removido (a ordem da lista nao e preservada)
+        """
+        posicao = self._indice_produtos.pop(produto_id, None)
+        if posicao is None:
+            return
+        ultimo = self.produtos.pop()
+        if posicao < len(self.produtos):
+            self.produtos[posicao] = ultimo
+            self._indice_produtos[ultimo.id] = posicao
+    
+    def buscar_produto(self, produto_id):
+        """retorna o produto com o ID informado ou None"""
+        posicao = self._indice_produtos.get(produto_id)
+        return None if posicao is None else self.produtos[posicao]
     
     def __repr__(self):
         return f"categoria(nome='{self.nome}', produtos={len(self.produtos)})"
@@ -25,12 +67,34 @@ class Categoria:
 class Produto:
     """representa um produto no marketplace"""
     
+    # campos que entram no fragmento json em cache
+    _CAMPOS_JSON = ('id', 'nome', 'preco', 'descricao', 'avaliacao')
+    
     def __init__(self, id, nome, preco, descricao="", avaliacao=0.0):
+        self._json = None
         self.id = id
         self.nome = nome
         self.preco = preco
         self.descricao = descricao
         self.avaliacao = avaliacao  # nota de 0 a 5
     
+    def __setattr__(self, campo, valor):
+        # alterar um campo serializado invalida o fragmento json em cache
+        object.__setattr__(self, campo, valor)
+        if campo in self._CAMPOS_JSON:
+            object.__setattr__(self, '_json', None)
+    
+    def json_bytes(self):
+        """json do produto (id, nome, preco, descricao, avaliacao) em cache"""
+        if self._json is None:
+            self._json = fragmento({
+                'id': self.id,
+                'nome': self.nome,
+                'preco': self.preco,
+                'descricao': self.descricao,
+                'avaliacao': self.avaliacao
+            })
+        return self._json
+    
     def __repr__(self):
         return f"produto(id={self.id}, nome='{self.nome}', preco=R${self.preco:.2f})"
\ No newline at end of file
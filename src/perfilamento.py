@@ -0,0 +1,230 @@
+"""
+modulo de perfilamento sob demanda das requisicoes
+uma requisicao a cada N (ou a que vier com o cabecalho de perfil) roda sob
+cProfile e tracemalloc; os resultados ficam em um buffer circular com os
+ultimos registros e podem ser baixados em texto ou no formato do pstats
+
+desligado (SRHP_PERFIL=0) o app nem registra o middleware nem as rotas
+/debug, entao nao ha custo nenhum por requisicao
+
+limitacoes
+    - so um perfil por vez: enquanto uma requisicao e perfilada, as outras
+      sorteadas passam direto (contadas em `ignoradas_ocupado`)
+    - o cProfile mede a thread do event loop: o que outras requisicoes
+      rodarem no loop durante o `await` tambem entra no perfil, e handlers
+      sincronos (threadpool) ficam de fora
+    - o tracemalloc mostra o pico da requisicao e o que ainda estava alocado
+      no fim dela (o que foi liberado antes nao aparece por linha)
+"""
+
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime, timezone
+
+# o relatorio agrupa por linha, entao basta o quadro mais recente de cada
+# alocacao (mais quadros deixam a requisicao perfilada bem mais lenta)
+QUADROS_TRACEMALLOC = 1
+LINHAS_ALOCACAO = 50
+
+# alocacoes do proprio rastreamento nao interessam; o filtro e aplicado nas
+# estatisticas ja agrupadas por linha (filter_traces no snapshot inteiro custa
+# mais que a requisicao)
+ARQUIVOS_IGNORADOS = frozenset({
+    tracemalloc.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+})
+
+
+class Perfilador:
+    """amostragem 1 a cada N, perfil de cpu e de memoria e buffer circular dos registros"""
+
+    def __init__(self, amostragem=0, cabecalho="x-perfil", capacidade=50,
+                 ignorar=("/debug/", "/static/")):
+        """
+        args
+            amostragem (int) perfila 1 requisicao a cada N; 0 so pelo cabecalho
+            cabecalho (str) requisicao com esse cabecalho (valor nao vazio) e sempre perfilada
+            capacidade (int) registros guardados; os mais antigos saem primeiro
+            ignorar (tuple) prefixos de caminho que nunca sao perfilados
+        """
+        self.amostragem = amostragem
+        self.cabecalho = cabecalho.lower()
+        self.ignorar = ignorar
+        self.registros = deque(maxlen=capacidade)
+        self._contador = itertools.count(1)
+        self._ids = itertools.count(1)
+        self._trava = threading.Lock()
+
+        # metricas
+        self.perfiladas = 0
+        self.ignoradas_ocupado = 0
+
+    def motivo(self, caminho, cabecalhos):
+        """'cabecalho', 'amostra' ou None se a requisicao nao deve ser perfilada"""
+        if caminho.startswith(self.ignorar):
+            return None
+        if cabecalhos.get(self.cabecalho):
+            return "cabecalho"
+        if self.amostragem > 0 and next(self._contador) % self.amostragem == 0:
+            return "amostra"
+        return None
+
+    async def perfilar(self, executar, metodo, caminho, motivo):
+        """
+        aguarda `executar()` sob cProfile e tracemalloc e guarda o registro
+
+        returns
+            (resposta, registro) registro e None se outro perfil estava em andamento
+        """
+        if not self._trava.acquire(blocking=False):
+            self.ignoradas_ocupado += 1
+            return await executar(), None
+
+        try:
+            ja_rastreando = tracemalloc.is_tracing()
+            if not ja_rastreando:
+                tracemalloc.start(QUADROS_TRACEMALLOC)
+            antes = tracemalloc.take_snapshot() if ja_rastreando else None
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            perfil = cProfile.Profile()
+
+            inicio = time.perf_counter()
+            perfil.enable()
+            try:
+                resposta = await executar()
+            finally:
+                perfil.disable()
+                duracao = time.perf_counter() - inicio
+                retido, pico = tracemalloc.get_traced_memory()
+                depois = tracemalloc.take_snapshot()
+                if not ja_rastreando:
+                    tracemalloc.stop()
+
+            if antes is not None:
+                alocacoes = depois.compare_to(antes, "lineno")
+            else:
+                alocacoes = depois.statistics("lineno")
+            alocacoes = [estatistica for estatistica in alocacoes
+                         if estatistica.traceback[0].filename not in ARQUIVOS_IGNORADOS]
+
+            perfil.create_stats()
+            registro = {
+                'id': next(self._ids),
+                'metodo': metodo,
+                'caminho': caminho,
+                'motivo': motivo,
+                'status': resposta.status_code,
+                'inicio': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                'duracao_ms': round(1000 * duracao, 3),
+                'pico_kib': round((pico - base) / 1024, 1),
+                'retido_kib': round((retido - base) / 1024, 1),
+                'perfil': perfil.stats,
+                'alocacoes': [
+                    {'linha': str(estatistica.traceback[0]), 'bytes': estatistica.size,
+                     'blocos': estatistica.count}
+                    for estatistica in alocacoes[:LINHAS_ALOCACAO]
+                ]
+            }
+            self.registros.append(registro)
+            self.perfiladas += 1
+            return resposta, registro
+        finally:
+            self._trava.release()
+
+    def _selecionar(self, ids=None):
+        registros = list(self.registros)
+        if ids:
+            registros = [registro for registro in registros if registro['id'] in ids]
+        return registros
+
+    def resumo(self):
+        """registros guardados, sem o perfil e as alocacoes"""
+        return [{k: v for k, v in registro.items() if k not in ('perfil', 'alocacoes')}
+                for registro in self.registros]
+
+    def estatisticas(self, ids=None):
+        """pstats.Stats somando os perfis escolhidos (todos, sem ids); None se nao houver"""
+        registros = self._selecionar(ids)
+        if not registros:
+            return None
+        saida = io.StringIO()
+        estatisticas = pstats.Stats(_PerfilPronto(registros[0]['perfil']), stream=saida)
+        for registro in registros[1:]:
+            estatisticas.add(_PerfilPronto(registro['perfil']))
+        return estatisticas
+
+    def texto_perfil(self, ids=None, ordenar="cumulative", limite=40):
+        """relatorio do pstats em texto, com o cabecalho dos registros somados"""
+        estatisticas = self.estatisticas(ids)
+        if estatisticas is None:
+            return "nenhum registro de perfil\n"
+        registros = self._selecionar(ids)
+        linhas = [f"{len(registros)} requisicoes perfiladas"]
+        linhas += [f"  #{r['id']} {r['metodo']} {r['caminho']} {r['status']} "
+                   f"{r['duracao_ms']:.1f} ms ({r['motivo']}, {r['inicio']})" for r in registros]
+        estatisticas.stream = io.StringIO()
+        estatisticas.sort_stats(ordenar).print_stats(limite)
+        return "\n".join(linhas) + "\n" + estatisticas.stream.getvalue()
+
+    def bytes_pstats(self, ids=None):
+        """perfis somados no formato de arquivo do pstats (pstats.Stats(arquivo), snakeviz)"""
+        estatisticas = self.estatisticas(ids)
+        return marshal.dumps(estatisticas.stats) if estatisticas is not None else None
+
+    def alocacoes(self, ids=None, limite=40):
+        """linhas com mais bytes somando os registros escolhidos, da maior para a menor"""
+        total = {}
+        for registro in self._selecionar(ids):
+            for alocacao in registro['alocacoes']:
+                bytes_, blocos = total.get(alocacao['linha'], (0, 0))
+                total[alocacao['linha']] = (bytes_ + alocacao['bytes'], blocos + alocacao['blocos'])
+        ordenadas = sorted(total.items(), key=lambda item: abs(item[1][0]), reverse=True)
+        return [{'linha': linha, 'bytes': bytes_, 'blocos': blocos}
+                for linha, (bytes_, blocos) in ordenadas[:limite]]
+
+    def texto_alocacoes(self, ids=None, limite=40):
+        """alocacoes em texto, com o pico de memoria de cada registro"""
+        registros = self._selecionar(ids)
+        if not registros:
+            return "nenhum registro de alocacao\n"
+        linhas = [f"{len(registros)} requisicoes perfiladas"]
+        linhas += [f"  #{r['id']} {r['metodo']} {r['caminho']} pico {r['pico_kib']:.1f} KiB, "
+                   f"retido {r['retido_kib']:.1f} KiB" for r in registros]
+        linhas.append("")
+        linhas.append(f"{'KiB':>10} {'blocos':>8}  linha")
+        for alocacao in self.alocacoes(ids, limite):
+            linhas.append(f"{alocacao['bytes'] / 1024:>10.1f} {alocacao['blocos']:>8}  {alocacao['linha']}")
+        return "\n".join(linhas) + "\n"
+
+    def metricas(self):
+        return {
+            'amostragem': self.amostragem,
+            'cabecalho': self.cabecalho,
+            'capacidade': self.registros.maxlen,
+            'registros': len(self.registros),
+            'perfiladas': self.perfiladas,
+            'ignoradas_ocupado': self.ignoradas_ocupado
+        }
+
+
+class _PerfilPronto:
+    """
+    adapta o dict de um cProfile ja coletado para o pstats.Stats (que chama
+    create_stats); a copia protege o registro, que o Stats.add altera no lugar
+    """
+
+    def __init__(self, stats):
+        self.stats = dict(stats)
+
+    def create_stats(self):
+        pass
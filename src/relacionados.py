@@ -0,0 +1,452 @@
+"""
+modulo de produtos relacionados item a item
+eventos de visualizacao e compra agrupados por sessao formam vetores esparsos
+produto x sessao; uma tarefa em segundo plano leva para a matriz de
+coocorrencias so as sessoes que mudaram desde a rodada anterior, recalcula a
+similaridade (cosseno ou jaccard) dos produtos cujas linhas mudaram e guarda
+os N vizinhos mais parecidos de cada um em uma tabela compacta de arrays
+
+a consulta so le a tabela pronta: busca binaria pelo id e fatia de N vizinhos;
+o recalculo monta uma tabela nova (copiando em bloco os trechos sem mudanca)
+e troca a referencia, entao as leituras nao esperam por ele
+"""
+
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+# peso de cada tipo de evento no vetor da sessao (o maior vale se o produto
+# aparece mais de uma vez na mesma sessao)
+PESOS_EVENTO = {'visualizacao': 1.0, 'compra': 3.0}
+MEDIDAS = ("cosseno", "jaccard")
+
+# celulas e normas abaixo disto sao zero (sobra de ponto flutuante ao descontar)
+ZERO = 1e-9
+
+# produtos guardados por sessao (os mais recentes): levar uma sessao para a
+# matriz custa O(L^2)
+MAX_ITENS_SESSAO = 20
+
+
+class TabelaVizinhos:
+    """
+    vizinhos de cada produto em formato csr: `ids` ordenados, `inicios[i]`
+    a posicao da lista do i-esimo id em `vizinhos`/`notas` (com um inicio a
+    mais no fim), sem um objeto python por vizinho
+    """
+
+    __slots__ = ('ids', 'inicios', 'vizinhos', 'notas')
+
+    def __init__(self, ids=(), inicios=(0,), vizinhos=(), notas=()):
+        self.ids = array('q', ids)
+        self.inicios = array('q', inicios)
+        self.vizinhos = array('q', vizinhos)
+        self.notas = array('f', notas)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def vizinhos_de(self, produto_id, limite=None):
+        """
+        [(id, similaridade)] do mais parecido para o menos
+
+        complexidade O(log P + N) para P produtos com vizinhos
+        """
+        i = bisect_left(self.ids, produto_id)
+        if i == len(self.ids) or self.ids[i] != produto_id:
+            return []
+        inicio, fim = self.inicios[i], self.inicios[i + 1]
+        if limite is not None:
+            fim = min(fim, inicio + limite)
+        return list(zip(self.vizinhos[inicio:fim], self.notas[inicio:fim]))
+
+    def tamanho_bytes(self):
+        return sum(len(a) * a.itemsize for a in (self.ids, self.inicios, self.vizinhos, self.notas))
+
+    def atualizada(self, novas):
+        """
+        copia da tabela com as listas de `novas` (id -> [(vizinho, nota)]; lista
+        vazia tira o id) no lugar das antigas; os trechos entre os ids de
+        `novas` sao copiados em bloco
+
+        complexidade O(P + V) copiando arrays, mais o tamanho de `novas`
+        """
+        tabela = TabelaVizinhos()
+        anterior = 0
+        for produto in sorted(novas):
+            i = bisect_left(self.ids, produto, anterior)
+            self._copiar(tabela, anterior, i)
+            lista = novas[produto]
+            if lista:
+                tabela.ids.append(produto)
+                for vizinho, nota in lista:
+                    tabela.vizinhos.append(vizinho)
+                    tabela.notas.append(nota)
+                tabela.inicios.append(len(tabela.vizinhos))
+            anterior = i + 1 if i < len(self.ids) and self.ids[i] == produto else i
+        self._copiar(tabela, anterior, len(self.ids))
+        return tabela
+
+    def _copiar(self, tabela, de, ate):
+        """acrescenta a `tabela` as listas dos ids nas posicoes [de, ate)"""
+        if de >= ate:
+            return
+        inicio, fim = self.inicios[de], self.inicios[ate]
+        deslocamento = len(tabela.vizinhos) - inicio
+        tabela.ids.extend(self.ids[de:ate])
+        tabela.vizinhos.extend(self.vizinhos[inicio:fim])
+        tabela.notas.extend(self.notas[inicio:fim])
+        tabela.inicios.extend(array('q', (posicao + deslocamento for posicao in self.inicios[de + 1:ate + 1])))
+
+
+class MatrizCoocorrencias:
+    """
+    linhas da matriz esparsa e simetrica de coocorrencias produto x produto e
+    a norma de cada produto, com as sessoes como estavam na ultima
+    atualizacao; `tocados` sao os produtos com a linha ou a norma mudada
+
+    cosseno: a celula soma o produto dos pesos nas sessoes em comum e a norma
+    a soma dos quadrados; jaccard: pesos ignorados, a celula conta as sessoes
+    em comum e a norma as sessoes do produto
+    """
+
+    __slots__ = ('cosseno', 'linhas', 'normas', 'sessoes', 'tocados')
+
+    def __init__(self, medida="cosseno"):
+        if medida not in MEDIDAS:
+            raise ValueError(f"medida desconhecida {medida!r} (opcoes: {', '.join(MEDIDAS)})")
+        self.cosseno = medida == "cosseno"
+        self.linhas = {}   # produto -> {outro: valor}
+        self.normas = {}   # produto -> norma ao quadrado
+        self.sessoes = {}  # sessao -> {produto: peso} ja somado na matriz
+        self.tocados = set()
+
+    def atualizar_sessao(self, sessao, itens):
+        """
+        leva a sessao para a matriz com os itens atuais {produto: peso}; vazio
+        tira a sessao
+
+        complexidade O(L) por item que entrou, saiu ou mudou de peso em uma
+        sessao de L itens (O(L^2) para uma sessao nova ou removida)
+        """
+        aplicados = self.sessoes.pop(sessao, None)
+        if aplicados is None:
+            if itens:
+                self._somar_sessao(itens)
+                self.sessoes[sessao] = dict(itens)
+            return
+        for produto in [produto for produto in aplicados if produto not in itens]:
+            self._mudar(aplicados, produto, aplicados.pop(produto), 0.0)
+        for produto, peso in itens.items():
+            antigo = aplicados.pop(produto, 0.0)
+            self._mudar(aplicados, produto, antigo, peso)
+            aplicados[produto] = peso
+        if aplicados:
+            self.sessoes[sessao] = aplicados
+
+    def _somar_sessao(self, itens):
+        """sessao nova inteira: cada par uma vez, sem descontar nada"""
+        pares = list(itens.items()) if self.cosseno else [(produto, 1.0) for produto in itens]
+        normas, linhas = self.normas, self.linhas
+        for produto, peso in pares:
+            normas[produto] = normas.get(produto, 0.0) + peso * peso
+        self.tocados.update(itens)
+        # sessao de um produto so nao gera par (nem linha vazia na tabela)
+        if len(pares) < 2:
+            return
+        for produto, peso in pares:
+            linha = linhas.get(produto)
+            if linha is None:
+                linha = linhas[produto] = {}
+            for outro, peso_outro in pares:
+                if outro != produto:
+                    linha[outro] = linha.get(outro, 0.0) + peso * peso_outro
+
+    def _mudar(self, outros, produto, antigo, novo):
+        """o peso de `produto` na sessao de `outros` {id: peso} passa de `antigo` para `novo`"""
+        if not self.cosseno:
+            antigo, novo = float(antigo > 0), float(novo > 0)
+        delta = novo - antigo
+        if delta == 0:
+            return
+        norma = self.normas.get(produto, 0.0) + novo * novo - antigo * antigo
+        if norma > ZERO:
+            self.normas[produto] = norma
+        else:
+            self.normas.pop(produto, None)
+        self.tocados.add(produto)
+        if not outros:
+            return
+
+        linhas = self.linhas
+        linha = linhas.get(produto)
+        if linha is None:
+            linha = linhas[produto] = {}
+        for outro, peso in outros.items():
+            valor = delta * peso if self.cosseno else delta
+            # celulas que voltam a zero saem (itens e sessoes removidos)
+            total = linha.get(outro, 0.0) + valor
+            if abs(total) > ZERO:
+                linha[outro] = total
+            else:
+                linha.pop(outro, None)
+            linha_outro = linhas.get(outro)
+            if linha_outro is None:
+                linha_outro = linhas[outro] = {}
+            total = linha_outro.get(produto, 0.0) + valor
+            if abs(total) > ZERO:
+                linha_outro[produto] = total
+            else:
+                linha_outro.pop(produto, None)
+                if not linha_outro:
+                    del linhas[outro]
+        if not linha:
+            del linhas[produto]
+        self.tocados.update(outros)
+
+    def retirar_tocados(self):
+        """produtos tocados desde a ultima chamada"""
+        tocados = self.tocados
+        self.tocados = set()
+        return tocados
+
+
+def melhores_vizinhos(linha, norma, normas, n, cosseno=True):
+    """
+    os `n` vizinhos [(id, similaridade)] de um produto a partir da linha
+    {outro: valor} e das normas, do mais parecido para o menos
+
+    complexidade O(d log n) para d coocorrencias
+    """
+    if cosseno:
+        pontuados = ((valor / math.sqrt(norma * normas[outro]), outro) for outro, valor in linha.items())
+    else:
+        # com pesos 1 a norma e o numero de sessoes do produto
+        pontuados = ((valor / (norma + normas[outro] - valor), outro) for outro, valor in linha.items())
+    # empate: o menor id primeiro
+    return [(outro, nota) for nota, outro in heapq.nsmallest(n, pontuados, key=lambda par: (-par[0], par[1]))]
+
+
+def calcular_vizinhos(sessoes, n=10, medida="cosseno"):
+    """
+    tabela com os `n` vizinhos mais parecidos de cada produto
+
+    cosseno: soma dos produtos dos pesos nas sessoes em comum sobre o produto
+    das normas; jaccard: sessoes em comum sobre sessoes com um ou outro
+    (pesos ignorados). so pares que dividem alguma sessao entram na matriz
+
+    args
+        sessoes (iteravel) dicts produto_id -> peso, um por sessao
+        n (int) vizinhos guardados por produto
+        medida (str) cosseno ou jaccard
+
+    complexidade O(soma de L^2) para sessoes de L produtos mais O(d log n)
+    por produto com d coocorrencias
+    """
+    matriz = MatrizCoocorrencias(medida)
+    for sessao, itens in enumerate(sessoes):
+        matriz.atualizar_sessao(sessao, itens)
+    return TabelaVizinhos().atualizada({
+        produto: melhores_vizinhos(linha, matriz.normas[produto], matriz.normas, n, matriz.cosseno)
+        for produto, linha in matriz.linhas.items()
+    })
+
+
+class MotorRelacionados:
+    """
+    sessoes recentes em memoria, ingestao de eventos (lista ou arquivo jsonl
+    acompanhado pelo offset), a matriz de coocorrencias (de posse do
+    recalculo) e a tabela de vizinhos publicada
+
+    o recalculo parcial refaz so as listas dos produtos com a linha ou a norma
+    mudada; a lista de um produto cujos vizinhos apenas ficaram mais (ou
+    menos) populares fica com as notas antigas ate o proximo recalculo
+    completo, feito a cada `completo_a_cada` parciais ou na primeira rodada
+    sem eventos novos
+    """
+
+    def __init__(self, n=10, medida="cosseno", max_sessoes=100_000, pesos=None, completo_a_cada=10):
+        """
+        args
+            n (int) vizinhos por produto
+            medida (str) cosseno ou jaccard
+            max_sessoes (int) sessoes guardadas; as menos recentes saem primeiro
+            pesos (dict) tipo de evento -> peso (padrao PESOS_EVENTO)
+            completo_a_cada (int) recalculos parciais entre dois completos
+        """
+        if medida not in MEDIDAS:
+            raise ValueError(f"medida desconhecida {medida!r} (opcoes: {', '.join(MEDIDAS)})")
+        self.n = n
+        self.medida = medida
+        self.max_sessoes = max_sessoes
+        self.pesos = dict(PESOS_EVENTO if pesos is None else pesos)
+        self.tabela = TabelaVizinhos()
+        self.completo_a_cada = completo_a_cada
+        self._sessoes = OrderedDict()  # sessao -> {produto_id: peso}, a mais recente no fim
+        self._sujas = set()  # sessoes mudadas (ou removidas) desde o ultimo recalculo
+        self._matriz = MatrizCoocorrencias(medida)
+        self._parciais = 0  # recalculos parciais desde o ultimo completo
+        self._posicoes = {}  # arquivo -> bytes ja lidos
+        self._trava = threading.Lock()
+        # um recalculo por vez: a matriz e a tabela so mudam sob esta trava
+        self._trava_recalculo = threading.Lock()
+
+        # metricas
+        self.eventos = 0
+        self.eventos_invalidos = 0
+        self.recalculos = 0
+        self.ultimo_recalculo_ms = None
+        self.recalculos_completos = 0
+        self.ultimos_recalculados = 0
+
+    def registrar(self, eventos):
+        """
+        agrega eventos {'sessao', 'produto_id', 'tipo'} nas sessoes, em O(1)
+        por evento; a matriz so recebe as sessoes mudadas no recalculo
+
+        returns
+            int eventos aceitos (os invalidos sao contados e ignorados)
+        """
+        aceitos = 0
+        with self._trava:
+            for evento in eventos:
+                try:
+                    sessao = evento['sessao']
+                    produto_id = evento['produto_id']
+                    peso = self.pesos[evento.get('tipo', 'visualizacao')]
+                except (KeyError, TypeError, AttributeError):
+                    self.eventos_invalidos += 1
+                    continue
+                if type(produto_id) is not int or not isinstance(sessao, (str, int)):
+                    self.eventos_invalidos += 1
+                    continue
+
+                itens = self._sessoes.pop(sessao, None)
+                if itens is None:
+                    itens = {}
+                peso = max(peso, itens.pop(produto_id, 0.0))
+                itens[produto_id] = peso
+                if len(itens) > MAX_ITENS_SESSAO:
+                    del itens[next(iter(itens))]
+                self._sessoes[sessao] = itens
+                self._sujas.add(sessao)
+                if len(self._sessoes) > self.max_sessoes:
+                    self._sujas.add(self._sessoes.popitem(last=False)[0])
+                aceitos += 1
+            self.eventos += aceitos
+        return aceitos
+
+    def ingerir_arquivo(self, caminho):
+        """
+        le as linhas completas acrescentadas a `caminho` desde a ultima leitura
+        (um evento json por linha); arquivo menor que o offset e tratado como
+        rotacionado e relido do inicio
+
+        returns
+            int eventos aceitos
+        """
+        try:
+            tamanho = os.path.getsize(caminho)
+        except FileNotFoundError:
+            return 0
+        posicao = self._posicoes.get(caminho, 0)
+        if tamanho < posicao:
+            posicao = 0
+        if tamanho == posicao:
+            return 0
+
+        with open(caminho, "rb") as arquivo:
+            arquivo.seek(posicao)
+            dados = arquivo.read(tamanho - posicao)
+        # a ultima linha pode estar pela metade: fica para a proxima leitura
+        completo = dados.rfind(b"\n") + 1
+        self._posicoes[caminho] = posicao + completo
+
+        eventos = []
+        for linha in dados[:completo].splitlines():
+            if not linha.strip():
+                continue
+            try:
+                eventos.append(json.loads(linha))
+            except ValueError:
+                with self._trava:
+                    self.eventos_invalidos += 1
+        return self.registrar(eventos)
+
+    def recalcular(self, forcar=False):
+        """
+        leva as sessoes mudadas para a matriz e publica uma tabela nova com as
+        listas refeitas dos produtos tocados; sob a trava dos eventos so as
+        sessoes mudadas sao copiadas, o resto roda fora dela
+
+        o recalculo e completo (todas as listas) com forcar, a cada
+        `completo_a_cada` parciais ou quando nao chegaram eventos mas ha
+        listas com notas antigas
+
+        returns
+            bool true se publicou uma tabela nova
+
+        complexidade O(L) por item mudado em cada sessao mudada mais O(d log n)
+        por produto refeito com d coocorrencias e O(P) para copiar a tabela
+        """
+        with self._trava_recalculo:
+            with self._trava:
+                sujas = {sessao: dict(self._sessoes.get(sessao, ())) for sessao in self._sujas}
+                self._sujas = set()
+            if not sujas and not forcar and not self._parciais:
+                return False
+
+            inicio = time.perf_counter()
+            matriz = self._matriz
+            for sessao, itens in sujas.items():
+                matriz.atualizar_sessao(sessao, itens)
+            tocados = matriz.retirar_tocados()
+            completo = forcar or not sujas or self._parciais >= self.completo_a_cada
+            if completo:
+                tocados.update(matriz.linhas, self.tabela.ids)
+            if not tocados:
+                return False
+
+            normas = matriz.normas
+            novas = {produto: melhores_vizinhos(matriz.linhas[produto], normas[produto], normas, self.n,
+                                                matriz.cosseno)
+                     if produto in matriz.linhas else [] for produto in tocados}
+            self.tabela = self.tabela.atualizada(novas)
+            # sem listas de fora dos tocados, nenhuma ficou com notas antigas
+            if completo or matriz.linhas.keys() <= tocados:
+                self._parciais = 0
+                self.recalculos_completos += 1
+            else:
+                self._parciais += 1
+            self.recalculos += 1
+            self.ultimos_recalculados = len(novas)
+            self.ultimo_recalculo_ms = round(1000 * (time.perf_counter() - inicio), 1)
+            return True
+
+    def relacionados(self, produto_id, limite=None):
+        """[(id, similaridade)] da tabela publicada, em O(log P + N)"""
+        return self.tabela.vizinhos_de(produto_id, limite)
+
+    def metricas(self):
+        with self._trava:
+            sessoes = len(self._sessoes)
+        return {
+            'medida': self.medida,
+            'vizinhos_por_produto': self.n,
+            'sessoes': sessoes,
+            'eventos': self.eventos,
+            'eventos_invalidos': self.eventos_invalidos,
+            'recalculos': self.recalculos,
+            'recalculos_completos': self.recalculos_completos,
+            'ultimo_recalculo_ms': self.ultimo_recalculo_ms,
+            'ultimos_recalculados': self.ultimos_recalculados,
+            'produtos_com_vizinhos': len(self.tabela),
+            'bytes_tabela': self.tabela.tamanho_bytes()
+        }
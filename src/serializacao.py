@@ -0,0 +1,42 @@
+"""
+modulo de serializacao json para as respostas da api
+usa orjson quando estiver instalado e cai para o json da biblioteca padrao,
+gerando o mesmo formato compacto do JSONResponse do starlette
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # dependencia opcional
+    orjson = None
+
+
+def dumps(valor):
+    """codifica `valor` em json utf-8 (bytes)"""
+    if orjson is not None:
+        return orjson.dumps(valor)
+    return json.dumps(valor, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def fragmento(valor):
+    """
+    como `dumps`, para fragmentos guardados em cache: o bytes do orjson fica
+    com o buffer de trabalho inteiro alocado (~1 KiB mesmo para 100 bytes de
+    json), entao o fragmento e copiado para um bytes do tamanho exato
+    """
+    codificado = dumps(valor)
+    if orjson is not None:
+        return memoryview(codificado).tobytes()
+    return codificado
+
+
+def juntar_lista(fragmentos):
+    """monta um array json a partir de fragmentos ja codificados"""
+    return b"[" + b",".join(fragmentos) + b"]"
+
+
+def produtos_json(produtos):
+    """array json dos produtos, reaproveitando o fragmento guardado em cada um"""
+    return juntar_lista([produto.json_bytes() for produto in produtos])
@@ -0,0 +1,247 @@
+"""
+modulo de snapshot binario do catalogo em memoria
+salva a forma da arvore AVL e todos os dados de categorias e produtos em um
+arquivo compacto, versionado e com checksum, para reinicios rapidos
+"""
+
+import mmap
+import os
+import struct
+import zlib
+
+from src.avl_tree import AVLNode, AVLTree
+from src.models import Categoria, Produto
+
+
+MAGIC = b"SRHP"
+VERSAO = 2
+
+# cabecalho: magic, versao, identidade do banco de origem (uuid, zeros se
+# nenhum), seq do log de alteracoes, numero de nos, tamanho do payload e
+# crc32 do payload
+_CABECALHO = struct.Struct("<4sH16sQIQI")
+_SEM_BANCO = bytes(16)
+_NO = struct.Struct("<BBI")          # filhos (bit 1 esquerda, bit 2 direita), altura, num produtos
+_PRODUTO = struct.Struct("<qdd")     # id, preco, avaliacao
+_TAM_STR = struct.Struct("<I")
+_INT = struct.Struct("<q")
+
+_TEM_ESQUERDA = 1
+_TEM_DIREITA = 2
+
+_CHAVE_STR = 0
+_CHAVE_INT = 1
+
+
+def _escrever_str(partes, texto):
+    dados = (texto or "").encode("utf-8")
+    partes.append(_TAM_STR.pack(len(dados)))
+    partes.append(dados)
+
+
+def _escrever_chave(partes, chave):
+    if isinstance(chave, int):
+        partes.append(bytes((_CHAVE_INT,)))
+        partes.append(_INT.pack(chave))
+    else:
+        partes.append(bytes((_CHAVE_STR,)))
+        _escrever_str(partes, chave)
+
+
+def _serializar_no(node, partes):
+    """serializa a subarvore em pre-ordem (raiz, esquerda, direita)"""
+    pilha = [node]
+    total = 0
+    while pilha:
+        atual = pilha.pop()
+        categoria = atual.data
+        filhos = (_TEM_ESQUERDA if atual.leftChild else 0) | (_TEM_DIREITA if atual.rightChild else 0)
+        partes.append(_NO.pack(filhos, atual.height, len(categoria.produtos)))
+        _escrever_chave(partes, atual.key)
+        _escrever_str(partes, categoria.nome)
+        _escrever_str(partes, categoria.descricao)
+        for produto in categoria.produtos:
+            partes.append(_PRODUTO.pack(produto.id, produto.preco, produto.avaliacao))
+            _escrever_str(partes, produto.nome)
+            _escrever_str(partes, produto.descricao)
+        total += 1
+        # direita empilhada primeiro para a esquerda sair antes (pre-ordem)
+        if atual.rightChild:
+            pilha.append(atual.rightChild)
+        if atual.leftChild:
+            pilha.append(atual.leftChild)
+    return total
+
+
+def salvar_snapshot(sistema, caminho, db=None):
+    """
+    grava um snapshot binario do catalogo de `sistema` em `caminho`
+
+    inclui a forma exata da AVL (nada e rebalanceado ao carregar), o
+    seq_alteracoes do sistema como marca d'agua para replay do log e a
+    identidade de `db`, o banco de onde o catalogo veio
+    a escrita e atomica: grava em um arquivo temporario deste processo (os
+    workers podem gravar o mesmo snapshot ao mesmo tempo) e renomeia
+
+    returns
+        int numero de categorias gravadas
+    """
+    partes = []
+    total = 0
+    with sistema.trava.leitura():
+        if sistema.arvore_categorias.root is not None:
+            total = _serializar_no(sistema.arvore_categorias.root, partes)
+        seq = sistema.seq_alteracoes
+    payload = b"".join(partes)
+    banco = _SEM_BANCO if db is None else bytes.fromhex(db.id_banco)
+    cabecalho = _CABECALHO.pack(MAGIC, VERSAO, banco, seq, total,
+                                len(payload), zlib.crc32(payload))
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(cabecalho)
+        arquivo.write(payload)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+    return total
+
+
+class _Leitor:
+    """cursor sobre o buffer do snapshot"""
+
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        self.offset = offset
+
+    def ler(self, estrutura):
+        valores = estrutura.unpack_from(self.buffer, self.offset)
+        self.offset += estrutura.size
+        return valores
+
+    def ler_str(self):
+        (tamanho,) = self.ler(_TAM_STR)
+        inicio = self.offset
+        self.offset += tamanho
+        return str(self.buffer[inicio:self.offset], "utf-8")
+
+    def ler_chave(self):
+        tipo = self.buffer[self.offset]
+        self.offset += 1
+        if tipo == _CHAVE_INT:
+            return self.ler(_INT)[0]
+        return self.ler_str()
+
+
+def _desserializar(leitor, total):
+    """reconstroi a arvore a partir dos nos em pre-ordem"""
+    if total == 0:
+        return None
+
+    def ler_no():
+        filhos, altura, num_produtos = leitor.ler(_NO)
+        chave = leitor.ler_chave()
+        categoria = Categoria(leitor.ler_str(), leitor.ler_str())
+        for _ in range(num_produtos):
+            produto_id, preco, avaliacao = leitor.ler(_PRODUTO)
+            nome = leitor.ler_str()
+            categoria.adicionar_produto(Produto(produto_id, nome, preco, leitor.ler_str(), avaliacao))
+        node = AVLNode(chave, categoria)
+        node.height = altura
+        return node, filhos
+
+    raiz, filhos = ler_no()
+    # pilha de (no, filhos ainda nao lidos) para reconstruir em pre-ordem sem recursao
+    pilha = [(raiz, filhos)]
+    while pilha:
+        node, filhos = pilha[-1]
+        if filhos & _TEM_ESQUERDA:
+            pilha[-1] = (node, filhos & ~_TEM_ESQUERDA)
+            filho, filhos_filho = ler_no()
+            node.leftChild = filho
+            pilha.append((filho, filhos_filho))
+        elif filhos & _TEM_DIREITA:
+            pilha[-1] = (node, 0)
+            filho, filhos_filho = ler_no()
+            node.rightChild = filho
+            pilha.append((filho, filhos_filho))
+        else:
+            pilha.pop()
+    return raiz
+
+
+def _ler_buffer(mapa, db):
+    """
+    valida o cabecalho, a origem e o checksum e reconstroi a arvore a partir
+    do buffer
+    """
+    buffer = memoryview(mapa)
+    if len(buffer) < 6:
+        raise ValueError("snapshot truncado")
+    magic, versao = struct.unpack_from("<4sH", buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("arquivo nao e um snapshot do srhp")
+    if versao != VERSAO:
+        raise ValueError(f"versao de snapshot nao suportada: {versao}")
+    if len(buffer) < _CABECALHO.size:
+        raise ValueError("snapshot truncado")
+    _, _, banco, seq, total, tamanho, crc = _CABECALHO.unpack_from(buffer, 0)
+    if db is not None:
+        # banco apagado e recriado: o snapshot traria de volta dados que nao
+        # existem mais, e o replay do log novo nao os removeria
+        if banco != bytes.fromhex(db.id_banco):
+            raise ValueError("snapshot gravado a partir de outro banco")
+        if seq > db.ultima_alteracao():
+            raise ValueError(f"snapshot a frente do banco (seq {seq})")
+    payload = buffer[_CABECALHO.size:_CABECALHO.size + tamanho]
+    if len(payload) != tamanho or zlib.crc32(payload) != crc:
+        raise ValueError("checksum do snapshot nao confere")
+    return _desserializar(_Leitor(payload, 0), total), seq
+
+
+def carregar_snapshot(caminho, sistema, db=None):
+    """
+    carrega em `sistema` o snapshot gravado por salvar_snapshot
+
+    o arquivo e mapeado com mmap e lido direto do buffer; versao, tamanho e
+    checksum sao conferidos antes de tocar no sistema. com `db`, o snapshot
+    tambem precisa ter sido gravado a partir dele e nao estar a frente do
+    log de alteracoes
+
+    returns
+        int seq do log de alteracoes registrado no snapshot (replay a partir dele)
+
+    raises
+        ValueError se o arquivo estiver corrompido, for de outra versao ou de
+        outro banco
+    """
+    with open(caminho, "rb") as arquivo:
+        if os.fstat(arquivo.fileno()).st_size == 0:
+            raise ValueError("snapshot truncado")
+        mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            raiz, seq = _ler_buffer(mapa, db)
+        finally:
+            try:
+                mapa.close()
+            except BufferError:
+                # ainda ha views presas em um traceback; o gc fecha o mapa depois
+                pass
+
+    # a AVL volta com a forma gravada; as outras estruturas recebem as
+    # categorias em ordem
+    arvore = sistema.nova_arvore()
+    if isinstance(arvore, AVLTree):
+        arvore.root = raiz
+    else:
+        pilha, node = [], raiz
+        while pilha or node is not None:
+            while node is not None:
+                pilha.append(node)
+                node = node.leftChild
+            node = pilha.pop()
+            arvore.insert(node.key, node.data)
+            node = node.rightChild
+    # um snapshot gravado com outro modo de chave e recusado (ValueError)
+    sistema.trocar_arvore(arvore, seq)
+    return seq
@@ -0,0 +1,190 @@
+"""
+modulo de sugestoes aproximadas para nomes de categorias e produtos
+indice invertido de trigramas sobre as chaves de colacao dos nomes: uma busca
+com erro de digitacao visita so as listas de trigramas mais raras da consulta
+(filtro de prefixo) em vez de calcular a distancia de edicao contra todo o
+catalogo
+"""
+
+import heapq
+import math
+from collections import Counter
+
+from src.colacao import chave_colacao
+from src.models import Produto
+
+
+# o que o indice cobre
+MODOS_SUGESTOES = ("completo", "categorias", "desligado")
+
+# primeira tentativa de cada busca; se ja der k resultados, sao os mesmos k
+# que o limiar pedido daria, com bem menos candidatos
+LIMIAR_INICIAL = 0.6
+
+
+def trigramas(texto):
+    """trigramas de `texto` com dois espacos antes e um depois (como o pg_trgm)"""
+    preenchido = f"  {texto} "
+    return {preenchido[i:i + 3] for i in range(len(preenchido) - 2)}
+
+
+def distancia_edicao(a, b):
+    """distancia de levenshtein entre `a` e `b` (duas linhas da tabela)"""
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = atual
+    return anterior[-1]
+
+
+class IndiceSugestoes:
+    """
+    trigramas -> textos e texto -> entradas (objetos categoria e produto)
+
+    os textos sao as chaves de colacao (internadas), entao nomes repetidos
+    ocupam uma so posicao nas listas; as entradas sao os proprios objetos do
+    catalogo, sem copia
+    """
+
+    def __init__(self, produtos=True):
+        """
+        args
+            produtos (bool) indexa tambem os nomes dos produtos
+        """
+        self.produtos = produtos
+        self._listas = {}   # trigrama -> set de textos
+        self._textos = {}   # texto -> (numero de trigramas, set de entradas)
+
+    def __len__(self):
+        return sum(len(entradas) for _, entradas in self._textos.values())
+
+    def adicionar(self, entrada, nome):
+        """indexa `entrada` (categoria ou produto) pelo `nome`"""
+        texto = chave_colacao(nome)
+        registro = self._textos.get(texto)
+        if registro is None:
+            grams = trigramas(texto)
+            registro = self._textos[texto] = (len(grams), set())
+            for grama in grams:
+                self._listas.setdefault(grama, set()).add(texto)
+        registro[1].add(entrada)
+
+    def remover(self, entrada, nome):
+        """tira `entrada` indexada pelo `nome`; o texto sai quando fica sem entradas"""
+        texto = chave_colacao(nome)
+        registro = self._textos.get(texto)
+        if registro is None:
+            return
+        registro[1].discard(entrada)
+        if registro[1]:
+            return
+        del self._textos[texto]
+        for grama in trigramas(texto):
+            lista = self._listas[grama]
+            lista.discard(texto)
+            if not lista:
+                del self._listas[grama]
+
+    def adicionar_produto(self, produto):
+        """indexa o produto se o indice cobre produtos"""
+        if self.produtos:
+            self.adicionar(produto, produto.nome)
+
+    def remover_produto(self, produto):
+        if self.produtos:
+            self.remover(produto, produto.nome)
+
+    def adicionar_categoria(self, categoria):
+        """indexa a categoria e (no modo completo) os seus produtos"""
+        self.adicionar(categoria, categoria.nome)
+        for produto in categoria.produtos:
+            self.adicionar_produto(produto)
+
+    def remover_categoria(self, categoria):
+        self.remover(categoria, categoria.nome)
+        for produto in categoria.produtos:
+            self.remover_produto(produto)
+
+    def buscar(self, consulta, k=10, limiar=0.3, tipo=None):
+        """
+        ate `k` entradas com nome parecido com `consulta`
+
+        a similaridade e o jaccard dos trigramas; o desempate e a distancia de
+        edicao. um texto com jaccard >= t divide pelo menos ceil(t * q) dos q
+        trigramas da consulta, entao aparece em alguma das q - ceil(t * q) + 1
+        listas mais curtas: so elas geram candidatos, e cada candidato e
+        conferido em O(q) nas outras. a busca tenta antes um limiar alto (menos
+        listas, menos candidatos) e so desce ate `limiar` se faltarem resultados
+
+        args
+            consulta (str) texto digitado
+            k (int) numero maximo de resultados
+            limiar (float) similaridade minima, entre 0 e 1
+            tipo (str) 'categoria', 'produto' ou None para os dois
+
+        returns
+            list de (entrada, similaridade, distancia), da mais parecida para a menos
+
+        complexidade O(q log q) mais O(q) por candidato das listas mais raras
+        """
+        texto = chave_colacao(consulta)
+        if not texto:
+            return []
+        grams = trigramas(texto)
+        listas = sorted((self._listas.get(grama, ()) for grama in grams), key=len)
+
+        for tentativa in (LIMIAR_INICIAL, limiar):
+            if tentativa < limiar:
+                continue
+            resultado = self._buscar(texto, grams, listas, k, tentativa, tipo)
+            if len(resultado) >= k:
+                break
+        return resultado
+
+    def _buscar(self, texto, grams, listas, k, limiar, tipo):
+        minimo = max(1, math.ceil(limiar * len(grams)))
+        prefixo = len(grams) - minimo + 1
+        # contagem nas listas do prefixo em lote; o resto e conferido por candidato
+        contagem = Counter()
+        for lista in listas[:prefixo]:
+            contagem.update(lista)
+        resto = listas[prefixo:]
+
+        pontuados = []
+        for candidato, comuns in contagem.items():
+            comuns += sum(1 for lista in resto if candidato in lista)
+            similaridade = comuns / (len(grams) + self._textos[candidato][0] - comuns)
+            if similaridade < limiar:
+                continue
+            if tipo is not None and not any(_tipo(entrada) == tipo for entrada in self._textos[candidato][1]):
+                continue
+            pontuados.append((similaridade, candidato))
+        # a distancia de edicao so e calculada para os mais parecidos
+        melhores = heapq.nsmallest(3 * k, pontuados, key=lambda par: (-par[0], par[1]))
+        finalistas = [(similaridade, distancia_edicao(texto, candidato), candidato)
+                      for similaridade, candidato in melhores]
+        finalistas.sort(key=lambda trio: (-trio[0], trio[1], trio[2]))
+
+        resultado = []
+        for similaridade, distancia, candidato in finalistas:
+            entradas = self._textos[candidato][1]
+            for entrada in sorted(entradas, key=_ordem_entrada):
+                if tipo is not None and _tipo(entrada) != tipo:
+                    continue
+                resultado.append((entrada, similaridade, distancia))
+                if len(resultado) == k:
+                    return resultado
+        return resultado
+
+
+def _tipo(entrada):
+    return "produto" if isinstance(entrada, Produto) else "categoria"
+
+
+def _ordem_entrada(entrada):
+    # categorias antes de produtos com o mesmo texto; produtos por id
+    return (0, 0) if _tipo(entrada) == "categoria" else (1, entrada.id)
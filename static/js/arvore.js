@@ -5,13 +5,16 @@ class TreeVisualizer {
         this.expandedNodes = new Set();
         this.levelColors = ['#9F4444', '#8B6B61', '#C89B9B', '#7B9ACF'];
         this.tree = null;
+        this.profundidade = 3;
         
         this.carregarArvore();
     }
     
     async carregarArvore() {
         try {
-            const response = await fetch('/api/tree');
+            // primeira pintura so com os niveis de cima e sem produtos;
+            // subarvores mais fundas sao buscadas ao expandir
+            const response = await fetch(`/api/tree?depth=${this.profundidade}&include_produtos=false`);
             const treeData = await response.json();
             
             // converter dados da api para o formato esperado
@@ -53,7 +56,7 @@ class TreeVisualizer {
                 altura: 'altura 0',
                 nome: 'todas as categorias',
                 iniciais: 'TC',
-                numeroProdutos: treeData.reduce((sum, node) => sum + (node.produtos?.length || 0), 0),
+                numeroProdutos: treeData.reduce((sum, node) => sum + (node.num_produtos || 0), 0),
                 children: treeData.map((node, index) => this.convertNode(node, 1))
             };
         } else if (treeData.length === 1) {
@@ -65,14 +68,17 @@ class TreeVisualizer {
     
     convertNode(node, level) {
         const iniciais = node.nome.substring(0, 2).toUpperCase();
-        const numeroProdutos = node.produtos?.length || 0;
+        const numeroProdutos = node.num_produtos ?? (node.produtos?.length || 0);
         
         return {
             id: `cat-${node.id}`,
             altura: `altura ${level}`,
+            nivel: level,
             nome: node.nome,
             iniciais: iniciais,
             numeroProdutos: numeroProdutos,
+            // filhos ainda nao baixados (corte de profundidade da api)
+            pendente: Boolean(node.filhos_pendentes),
             children: (node.children || []).map((child, index) => 
                 this.convertNode(child, level + 1)
             )
@@ -84,15 +90,39 @@ class TreeVisualizer {
         this.render();
     }
 
-    toggleNode(nodeId) {
-        if (this.expandedNodes.has(nodeId)) {
-            this.expandedNodes.delete(nodeId);
+    async toggleNode(node) {
+        if (this.expandedNodes.has(node.id)) {
+            this.expandedNodes.delete(node.id);
         } else {
-            this.expandedNodes.add(nodeId);
+            if (node.pendente) {
+                await this.carregarFilhos(node);
+            }
+            this.expandedNodes.add(node.id);
         }
         this.render();
     }
 
+    async carregarFilhos(node) {
+        // busca a subarvore a partir deste no e pendura os filhos
+        try {
+            const params = `root=${encodeURIComponent(node.nome)}&depth=${this.profundidade}&include_produtos=false`;
+            const response = await fetch(`/api/tree?${params}`);
+            const subarvore = await response.json();
+            if (subarvore && subarvore.length > 0) {
+                node.children = (subarvore[0].children || []).map(child =>
+                    this.convertNode(child, node.nivel + 1)
+                );
+            }
+            node.pendente = false;
+        } catch (error) {
+            console.error('erro ao carregar subarvore:', error);
+        }
+    }
+
+    hasChildren(node) {
+        return (node.children && node.children.length > 0) || node.pendente;
+    }
+
     createCard(node, level, stackIndex = 0) {
         const color = this.levelColors[level] || this.levelColors[0];
         const stackOffset = stackIndex * 4;
@@ -100,7 +130,7 @@ class TreeVisualizer {
         
         const card = document.createElement('div');
         card.className = 'node-card';
-        if (!node.children || node.children.length === 0) {
+        if (!this.hasChildren(node)) {
             card.className += ' no-children';
         }
         card.style.backgroundColor = color;
@@ -114,7 +144,7 @@ class TreeVisualizer {
                 <span class="node-iniciais">${node.iniciais}</span>
                 <span class="node-produtos">${node.numeroProdutos} produtos</span>
             </div>
-            ${node.children && node.children.length > 0 ? '<div class="node-indicator"></div>' : ''}
+            ${this.hasChildren(node) ? '<div class="node-indicator"></div>' : ''}
         `;
         
         return card;
@@ -135,7 +165,7 @@ class TreeVisualizer {
     }
 
     createNode(node, level) {
-        const hasChildren = node.children && node.children.length > 0;
+        const hasChildren = this.hasChildren(node);
         const isExpanded = this.expandedNodes.has(node.id);
         
         const nodeDiv = document.createElement('div');
@@ -153,7 +183,7 @@ class TreeVisualizer {
         // card principal
         const mainCard = this.createCard(node, level);
         if (hasChildren) {
-            mainCard.addEventListener('click', () => this.toggleNode(node.id));
+            mainCard.addEventListener('click', () => this.toggleNode(node));
         }
         cardWrapper.appendChild(mainCard);
         
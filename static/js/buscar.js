@@ -8,16 +8,14 @@ class SearchPage {
         this.selectedCategory = null;
         
         this.categories = [];
-        this.produtos = [];
         
         this.init();
         this.carregarDados();
     }
     
     async carregarDados() {
-        // carregar categorias e produtos do backend
+        // carregar categorias do backend (produtos sao buscados sob demanda)
         await this.carregarCategorias();
-        await this.carregarProdutos();
     }
     
     async carregarCategorias() {
@@ -30,16 +28,6 @@ class SearchPage {
         }
     }
     
-    async carregarProdutos() {
-        try {
-            const response = await fetch('/api/produtos');
-            this.produtos = await response.json();
-        } catch (error) {
-            console.error('erro ao carregar produtos:', error);
-            this.produtos = [];
-        }
-    }
-    
     init() {
         console.log('searchButton:', this.searchButton);
         console.log('searchResults:', this.searchResults);
@@ -153,10 +141,15 @@ class SearchPage {
         }
     }
     
-    searchProducts(query) {
-        const products = this.produtos.filter(p => 
-            p.nome.toLowerCase().includes(query)
-        );
+    async searchProducts(query) {
+        // busca textual no servidor (indice fts5), sem baixar o catalogo inteiro
+        let products = [];
+        try {
+            const response = await fetch(`/api/busca?q=${encodeURIComponent(query)}&limite=50`);
+            products = response.ok ? await response.json() : [];
+        } catch (error) {
+            console.error('erro ao buscar produtos:', error);
+        }
         
         if (products.length === 0) {
             this.showEmptyState();
@@ -0,0 +1,39 @@
+# Fixtures compartilhadas pelos testes
+
+import pytest
+import sys
+import os
+from unittest import mock
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+
+@pytest.fixture(scope="session")
+def aplicacao(tmp_path_factory):
+    """
+    O app (módulo app.py) rodando sobre um banco temporário, com o cliente de
+    testes em `aplicacao.cliente`. O app lê a configuração no import: sem
+    snapshot, carga no startup e sem tarefas em segundo plano.
+    """
+    from starlette.testclient import TestClient
+    from benchmarks.estruturas import silenciar
+
+    ambiente = {
+        "SRHP_DB": str(tmp_path_factory.mktemp("app") / "srhp.db"),
+        "SRHP_SNAPSHOT": "",
+        "SRHP_CARGA_EM_SEGUNDO_PLANO": "0",
+        "SRHP_INTERVALO_ALTERACOES": "0",
+        "SRHP_INTERVALO_RELACIONADOS": "0",
+    }
+    diretorio = os.getcwd()
+    # static/ e templates/ são caminhos relativos à raiz do projeto
+    os.chdir(RAIZ)
+    try:
+        with mock.patch.dict(os.environ, ambiente), silenciar():
+            import app
+            with TestClient(app.app) as cliente:
+                app.cliente = cliente
+                yield app
+    finally:
+        os.chdir(diretorio)
@@ -0,0 +1,139 @@
+# Testes unitários para as rotas de escrita da API (app.py)
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.estruturas import silenciar
+
+
+def _categoria(aplicacao, nome):
+    with silenciar():
+        resposta = aplicacao.cliente.post("/api/categorias", json={"nome": nome})
+    assert resposta.status_code == 200
+    return resposta.json()["id"]
+
+
+def _produto(aplicacao, nome, categoria_id, preco=10.0):
+    with silenciar():
+        resposta = aplicacao.cliente.post("/api/produtos", json={
+            "nome": nome, "categoria_id": categoria_id, "preco": preco})
+    assert resposta.status_code == 200
+    return resposta.json()["id"]
+
+
+def test_put_de_categoria_recusado_pela_avl_nao_grava(aplicacao):
+    """
+    Renomear para um nome que a AVL já tem (só muda maiúsculas e acentos)
+    responde 400 sem tocar no banco; um DELETE depois remove a categoria certa.
+    """
+    livros = _categoria(aplicacao, "Livros")
+    revistas = _categoria(aplicacao, "Revistas")
+    cliente = aplicacao.cliente
+
+    with silenciar():
+        resposta = cliente.put(f"/api/categorias/{revistas}", json={"nome": "livros"})
+        assert resposta.status_code == 400
+        assert aplicacao.db.buscar_categoria_por_id(revistas)["nome"] == "Revistas"
+
+        # só a grafia da própria categoria muda: aceito
+        assert cliente.put(f"/api/categorias/{livros}", json={"nome": "LIVROS"}).status_code == 200
+        assert aplicacao.sistema.buscar_categoria("livros").nome == "LIVROS"
+
+        assert cliente.delete(f"/api/categorias/{revistas}").status_code == 200
+    assert aplicacao.sistema.buscar_categoria("Revistas") is None
+    assert aplicacao.sistema.buscar_categoria("Livros") is not None
+
+
+def test_put_de_produto_para_categoria_fora_da_avl(aplicacao):
+    """
+    Uma categoria que só existe no banco (o tailer ainda não a trouxe) não
+    recebe o produto: 404 e o banco continua com a categoria antiga.
+    """
+    origem = _categoria(aplicacao, "Jogos")
+    produto_id = _produto(aplicacao, "Xadrez", origem)
+    so_no_banco = aplicacao.db.inserir_categoria("Brinquedos")
+
+    with silenciar():
+        resposta = aplicacao.cliente.put(f"/api/produtos/{produto_id}", json={
+            "nome": "Xadrez", "categoria_id": so_no_banco, "preco": 12.0})
+    assert resposta.status_code == 404
+    assert aplicacao.db.buscar_produto_por_id(produto_id)["categoria_id"] == origem
+    assert aplicacao.sistema.buscar_categoria("Jogos").buscar_produto(produto_id).preco == 10.0
+
+
+def test_tailer_recarrega_o_banco_depois_de_uma_lacuna(aplicacao):
+    """
+    A marca d'água do processo segura a poda; se ela vence e o log é podado
+    além do seq dele, o tailer recarrega o banco em vez de pular o que falta.
+    """
+    db = aplicacao.db
+    discos = db.inserir_categoria("Discos")
+    db.inserir_produto("Vinil", discos, 150.0, "", 4.5)
+    assert db.podar_alteracoes(db.ultima_alteracao()) == 0
+
+    db.remover_consumidor(aplicacao.CONSUMIDOR)
+    assert db.podar_alteracoes(db.ultima_alteracao()) > 0
+    with silenciar():
+        assert aplicacao.sincronizar_com_o_log()
+    assert [p.nome for p in aplicacao.sistema.buscar_categoria("Discos").produtos] == ["Vinil"]
+    assert aplicacao.sistema.seq_alteracoes == db.ultima_alteracao()
+
+
+def test_consulta_de_produtos_paginada_por_chave(aplicacao):
+    """
+    /api/produtos continua listando o banco; a consulta pelos índices tem rota
+    própria e devolve a faixa inteira em páginas, pelo cursor `proximo`.
+    """
+    pianos = _categoria(aplicacao, "Pianos")
+    ids = [_produto(aplicacao, f"Piano {i}", pianos, preco) for i, preco in enumerate([1005.0, 1001.0, 1005.0, 1009.0, 1020.0])]
+    cliente = aplicacao.cliente
+
+    assert all("categoria_nome" in linha for linha in cliente.get("/api/produtos").json())
+
+    vistos, cursor = [], None
+    while True:
+        parametros = {"preco_min": 1000, "preco_max": 1010, "limite": 2}
+        if cursor:
+            parametros["cursor"] = cursor
+        pagina = cliente.get("/api/produtos/consulta", params=parametros).json()
+        vistos += [item["produto"]["id"] for item in pagina["itens"]]
+        cursor = pagina["proximo"]
+        if cursor is None:
+            break
+    # empate de preço: o menor id primeiro
+    assert vistos == [ids[1], ids[0], ids[2], ids[3]]
+
+    pagina = cliente.get("/api/produtos/consulta", params={"preco_min": 1000, "ordenar": "preco_desc", "limite": 1}).json()
+    assert pagina["itens"][0]["produto"]["id"] == ids[4] and pagina["itens"][0]["categoria"] == "Pianos"
+    assert cliente.get("/api/produtos/consulta", params={"cursor": "abc"}).status_code == 400
+
+
+def test_lote_com_item_recusado_pela_avl_fica_para_o_tailer(aplicacao):
+    """
+    No lote da API, o item que a AVL recusa sai com erro e o seq do processo
+    não avança sobre o lote: o tailer reaplica o log.
+    """
+    musica = _categoria(aplicacao, "Música")
+    so_no_banco = aplicacao.db.inserir_categoria("Bonecas")
+    with silenciar():
+        aplicacao.sistema.sincronizar_alteracoes(aplicacao.db)
+        # some só da memória: a AVL recusa o produto e o seq está em dia
+        aplicacao.sistema.remover_categoria("Bonecas")
+    seq = aplicacao.sistema.seq_alteracoes
+    assert seq == aplicacao.db.ultima_alteracao()
+
+    with silenciar():
+        resposta = aplicacao.cliente.post("/api/produtos/lote", json={"itens": [
+            {"nome": "Violão", "categoria_id": musica, "preco": 600.0},
+            {"nome": "Barbie", "categoria_id": so_no_banco, "preco": 90.0}]})
+    corpo = resposta.json()
+    assert resposta.status_code == 200
+    assert [item["status"] for item in corpo["itens"]] == ["ok", "erro"]
+    assert corpo["falhas"] == 1 and "recusada pela AVL" in corpo["itens"][1]["erro"]
+    assert aplicacao.sistema.seq_alteracoes == seq
+
+    with silenciar():
+        assert aplicacao.sistema.sincronizar_alteracoes(aplicacao.db) == 2
+    assert aplicacao.sistema.seq_alteracoes == aplicacao.db.ultima_alteracao()
@@ -0,0 +1,54 @@
+# Testes unitários para as ordens de chaves e o executor dos benchmarks
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.escalabilidade import executar
+from benchmarks.estruturas import EstruturaAVL
+from benchmarks.ordens import ORDENS
+from src.avl_tree import altura_maxima_avl, altura_teorica_minima
+
+
+def test_alturas_teoricas():
+    assert [altura_teorica_minima(n) for n in (0, 1, 2, 3, 7, 8)] == [0, 1, 2, 2, 3, 4]
+    # N(h) = 1, 2, 4, 7, 12: menor número de nós de uma AVL de altura h
+    assert [altura_maxima_avl(n) for n in (1, 2, 4, 6, 7, 11, 12)] == [1, 2, 3, 3, 4, 4, 5]
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 12, 100, 1000])
+def test_ordens_sao_permutacoes(n):
+    for gerar in ORDENS.values():
+        assert sorted(gerar(n)) == list(range(n))
+
+
+@pytest.mark.parametrize("n", [12, 100, 1000])
+def test_ordem_adversarial_atinge_a_altura_maxima(n):
+    """
+    Inserida em largura, a árvore de Fibonacci não provoca rotações e a AVL
+    termina com a maior altura possível; a ordem crescente termina perto da mínima.
+    """
+    adversarial = EstruturaAVL()
+    adversarial.inserir(ORDENS['adversarial'](n))
+    assert adversarial.altura() == altura_maxima_avl(n)
+
+    crescente = EstruturaAVL()
+    crescente.inserir(ORDENS['crescente'](n))
+    assert crescente.altura() <= altura_teorica_minima(n) + 1
+
+
+def test_executar_mede_todas_as_combinacoes(capsys):
+    resultados = executar([200], ["aleatoria", "decrescente"], ["avl", "dict", "bisect"], repeticoes=1)
+
+    assert {(r['estrutura'], r['ordem']) for r in resultados} == {
+        (e, o) for e in ("avl", "dict", "bisect") for o in ("aleatoria", "decrescente")}
+    for resultado in resultados:
+        assert resultado['inserir_ns'] > 0 and resultado['buscar_ns'] > 0 and resultado['remover_ns'] > 0
+        if resultado['estrutura'] == "dict":
+            assert resultado['recomendar_ns'] is None and resultado['altura'] is None
+        else:
+            assert resultado['recomendar_ns'] > 0 and resultado['itens_por_recomendacao'] >= 1
+        if resultado['estrutura'] == "avl":
+            assert altura_teorica_minima(200) <= resultado['altura'] <= altura_maxima_avl(200)
@@ -0,0 +1,90 @@
+# Testes unitários para o cache de respostas HTTP
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.cache_respostas import CacheRespostas, EntradaCache
+
+
+def _entrada(corpo, *tags):
+    return EntradaCache(corpo, 200, {"content-type": "application/json"}, tags)
+
+
+def test_lru_respeita_orcamento_em_bytes():
+    """
+    Ao passar do orçamento sai a entrada usada há mais tempo.
+    """
+    tamanho = _entrada(b"x" * 100).tamanho
+    cache = CacheRespostas(limite_bytes=2 * tamanho)
+    for chave in ("a", "b"):
+        cache.guardar(chave, _entrada(b"x" * 100), cache.marca())
+
+    cache.obter("a")  # "a" passa a ser a mais recente
+    cache.guardar("c", _entrada(b"x" * 100), cache.marca())
+
+    assert cache.obter("b") is None
+    assert cache.obter("a") is not None and cache.obter("c") is not None
+    assert cache.bytes_usados <= cache.limite_bytes
+    assert cache.metricas()["remocoes_lru"] == 1
+
+
+def test_invalidacao_por_tag():
+    """
+    Invalidar uma tag remove só as entradas que dependem dela.
+    """
+    cache = CacheRespostas()
+    cache.guardar("categorias", _entrada(b"[]", "categorias"), cache.marca())
+    cache.guardar("produtos", _entrada(b"[]", "produtos", "categorias"), cache.marca())
+
+    assert cache.invalidar("produtos") == 1
+
+    assert cache.obter("produtos") is None
+    assert cache.obter("categorias") is not None
+
+
+def test_resposta_calculada_antes_da_escrita_nao_e_guardada():
+    """
+    Uma invalidação entre a marca e o guardar descarta a resposta velha.
+    """
+    cache = CacheRespostas()
+    marca = cache.marca()
+    cache.invalidar("produtos")
+
+    assert not cache.guardar("produtos", _entrada(b"[]", "produtos"), marca)
+    assert cache.guardar("categorias", _entrada(b"[]", "categorias"), marca)
+    assert cache.guardar("produtos", _entrada(b"[]", "produtos"), cache.marca())
+
+    marca = cache.marca()
+    cache.limpar()
+    assert not cache.guardar("categorias", _entrada(b"[]", "categorias"), marca)
+    assert cache.metricas()["entradas"] == 0
+
+
+def test_etag_depende_do_corpo():
+    assert _entrada(b"[1]").etag == _entrada(b"[1]").etag
+    assert _entrada(b"[1]").etag != _entrada(b"[2]").etag
+
+
+def test_variante_comprimida_entra_no_orcamento():
+    """
+    A variante comprimida soma ao tamanho da entrada; sem a entrada no cache
+    (removida ou invalidada) a variante não é guardada.
+    """
+    cache = CacheRespostas()
+    entrada = _entrada(b"x" * 100, "produtos")
+    cache.guardar("a", entrada, cache.marca())
+    antes = cache.bytes_usados
+
+    assert cache.guardar_variante("a", entrada, "gzip", b"z" * 10)
+    assert cache.obter("a").variantes == {"gzip": b"z" * 10}
+    assert cache.bytes_usados == antes + 10
+    # trocar a variante não conta duas vezes
+    assert cache.guardar_variante("a", entrada, "gzip", b"z" * 12)
+    assert cache.bytes_usados == antes + 12
+
+    cache.invalidar("produtos")
+    assert not cache.guardar_variante("a", entrada, "br", b"b" * 10)
+    assert cache.bytes_usados == 0
@@ -0,0 +1,67 @@
+# Testes unitários para o gerador de carga (percentis, mix e agregação)
+
+import asyncio
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.carga import executar_carga, ler_mix, percentil, resumir
+
+
+def test_percentil_posto_mais_proximo():
+    valores = list(range(1, 1001))
+    assert percentil(valores, 50) == 500
+    assert percentil(valores, 99) == 990
+    assert percentil(valores, 99.9) == 999
+    assert percentil([7], 99.9) == 7
+    assert percentil([], 50) is None
+
+    resumo = resumir([0.001, 0.002, 0.003, 0.004], erros=1, duracao=2.0)
+    assert resumo['vazao_rps'] == 2.0 and resumo['erros'] == 1
+    assert resumo['p50_ms'] == pytest.approx(2.0) and resumo['p999_ms'] == pytest.approx(4.0)
+
+
+def test_mix_invalido():
+    assert ler_mix("recomendar=5, tree=1") == {'recomendar': 5.0, 'tree': 1.0}
+    with pytest.raises(ValueError):
+        ler_mix("inexistente=1")
+    with pytest.raises(ValueError):
+        ler_mix("tree=0")
+
+
+def test_executar_carga_separa_endpoints_e_erros():
+    """
+    A carga roda contra um app ASGI mínimo: /api/buscar responde 404 para a
+    categoria "Sumida" e esses erros ficam fora dos percentis.
+    """
+    async def buscar(request):
+        if request.path_params['nome'] == "Sumida":
+            return JSONResponse({'detail': "nao encontrada"}, status_code=404)
+        return JSONResponse({'nome': request.path_params['nome']})
+
+    async def recomendar(request):
+        return JSONResponse([])
+
+    app = Starlette(routes=[Route("/api/buscar/{nome}", buscar),
+                            Route("/api/recomendar/{nome}", recomendar)])
+    catalogo = {'categorias': ["Livros", "Sumida"], 'termos': ["Cabo"]}
+
+    async def rodar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            return await executar_carga(cliente, catalogo, {'buscar': 1, 'recomendar': 1},
+                                        concorrencia=4, duracao=0.3, aquecimento=0.05)
+
+    resultado = asyncio.run(rodar())
+    buscar_resumo = resultado['endpoints']['buscar']
+    recomendar_resumo = resultado['endpoints']['recomendar']
+    assert buscar_resumo['requisicoes'] > 0 and buscar_resumo['erros'] > 0
+    assert recomendar_resumo['erros'] == 0 and recomendar_resumo['p50_ms'] > 0
+    assert resultado['total']['requisicoes'] == buscar_resumo['requisicoes'] + recomendar_resumo['requisicoes']
@@ -0,0 +1,79 @@
+# Testes unitários para as chaves de colação das categorias
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.estruturas import silenciar
+from src.business_logic import SistemaRecomendacao
+from src.colacao import chave_colacao
+from src.snapshot import carregar_snapshot, salvar_snapshot
+
+
+def _catalogo(chaves):
+    sistema = SistemaRecomendacao(chaves=chaves)
+    with silenciar():
+        for nome in ["Eletrônicos", "Áudio", "Câmeras", "Livros"]:
+            sistema.cadastrar_categoria(nome, f"descrição de {nome}")
+        sistema.cadastrar_produto("Áudio", 1, "Fone", 199.9, "", 4.5)
+        sistema.cadastrar_produto("Câmeras", 2, "Lente", 999.0, "", 4.9)
+    return sistema
+
+
+def test_chave_normalizada_e_internada():
+    assert chave_colacao("  Ação   e  AVENTURA ") == "acao e aventura"
+    assert chave_colacao("Straße") == chave_colacao("STRASSE")
+    # forma composta e decomposta do mesmo nome dão a mesma chave, e o mesmo objeto
+    assert chave_colacao("Câmeras") is chave_colacao("Câmeras".upper())
+
+
+def test_busca_ignora_maiusculas_e_acentos():
+    sistema = _catalogo("colacao")
+
+    with silenciar():
+        assert sistema.buscar_categoria("AUDIO").nome == "Áudio"
+        assert sistema.buscar_categoria("cameras").produtos[0].id == 2
+        assert [item['categoria'] for item in sistema.recomendar_produtos("audio")] == ["Áudio"]
+        # só difere em maiúsculas e acentos de uma existente
+        assert not sistema.cadastrar_categoria("ELETRONICOS")
+        # mudar só a grafia mantém a chave e troca o nome de exibição
+        assert sistema.atualizar_categoria("livros", "LIVROS", "nova")
+        assert not sistema.atualizar_categoria("LIVROS", "audio")
+
+    assert sistema.buscar_categoria("Livros").nome == "LIVROS"
+    chaves = [chave for chave, _ in sistema.arvore_categorias.itens()]
+    assert chaves == ["audio", "cameras", "eletronicos", "livros"]
+
+    exata = _catalogo("exata")
+    assert exata.buscar_categoria("audio") is None
+    assert exata.buscar_categoria("Áudio").nome == "Áudio"
+
+
+def test_modo_id_preserva_o_id_e_volta_do_snapshot(tmp_path):
+    sistema = _catalogo("id")
+    assert [chave for chave, _ in sistema.arvore_categorias.itens()] == [1, 2, 3, 4]
+
+    with silenciar():
+        assert sistema.atualizar_categoria("audio", "Som")
+        assert sistema.remover_categoria("Livros")
+        assert sistema.cadastrar_categoria("Jogos")
+    assert sistema.chave("SOM") == 2
+    assert sistema.chave("Áudio") is None
+    assert sistema.chave("jogos") == 5
+
+    caminho = str(tmp_path / "catalogo.snapshot")
+    salvar_snapshot(sistema, caminho)
+    restaurado = SistemaRecomendacao(chaves="id")
+    carregar_snapshot(caminho, restaurado)
+    assert restaurado.buscar_categoria("som").produtos[0].nome == "Fone"
+    with silenciar():
+        assert restaurado.cadastrar_categoria("Filmes")
+    assert restaurado.chave("Filmes") == 6
+
+    # um snapshot gravado com outro modo de chave é recusado
+    with pytest.raises(ValueError):
+        carregar_snapshot(caminho, SistemaRecomendacao(chaves="colacao"))
+    with pytest.raises(ValueError):
+        SistemaRecomendacao(chaves="hash")
@@ -0,0 +1,120 @@
+# Testes unitários para a compressão e os arquivos estáticos pré-comprimidos
+
+import gzip
+import pytest
+import sys
+import os
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from benchmarks.estruturas import silenciar
+from scripts.construir_estaticos import construir_estaticos
+from src.compressao import CODIFICACOES, aceitas, comprimir
+from src.estaticos import CACHE_IMUTAVEL, EstaticosPrecomprimidos
+
+
+def test_negociacao_respeita_q_e_recusa():
+    """
+    q=0 recusa a codificação; sem Accept-Encoding nada é comprimido.
+    """
+    assert aceitas("gzip, deflate") == ["gzip"]
+    assert aceitas("gzip;q=0, br;q=0") == []
+    assert aceitas("*") == list(CODIFICACOES)
+    assert aceitas("") == []
+    assert aceitas(None) == []
+
+
+def test_gzip_deterministico():
+    corpo = b'{"nome":"Livros"}' * 100
+    assert comprimir(corpo, "gzip") == comprimir(corpo, "gzip")
+    assert gzip.decompress(comprimir(corpo, "gzip", estatico=True)) == corpo
+
+
+def test_estaticos_com_hash_servidos_comprimidos_e_imutaveis(tmp_path):
+    """
+    O build gera o nome com hash e o .gz; o servidor entrega o .gz para quem
+    aceita gzip, com cache imutável, e o original para quem não aceita.
+    """
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_text("body { color: red; }\n" * 50)
+    manifesto = construir_estaticos(str(tmp_path))
+    url = "/static/" + manifesto["css/style.css"]
+
+    app = Starlette(routes=[Mount("/static", EstaticosPrecomprimidos(directory=str(tmp_path)))])
+    cliente = TestClient(app)
+
+    comprimida = cliente.get(url, headers={"Accept-Encoding": "gzip"})
+    assert comprimida.headers["content-encoding"] == "gzip"
+    assert comprimida.headers["cache-control"] == CACHE_IMUTAVEL
+    assert comprimida.headers["content-type"].startswith("text/css")
+    assert comprimida.text == "body { color: red; }\n" * 50
+
+    original = cliente.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in original.headers
+    assert int(original.headers["content-length"]) > int(comprimida.headers["content-length"])
+
+    sem_hash = cliente.get("/static/css/style.css")
+    assert sem_hash.headers["cache-control"] == "no-cache"
+
+
+def test_api_negocia_codificacao_e_reusa_a_variante_do_cache(aplicacao):
+    """
+    A resposta do cache sai em gzip para quem aceita (ETag fraca, Vary) e
+    sem compressão para quem não aceita (ETag forte); a variante comprimida
+    é feita uma vez e os acertos seguintes não comprimem de novo.
+    """
+    cliente = aplicacao.cliente
+    with silenciar():
+        for i in range(30):
+            resposta = cliente.post("/api/categorias", json={
+                "nome": f"Compressão {i:02d}", "descricao": "categoria para a resposta passar do mínimo"})
+            assert resposta.status_code == 200
+
+    with mock.patch.object(aplicacao, "comprimir", wraps=comprimir) as espiao:
+        primeira = cliente.get("/api/categorias", headers={"Accept-Encoding": "gzip"})
+        segunda = cliente.get("/api/categorias", headers={"Accept-Encoding": "gzip"})
+    assert espiao.call_count == 1
+    assert primeira.headers["x-cache"] == "MISS" and segunda.headers["x-cache"] == "HIT"
+    for resposta in (primeira, segunda):
+        assert resposta.headers["content-encoding"] == "gzip"
+        assert resposta.headers["vary"] == "Accept-Encoding"
+        assert resposta.headers["etag"].startswith('W/"')
+    assert segunda.json() == primeira.json()
+
+    original = cliente.get("/api/categorias", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in original.headers
+    assert original.headers["vary"] == "Accept-Encoding"
+    assert original.headers["etag"] == segunda.headers["etag"].removeprefix("W/")
+    assert original.json() == segunda.json()
+
+    # a etag fraca devolvida pelo cliente vale para as duas variantes
+    revalidada = cliente.get("/api/categorias", headers={
+        "Accept-Encoding": "gzip", "If-None-Match": segunda.headers["etag"]})
+    assert revalidada.status_code == 304
+    assert revalidada.headers["vary"] == "Accept-Encoding"
+
+
+def test_api_fora_do_cache_comprimida_pelo_middleware(aplicacao):
+    """
+    Rotas com ETag própria (a árvore) não entram no cache: o middleware
+    comprime e enfraquece a ETag; sem Accept-Encoding a ETag fica forte.
+    """
+    cliente = aplicacao.cliente
+    with silenciar():
+        assert cliente.post("/api/categorias", json={"nome": "Árvore comprimida"}).status_code == 200
+    # a árvore do banco de testes pode ser menor que o mínimo padrão
+    with mock.patch.object(aplicacao, "COMPRESSAO_MIN_BYTES", 16):
+        comprimida = cliente.get("/api/tree", headers={"Accept-Encoding": "gzip"})
+        original = cliente.get("/api/tree", headers={"Accept-Encoding": "identity"})
+    assert comprimida.headers["content-encoding"] == "gzip"
+    assert comprimida.headers["vary"] == "Accept-Encoding"
+    assert comprimida.headers["etag"].startswith('W/"')
+    assert "x-cache" not in comprimida.headers
+
+    assert "content-encoding" not in original.headers
+    assert original.headers["etag"] == comprimida.headers["etag"].removeprefix("W/")
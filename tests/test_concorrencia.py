@@ -0,0 +1,192 @@
+# Testes unitários para a trava de leitores e escritor do motor
+
+import random
+import threading
+import time
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.business_logic import SistemaRecomendacao
+from src.colacao import chave_colacao
+from src.concorrencia import TravaLeituraEscrita
+
+
+def _verificar_invariantes(node, minimo=None, maximo=None):
+    """
+    Confere ordem de busca, altura guardada e fator de balanceamento da
+    subárvore; retorna (altura, chaves em ordem).
+    """
+    if node is None:
+        return 0, []
+    assert minimo is None or node.key > minimo
+    assert maximo is None or node.key < maximo
+    altura_esq, chaves_esq = _verificar_invariantes(node.leftChild, minimo, node.key)
+    altura_dir, chaves_dir = _verificar_invariantes(node.rightChild, node.key, maximo)
+    assert abs(altura_esq - altura_dir) <= 1
+    assert node.height == 1 + max(altura_esq, altura_dir)
+    assert chave_colacao(node.data.nome) == node.key
+    return node.height, chaves_esq + [node.key] + chaves_dir
+
+
+def test_leituras_em_paralelo_e_escrita_exclusiva():
+    """
+    Dois leitores seguram a trava ao mesmo tempo; o escritor espera os dois.
+    """
+    trava = TravaLeituraEscrita()
+    dentro = threading.Barrier(3)
+    soltar = threading.Event()
+    escreveu = threading.Event()
+
+    def ler():
+        with trava.leitura():
+            dentro.wait()
+            soltar.wait()
+
+    def escrever():
+        with trava.escrita():
+            escreveu.set()
+
+    leitores = [threading.Thread(target=ler) for _ in range(2)]
+    for t in leitores:
+        t.start()
+    dentro.wait()
+    escritor = threading.Thread(target=escrever)
+    escritor.start()
+
+    assert not escreveu.wait(0.1)
+    soltar.set()
+    escritor.join(2)
+
+    assert escreveu.is_set()
+    metricas = trava.metricas()
+    assert metricas['maximo_leitores_simultaneos'] == 2
+    assert metricas['escrita']['aquisicoes'] == 1
+    assert metricas['escrita']['espera_maxima_ms'] >= 100
+
+
+def test_escritor_esperando_tem_preferencia():
+    """
+    Com um escritor na fila, um leitor novo espera o escritor passar.
+    """
+    trava = TravaLeituraEscrita()
+    ordem = []
+    leitor_dentro = threading.Event()
+    soltar = threading.Event()
+
+    def primeiro_leitor():
+        with trava.leitura():
+            leitor_dentro.set()
+            soltar.wait()
+
+    def escritor():
+        with trava.escrita():
+            ordem.append("escritor")
+
+    def segundo_leitor():
+        with trava.leitura():
+            ordem.append("leitor")
+
+    threads = [threading.Thread(target=primeiro_leitor)]
+    threads[0].start()
+    leitor_dentro.wait()
+    threads.append(threading.Thread(target=escritor))
+    threads[1].start()
+    while not trava.metricas()['escritores_esperando']:
+        time.sleep(0.001)
+    threads.append(threading.Thread(target=segundo_leitor))
+    threads[2].start()
+
+    time.sleep(0.05)
+    assert ordem == []
+    soltar.set()
+    for t in threads:
+        t.join(2)
+
+    assert ordem == ["escritor", "leitor"]
+
+
+def test_reentrada_e_promocao_proibida():
+    trava = TravaLeituraEscrita()
+    with trava.escrita():
+        with trava.escrita():
+            with trava.leitura():
+                pass
+    with trava.leitura():
+        with trava.leitura():
+            with pytest.raises(RuntimeError):
+                trava.adquirir_escrita()
+
+    # a trava volta livre: outra thread consegue escrever
+    def escrever():
+        with trava.escrita():
+            pass
+    t = threading.Thread(target=escrever)
+    t.start()
+    t.join(1)
+    assert not t.is_alive()
+
+
+def test_estresse_multithread_preserva_invariantes(capsys):
+    """
+    Escritores inserem/removem categorias e produtos enquanto leitores buscam e
+    recomendam; no fim a AVL continua válida e o conteúdo bate com o esperado.
+    """
+    sistema = SistemaRecomendacao()
+    for i in range(50):
+        sistema.cadastrar_categoria(f"base-{i:03d}")
+
+    erros = []
+    esperado = {}  # categoria criada por escritor -> numero de produtos
+    trava_esperado = threading.Lock()
+
+    def escritor(n):
+        aleatorio = random.Random(n)
+        minhas = []
+        try:
+            for i in range(150):
+                nome = f"w{n}-{i:03d}"
+                sistema.cadastrar_categoria(nome)
+                for produto_id in range(3):
+                    sistema.cadastrar_produto(nome, n * 10000 + i * 10 + produto_id, "p", 1.0)
+                sistema.remover_produto(nome, n * 10000 + i * 10)
+                minhas.append(nome)
+                if aleatorio.random() < 0.3:
+                    sistema.remover_categoria(minhas.pop(aleatorio.randrange(len(minhas))))
+            with trava_esperado:
+                esperado.update({nome: 2 for nome in minhas})
+        except Exception as e:  # pragma: no cover - so para reportar
+            erros.append(e)
+
+    def leitor(n):
+        aleatorio = random.Random(100 + n)
+        try:
+            for _ in range(300):
+                categoria = sistema.buscar_categoria(f"base-{aleatorio.randrange(50):03d}")
+                assert categoria is not None
+                sistema.recomendar_produtos(f"base-{aleatorio.randrange(50):03d}")
+                with sistema.trava.leitura():
+                    _verificar_invariantes(sistema.arvore_categorias.root)
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=escritor, args=(n,)) for n in range(4)]
+    threads += [threading.Thread(target=leitor, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(60)
+    capsys.readouterr()
+
+    assert not erros
+    _, chaves = _verificar_invariantes(sistema.arvore_categorias.root)
+    assert chaves == sorted([f"base-{i:03d}" for i in range(50)] + list(esperado))
+    for nome, quantidade in esperado.items():
+        categoria = sistema.buscar_categoria(nome)
+        assert len(categoria.produtos) == quantidade
+        assert sorted(categoria._indice_produtos) == sorted(p.id for p in categoria.produtos)
+    metricas = sistema.trava.metricas()
+    assert metricas['escrita']['aquisicoes'] >= 4 * 150
+    assert metricas['leitores_ativos'] == 0
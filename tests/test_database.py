@@ -0,0 +1,166 @@
+# Testes unitários para a camada SQLite (Database)
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    """
+    Banco vazio em arquivo temporário, com a hierarquia:
+
+        Eletrônicos
+        ├── Celulares
+        │   └── Smartphones
+        └── TVs
+        Livros
+    """
+    banco = Database(str(tmp_path / "teste.db"))
+    ids = {}
+    ids["Eletrônicos"] = banco.inserir_categoria("Eletrônicos")
+    ids["Celulares"] = banco.inserir_categoria("Celulares", "", ids["Eletrônicos"])
+    ids["Smartphones"] = banco.inserir_categoria("Smartphones", "", ids["Celulares"])
+    ids["TVs"] = banco.inserir_categoria("TVs", "", ids["Eletrônicos"])
+    ids["Livros"] = banco.inserir_categoria("Livros")
+
+    banco.inserir_produto("Rádio", ids["Eletrônicos"], 100.0, "", 3.0)
+    banco.inserir_produto("Nokia", ids["Celulares"], 300.0, "", 4.0)
+    banco.inserir_produto("iPhone", ids["Smartphones"], 9000.0, "", 4.9)
+    banco.inserir_produto("OLED", ids["TVs"], 5000.0, "", 4.5)
+    banco.inserir_produto("Romance", ids["Livros"], 50.0, "", 5.0)
+    banco.ids = ids
+    return banco
+
+
+# --- Recomendação no SQL (CTE recursiva) ---
+
+def test_recomendacao_sql_inclui_descendentes(db):
+    """
+    A recomendação de Eletrônicos inclui todos os níveis abaixo dela,
+    mas não categorias de outras raízes.
+    """
+    resultado = db.recomendar_produtos_descendentes(db.ids["Eletrônicos"])
+
+    assert [p["nome"] for p in resultado] == ["iPhone", "OLED", "Nokia", "Rádio"]
+    assert "Romance" not in [p["nome"] for p in resultado]
+
+
+def test_recomendacao_sql_subarvore_e_limite(db):
+    """
+    Ordenação e limite são aplicados no próprio banco.
+    """
+    resultado = db.recomendar_produtos_descendentes(db.ids["Celulares"], "preco_asc", limite=1)
+
+    assert len(resultado) == 1
+    assert resultado[0]["nome"] == "Nokia"
+    assert resultado[0]["categoria_nome"] == "Celulares"
+
+
+def test_recomendacao_sql_categoria_inexistente(db):
+    """
+    Categoria inexistente retorna lista vazia.
+    """
+    assert db.recomendar_produtos_descendentes(9999) == []
+
+
+def test_recomendacao_sql_criterio_invalido(db):
+    """
+    Critério de ordenação fora da lista é rejeitado antes de montar o SQL.
+    """
+    with pytest.raises(ValueError):
+        db.recomendar_produtos_descendentes(db.ids["Eletrônicos"], "id; DROP TABLE produtos")
+
+
+# --- Busca textual (FTS5) ---
+
+def test_busca_texto_prefixo_e_acentos(db):
+    """
+    Prefixos casam e acentos são ignorados ("radi" acha "Rádio").
+    """
+    assert [p["nome"] for p in db.buscar_produtos_texto("radi")] == ["Rádio"]
+    assert [p["nome"] for p in db.buscar_produtos_texto("iph")] == ["iPhone"]
+
+
+def test_busca_texto_ranqueia_nome_acima_da_descricao(db):
+    """
+    Termo no nome pesa mais do que o mesmo termo só na descrição.
+    """
+    db.inserir_produto("Capa", db.ids["Celulares"], 20.0, "capa para nokia e outros", 3.0)
+
+    resultado = db.buscar_produtos_texto("nokia")
+
+    assert [p["nome"] for p in resultado] == ["Nokia", "Capa"]
+
+
+def test_busca_texto_acompanha_update_e_delete(db):
+    """
+    Os triggers mantêm o índice em dia com atualizações e remoções.
+    """
+    romance = db.buscar_produtos_texto("romance")[0]
+    db.atualizar_produto(romance["id"], "Poesia", db.ids["Livros"], 50.0, "", 5.0)
+
+    assert db.buscar_produtos_texto("romance") == []
+    assert db.buscar_produtos_texto("poesia")[0]["id"] == romance["id"]
+
+    db.deletar_produto(romance["id"])
+    assert db.buscar_produtos_texto("poesia") == []
+
+
+def test_busca_texto_sintaxe_fts_neutralizada(db):
+    """
+    Operadores do FTS5 digitados pelo usuário são tratados como texto.
+    """
+    assert db.buscar_produtos_texto('OLED OR "') == []
+    assert db.buscar_produtos_texto("   ") == []
+
+
+# --- Execução em lote (uma transação) ---
+
+def test_executar_lote_isola_falhas_por_savepoint(db):
+    """
+    Uma operação que falha é desfeita sozinha; as demais do lote são gravadas.
+    """
+    def falha(conn):
+        db.inserir_produto("Fantasma", db.ids["Livros"], 1.0, conn=conn)
+        raise ValueError("erro no meio da operação")
+
+    seq = db.ultima_alteracao()
+    resultados, intervalo = db.executar_lote([
+        lambda conn: db.inserir_produto("Conto", db.ids["Livros"], 20.0, conn=conn),
+        falha,
+        lambda conn: db.inserir_produto("Ensaio", db.ids["Livros"], 30.0, conn=conn),
+    ])
+
+    assert [sucesso for sucesso, _ in resultados] == [True, False, True]
+    # só as duas inserções que ficaram entram no log, entre os seqs devolvidos
+    assert intervalo == (seq, seq + 2) == (seq, db.ultima_alteracao())
+    assert isinstance(resultados[1][1], ValueError)
+    nomes = [p["nome"] for p in db.listar_produtos_por_categoria(db.ids["Livros"])]
+    assert nomes == ["Conto", "Ensaio", "Romance"]
+
+
+# --- Exportação em lotes (paginação por chave) ---
+
+def test_iterar_produtos_em_lotes_por_id(db):
+    """
+    Os lotes respeitam o tamanho pedido e cobrem todos os produtos em ordem de id.
+    """
+    lotes = list(db.iterar_produtos(tamanho_lote=2))
+
+    assert [len(lote) for lote in lotes] == [2, 2, 1]
+    ids = [p["id"] for lote in lotes for p in lote]
+    assert ids == sorted(ids) and len(ids) == 5
+
+
+def test_iterar_produtos_filtra_subarvore(db):
+    """
+    Com categoria_id, só entram a categoria e suas descendentes.
+    """
+    nomes = [p["nome"] for lote in db.iterar_produtos(db.ids["Celulares"], 1) for p in lote]
+
+    assert sorted(nomes) == ["Nokia", "iPhone"]
@@ -0,0 +1,114 @@
+# Testes unitários para o coordenador de escritas (group commit)
+
+import asyncio
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.estruturas import silenciar
+from src.business_logic import SistemaRecomendacao
+from src.database import Database
+from src.escrita import CoordenadorEscrita
+
+
+@pytest.fixture
+def db(tmp_path):
+    banco = Database(str(tmp_path / "teste.db"))
+    banco.categoria_id = banco.inserir_categoria("Livros")
+    return banco
+
+
+def test_escritas_concorrentes_saem_em_um_lote(db):
+    """
+    Pedidos que chegam juntos compartilham a transação e são aplicados em ordem.
+    """
+    coordenador = CoordenadorEscrita(db, janela_ms=50, tamanho_maximo=100)
+    aplicados = []
+
+    async def criar(i):
+        return await coordenador.executar(
+            lambda conn: db.inserir_produto(f"Livro {i}", db.categoria_id, 10.0, conn=conn),
+            lambda produto_id: aplicados.append(produto_id),
+        )
+
+    async def principal():
+        return await asyncio.gather(*[criar(i) for i in range(20)])
+
+    ids = asyncio.run(principal())
+
+    assert aplicados == ids == sorted(ids)
+    metricas = coordenador.metricas()
+    assert metricas["lotes"] == 1
+    assert metricas["maior_lote"] == 20
+
+
+def test_tamanho_maximo_fecha_o_lote(db):
+    """
+    O lote fecha ao atingir o tamanho máximo mesmo com a janela aberta.
+    """
+    coordenador = CoordenadorEscrita(db, janela_ms=50, tamanho_maximo=4)
+
+    async def principal():
+        await asyncio.gather(*[
+            coordenador.executar(lambda conn: db.inserir_produto("x", db.categoria_id, 1.0, conn=conn))
+            for _ in range(10)
+        ])
+
+    asyncio.run(principal())
+
+    assert coordenador.metricas()["lotes"] == 3
+    assert coordenador.maior_lote == 4
+
+
+def test_falha_chega_somente_ao_chamador(db):
+    """
+    A exceção da operação é devolvida a quem a pediu, sem afetar o resto do lote.
+    """
+    coordenador = CoordenadorEscrita(db, janela_ms=20)
+
+    def falha(conn):
+        raise ValueError("dados invalidos")
+
+    async def principal():
+        return await asyncio.gather(
+            coordenador.executar(lambda conn: db.inserir_produto("ok", db.categoria_id, 1.0, conn=conn)),
+            coordenador.executar(falha),
+            return_exceptions=True,
+        )
+
+    ok, erro = asyncio.run(principal())
+
+    assert isinstance(ok, int)
+    assert isinstance(erro, ValueError)
+    assert coordenador.total_falhas == 1
+
+
+def test_lote_aplicado_avanca_o_seq_do_sistema(db):
+    """
+    As escritas do próprio processo não voltam pelo tailer; uma alteração de
+    outro processo pendente segura o seq até o tailer aplicar tudo em ordem.
+    """
+    with silenciar():
+        sistema = SistemaRecomendacao()
+        sistema.sincronizar_alteracoes(db)
+    coordenador = CoordenadorEscrita(db, janela_ms=1, sistema=sistema)
+
+    def criar(nome):
+        return coordenador.executar(
+            lambda conn: db.inserir_produto(nome, db.categoria_id, 10.0, conn=conn),
+            lambda produto_id: sistema.cadastrar_produto("Livros", produto_id, nome, 10.0),
+        )
+
+    with silenciar():
+        asyncio.run(criar("Conto"))
+        assert sistema.seq_alteracoes == db.ultima_alteracao()
+        assert sistema.sincronizar_alteracoes(db) == 0
+
+        db.inserir_produto("Externo", db.categoria_id, 5.0)
+        asyncio.run(criar("Ensaio"))
+        assert sistema.seq_alteracoes == db.ultima_alteracao() - 2
+        assert sistema.sincronizar_alteracoes(db) == 2
+
+    assert [p.nome for p in sistema.buscar_categoria("Livros").produtos] == ["Conto", "Externo", "Ensaio"]
@@ -0,0 +1,131 @@
+# Testes unitários para a exportação do catálogo em fluxo
+
+import csv
+import io
+import json
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.database import Database
+from src.exportacao import gerar_csv, gerar_ndjson
+
+LOTES = [
+    [{'id': 1, 'nome': 'Rádio', 'preco': 100.0, 'descricao': 'am, fm', 'avaliacao': 3.0,
+      'categoria_id': 1, 'categoria_nome': 'Eletrônicos'}],
+    [{'id': 2, 'nome': 'Romance "clássico"', 'preco': 50.0, 'descricao': '', 'avaliacao': 5.0,
+      'categoria_id': 2, 'categoria_nome': 'Livros'}],
+]
+
+
+def test_ndjson_um_pedaco_por_lote():
+    pedacos = list(gerar_ndjson(iter(LOTES)))
+
+    assert len(pedacos) == 2
+    linhas = b"".join(pedacos).decode("utf-8").splitlines()
+    assert [json.loads(linha)["nome"] for linha in linhas] == ['Rádio', 'Romance "clássico"']
+
+
+def test_csv_com_cabecalho_e_escape():
+    """
+    Vírgulas e aspas são escapadas; o cabeçalho sai antes do primeiro lote.
+    """
+    pedacos = list(gerar_csv(iter(LOTES)))
+
+    assert len(pedacos) == 3
+    texto = b"".join(pedacos).decode("utf-8-sig")
+    linhas = list(csv.DictReader(io.StringIO(texto)))
+    assert linhas[0]["descricao"] == "am, fm"
+    assert linhas[1]["nome"] == 'Romance "clássico"'
+
+
+# --- Leitura do banco em lotes (paginação por chave) ---
+
+@pytest.fixture
+def banco(tmp_path):
+    """
+    Dois ramos (Casa > Cozinha, e Jardim) com produtos intercalados entre
+    eles, de modo que os ids de um ramo não são contíguos.
+    """
+    db = Database(str(tmp_path / "exportacao.db"))
+    casa = db.inserir_categoria("Casa")
+    cozinha = db.inserir_categoria("Cozinha", "", casa)
+    jardim = db.inserir_categoria("Jardim")
+    for i, categoria_id in enumerate([casa, jardim, cozinha, jardim, cozinha, casa, jardim, cozinha]):
+        db.inserir_produto(f"Produto {i}", categoria_id, 10.0 + i)
+    db.ids = {"Casa": casa, "Cozinha": cozinha, "Jardim": jardim}
+    return db
+
+
+def _ids(lotes):
+    return [[produto["id"] for produto in lote] for lote in lotes]
+
+
+def test_lotes_atravessam_buracos_e_mudancas(banco):
+    """
+    Lotes cheios seguem do último id lido, sem repetir nem pular produtos,
+    mesmo com ids removidos e com o banco mudando entre um lote e outro.
+    """
+    banco.deletar_produto(2)
+    banco.deletar_produto(5)
+    # 6 produtos em lotes de 3: o segundo lote sai cheio e a consulta seguinte vem vazia
+    assert _ids(banco.iterar_produtos(tamanho_lote=3)) == [[1, 3, 4], [6, 7, 8]]
+    assert _ids(banco.iterar_produtos(tamanho_lote=4)) == [[1, 3, 4, 6], [7, 8]]
+    assert _ids(banco.iterar_produtos(tamanho_lote=100)) == [[1, 3, 4, 6, 7, 8]]
+
+    lotes = banco.iterar_produtos(tamanho_lote=3)
+    assert _ids([next(lotes)]) == [[1, 3, 4]]
+    # um produto já lido sai, um não lido sai e um novo entra no fim
+    banco.deletar_produto(1)
+    banco.deletar_produto(7)
+    novo = banco.inserir_produto("Novo", banco.ids["Jardim"], 1.0)
+    assert _ids(lotes) == [[6, 8, novo]]
+
+
+def test_lotes_de_uma_subarvore(banco):
+    """
+    categoria_id traz a categoria e as subcategorias, em ordem de id, com
+    lotes que atravessam os produtos de outros ramos.
+    """
+    casa = [[1, 3], [5, 6], [8]]
+    assert _ids(banco.iterar_produtos(banco.ids["Casa"], tamanho_lote=2)) == casa
+    assert {p["categoria_nome"] for lote in banco.iterar_produtos(banco.ids["Casa"], 2)
+            for p in lote} == {"Casa", "Cozinha"}
+    assert _ids(banco.iterar_produtos(banco.ids["Cozinha"], tamanho_lote=1)) == [[3], [5], [8]]
+    assert _ids(banco.iterar_produtos(banco.ids["Jardim"], tamanho_lote=3)) == [[2, 4, 7]]
+    assert list(banco.iterar_produtos(9999)) == []
+
+
+# --- Rota /api/exportar/produtos ---
+
+def test_rota_exporta_em_ndjson_e_csv(aplicacao):
+    """
+    A rota devolve o catálogo inteiro em ordem de id (ndjson), uma subárvore
+    (csv) com o nome de arquivo da categoria, e 404 para categoria inexistente.
+    """
+    db = aplicacao.db
+    raiz = db.inserir_categoria("Exportação")
+    filha = db.inserir_categoria("Exportação filha", "", raiz)
+    fora = db.inserir_categoria("Fora da exportação")
+    esperados = [db.inserir_produto(f"Item {i}", [raiz, fora, filha][i % 3], 5.0) for i in range(7)]
+    cliente = aplicacao.cliente
+
+    resposta = cliente.get("/api/exportar/produtos", params={"lote": 2})
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="produtos.ndjson"' in resposta.headers["content-disposition"]
+    ids = [json.loads(linha)["id"] for linha in resposta.text.splitlines()]
+    assert ids == sorted(produto["id"] for produto in db.listar_produtos())
+
+    resposta = cliente.get("/api/exportar/produtos",
+                           params={"formato": "csv", "categoria_id": raiz, "lote": 2})
+    assert resposta.status_code == 200
+    assert f'filename="produtos-{raiz}.csv"' in resposta.headers["content-disposition"]
+    linhas = list(csv.DictReader(io.StringIO(resposta.content.decode("utf-8-sig"))))
+    assert [int(linha["id"]) for linha in linhas] == [
+        produto_id for i, produto_id in enumerate(esperados) if i % 3 != 1]
+
+    assert cliente.get("/api/exportar/produtos", params={"categoria_id": 999999}).status_code == 404
+    assert cliente.get("/api/exportar/produtos", params={"formato": "xml"}).status_code == 422
@@ -0,0 +1,109 @@
+# Testes unitários para os índices globais de preço e avaliação
+
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.estruturas import silenciar
+from src.business_logic import SistemaRecomendacao
+from src.indices_produtos import chave_da_ordenacao
+from src.mapas_ordenados import ListaBlocos
+from src.snapshot import carregar_snapshot, salvar_snapshot
+
+
+def _referencia(sistema, preco_min, preco_max, avaliacao_min, ordenar, limite):
+    """Varredura de todas as categorias, como seria sem os índices."""
+    produtos = [produto for _, categoria in sistema.arvore_categorias.itens()
+                for produto in categoria.produtos
+                if (preco_min is None or produto.preco >= preco_min)
+                and (preco_max is None or produto.preco <= preco_max)
+                and (avaliacao_min is None or produto.avaliacao >= avaliacao_min)]
+    if ordenar == "avaliacao":
+        produtos.sort(key=lambda p: (-p.avaliacao, p.id))
+    else:
+        produtos.sort(key=lambda p: (p.preco, p.id), reverse=ordenar == "preco_desc")
+    return [p.id for p in produtos[:limite]]
+
+
+def test_lista_em_blocos_reversa_e_carga_ordenada():
+    gerador = random.Random(3)
+    chaves = sorted(gerador.sample(range(10_000), 1500))
+    lista = ListaBlocos(carga=8)
+    lista.carregar_ordenados(chaves, [str(c) for c in chaves])
+    for chave in gerador.sample(chaves, 300):
+        lista.delete(chave)
+        chaves.remove(chave)
+    for chave in gerador.sample(range(10_000, 12_000), 300):
+        lista.insert(chave, str(chave))
+        chaves.append(chave)
+    chaves.sort()
+
+    assert [c for c, _ in lista.itens()] == chaves
+    assert [c for c, _ in lista.itens_reversos()] == chaves[::-1]
+    for _ in range(50):
+        inicio, fim = sorted(gerador.sample(range(-10, 12_010), 2))
+        esperado = [c for c in chaves if inicio <= c <= fim]
+        assert [c for c, _ in lista.itens_reversos(inicio, fim)] == esperado[::-1]
+        assert [c for c, _ in lista.itens_reversos(None, fim)] == [c for c in chaves if c <= fim][::-1]
+        assert all(lista.find(c) == str(c) for c in esperado[:5])
+
+
+def test_consulta_igual_a_varredura_depois_de_alteracoes():
+    gerador = random.Random(11)
+    with silenciar():
+        sistema = SistemaRecomendacao()
+        for c in range(20):
+            sistema.cadastrar_categoria(f"Categoria {c}")
+        for i in range(600):
+            sistema.cadastrar_produto(f"Categoria {i % 20}", i, f"Produto {i}",
+                                      gerador.choice([9.9, 19.9, 49.9, 99.9, 150.0, 199.9, 350.0]),
+                                      "", gerador.choice([1.0, 3.5, 4.0, 4.5, 5.0]))
+        for i in gerador.sample(range(600), 100):
+            sistema.atualizar_produto(f"Categoria {i % 20}", i, f"Produto {i}", gerador.uniform(1, 400),
+                                      "", gerador.uniform(0, 5), nova_categoria=f"Categoria {gerador.randrange(20)}")
+        sistema.remover_categoria("Categoria 7")
+        for _, categoria in list(sistema.arvore_categorias.itens())[:3]:
+            sistema.remover_produto(categoria.nome, categoria.produtos[0].id)
+
+    assert len(sistema.indices) == sum(len(c.produtos) for _, c in sistema.arvore_categorias.itens())
+    for preco_min, preco_max, avaliacao_min in [(None, None, None), (100, 200, None), (None, 50, 4.0),
+                                                (150.0, None, 4.5), (19.9, 19.9, None), (500, None, None)]:
+        for ordenar in ("preco_asc", "preco_desc", "avaliacao"):
+            encontrados = sistema.consultar_produtos(preco_min, preco_max, avaliacao_min, ordenar, 20)
+            assert [p.id for p, _ in encontrados] == \
+                _referencia(sistema, preco_min, preco_max, avaliacao_min, ordenar, 20)
+            assert all(categoria.buscar_produto(p.id) is p for p, categoria in encontrados)
+
+            # paginas de 7 pela chave do ultimo item cobrem a faixa inteira, sem repetir
+            paginados, apos = [], None
+            while True:
+                pagina = sistema.consultar_produtos(preco_min, preco_max, avaliacao_min, ordenar, 7, apos)
+                paginados += [p.id for p, _ in pagina]
+                if len(pagina) < 7:
+                    break
+                apos = chave_da_ordenacao(pagina[-1][0], ordenar)
+            assert paginados == _referencia(sistema, preco_min, preco_max, avaliacao_min, ordenar, None)
+
+
+def test_indices_refeitos_na_troca_da_arvore(tmp_path):
+    with silenciar():
+        sistema = SistemaRecomendacao()
+        sistema.cadastrar_categoria("Livros")
+        sistema.cadastrar_categoria("Jogos")
+        sistema.cadastrar_produto("Livros", 1, "Romance", 49.9, "", 4.0)
+        sistema.cadastrar_produto("Jogos", 2, "Xadrez", 120.0, "", 5.0)
+        sistema.cadastrar_produto("Jogos", 3, "Dama", 35.0, "", 3.0)
+    caminho = str(tmp_path / "catalogo.snapshot")
+    salvar_snapshot(sistema, caminho)
+
+    restaurado = SistemaRecomendacao()
+    carregar_snapshot(caminho, restaurado)
+    assert [(p.id, c.nome) for p, c in restaurado.consultar_produtos(ordenar="preco_desc")] == \
+        [(2, "Jogos"), (1, "Livros"), (3, "Jogos")]
+    assert [p.id for p, _ in restaurado.consultar_produtos(ordenar="avaliacao", limite=2)] == [2, 1]
+
+    restaurado.trocar_arvore(restaurado.nova_arvore(), 0, verificar=False)
+    assert restaurado.consultar_produtos() is None
+    assert SistemaRecomendacao(indices=False).consultar_produtos() is None
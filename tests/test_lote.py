@@ -0,0 +1,123 @@
+# Testes unitários para a escrita em lote de produtos e categorias
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.business_logic import SistemaRecomendacao
+from src.database import Database
+from src.lote import (ERRO_RECUSADO, LoteRecusado, aplicar_lote_categorias, aplicar_lote_produtos,
+                      gravar_lote_categorias, gravar_lote_produtos)
+
+
+@pytest.fixture
+def db(tmp_path):
+    banco = Database(str(tmp_path / "teste.db"))
+    banco.livros = banco.inserir_categoria("Livros")
+    banco.revistas = banco.inserir_categoria("Revistas")
+    return banco
+
+
+@pytest.fixture
+def sistema(db):
+    sistema = SistemaRecomendacao()
+    sistema.sincronizar_alteracoes(db)
+    return sistema
+
+
+def _gravar(db, gravar_lote, itens):
+    resultados, _ = db.executar_lote([lambda conn: gravar_lote(db, conn, itens)])
+    sucesso, retorno = resultados[0]
+    assert sucesso
+    return retorno
+
+
+def test_lote_de_produtos_com_status_por_item(db, sistema):
+    """
+    Itens válidos são gravados e aplicados; os inválidos voltam com erro.
+    """
+    resultados, mudancas = _gravar(db, gravar_lote_produtos, [
+        {'nome': 'Romance', 'categoria_id': db.livros, 'preco': 50.0, 'avaliacao': 4.0},
+        {'nome': 'Fantasma', 'categoria_id': 9999, 'preco': 1.0},
+        {'nome': 'Sem preço', 'categoria_id': db.livros},
+        {'nome': 'Quadrinho', 'categoria_id': db.revistas, 'preco': 20.0},
+    ])
+    aplicar_lote_produtos(sistema, mudancas)
+
+    assert [r['status'] for r in resultados] == ['ok', 'erro', 'erro', 'ok']
+    assert "9999" in resultados[1]['erro']
+    assert "preco" in resultados[2]['erro']
+    assert [p['nome'] for p in db.listar_produtos()] == ['Quadrinho', 'Romance']
+    assert sistema.buscar_categoria("Livros").buscar_produto(resultados[0]['id']).nome == 'Romance'
+
+
+def test_lote_atualiza_parcialmente_move_e_exclui(db, sistema):
+    """
+    Atualizar mantém os campos ausentes e pode trocar a categoria; excluir remove.
+    """
+    criados, mudancas = _gravar(db, gravar_lote_produtos, [
+        {'nome': 'Romance', 'categoria_id': db.livros, 'preco': 50.0},
+        {'nome': 'Poesia', 'categoria_id': db.livros, 'preco': 30.0},
+    ])
+    aplicar_lote_produtos(sistema, mudancas)
+    romance, poesia = (r['id'] for r in criados)
+
+    resultados, mudancas = _gravar(db, gravar_lote_produtos, [
+        {'operacao': 'atualizar', 'id': romance, 'preco': 45.0, 'categoria_id': db.revistas},
+        {'operacao': 'excluir', 'id': poesia},
+        {'operacao': 'excluir', 'id': poesia},
+    ])
+    aplicar_lote_produtos(sistema, mudancas)
+
+    assert [r['status'] for r in resultados] == ['ok', 'ok', 'erro']
+    assert db.buscar_produto_por_id(romance)['nome'] == 'Romance'
+    assert db.buscar_produto_por_id(romance)['preco'] == 45.0
+    assert db.buscar_produto_por_id(poesia) is None
+    assert sistema.buscar_categoria("Livros").produtos == []
+    assert sistema.buscar_categoria("Revistas").buscar_produto(romance).preco == 45.0
+
+
+def test_lote_de_categorias_com_pai_criado_no_mesmo_lote(db, sistema):
+    """
+    Um item pode usar como pai a categoria criada por um item anterior.
+    """
+    resultados, mudancas = _gravar(db, gravar_lote_categorias, [
+        {'nome': 'Ficção', 'categoria_pai_id': db.livros},
+        {'nome': 'Livros'},
+        {'operacao': 'atualizar', 'id': db.revistas, 'nome': 'Periódicos'},
+    ])
+    resultados_filho, mudancas_filho = _gravar(db, gravar_lote_categorias, [
+        {'nome': 'Fantasia', 'categoria_pai_id': resultados[0]['id']},
+        {'operacao': 'atualizar', 'id': db.livros, 'categoria_pai_id': db.livros},
+    ])
+    aplicar_lote_categorias(sistema, mudancas + mudancas_filho)
+
+    assert [r['status'] for r in resultados] == ['ok', 'erro', 'ok']
+    assert [r['status'] for r in resultados_filho] == ['ok', 'erro']
+    assert db.buscar_categoria_por_nome('Fantasia')['categoria_pai_id'] == resultados[0]['id']
+    assert sistema.buscar_categoria('Periódicos') is not None
+    assert sistema.buscar_categoria('Revistas') is None
+    assert sistema.buscar_categoria('Fantasia') is not None
+
+
+def test_item_recusado_pela_avl_volta_com_erro(db, sistema):
+    """
+    Um item gravado no banco que a AVL recusa (categoria que ela ainda não
+    tem) fica com erro; os outros são aplicados e o lote levanta LoteRecusado.
+    """
+    jogos = db.inserir_categoria("Jogos")
+    resultados, mudancas = _gravar(db, gravar_lote_produtos, [
+        {'nome': 'Xadrez', 'categoria_id': jogos, 'preco': 80.0},
+        {'nome': 'Romance', 'categoria_id': db.livros, 'preco': 50.0},
+    ])
+    with pytest.raises(LoteRecusado) as erro:
+        aplicar_lote_produtos(sistema, mudancas)
+
+    assert erro.value.recusados == [resultados[0]]
+    assert [(r['status'], r['erro']) for r in resultados] == [('erro', ERRO_RECUSADO), ('ok', None)]
+    assert sistema.buscar_categoria("Livros").buscar_produto(resultados[1]['id']) is not None
+    # o tailer reaplica o log e traz o que faltava
+    sistema.sincronizar_alteracoes(db)
+    assert sistema.buscar_categoria("Jogos").buscar_produto(resultados[0]['id']).nome == 'Xadrez'
@@ -0,0 +1,103 @@
+# Testes unitários para os mapas ordenados intercambiáveis (AVL, árvore B e lista em blocos)
+
+import pytest
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.estruturas import silenciar
+from src.avl_tree import AVLTree
+from src.business_logic import SistemaRecomendacao
+from src.mapas_ordenados import ArvoreB, ESTRUTURAS, ListaBlocos, criar_mapa
+
+# graus pequenos forçam divisões, fusões e empréstimos com poucas chaves
+PEQUENOS = {
+    'avl': AVLTree,
+    'arvore_b': lambda: ArvoreB(grau=2),
+    'lista_blocos': lambda: ListaBlocos(carga=4),
+}
+
+
+def _em_ordem(node):
+    if node is None:
+        return []
+    return _em_ordem(node.leftChild) + [node] + _em_ordem(node.rightChild)
+
+
+@pytest.mark.parametrize("estrutura", list(PEQUENOS))
+def test_operacoes_aleatorias_como_dict(estrutura):
+    """Inserções e remoções sorteadas: find, itens e intervalos batem com um dict de referência"""
+    sorteio = random.Random(3)
+    mapa, referencia = PEQUENOS[estrutura](), {}
+    with silenciar():
+        for passo in range(4000):
+            chave = sorteio.randrange(500)
+            if sorteio.random() < 0.55:
+                if chave not in referencia:
+                    referencia[chave] = {'produtos': [chave]}
+                    mapa.insert(chave, referencia[chave])
+            else:
+                mapa.delete(chave)
+                referencia.pop(chave, None)
+
+            if passo % 400 == 0:
+                chaves = sorted(referencia)
+                assert [chave for chave, _ in mapa.itens()] == chaves
+                assert all(mapa.find(chave) is referencia.get(chave) for chave in range(500))
+                menor, maior = sorted(sorteio.sample(range(500), 2))
+                assert [chave for chave, _ in mapa.itens(menor, maior)] == [c for c in chaves if menor <= c <= maior]
+
+                # a raiz (real ou implícita) percorre as mesmas chaves, e a
+                # recomendação é o intervalo da subárvore
+                assert [node.key for node in _em_ordem(mapa.root)] == chaves
+                for chave in chaves[::7]:
+                    menor, maior = mapa.intervalo_subarvore(chave)
+                    assert menor <= chave <= maior
+                    assert sorted(mapa.recommend(chave)) == [c for c in chaves if menor <= c <= maior]
+    assert mapa.intervalo_subarvore(-1) is None
+    assert mapa.recommend(-1) == []
+
+
+@pytest.mark.parametrize("estrutura", ["arvore_b", "lista_blocos"])
+def test_arvore_implicita_balanceada(estrutura):
+    mapa = PEQUENOS[estrutura]()
+    for chave in range(100):
+        mapa.insert(chave, None)
+    raiz = mapa.root
+    assert raiz.key == 50 and raiz.height == 7
+    # o mesmo nó devolve sempre os mesmos filhos (o snapshot indexa os nós por id)
+    assert raiz.leftChild is raiz.leftChild
+    for node in _em_ordem(raiz):
+        esquerda = node.leftChild.height if node.leftChild else 0
+        direita = node.rightChild.height if node.rightChild else 0
+        assert node.height == 1 + max(esquerda, direita) and abs(esquerda - direita) <= 1
+    mapa.delete(50)
+    assert mapa.root is not raiz and 50 not in [node.key for node in _em_ordem(mapa.root)]
+
+
+@pytest.mark.parametrize("estrutura", list(ESTRUTURAS))
+def test_sistema_com_cada_estrutura(estrutura):
+    with silenciar():
+        sistema = SistemaRecomendacao(estrutura)
+        for i in range(15):
+            sistema.cadastrar_categoria(f"Categoria {i:02d}")
+            sistema.cadastrar_produto(f"Categoria {i:02d}", i, f"Produto {i}", 10.0 + i, "", i % 5)
+        sistema.remover_categoria("Categoria 03")
+        sistema.atualizar_categoria("Categoria 04", "Categoria 99")
+        intervalo = sistema.arvore_categorias.intervalo_subarvore(sistema.chave("Categoria 07"))
+        recomendados = sistema.recomendar_produtos("Categoria 07", ordenar_por="preco_asc")
+        sistema.imprimir_hierarquia()
+
+    nomes = [categoria.nome for _, categoria in sistema.arvore_categorias.itens(*intervalo)]
+    assert sorted({item['categoria'] for item in recomendados}) == nomes
+    assert [item['produto'].preco for item in recomendados] == sorted(item['produto'].preco for item in recomendados)
+    assert sistema.buscar_categoria("Categoria 99").produtos[0].id == 4
+    assert sistema.buscar_categoria("Categoria 03") is None
+    assert isinstance(sistema.nova_arvore(), type(sistema.arvore_categorias))
+
+
+def test_estrutura_desconhecida():
+    with pytest.raises(ValueError):
+        criar_mapa("skiplist")
@@ -0,0 +1,62 @@
+# Testes unitários para a contabilidade de memória do catálogo
+
+import sys
+import os
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.estruturas import silenciar
+from benchmarks.memoria import ajustar_modelo, calibrar, contabilizar, prever
+from src.business_logic import SistemaRecomendacao
+from src.colacao import chave_colacao
+from src.models import Produto
+from src.serializacao import fragmento
+
+
+def test_contabiliza_cada_objeto_uma_vez():
+    with silenciar():
+        sistema = SistemaRecomendacao()
+        for i in range(7):
+            sistema.cadastrar_categoria(f"Categoria {i}", "descricao")
+            for j in range(3):
+                sistema.cadastrar_produto(f"Categoria {i}", 10 * i + j, f"Produto {j}", 9.9, "", 4.5)
+
+    conta, niveis = contabilizar(sistema, calibrar())
+
+    assert conta.objetos['avl_node']['instancia'] == 7
+    assert conta.objetos['categoria']['instancia'] == 7
+    assert conta.objetos['produto']['instancia'] == 21
+    # a chave de colação é uma str própria (minúscula): fica com o nó
+    assert conta.bytes['avl_node']['str'] == sum(sys.getsizeof(chave_colacao(f"Categoria {i}")) for i in range(7))
+    assert [nivel['nos'] for nivel in niveis] == [1, 2, 4]
+    assert sum(nivel['produtos'] for nivel in niveis) == 21
+    assert sum(nivel['bytes'] for nivel in niveis) == sum(sum(t.values()) for t in conta.bytes.values())
+
+
+def test_ajuste_recupera_coeficientes():
+    medicoes = [{'categorias': c, 'produtos': p, 'total': 5000 + 300 * c + 600 * p}
+                for c, p in [(10, 200), (50, 200), (100, 10_000), (500, 10_000)]]
+    modelo = ajustar_modelo(medicoes, lambda m: m['total'])
+    assert round(modelo['fixo']) == 5000
+    assert round(modelo['por_categoria']) == 300
+    assert round(modelo['por_produto']) == 600
+    assert round(prever(modelo, 1000, 1_000_000)) == 5000 + 300 * 1000 + 600 * 1_000_000
+
+    # categorias proporcionais aos produtos não separam os dois custos
+    proporcionais = [{'categorias': c, 'produtos': 100 * c, 'total': 1} for c in (10, 20, 40)]
+    assert ajustar_modelo(proporcionais, lambda m: m['total']) is None
+
+
+def test_fragmento_em_cache_tem_o_tamanho_exato():
+    produtos = [Produto(i, "Caneca", 19.9, "Cerâmica", 4.0) for i in range(1000)]
+    assert produtos[1].json_bytes() == fragmento(
+        {'id': 1, 'nome': "Caneca", 'preco': 19.9, 'descricao': "Cerâmica", 'avaliacao': 4.0})
+
+    # o que fica alocado por fragmento é o tamanho do bytes, não o buffer do codificador
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    fragmentos = [produto.json_bytes() for produto in produtos]
+    retido = (tracemalloc.get_traced_memory()[0] - antes) / len(produtos)
+    tracemalloc.stop()
+    assert retido < 2 * sys.getsizeof(fragmentos[-1])
@@ -0,0 +1,137 @@
+# Testes unitários para o catálogo em memória compartilhada
+
+import uuid
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.business_logic import SistemaRecomendacao
+from src.memoria_compartilhada import CatalogoCompartilhado, PublicadorCatalogo
+
+
+@pytest.fixture
+def publicador():
+    publicador = PublicadorCatalogo(f"srhp-teste-{uuid.uuid4().hex[:8]}")
+    yield publicador
+    publicador.encerrar()
+
+
+def _sistema_exemplo():
+    sistema = SistemaRecomendacao()
+    for nome in ["Eletrônicos", "Celulares", "TVs", "Livros", "Roupas"]:
+        sistema.cadastrar_categoria(nome, f"sobre {nome}")
+    sistema.cadastrar_produto("Celulares", 1, "iPhone", 8999.9, "", 4.8)
+    sistema.cadastrar_produto("TVs", 2, "OLED", 4999.0, "", 4.6)
+    sistema.cadastrar_produto("Livros", 3, "Romance", 49.9, "", 5.0)
+    return sistema
+
+
+def _chaves(node):
+    if node is None:
+        return []
+    return [(node.key, node.height)] + _chaves(node.leftChild) + _chaves(node.rightChild)
+
+
+def test_worker_le_a_mesma_arvore_do_carregador(publicador):
+    """
+    O worker navega a AVL direto no segmento: mesma forma, busca e recomendação.
+    """
+    origem = _sistema_exemplo()
+    publicador.publicar(origem)
+
+    worker = SistemaRecomendacao()
+    catalogo = CatalogoCompartilhado(publicador.nome)
+    assert catalogo.atualizar(worker)
+
+    assert _chaves(worker.arvore_categorias.root) == _chaves(origem.arvore_categorias.root)
+    assert worker.buscar_categoria("Celulares").produtos[0].nome == "iPhone"
+    assert worker.buscar_categoria("Inexistente") is None
+    assert [i["produto"].id for i in worker.recomendar_produtos("Eletrônicos")] == \
+        [i["produto"].id for i in origem.recomendar_produtos("Eletrônicos")]
+    catalogo.fechar()
+
+
+def test_worker_troca_para_nova_versao(publicador):
+    """
+    Uma nova publicação é detectada e trocada; sem publicação nova nada muda.
+    """
+    origem = _sistema_exemplo()
+    publicador.publicar(origem)
+    worker = SistemaRecomendacao()
+    catalogo = CatalogoCompartilhado(publicador.nome)
+    catalogo.atualizar(worker)
+
+    assert not catalogo.atualizar(worker)
+
+    origem.cadastrar_categoria("Esportes")
+    publicador.publicar(origem)
+
+    assert catalogo.atualizar(worker)
+    assert worker.buscar_categoria("Esportes") is not None
+    catalogo.fechar()
+
+
+def test_categorias_decodificadas_uma_vez_por_versao(publicador):
+    """
+    A mesma categoria (e o json em cache dela) volta nas leituras seguintes;
+    a troca de versão descarta as decodificadas da anterior.
+    """
+    origem = _sistema_exemplo()
+    publicador.publicar(origem)
+    worker = SistemaRecomendacao()
+    catalogo = CatalogoCompartilhado(publicador.nome)
+    catalogo.atualizar(worker)
+
+    celulares = worker.buscar_categoria("Celulares")
+    fragmento = celulares.produtos[0].json_bytes()
+    assert worker.buscar_categoria("Celulares") is celulares
+    assert worker.recomendar_produtos("Celulares")[0]["produto"].json_bytes() is fragmento
+    anteriores = catalogo._categorias
+    assert len(anteriores) == 2 and anteriores.produtos == 3
+
+    origem.cadastrar_produto("Celulares", 4, "Pixel", 5999.0, "", 4.5)
+    publicador.publicar(origem)
+    catalogo.atualizar(worker)
+
+    assert len(anteriores) == 0
+    atual = worker.buscar_categoria("Celulares")
+    assert atual is not celulares
+    assert [p.id for p in atual.produtos] == [1, 4]
+    catalogo.fechar()
+
+
+def test_categorias_decodificadas_respeitam_o_limite(publicador):
+    """
+    O cache da versão é um LRU limitado em produtos: ler a árvore inteira não
+    deixa o catálogo todo decodificado no worker.
+    """
+    origem = _sistema_exemplo()
+    publicador.publicar(origem)
+    worker = SistemaRecomendacao()
+    catalogo = CatalogoCompartilhado(publicador.nome, max_produtos=4)
+    catalogo.atualizar(worker)
+
+    # a recomendação percorre as 5 categorias e 3 produtos (peso 8); só as
+    # mais recentes ficam, até 4
+    assert len(worker.recomendar_produtos("Eletrônicos")) == 3
+    cache = catalogo._categorias
+    assert cache.produtos <= 4
+    celulares = worker.buscar_categoria("Celulares")
+    assert worker.buscar_categoria("Celulares") is celulares
+    # a menos recente saiu e volta decodificada de novo
+    assert worker.buscar_categoria("Livros").produtos[0].nome == "Romance"
+    assert cache.produtos <= 4
+    catalogo.fechar()
+
+
+def test_arvore_compartilhada_e_somente_leitura(publicador):
+    publicador.publicar(_sistema_exemplo())
+    worker = SistemaRecomendacao()
+    catalogo = CatalogoCompartilhado(publicador.nome)
+    catalogo.atualizar(worker)
+
+    with pytest.raises(AttributeError):
+        worker.arvore_categorias.insert("Nova", None)
+    catalogo.fechar()
@@ -0,0 +1,69 @@
+# Testes unitários para o benchmark de partida a frio
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from benchmarks.partida_fria import (ESTRATEGIAS, SUGESTOES_PADRAO, Relogio, assinatura, construir_balanceada,
+                                     gerar_banco, preparar_snapshot)
+from src.avl_tree import altura_teorica_minima
+from src.business_logic import SistemaRecomendacao
+from src.database import Database
+
+
+@pytest.fixture(scope="module")
+def banco(tmp_path_factory):
+    caminho = str(tmp_path_factory.mktemp("partida_fria") / "catalogo.db")
+    gerar_banco(caminho, produtos=600, categorias=40, semente=7)
+    preparar_snapshot(caminho)
+    return caminho
+
+
+def test_banco_gerado_segue_o_esquema(banco):
+    db = Database(banco)
+    categorias = db.listar_categorias()
+    assert len(categorias) == 40
+    assert len(db.listar_produtos()) == 600
+    # ~5% de raízes; as demais apontam para uma categoria existente
+    assert sum(1 for c in categorias if c['categoria_pai_id'] is None) == 2
+    assert all(c['categoria_pai_nome'] for c in categorias if c['categoria_pai_id'] is not None)
+    assert db.listar_alteracoes() == []
+
+
+def test_estrategias_montam_o_mesmo_catalogo(banco):
+    assinaturas = set()
+    for nome, estrategia in ESTRATEGIAS.items():
+        relogio = Relogio()
+        sistema = estrategia(banco, relogio)
+        assinaturas.add(assinatura(sistema))
+        esperadas = {"leitura_snapshot"} if nome == "snapshot" else {"leitura_banco", "insercao_categorias",
+                                                                    "associacao_produtos"}
+        assert esperadas <= set(relogio.fases)
+        assert sum(len(node.data.produtos) for node in _nos(sistema.arvore_categorias.root)) == 600
+        # todas terminam na configuração padrão do app, com os índices montados
+        assert sistema.modo_sugestoes == SUGESTOES_PADRAO == SistemaRecomendacao().modo_sugestoes
+        assert len(sistema.sugestoes) == 40
+        assert len(sistema.indices) == 600
+    assert len(assinaturas) == 1
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 8, 100])
+def test_construcao_balanceada(n):
+    chaves = [f"c{i:03d}" for i in range(n)]
+    raiz = construir_balanceada(chaves, chaves)
+    assert [node.key for node in _nos(raiz)] == chaves
+    assert (raiz.height if raiz else 0) == altura_teorica_minima(n)
+    for node in _nos(raiz):
+        esquerda = node.leftChild.height if node.leftChild else 0
+        direita = node.rightChild.height if node.rightChild else 0
+        assert abs(esquerda - direita) <= 1
+
+
+def _nos(node):
+    """nós em ordem"""
+    if node is None:
+        return []
+    return _nos(node.leftChild) + [node] + _nos(node.rightChild)
@@ -0,0 +1,74 @@
+# Testes unitários para o perfilamento sob demanda (cProfile + tracemalloc)
+
+import asyncio
+import pstats
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.perfilamento import Perfilador
+
+
+class _Resposta:
+    status_code = 200
+
+
+def _trabalho_pesado():
+    return [str(i) * 10 for i in range(20000)]
+
+
+def test_motivo_por_amostra_cabecalho_e_caminho():
+    perfilador = Perfilador(amostragem=3)
+    motivos = [perfilador.motivo("/api/tree", {}) for _ in range(6)]
+    assert motivos == [None, None, "amostra", None, None, "amostra"]
+    assert perfilador.motivo("/api/tree", {"x-perfil": "1"}) == "cabecalho"
+    assert perfilador.motivo("/debug/profile", {"x-perfil": "1"}) is None
+    assert Perfilador().motivo("/api/tree", {}) is None
+
+
+def test_registro_com_perfil_alocacoes_e_buffer_circular(tmp_path):
+    """
+    O perfil mostra a função chamada, exporta no formato do pstats e as
+    alocações apontam para a linha que alocou; o buffer guarda só os últimos.
+    """
+    perfilador = Perfilador(capacidade=2)
+    guardado = []
+
+    async def executar():
+        guardado.append(_trabalho_pesado())
+        return _Resposta()
+
+    for _ in range(3):
+        resposta, registro = asyncio.run(perfilador.perfilar(executar, "GET", "/api/tree", "cabecalho"))
+        assert resposta.status_code == 200
+
+    assert [r['id'] for r in perfilador.resumo()] == [2, 3]
+    assert registro['pico_kib'] > 100 and registro['retido_kib'] > 100
+    assert "_trabalho_pesado" in perfilador.texto_perfil()
+    assert "_trabalho_pesado" in perfilador.texto_perfil(ids=[3])
+
+    arquivo = tmp_path / "srhp.pstats"
+    arquivo.write_bytes(perfilador.bytes_pstats())
+    chamadas = {funcao[2]: dados[0] for funcao, dados in pstats.Stats(str(arquivo)).stats.items()}
+    assert chamadas["_trabalho_pesado"] == 2  # os dois registros somados
+
+    assert "test_perfilamento.py" in perfilador.alocacoes(limite=1)[0]['linha']
+    assert perfilador.bytes_pstats(ids=[99]) is None
+
+
+def test_um_perfil_por_vez():
+    perfilador = Perfilador()
+
+    async def executar():
+        await asyncio.sleep(0.01)
+        return _Resposta()
+
+    async def concorrentes():
+        return await asyncio.gather(*(perfilador.perfilar(executar, "GET", "/api/tree", "amostra")
+                                      for _ in range(3)))
+
+    registros = [registro for _, registro in asyncio.run(concorrentes())]
+    assert sum(registro is not None for registro in registros) == 1
+    assert perfilador.metricas()['ignoradas_ocupado'] == 2
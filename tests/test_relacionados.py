@@ -0,0 +1,134 @@
+# Testes unitários para os produtos relacionados item a item
+
+import json
+import math
+import random
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.relacionados import MAX_ITENS_SESSAO, MotorRelacionados, calcular_vizinhos
+
+
+def _arredondados(vizinhos):
+    return [(produto_id, round(nota, 4)) for produto_id, nota in vizinhos]
+
+
+def test_cosseno_e_jaccard_conferem_com_a_conta_manual():
+    sessoes = [{1: 1.0, 2: 3.0}, {1: 1.0, 2: 1.0, 3: 1.0}, {2: 1.0, 3: 1.0}, {4: 1.0}]
+
+    tabela = calcular_vizinhos(sessoes, n=10, medida="cosseno")
+    # produto 1 = (1, 1, 0), produto 2 = (3, 1, 1), produto 3 = (0, 1, 1)
+    assert _arredondados(tabela.vizinhos_de(1)) == [
+        (2, round(4 / math.sqrt(2 * 11), 4)), (3, round(1 / math.sqrt(2 * 2), 4))]
+    assert _arredondados(tabela.vizinhos_de(3)) == [
+        (1, 0.5), (2, round(2 / math.sqrt(2 * 11), 4))]
+    # sem coocorrência não há vizinhos; o limite corta a lista
+    assert tabela.vizinhos_de(4) == []
+    assert len(tabela.vizinhos_de(2, limite=1)) == 1
+    assert list(tabela.ids) == [1, 2, 3]
+
+    jaccard = calcular_vizinhos(sessoes, n=10, medida="jaccard")
+    # os pesos são ignorados: 1 está em 2 sessões, 2 em 3, 3 em 2
+    assert _arredondados(jaccard.vizinhos_de(1)) == [(2, round(2 / 3, 4)), (3, round(1 / 3, 4))]
+    # empate de similaridade: o menor id primeiro
+    assert [produto_id for produto_id, _ in jaccard.vizinhos_de(2)] == [1, 3]
+
+    with pytest.raises(ValueError):
+        calcular_vizinhos(sessoes, medida="pearson")
+
+
+def test_arquivo_lido_de_onde_parou(tmp_path):
+    caminho = tmp_path / "eventos.jsonl"
+    motor = MotorRelacionados()
+    assert motor.ingerir_arquivo(str(caminho)) == 0
+
+    linhas = [{'sessao': "a", 'produto_id': 1}, {'sessao': "a", 'produto_id': 2, 'tipo': "compra"}]
+    with open(caminho, "w") as arquivo:
+        arquivo.write("".join(json.dumps(linha) + "\n" for linha in linhas))
+        # linha pela metade: só entra quando o resto chegar
+        arquivo.write('{"sessao": "b", "produ')
+    assert motor.ingerir_arquivo(str(caminho)) == 2
+    assert motor.ingerir_arquivo(str(caminho)) == 0
+
+    with open(caminho, "a") as arquivo:
+        arquivo.write('to_id": 1}\nnão é json\n{"sessao": "b", "produto_id": "2"}\n')
+    assert motor.ingerir_arquivo(str(caminho)) == 1
+    assert motor.eventos_invalidos == 2
+
+    # arquivo rotacionado (menor que o offset) é relido do início
+    with open(caminho, "w") as arquivo:
+        arquivo.write(json.dumps({'sessao': "c", 'produto_id': 2}) + "\n")
+    assert motor.ingerir_arquivo(str(caminho)) == 1
+    assert motor.metricas()['sessoes'] == 3
+
+
+def test_recalculo_so_publica_com_eventos_novos():
+    motor = MotorRelacionados(n=2, max_sessoes=2)
+    assert not motor.recalcular()
+    assert motor.relacionados(1) == []
+
+    motor.registrar([{'sessao': "a", 'produto_id': 1}, {'sessao': "a", 'produto_id': 2},
+                     {'sessao': "a", 'produto_id': 1, 'tipo': "compra"},
+                     {'sessao': "b", 'produto_id': 1}, {'sessao': "b", 'produto_id': 3},
+                     {'sessao': "b", 'produto_id': 1, 'tipo': "desconhecido"}])
+    assert motor.recalcular()
+    assert not motor.recalcular()
+    # a compra vale mais que a visualização do mesmo produto na sessão
+    assert _arredondados(motor.relacionados(2)) == [(1, round(3 / math.sqrt(10), 4))]
+    assert [produto_id for produto_id, _ in motor.relacionados(1)] == [2, 3]
+
+    # além de max_sessoes, a sessão menos recente sai; além de MAX_ITENS_SESSAO, o produto mais antigo
+    motor.registrar({'sessao': "c", 'produto_id': i} for i in range(10, 11 + MAX_ITENS_SESSAO))
+    assert motor.recalcular()
+    assert motor.relacionados(2) == []
+    assert motor.relacionados(10) == []
+    assert len(motor.relacionados(11)) == 2
+
+    metricas = motor.metricas()
+    assert metricas['sessoes'] == 2
+    assert metricas['eventos_invalidos'] == 1
+    assert metricas['recalculos'] == 2
+    assert metricas['bytes_tabela'] > 0
+
+
+def _confere(motor, produtos=None):
+    completa = calcular_vizinhos(list(motor._sessoes.values()), n=motor.n, medida=motor.medida)
+    if produtos is None:
+        assert list(motor.tabela.ids) == list(completa.ids)
+        produtos = completa.ids
+    for produto_id in produtos:
+        assert _arredondados(motor.relacionados(produto_id)) == _arredondados(completa.vizinhos_de(produto_id))
+
+
+@pytest.mark.parametrize("medida", ["cosseno", "jaccard"])
+def test_matriz_incremental_confere_com_o_calculo_completo(medida):
+    """
+    A matriz recebe só as sessões mudadas (com sessões e itens saindo pelos
+    limites) e o recálculo parcial refaz só os produtos tocados; a rodada sem
+    eventos novos completa as listas que ficaram com notas antigas.
+    """
+    aleatorio = random.Random(5)
+    motor = MotorRelacionados(n=4, medida=medida, max_sessoes=30, completo_a_cada=100)
+    for rodada in range(6):
+        motor.registrar({'sessao': aleatorio.randrange(60), 'produto_id': aleatorio.randrange(40),
+                         'tipo': aleatorio.choice(["visualizacao", "compra"])}
+                        for _ in range(150 + 50 * rodada))
+        assert motor.recalcular()
+        motor.recalcular()
+        _confere(motor)
+
+    # uma sessão nova com dois produtos: só as listas deles são refeitas
+    motor.max_sessoes = 100
+    motor.registrar([{'sessao': "nova", 'produto_id': 1}, {'sessao': "nova", 'produto_id': 2}])
+    completos = motor.metricas()['recalculos_completos']
+    assert motor.recalcular()
+    assert motor.metricas()['ultimos_recalculados'] == 2
+    _confere(motor, [1, 2])
+
+    assert motor.recalcular()
+    assert motor.metricas()['recalculos_completos'] == completos + 1
+    _confere(motor)
+    assert not motor.recalcular()
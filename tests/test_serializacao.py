@@ -0,0 +1,48 @@
+# Testes unitários para os fragmentos JSON em cache dos modelos
+
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.models import Categoria, Produto
+from src.serializacao import produtos_json
+
+
+def test_fragmento_do_produto_e_json_valido():
+    produto = Produto(7, "Café \"especial\"", 29.9, "grãos", 4.5)
+
+    assert json.loads(produto.json_bytes()) == {
+        "id": 7, "nome": "Café \"especial\"", "preco": 29.9,
+        "descricao": "grãos", "avaliacao": 4.5,
+    }
+
+
+def test_fragmento_reaproveitado_e_invalidado_na_alteracao():
+    """
+    O fragmento é o mesmo objeto enquanto o produto não muda e é refeito
+    quando um campo serializado é alterado.
+    """
+    produto = Produto(1, "Mouse", 99.0)
+    fragmento = produto.json_bytes()
+
+    assert produto.json_bytes() is fragmento
+
+    produto.preco = 79.0
+    assert json.loads(produto.json_bytes())["preco"] == 79.0
+
+
+def test_campos_da_categoria_e_lista_de_produtos():
+    categoria = Categoria("Periféricos", "mouse e teclado")
+    categoria.adicionar_produto(Produto(1, "Mouse", 99.0))
+    categoria.adicionar_produto(Produto(2, "Teclado", 199.0))
+
+    corpo = b"{" + categoria.json_campos() + b',"produtos":' + produtos_json(categoria.produtos) + b"}"
+    dados = json.loads(corpo)
+
+    assert dados["nome"] == "Periféricos"
+    assert [p["nome"] for p in dados["produtos"]] == ["Mouse", "Teclado"]
+
+    categoria.nome = "Acessórios"
+    assert json.loads(b"{" + categoria.json_campos() + b"}")["nome"] == "Acessórios"
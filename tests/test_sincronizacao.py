@@ -0,0 +1,307 @@
+# Testes unitários para a sincronização incremental AVL <- banco (log de alterações)
+
+import pytest
+import sqlite3
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.business_logic import LacunaAlteracoes, SistemaRecomendacao
+from src.database import Database
+from src.models import Categoria, Produto
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "teste.db"))
+
+
+def test_triggers_registram_alteracoes(db):
+    """
+    Inserção, atualização e remoção geram linhas no log, em ordem.
+    """
+    cat_id = db.inserir_categoria("Livros", "papel")
+    db.atualizar_categoria(cat_id, "Livros", "papel e digital")
+    db.deletar_categoria(cat_id)
+
+    alteracoes = db.listar_alteracoes()
+
+    assert [a["operacao"] for a in alteracoes] == ["INSERT", "UPDATE", "DELETE"]
+    assert alteracoes[1]["dados_antigos"]["descricao"] == "papel"
+    assert alteracoes[1]["dados_novos"]["descricao"] == "papel e digital"
+    assert db.ultima_alteracao() == alteracoes[-1]["seq"]
+
+
+def test_tailer_aplica_somente_alteracoes_novas(db):
+    """
+    O tailer aplica as alterações a partir do seq guardado e não reaplica as antigas.
+    """
+    sistema = SistemaRecomendacao()
+    cat_id = db.inserir_categoria("Livros")
+    db.inserir_produto("Romance", cat_id, 50.0, "", 4.0)
+
+    assert sistema.sincronizar_alteracoes(db) == 2
+    assert [p.nome for p in sistema.buscar_categoria("Livros").produtos] == ["Romance"]
+
+    db.inserir_produto("Poesia", cat_id, 30.0, "", 5.0)
+
+    assert sistema.sincronizar_alteracoes(db) == 1
+    assert sistema.sincronizar_alteracoes(db) == 0
+    assert sistema.seq_alteracoes == db.ultima_alteracao()
+    assert len(sistema.buscar_categoria("Livros").produtos) == 2
+
+
+def test_tailer_renomeia_categoria_e_move_produto(db):
+    """
+    Renomear mantém o objeto Categoria; trocar categoria_id move o produto.
+    """
+    sistema = SistemaRecomendacao()
+    livros = db.inserir_categoria("Livros")
+    revistas = db.inserir_categoria("Revistas")
+    prod_id = db.inserir_produto("Romance", livros, 50.0, "", 4.0)
+    sistema.sincronizar_alteracoes(db)
+    categoria = sistema.buscar_categoria("Livros")
+
+    db.atualizar_categoria(livros, "Literatura", "")
+    db.atualizar_produto(prod_id, "Romance", revistas, 45.0, "", 4.0)
+    sistema.sincronizar_alteracoes(db)
+
+    assert sistema.buscar_categoria("Livros") is None
+    assert sistema.buscar_categoria("Literatura") is categoria
+    assert categoria.produtos == []
+    assert sistema.buscar_categoria("Revistas").produtos[0].preco == 45.0
+
+
+def test_tailer_idempotente_com_escrita_em_memoria(db):
+    """
+    Alterações que o processo já aplicou em memória não são duplicadas.
+    """
+    sistema = SistemaRecomendacao()
+    sistema.cadastrar_categoria("Livros")
+    cat_id = db.inserir_categoria("Livros")
+    prod_id = db.inserir_produto("Romance", cat_id, 50.0, "", 4.0)
+    sistema.cadastrar_produto("Livros", prod_id, "Romance", 50.0, "", 4.0)
+
+    sistema.sincronizar_alteracoes(db)
+
+    assert len(sistema.buscar_categoria("Livros").produtos) == 1
+
+
+def test_log_podado_mantem_a_marca_dagua(db):
+    """
+    Podar o log não faz o seq voltar: o tailer continua a partir de onde estava.
+    """
+    sistema = SistemaRecomendacao()
+    cat_id = db.inserir_categoria("Livros")
+    db.inserir_produto("Romance", cat_id, 50.0, "", 4.0)
+    sistema.sincronizar_alteracoes(db)
+
+    assert db.podar_alteracoes(sistema.seq_alteracoes) == 2
+    assert db.listar_alteracoes() == []
+    assert db.ultima_alteracao() == sistema.seq_alteracoes == 2
+
+    db.inserir_produto("Poesia", cat_id, 30.0, "", 5.0)
+    assert [a["seq"] for a in db.listar_alteracoes()] == [3]
+    assert sistema.sincronizar_alteracoes(db) == 1
+
+
+def test_poda_para_na_marca_dos_consumidores(db):
+    """
+    A poda não passa do menor seq registrado pelos consumidores; a marca de
+    um consumidor que não renova dentro da validade é descartada.
+    """
+    cat_id = db.inserir_categoria("Livros")
+    for nome in ["Romance", "Poesia", "Conto"]:
+        db.inserir_produto(nome, cat_id, 30.0, "", 4.0)
+    db.registrar_consumidor("a", 4)
+    db.registrar_consumidor("b", 2)
+
+    assert db.podar_alteracoes(4) == 2
+    assert [a["seq"] for a in db.listar_alteracoes()] == [3, 4]
+
+    db.registrar_consumidor("b", 3)
+    assert db.podar_alteracoes(4, validade=60) == 1
+
+    # "b" parou de renovar: sai na poda e não segura mais o log
+    with db.get_connection() as conn:
+        conn.execute("UPDATE consumidores_alteracoes SET atualizado_em = datetime('now', '-1 hour') WHERE consumidor = 'b'")
+    assert db.podar_alteracoes(4, validade=60) == 1
+    db.remover_consumidor("a")
+    with db.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM consumidores_alteracoes").fetchone()[0] == 0
+
+
+def test_lacuna_no_log_nao_e_pulada(db):
+    """
+    Um processo cujo seq ficou para trás da poda recebe LacunaAlteracoes, sem
+    aplicar nada, tanto com alterações novas depois da lacuna quanto sem.
+    """
+    sistema = SistemaRecomendacao()
+    cat_id = db.inserir_categoria("Livros")
+    assert sistema.sincronizar_alteracoes(db) == 1
+
+    db.inserir_produto("Romance", cat_id, 50.0, "", 4.0)
+    db.podar_alteracoes(db.ultima_alteracao())
+    with pytest.raises(LacunaAlteracoes):
+        sistema.sincronizar_alteracoes(db)
+
+    db.inserir_produto("Poesia", cat_id, 30.0, "", 5.0)
+    with pytest.raises(LacunaAlteracoes):
+        sistema.sincronizar_alteracoes(db)
+    assert sistema.seq_alteracoes == 1
+    assert sistema.buscar_categoria("Livros").produtos == []
+
+
+# --- Edições incrementais no motor ---
+
+def test_banco_recusa_nomes_equivalentes(db):
+    """
+    O banco usa a mesma chave de colação da AVL: nomes que só diferem em
+    maiúsculas ou acentos são recusados, também dentro de um lote.
+    """
+    livros = db.inserir_categoria("Livros")
+    revistas = db.inserir_categoria("Revistas")
+    with pytest.raises(sqlite3.IntegrityError):
+        db.inserir_categoria("LÍVROS")
+
+    resultados, _ = db.executar_lote([
+        lambda conn: db.atualizar_categoria(revistas, "livros", conn=conn),
+        lambda conn: db.atualizar_categoria(livros, "LIVROS", conn=conn),
+    ])
+
+    assert [sucesso for sucesso, _ in resultados] == [False, True]
+    assert isinstance(resultados[0][1], sqlite3.IntegrityError)
+    assert db.buscar_categoria_por_id(revistas)["nome"] == "Revistas"
+    assert db.buscar_categoria_por_id(livros)["nome"] == "LIVROS"
+
+
+def test_banco_antigo_ganha_a_chave_de_colacao(tmp_path, capsys):
+    """
+    Um banco sem a coluna chave_nome é migrado ao abrir; se já tiver nomes
+    equivalentes, o índice único fica de fora com um aviso.
+    """
+    def banco_antigo(caminho, nomes):
+        conn = sqlite3.connect(caminho)
+        conn.execute("""CREATE TABLE categorias (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        nome TEXT NOT NULL UNIQUE, descricao TEXT, categoria_pai_id INTEGER,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+        conn.executemany("INSERT INTO categorias (nome) VALUES (?)", [(nome,) for nome in nomes])
+        conn.commit()
+        conn.close()
+        return Database(caminho)
+
+    migrado = banco_antigo(str(tmp_path / "antigo.db"), ["Livros", "Eletrônicos"])
+    assert migrado.chave_nome_unica
+    with migrado.get_connection() as conn:
+        chaves = [row[0] for row in conn.execute("SELECT chave_nome FROM categorias ORDER BY id")]
+    assert chaves == ["livros", "eletronicos"]
+    with pytest.raises(sqlite3.IntegrityError):
+        migrado.inserir_categoria("eletronicos")
+
+    capsys.readouterr()
+    duplicado = banco_antigo(str(tmp_path / "duplicado.db"), ["Café", "cafe"])
+    assert not duplicado.chave_nome_unica
+    assert "Café, cafe" in capsys.readouterr().out
+
+
+def test_alteracao_recusada_pela_avl_e_avisada(capsys):
+    """
+    Uma alteração do log que a AVL recusa (vinda de um banco sem o índice
+    único) não some em silêncio: é contada e avisada, e o seq avança.
+    """
+    sistema = SistemaRecomendacao()
+    sistema.cadastrar_categoria("Livros")
+    sistema.cadastrar_categoria("Revistas")
+    capsys.readouterr()
+
+    aplicadas = sistema.aplicar_alteracoes([{
+        'seq': 7, 'tabela': 'categorias', 'operacao': 'UPDATE', 'registro_id': 2,
+        'dados_antigos': {'id': 2, 'nome': "Revistas", 'descricao': ""},
+        'dados_novos': {'id': 2, 'nome': "livros", 'descricao': ""},
+    }])
+
+    assert aplicadas == 1
+    assert sistema.seq_alteracoes == 7
+    assert sistema.alteracoes_recusadas == 1
+    assert "alteracao 7" in capsys.readouterr().out
+    assert sistema.buscar_categoria("Revistas").nome == "Revistas"
+    assert sistema.buscar_categoria("Livros").nome == "Livros"
+
+
+def test_renomear_categoria_preserva_objeto():
+    """
+    Renomear move a chave na AVL e mantém o mesmo objeto Categoria.
+    """
+    sistema = SistemaRecomendacao()
+    sistema.cadastrar_categoria("Livros", "papel")
+    sistema.cadastrar_produto("Livros", 1, "Romance", 50.0)
+    categoria = sistema.buscar_categoria("Livros")
+
+    assert sistema.atualizar_categoria("Livros", "Literatura", "papel e digital")
+
+    assert sistema.buscar_categoria("Livros") is None
+    assert sistema.buscar_categoria("Literatura") is categoria
+    assert categoria.descricao == "papel e digital"
+    assert [p.id for p in categoria.produtos] == [1]
+
+
+def test_renomear_para_nome_existente_falha():
+    sistema = SistemaRecomendacao()
+    sistema.cadastrar_categoria("Livros")
+    sistema.cadastrar_categoria("Revistas")
+
+    assert not sistema.atualizar_categoria("Livros", "Revistas")
+    assert sistema.buscar_categoria("Livros").nome == "Livros"
+
+
+def test_editar_produto_no_lugar_e_mover_de_categoria():
+    """
+    Editar mantém o objeto Produto; trocar a categoria move o mesmo objeto.
+    """
+    sistema = SistemaRecomendacao()
+    sistema.cadastrar_categoria("Livros")
+    sistema.cadastrar_categoria("Revistas")
+    sistema.cadastrar_produto("Livros", 1, "Romance", 50.0, "", 4.0)
+    produto = sistema.buscar_categoria("Livros").buscar_produto(1)
+
+    assert sistema.atualizar_produto("Livros", 1, "Romance", 45.0, "promo", 4.5)
+    assert produto.preco == 45.0
+
+    assert sistema.atualizar_produto("Livros", 1, "Romance", 45.0, "promo", 4.5,
+                                     nova_categoria="Revistas")
+    assert sistema.buscar_categoria("Livros").produtos == []
+    assert sistema.buscar_categoria("Revistas").buscar_produto(1) is produto
+
+
+def test_editar_produto_para_categoria_inexistente_nao_altera():
+    sistema = SistemaRecomendacao()
+    sistema.cadastrar_categoria("Livros")
+    sistema.cadastrar_produto("Livros", 1, "Romance", 50.0)
+
+    assert not sistema.atualizar_produto("Livros", 1, "Outro", 1.0, nova_categoria="Nada")
+    assert sistema.buscar_categoria("Livros").buscar_produto(1).nome == "Romance"
+
+
+def test_remover_produto_troca_pelo_ultimo():
+    """
+    A remoção põe o último produto no lugar do removido, sem refazer a lista,
+    e o índice por id continua apontando para as posições certas.
+    """
+    categoria = Categoria("Livros")
+    lista = categoria.produtos
+    for i in range(1, 6):
+        categoria.adicionar_produto(Produto(i, f"Livro {i}", 10.0 * i))
+
+    categoria.remover_produto(2)
+    categoria.remover_produto(5)
+    categoria.remover_produto(99)
+
+    assert categoria.produtos is lista
+    assert [p.id for p in categoria.produtos] == [1, 4, 3]
+    assert all(categoria.buscar_produto(p.id) is p for p in categoria.produtos)
+    assert categoria.buscar_produto(2) is None
+
+    # mesmo id de novo: substitui no lugar, sem duplicar
+    categoria.adicionar_produto(Produto(4, "Livro 4 revisado", 45.0))
+    assert [p.nome for p in categoria.produtos] == ["Livro 1", "Livro 4 revisado", "Livro 3"]
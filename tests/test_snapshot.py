@@ -0,0 +1,106 @@
+# Testes unitários para o snapshot binário do catálogo
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.business_logic import SistemaRecomendacao
+from src.database import Database
+from src.snapshot import carregar_snapshot, salvar_snapshot
+
+
+def _chaves_pre_ordem(node):
+    if node is None:
+        return []
+    return [(node.key, node.height)] + _chaves_pre_ordem(node.leftChild) + _chaves_pre_ordem(node.rightChild)
+
+
+@pytest.fixture
+def sistema():
+    sistema = SistemaRecomendacao()
+    for nome in ["Eletrônicos", "Celulares", "TVs", "Livros", "Roupas", "Áudio"]:
+        sistema.cadastrar_categoria(nome, f"descrição de {nome}")
+    sistema.cadastrar_produto("Celulares", 1, "iPhone", 8999.9, "256GB", 4.8)
+    sistema.cadastrar_produto("Celulares", 2, "Galaxy", 7499.0, "", 4.7)
+    sistema.cadastrar_produto("Livros", 3, "Romance", 49.9, "capa dura", 5.0)
+    sistema.seq_alteracoes = 42
+    return sistema
+
+
+def test_snapshot_preserva_forma_e_dados(sistema, tmp_path):
+    """
+    Carregar o snapshot reproduz a mesma árvore (forma e alturas), os produtos
+    e a marca d'água do log de alterações.
+    """
+    caminho = str(tmp_path / "catalogo.snapshot")
+    assert salvar_snapshot(sistema, caminho) == 6
+
+    restaurado = SistemaRecomendacao()
+    assert carregar_snapshot(caminho, restaurado) == 42
+
+    assert _chaves_pre_ordem(restaurado.arvore_categorias.root) == \
+        _chaves_pre_ordem(sistema.arvore_categorias.root)
+    celulares = restaurado.buscar_categoria("Celulares")
+    assert celulares.descricao == "descrição de Celulares"
+    assert [(p.id, p.nome, p.preco, p.avaliacao) for p in celulares.produtos] == \
+        [(1, "iPhone", 8999.9, 4.8), (2, "Galaxy", 7499.0, 4.7)]
+    assert restaurado.seq_alteracoes == 42
+
+
+def test_snapshot_arvore_vazia(tmp_path):
+    caminho = str(tmp_path / "vazio.snapshot")
+    salvar_snapshot(SistemaRecomendacao(), caminho)
+
+    restaurado = SistemaRecomendacao()
+    carregar_snapshot(caminho, restaurado)
+
+    assert restaurado.arvore_categorias.root is None
+
+
+def test_snapshot_corrompido_e_rejeitado(sistema, tmp_path):
+    """
+    Um byte alterado no payload invalida o checksum e não altera o sistema.
+    """
+    caminho = tmp_path / "catalogo.snapshot"
+    salvar_snapshot(sistema, str(caminho))
+    dados = bytearray(caminho.read_bytes())
+    dados[-1] ^= 0xFF
+    caminho.write_bytes(bytes(dados))
+
+    restaurado = SistemaRecomendacao()
+    with pytest.raises(ValueError):
+        carregar_snapshot(str(caminho), restaurado)
+    assert restaurado.arvore_categorias.root is None
+
+
+def test_snapshot_de_outro_banco_e_rejeitado(tmp_path):
+    """
+    Um banco apagado e recriado tem outra identidade: o snapshot dele não
+    volta a servir as categorias removidas, nem um snapshot à frente do log.
+    """
+    caminho_banco = str(tmp_path / "srhp.db")
+    caminho = str(tmp_path / "catalogo.snapshot")
+    db = Database(caminho_banco)
+    sistema = SistemaRecomendacao()
+    for nome in ["Livros", "Filmes", "Jogos"]:
+        db.inserir_categoria(nome)
+    sistema.sincronizar_alteracoes(db)
+    salvar_snapshot(sistema, caminho, db)
+
+    assert carregar_snapshot(caminho, SistemaRecomendacao(), db) == 3
+    assert Database(caminho_banco).id_banco == db.id_banco
+
+    os.remove(caminho_banco)
+    recriado = Database(caminho_banco)
+    restaurado = SistemaRecomendacao()
+    with pytest.raises(ValueError, match="outro banco"):
+        carregar_snapshot(caminho, restaurado, recriado)
+    assert restaurado.arvore_categorias.root is None
+
+    # mesma identidade, mas com o log atrás do snapshot
+    sistema.seq_alteracoes = 10
+    salvar_snapshot(sistema, caminho, recriado)
+    with pytest.raises(ValueError, match="a frente"):
+        carregar_snapshot(caminho, restaurado, recriado)
@@ -0,0 +1,109 @@
+# Testes unitários para o índice de sugestões aproximadas
+
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.estruturas import silenciar
+from src.business_logic import SistemaRecomendacao
+from src.colacao import chave_colacao
+from src.models import Categoria
+from src.snapshot import carregar_snapshot, salvar_snapshot
+from src.sugestoes import IndiceSugestoes, distancia_edicao, trigramas
+
+
+def _nomes(resultado):
+    return [entrada.nome for entrada, _, _ in resultado]
+
+
+def test_filtro_de_prefixo_acha_o_mesmo_que_a_varredura():
+    """
+    Só as listas mais raras geram candidatos, mas nenhum texto acima do
+    limiar fica de fora em relação à comparação com o catálogo inteiro.
+    """
+    gerador = random.Random(7)
+    silabas = ["ca", "me", "ra", "li", "vro", "ton", "su", "pe", "ri", "or", "ção"]
+    nomes = sorted({" ".join("".join(gerador.choices(silabas, k=gerador.randint(2, 4)))
+                             for _ in range(gerador.randint(1, 2))) for _ in range(400)})
+    indice = IndiceSugestoes()
+    for nome in nomes:
+        indice.adicionar(Categoria(nome), nome)
+
+    for consulta in gerador.sample(nomes, 40) + ["camera", "livro", "superior"]:
+        q = trigramas(chave_colacao(consulta))
+        esperados = set()
+        for nome in nomes:
+            t = trigramas(chave_colacao(nome))
+            if len(q & t) / len(q | t) >= 0.3:
+                esperados.add(nome)
+        achados = indice.buscar(consulta, k=len(nomes))
+        assert set(_nomes(achados)) == esperados
+        similaridades = [similaridade for _, similaridade, _ in achados]
+        assert similaridades == sorted(similaridades, reverse=True)
+
+    assert distancia_edicao("celulares", "celualres") == 2
+    assert indice.buscar("") == []
+
+
+def test_sistema_mantem_o_indice_em_dia():
+    with silenciar():
+        sistema = SistemaRecomendacao(sugestoes="completo")
+        sistema.cadastrar_categoria("Eletrônicos")
+        sistema.cadastrar_categoria("Celulares")
+        sistema.cadastrar_produto("Celulares", 1, "Smartphone Galaxy", 1999.0)
+        sistema.cadastrar_produto("Eletrônicos", 2, "Fone Bluetooth", 199.0)
+
+        assert _nomes(sistema.sugestoes.buscar("eletronicso", k=1)) == ["Eletrônicos"]
+        assert _nomes(sistema.sugestoes.buscar("smarphone galxy", tipo="produto")) == ["Smartphone Galaxy"]
+
+        sistema.atualizar_categoria("Celulares", "Telefones")
+        sistema.atualizar_produto("Telefones", 1, "Smartphone Moto", 1499.0)
+        sistema.remover_categoria("Eletrônicos")
+        sistema.aplicar_alteracoes([{
+            'seq': 1, 'tabela': 'produtos', 'operacao': 'INSERT', 'dados_antigos': None,
+            'dados_novos': {'id': 3, 'nome': 'Capinha', 'preco': 29.9, 'descricao': None,
+                            'avaliacao': 4.0, 'categoria_nome': 'Telefones'}
+        }])
+
+    assert _nomes(sistema.sugestoes.buscar("celulares")) == []
+    assert _nomes(sistema.sugestoes.buscar("telefone")) == ["Telefones"]
+    assert _nomes(sistema.sugestoes.buscar("smartphone galaxy")) == ["Smartphone Moto"]
+    assert _nomes(sistema.sugestoes.buscar("fone bluetooth")) == []
+    assert _nomes(sistema.sugestoes.buscar("capina")) == ["Capinha"]
+    assert len(sistema.sugestoes) == 3
+
+
+def test_indice_refeito_na_troca_da_arvore(tmp_path):
+    with silenciar():
+        sistema = SistemaRecomendacao()
+        sistema.cadastrar_categoria("Livros")
+        sistema.cadastrar_produto("Livros", 1, "Romance Policial", 49.9)
+    caminho = str(tmp_path / "catalogo.snapshot")
+    salvar_snapshot(sistema, caminho)
+
+    restaurado = SistemaRecomendacao(sugestoes="categorias")
+    carregar_snapshot(caminho, restaurado)
+    assert _nomes(restaurado.sugestoes.buscar("livro")) == ["Livros"]
+    assert restaurado.sugestoes.buscar("romance policial") == []
+
+    # troca sem verificação (catálogo compartilhado): sem índice, não desatualizado
+    restaurado.trocar_arvore(restaurado.nova_arvore(), 0, verificar=False)
+    assert restaurado.sugestoes is None
+    assert SistemaRecomendacao(sugestoes="desligado").sugestoes is None
+
+
+def test_rota_limita_o_tamanho_da_consulta(aplicacao):
+    """
+    Consultas acima de 100 caracteres são recusadas antes de chegar ao índice.
+    """
+    cliente = aplicacao.cliente
+    with silenciar():
+        assert cliente.post("/api/categorias", json={"nome": "Papelaria"}).status_code == 200
+
+    resposta = cliente.get("/api/sugestoes", params={"q": "papelaira"})
+    assert resposta.status_code == 200
+    assert [item["nome"] for item in resposta.json()] == ["Papelaria"]
+    assert cliente.get("/api/sugestoes", params={"q": "p" * 100}).status_code == 200
+    assert cliente.get("/api/sugestoes", params={"q": "p" * 101}).status_code == 422